@@ -0,0 +1,98 @@
+"""
+ANN vs brute-force benchmark for lesson recall.
+
+For each lesson count, builds the IVF index over synthetic clustered
+embeddings (real lesson embeddings are far from uniform) and reports
+recall@k against an exact scan, query latency for both, and build time.
+
+Usage:
+    python -m benchmarks.bench_ann_recall --sizes 10000 100000 1000000 --nprobe 8 16 32
+"""
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from src.store.ann import IVFIndex
+
+
+def clustered_vectors(count: int, dims: int, topics: int, rng) -> np.ndarray:
+    """Unit vectors scattered around `topics` random directions."""
+    centres = rng.standard_normal((topics, dims)).astype(np.float32)
+    centres /= np.linalg.norm(centres, axis=1, keepdims=True)
+    vectors = centres[rng.integers(0, topics, count)]
+    vectors = vectors + 0.6 / np.sqrt(dims) * rng.standard_normal((count, dims))
+    vectors = vectors.astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def exact_top_k(matrix: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    scores = matrix @ query
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def ann_top_k(ann: IVFIndex, matrix, query, k: int, nprobe: int) -> np.ndarray:
+    rows = ann.candidates(query, nprobe)
+    scores = matrix[rows] @ query
+    k = min(k, len(rows))
+    top = np.argpartition(-scores, k - 1)[:k]
+    return rows[top[np.argsort(-scores[top])]]
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def run(args):
+    rng = np.random.default_rng(args.seed)
+    print(f"{'lessons':>10} {'build s':>8} {'nlist':>6} {'nprobe':>7} "
+          f"{'recall@k':>9} {'exact p50':>10} {'ann p50':>8} {'ann p95':>8}")  # fmt: skip
+    for size in args.sizes:
+        topics = max(16, size // 200)
+        matrix = clustered_vectors(size, args.dims, topics, rng)
+        # Queries are perturbed lessons, like a new task resembling an old one
+        queries = matrix[rng.integers(0, size, args.queries)]
+        noise = 0.6 / np.sqrt(args.dims) * rng.standard_normal(queries.shape)
+        queries = (queries + noise).astype(np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+        started = time.perf_counter()
+        ann = IVFIndex.train(matrix)
+        ann.build(ann.assign(matrix))
+        build_s = time.perf_counter() - started
+
+        exact, exact_ms = zip(*(timed(exact_top_k, matrix, q, args.k) for q in queries))
+        for nprobe in args.nprobe:
+            hits, ann_ms = [], []
+            for query, truth in zip(queries, exact):
+                found, ms = timed(ann_top_k, ann, matrix, query, args.k, nprobe)
+                hits.append(len(set(found.tolist()) & set(truth.tolist())) / args.k)
+                ann_ms.append(ms)
+            print(
+                f"{size:>10} {build_s:>8.1f} {ann.nlist:>6} {nprobe:>7} "
+                f"{statistics.mean(hits):>9.3f} {statistics.median(exact_ms):>10.2f} "
+                f"{statistics.median(ann_ms):>8.2f} "
+                f"{sorted(ann_ms)[int(len(ann_ms) * 0.95)]:>8.2f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--dims", type=int, default=64, help="Embedding dimensions")
+    parser.add_argument("--k", type=int, default=10, help="Neighbours per query")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
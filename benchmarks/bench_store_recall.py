@@ -0,0 +1,135 @@
+"""
+Recall latency benchmark for the SQLite lesson store.
+
+Fills a fresh store with N synthetic lessons and times
+asearch(LESSON_NAMESPACE, query=...), the call recall_notes makes at the start
+of every search. Embeddings are deterministic hash vectors so the benchmark
+measures the store, not an embedding API. With --lexical it times the
+embedding-free BM25 keyword search used when embeddings are unavailable; with
+--snapshot the reopened store maps a quantized snapshot instead of decoding
+every embedding from SQLite (compare the cold column).
+
+Usage:
+    python -m benchmarks.bench_store_recall --sizes 10000 100000 1000000
+    python -m benchmarks.bench_store_recall --ann-min-vectors 50000
+    python -m benchmarks.bench_store_recall --lexical
+    python -m benchmarks.bench_store_recall --snapshot int8
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+from langgraph.store.base import PutOp
+
+from src.store import SqliteStore
+from src.store.snapshot import DTYPES, build_snapshot
+from src.tools.consult_note import LESSON_NAMESPACE
+
+
+def hash_embed(texts, dims):
+    vectors = []
+    for text in texts:
+        seed = int.from_bytes(hashlib.md5(text.encode()).digest()[:8], "little")
+        vectors.append(np.random.default_rng(seed).standard_normal(dims).tolist())
+    return vectors
+
+
+def fill(store: SqliteStore, size: int, batch_size: int) -> float:
+    started = time.perf_counter()
+    for start in range(0, size, batch_size):
+        store.batch(
+            [
+                PutOp(
+                    LESSON_NAMESPACE,
+                    f"lesson-{i}",
+                    {"lesson": f"synthetic lesson {i}", "task_query": f"query {i}"},
+                    index=["lesson"],
+                )
+                for i in range(start, min(start + batch_size, size))
+            ]
+        )
+    return time.perf_counter() - started
+
+
+async def time_queries(store: SqliteStore, queries: int, limit: int, lexical: bool):
+    latencies = []
+    for i in range(queries):
+        started = time.perf_counter()
+        if lexical:
+            await store.alexical_search(LESSON_NAMESPACE, f"lesson {i}", limit=limit)
+        else:
+            await store.asearch(LESSON_NAMESPACE, query=f"probe {i}", limit=limit)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run(args):
+    print(f"{'lessons':>10} {'fill s':>8} {'db MB':>8} {'cold ms':>9} "
+          f"{'p50 ms':>8} {'p95 ms':>8}")  # fmt: skip
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "store.db")
+            index = {
+                "dims": args.dims,
+                "embed": lambda texts: hash_embed(texts, args.dims),
+                "fields": ["lesson"],
+            }
+            ann = {"ann_min_vectors": args.ann_min_vectors, "ann_nprobe": args.nprobe}
+            store = SqliteStore(path, index=index, **ann)
+            fill_s = fill(store, size, args.batch_size)
+            if args.snapshot:
+                ann["snapshot_path"] = os.path.join(tmp, "snapshot")
+                build_snapshot(store, ann["snapshot_path"], dtype=args.snapshot)
+            store.close()
+
+            # Reopen so the first query pays the cost of loading vectors from disk
+            store = SqliteStore(path, index=index, **ann)
+            cold = await time_queries(store, 1, args.limit, args.lexical)
+            warm = await time_queries(store, args.queries, args.limit, args.lexical)
+            db_mb = os.path.getsize(path) / 1e6
+            store.close()
+
+        print(
+            f"{size:>10} {fill_s:>8.1f} {db_mb:>8.1f} {cold[0]:>9.1f} "
+            f"{statistics.median(warm):>8.2f} {percentile(warm, 95):>8.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--dims", type=int, default=64, help="Embedding dimensions")
+    parser.add_argument("--queries", type=int, default=50, help="Warm queries per size")
+    parser.add_argument("--limit", type=int, default=3, help="Lessons per recall")
+    parser.add_argument("--batch-size", type=int, default=5_000)
+    parser.add_argument(
+        "--ann-min-vectors",
+        type=int,
+        default=0,
+        help="Use the IVF index from this many lessons (0 = exact scan only)",
+    )
+    parser.add_argument("--nprobe", type=int, default=32)
+    parser.add_argument(
+        "--lexical", action="store_true", help="Time BM25 keyword search instead"
+    )
+    parser.add_argument(
+        "--snapshot", choices=DTYPES, help="Reopen from a snapshot of this precision"
+    )
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Throughput scaling benchmark for the batch worker pool.
+
+Runs the same batch on 1..N worker processes and reports queries/min and the
+speedup over one worker. The graph mirrors the search graph's shape with fake
+providers: each query plans, "searches" several sub-questions in parallel and
+summarises. Provider calls are asyncio.sleep (--latency-ms), while the work
+between them - building and parsing result JSON, hashing content, and
+checkpointing the growing state after every step - is real CPU work that
+holds the GIL, so one event loop saturates a core however many queries it has
+in flight. Each worker keeps --concurrency queries in flight, and wall time
+includes starting the worker processes.
+
+Usage:
+    python -m benchmarks.bench_worker_pool --workers 1 2 4 --queries 200
+    python -m benchmarks.bench_worker_pool --workers 1 2 4 8 --concurrency 16 --cpu 4
+"""
+
+from typing import Annotated
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import operator
+import os
+
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import END, START, StateGraph
+from langgraph.types import Send
+from typing_extensions import TypedDict
+
+from src.pool import WorkerPool
+
+SUB_QUESTIONS = 4
+RESULTS_PER_SEARCH = 20
+
+
+class BenchState(TypedDict, total=False):
+    query: str
+    questions: list
+    sources: Annotated[list, operator.add]
+    summary: str
+
+
+def _settings():
+    # Read in the worker processes, which get the parent's environment
+    return (
+        float(os.getenv("BENCH_LATENCY_MS", "200")) / 1000,
+        int(os.getenv("BENCH_CPU", "2")),
+    )
+
+
+def _cpu_work(payload: list, rounds: int) -> str:
+    digest = b""
+    for _ in range(rounds):
+        text = json.dumps(payload)
+        payload = json.loads(text)
+        digest = hashlib.sha256(text.encode() + digest).digest()
+    return digest.hex()
+
+
+def build_graph():
+    """Fake-provider search graph: plan -> search x SUB_QUESTIONS -> summarise."""
+    latency, rounds = _settings()
+
+    async def plan(state):
+        await asyncio.sleep(latency)
+        return {
+            "questions": [f"{state['query']} part {i}" for i in range(SUB_QUESTIONS)]
+        }
+
+    def fan_out(state):
+        return [Send("search", {"query": question}) for question in state["questions"]]
+
+    async def search(state):
+        await asyncio.sleep(latency)
+        results = [
+            {
+                "title": f"{state['query']} result {i}",
+                "url": f"https://example.com/{i}",
+                "content": f"{state['query']} " * 60,
+            }
+            for i in range(RESULTS_PER_SEARCH)
+        ]
+        _cpu_work(results, rounds)
+        return {"sources": results[:5]}
+
+    async def summarise(state):
+        await asyncio.sleep(latency)
+        return {"summary": _cpu_work(state["sources"], rounds * 4)}
+
+    builder = StateGraph(BenchState)
+    builder.add_node("plan", plan)
+    builder.add_node("search", search)
+    builder.add_node("summarise", summarise)
+    builder.add_edge(START, "plan")
+    builder.add_conditional_edges("plan", fan_out, ["search"])
+    builder.add_edge("search", "summarise")
+    builder.add_edge("summarise", END)
+    return builder.compile(checkpointer=InMemorySaver())
+
+
+async def run(workers: int, queries: int, concurrency: int) -> dict:
+    items = [{"id": str(i), "query": f"benchmark query {i}"} for i in range(queries)]
+    pool = WorkerPool(
+        workers, concurrency, graph_ref="benchmarks.bench_worker_pool:build_graph"
+    )
+    return await pool.run(items, io.StringIO())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="Queries in flight per worker"
+    )
+    parser.add_argument(
+        "--latency-ms", type=float, default=200, help="Simulated provider latency"
+    )
+    parser.add_argument(
+        "--cpu", type=int, default=2, help="JSON round trips per step (CPU work)"
+    )
+    args = parser.parse_args()
+    os.environ["BENCH_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["BENCH_CPU"] = str(args.cpu)
+
+    print(
+        f"{args.queries} queries, {args.concurrency} in flight per worker, "
+        f"{args.latency_ms:.0f}ms provider latency, {os.cpu_count()} CPUs"
+    )
+    print(
+        f"{'workers':>8} {'wall s':>8} {'queries/min':>12} {'speedup':>8} {'p50 s':>7}"
+    )
+    baseline = None
+    for workers in args.workers:
+        stats = asyncio.run(run(workers, args.queries, args.concurrency))
+        if stats["failed"]:
+            raise SystemExit(f"{stats['failed']} queries failed with {workers} workers")
+        baseline = baseline or stats["queries_per_minute"]
+        print(
+            f"{workers:>8} {stats['wall_s']:>8.1f} {stats['queries_per_minute']:>12.0f} "
+            f"{stats['queries_per_minute'] / baseline:>7.2f}x "
+            f"{stats['latency_s']['p50']:>7.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Concurrent batch mode - many queries on one event loop, results streamed as JSONL
+"""
+
+from typing import Any, Dict, IO, Iterable, List, Optional
+import asyncio
+import json
+import logging
+import sys
+import time
+import uuid
+
+import numpy as np
+
+from src.runner import query_events
+
+logger = logging.getLogger("LangGraph_DeepSearch.batch")
+
+
+def read_queries(lines: Iterable[str]) -> List[Dict[str, Any]]:
+    """
+    Parse batch input: one query per line, as a JSON object with a "query" key
+    (plus optional "id", "thread_id", "tenant", "project" and budget keys),
+    a JSON string, or plain text. Blank lines are skipped.
+
+    Returns:
+        One dict per query, each with at least "id" and "query"
+    """
+    items = []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError:
+            item = line
+        if isinstance(item, str):
+            item = {"query": item}
+        if not isinstance(item, dict) or not str(item.get("query", "")).strip():
+            raise ValueError(f"Line {number}: expected a query, got {line[:80]!r}")
+        item.setdefault("id", str(len(items) + 1))
+        items.append(item)
+    return items
+
+
+def latency_percentiles(latencies: List[float]) -> Dict[str, float]:
+    if not latencies:
+        return {}
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+    return {"p50": float(p50), "p90": float(p90), "p99": float(p99)}
+
+
+def batch_stats(
+    queries: int, latencies: List[float], failed: int, wall_s: float
+) -> Dict[str, Any]:
+    """Counts, wall time, throughput and latency percentiles of a finished batch."""
+    return {
+        "queries": queries,
+        "succeeded": queries - failed,
+        "failed": failed,
+        "wall_s": round(wall_s, 3),
+        "queries_per_minute": round(queries / wall_s * 60, 2) if wall_s else 0.0,
+        "latency_s": latency_percentiles(latencies),
+    }
+
+
+async def run_query(
+    graph, item: Dict[str, Any], batch_id: str, queued_s: float = 0.0
+) -> Dict[str, Any]:
+    """
+    Run one query to completion, approving the plan as --no-feedback does.
+
+    Args:
+        graph: Compiled search graph
+        item: Parsed batch line (see read_queries)
+        batch_id: Prefix of generated thread IDs
+        queued_s: Time the query waited for a free slot, reported in its result
+
+    Returns:
+        JSON-serialisable result: summary, sources, score, degradations and timings
+    """
+    started = time.perf_counter()
+    request = {
+        **item,
+        "thread_id": item.get("thread_id") or f"{batch_id}_{item['id']}",
+        "no_feedback": True,
+    }
+    result: Dict[str, Any] = {
+        "id": item["id"],
+        "query": item["query"],
+        "thread_id": request["thread_id"],
+    }
+    try:
+        async for event in query_events(graph, request):
+            if event["event"] == "result":
+                result.update(
+                    {
+                        key: event[key]
+                        for key in ("summary", "sources", "score", "degradations")
+                    }
+                )
+    except Exception as e:
+        logger.warning(f"Batch query {item['id']} failed: {e}")
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["latency_s"] = round(time.perf_counter() - started, 3)
+    result["queued_s"] = round(queued_s, 3)
+    return result
+
+
+async def run_batch(
+    items: List[Dict[str, Any]],
+    out: IO[str],
+    concurrency: int = 4,
+    graph=None,
+) -> Dict[str, Any]:
+    """
+    Run queries concurrently and write each result as one JSON line when it finishes.
+
+    All queries share the process's graph, store, embedding service and HTTP
+    clients, so caches stay warm across the batch.
+
+    Args:
+        items: Parsed batch lines (see read_queries)
+        out: Text stream receiving one JSON object per finished query
+        concurrency: Maximum number of queries in flight
+        graph: Compiled search graph (default: the web search graph)
+
+    Returns:
+        Batch statistics: counts, wall time, throughput and latency percentiles
+    """
+    if graph is None:
+        from src.graphs.web_search_graph import graph
+
+    batch_id = f"batch_{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+    slots = asyncio.Semaphore(max(1, concurrency))
+    started = time.perf_counter()
+
+    async def run(item):
+        submitted = time.perf_counter()
+        async with slots:
+            return await run_query(
+                graph, item, batch_id, queued_s=time.perf_counter() - submitted
+            )
+
+    latencies, failed = [], 0
+    for finished in asyncio.as_completed([run(item) for item in items]):
+        result = await finished
+        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        out.flush()
+        if "error" in result:
+            failed += 1
+        else:
+            latencies.append(result["latency_s"])
+
+    return batch_stats(len(items), latencies, failed, time.perf_counter() - started)
+
+
+def format_stats(stats: Dict[str, Any]) -> str:
+    latency = stats["latency_s"]
+    lines = [
+        f"📦 {stats['succeeded']}/{stats['queries']} queries succeeded "
+        f"in {stats['wall_s']:.1f}s ({stats['queries_per_minute']:.1f} queries/min)"
+    ]
+    if latency:
+        lines.append(
+            f"⏱️  Latency p50 {latency['p50']:.1f}s, p90 {latency['p90']:.1f}s, "
+            f"p99 {latency['p99']:.1f}s"
+        )
+    if stats.get("per_worker"):
+        counts = ", ".join(str(n) for n in stats["per_worker"].values())
+        lines.append(f"🧵 {stats['workers']} workers finished {counts} queries")
+    return "\n".join(lines)
+
+
+def open_output(path: Optional[str]) -> IO[str]:
+    """The JSONL output stream: a file, or stdout for None or "-"."""
+    if not path or path == "-":
+        return sys.stdout
+    return open(path, "w", encoding="utf-8")
@@ -0,0 +1,203 @@
+"""
+Per-query latency and cost budget - lets nodes degrade gracefully under a deadline
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import time
+import logging
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import RunnableConfig
+from langgraph.config import get_config
+from src import config
+
+logger = logging.getLogger("LangGraph_DeepSearch.budget")
+
+# Degradation steps in the order they are applied, with the budget pressure
+# (fraction of the tightest limit already used) at which each one kicks in
+DEGRADATION_STEPS = [
+    ("skip_review", 0.5),
+    ("skip_relevance", 0.65),
+    ("cap_sub_questions", 0.8),
+    ("basic_search", 0.9),
+]
+
+
+class QueryBudget(BaseCallbackHandler):
+    """
+    Wall-clock deadline plus LLM call and token limits for a single query.
+
+    The budget is carried in graph config under configurable["budget"] so that
+    nodes can consult it. Attach it as a callback as well (see with_budget) so
+    that every LLM call made inside the graph is counted against it.
+    """
+
+    run_inline = True
+
+    def __init__(
+        self,
+        deadline_s: Optional[float] = None,
+        max_llm_calls: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+    ):
+        self.deadline_s = deadline_s or None
+        self.max_llm_calls = max_llm_calls or None
+        self.max_tokens = max_tokens or None
+        self.started_at = time.monotonic()
+        self.llm_calls = 0
+        self.tokens_used = 0
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "QueryBudget":
+        return cls(
+            deadline_s=data.get("deadline_s"),
+            max_llm_calls=data.get("max_llm_calls"),
+            max_tokens=data.get("max_tokens"),
+        )
+
+    # Callback hooks
+
+    def on_llm_start(self, serialized, prompts, **kwargs: Any) -> None:
+        self.llm_calls += 1
+
+    def on_chat_model_start(self, serialized, messages, **kwargs: Any) -> None:
+        self.llm_calls += 1
+
+    def on_llm_end(self, response, **kwargs: Any) -> None:
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        tokens = usage.get("total_tokens")
+        if tokens is None:
+            tokens = 0
+            for generations in response.generations:
+                for generation in generations:
+                    message = getattr(generation, "message", None)
+                    usage_metadata = getattr(message, "usage_metadata", None) or {}
+                    tokens += usage_metadata.get("total_tokens", 0)
+        self.tokens_used += tokens
+
+    # Budget checks
+
+    def exclude(self, seconds: float) -> None:
+        """Exclude time spent outside the graph (e.g. waiting for human feedback) from the deadline."""
+        self.started_at += seconds
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def pressure(self) -> float:
+        """Fraction of the tightest limit used so far (0 = untouched, >= 1 = exhausted)."""
+        ratios = [0.0]
+        if self.deadline_s:
+            ratios.append(self.elapsed / self.deadline_s)
+        if self.max_llm_calls:
+            ratios.append(self.llm_calls / self.max_llm_calls)
+        if self.max_tokens:
+            ratios.append(self.tokens_used / self.max_tokens)
+        return max(ratios)
+
+    def degradations(self) -> List[str]:
+        """Degradation steps currently in effect, in the order they are applied."""
+        pressure = self.pressure()
+        return [step for step, threshold in DEGRADATION_STEPS if pressure >= threshold]
+
+    def should(self, step: str) -> bool:
+        return step in self.degradations()
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "elapsed_s": round(self.elapsed, 3),
+            "llm_calls": self.llm_calls,
+            "tokens_used": self.tokens_used,
+            "pressure": round(self.pressure(), 3),
+        }
+
+
+# Budgets passed as plain dicts (e.g. JSON config from `langgraph dev`) are
+# materialised once per run (configurable["run_id"], set by the LangGraph API;
+# the thread for callers without one) so that every node sees the same clock.
+# The entry is released when the run reaches END; the cap bounds runs that
+# never get there (interrupted, failed). Only the deadline applies to these
+# unless the budget is also attached as a callback.
+_DICT_BUDGETS: "OrderedDict[str, QueryBudget]" = OrderedDict()
+_MAX_DICT_BUDGETS = 1024
+
+
+def _dict_budget_key(configurable: Dict[str, Any]) -> str:
+    run_id = configurable.get("run_id")
+    if run_id:
+        return f"run:{run_id}"
+    return f"thread:{configurable.get('thread_id', '')}"
+
+
+def get_budget(run_config: Optional[RunnableConfig]) -> Optional[QueryBudget]:
+    """Return the QueryBudget carried in graph config, if any."""
+    configurable = (run_config or {}).get("configurable", {})
+    budget = configurable.get("budget")
+    if budget is None or isinstance(budget, QueryBudget):
+        return budget
+
+    key = _dict_budget_key(configurable)
+    if key not in _DICT_BUDGETS:
+        _DICT_BUDGETS[key] = QueryBudget.from_dict(budget)
+        while len(_DICT_BUDGETS) > _MAX_DICT_BUDGETS:
+            _DICT_BUDGETS.popitem(last=False)
+    return _DICT_BUDGETS[key]
+
+
+def release_budget(run_config: Optional[RunnableConfig] = None) -> None:
+    """
+    Forget the budget materialised from a dict for a finished run, so the
+    next run on the thread (e.g. --continue) starts a fresh clock.
+
+    Args:
+        run_config: Graph config of the run (default: the run we are executing in)
+    """
+    if run_config is None:
+        try:
+            run_config = get_config()
+        except RuntimeError:
+            return
+    configurable = run_config.get("configurable", {})
+    if isinstance(configurable.get("budget"), dict):
+        _DICT_BUDGETS.pop(_dict_budget_key(configurable), None)
+
+
+def budget_from_config() -> Optional[QueryBudget]:
+    """Build a QueryBudget from the QUERY_* environment defaults, or None if unset."""
+    if not (
+        config.QUERY_DEADLINE_SECONDS
+        or config.QUERY_MAX_LLM_CALLS
+        or config.QUERY_MAX_TOKENS
+    ):
+        return None
+    return QueryBudget(
+        deadline_s=config.QUERY_DEADLINE_SECONDS,
+        max_llm_calls=config.QUERY_MAX_LLM_CALLS,
+        max_tokens=config.QUERY_MAX_TOKENS,
+    )
+
+
+def with_budget(run_config: RunnableConfig, budget: QueryBudget) -> RunnableConfig:
+    """Attach a budget to a graph config so nodes can consult it and LLM usage is counted."""
+    configurable = {**run_config.get("configurable", {}), "budget": budget}
+    callbacks = list(run_config.get("callbacks") or []) + [budget]
+    return {**run_config, "configurable": configurable, "callbacks": callbacks}
+
+
+def current_budget() -> Optional[QueryBudget]:
+    """Return the budget of the graph run we are executing in, if any."""
+    try:
+        return get_budget(get_config())
+    except RuntimeError:
+        # Called outside of a graph run (e.g. directly from tests)
+        return None
+
+
+def degrade(step: str) -> bool:
+    """Return True (and log it) when the current query budget requires the given degradation."""
+    budget = current_budget()
+    if budget is None or not budget.should(step):
+        return False
+    logger.info(f"Budget degradation '{step}' applied ({budget.report()})")
+    return True
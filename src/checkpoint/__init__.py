@@ -0,0 +1,20 @@
+"""Persistent LangGraph checkpointer implementations."""
+
+# Exports are imported on first access, so that the stdlib-only reader can be
+# used without importing LangGraph
+_EXPORTS = {
+    "SqliteSaver": ".sqlite_saver",
+    "ThreadCache": ".thread_cache",
+    "ThreadEvent": ".thread_cache",
+}
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+
+    return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+
+
+__all__ = ["SqliteSaver", "ThreadCache", "ThreadEvent"]
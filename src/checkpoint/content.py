@@ -0,0 +1,99 @@
+"""
+Content-addressed storage of large checkpoint values.
+
+A checkpoint stores every channel that changed in full, so append-only
+channels (messages, search_results, sources) are rewritten with all their
+earlier items at each step and a thread's storage grows quadratically. Here
+each large item is stored once under the SHA-256 of its serialized form; the
+channel value only lists digests, so a step adds just its new items.
+
+Lists are split item by item, other values are moved out whole. Small items
+stay inline, where a digest would cost about as much as the item.
+"""
+
+from typing import Any, Dict, List, Tuple
+import hashlib
+
+import ormsgpack
+
+from langgraph.checkpoint.serde.base import SerializerProtocol
+
+# Value types of a split value: one digest, or a list of digests and inline items
+CONTENT = "content"
+CONTENT_LIST = "content-list"
+
+DIGEST_BYTES = 32
+
+# (type, data) of a serialized value, keyed by digest
+Contents = Dict[bytes, Tuple[str, bytes]]
+
+
+def digest(type_: str, data: bytes) -> bytes:
+    return hashlib.sha256(type_.encode() + b"\0" + data).digest()
+
+
+def split_value(
+    serde: SerializerProtocol, value: Any, min_bytes: int
+) -> Tuple[str, bytes, Contents]:
+    """
+    Serialize value, moving items of at least min_bytes into content entries.
+
+    Args:
+        serde: Serializer for the value and its items
+        value: Channel value or pending write
+        min_bytes: Serialized size from which an item is stored by digest (0 = never)
+
+    Returns:
+        (type, data, contents): the serialized value, which references the
+        digests in contents instead of embedding them
+    """
+    contents: Contents = {}
+    if min_bytes > 0 and isinstance(value, list) and value:
+        entries: List[Any] = []
+        for item in value:
+            type_, data = serde.dumps_typed(item)
+            if len(data) >= min_bytes:
+                key = digest(type_, data)
+                contents[key] = (type_, data)
+                entries.append(key)
+            else:
+                entries.append((type_, data))
+        if contents:
+            return CONTENT_LIST, ormsgpack.packb(entries), contents
+        return (*serde.dumps_typed(value), contents)
+
+    type_, data = serde.dumps_typed(value)
+    if min_bytes > 0 and len(data) >= min_bytes:
+        key = digest(type_, data)
+        return CONTENT, key, {key: (type_, data)}
+    return type_, data, contents
+
+
+def join_value(
+    serde: SerializerProtocol, type_: str, data: bytes, contents: Contents
+) -> Any:
+    """
+    Inverse of split_value.
+
+    Args:
+        serde: Serializer the value was split with
+        type_: Type returned by split_value
+        data: Data returned by split_value
+        contents: Content entries, at least those the value references
+
+    Returns:
+        The value, with each referenced item deserialized from its own copy
+    """
+    if type_ == CONTENT:
+        return serde.loads_typed(contents[data])
+    if type_ == CONTENT_LIST:
+        return [
+            serde.loads_typed(contents[entry] if isinstance(entry, bytes) else entry)
+            for entry in ormsgpack.unpackb(data)
+        ]
+    return serde.loads_typed((type_, data))
+
+
+def split_refs(refs: bytes) -> List[bytes]:
+    """Digests packed into one refs column."""
+    return [refs[i : i + DIGEST_BYTES] for i in range(0, len(refs), DIGEST_BYTES)]
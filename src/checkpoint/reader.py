@@ -0,0 +1,46 @@
+"""
+Read-only queries on a checkpoint database.
+
+The thread and state-size listings only read tables SqliteSaver maintains,
+so they are plain SQLite queries with no LangGraph imports. SqliteSaver uses
+them on its own connection, and the CLI's --list-threads and --show-state
+open the file read-only with them, without loading the graph.
+"""
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import sqlite3
+
+from .size_stats import step_breakdown
+
+
+def connect_readonly(path: str) -> Optional[sqlite3.Connection]:
+    """
+    Open a checkpoint database for reading.
+
+    Returns:
+        The connection, or None for ":memory:" or a file that doesn't exist yet
+    """
+    if path == ":memory:" or not Path(path).exists():
+        return None
+    return sqlite3.connect(Path(path).resolve().as_uri() + "?mode=ro", uri=True)
+
+
+def read_threads(conn: sqlite3.Connection, limit: int = 20) -> List[Tuple[str, float]]:
+    """Most recently updated threads as (thread_id, updated_at) pairs."""
+    return conn.execute(
+        "SELECT thread_id, updated_at FROM threads ORDER BY updated_at DESC LIMIT ?",
+        (limit,),
+    ).fetchall()
+
+
+def read_state_sizes(
+    conn: sqlite3.Connection, thread_id: str, checkpoint_ns: str = ""
+) -> List[Dict[str, Any]]:
+    """Per-step size breakdown of a thread's state (see size_stats.step_breakdown)."""
+    rows = conn.execute(
+        "SELECT checkpoint_id, step, source, sizes, put_ms, write_ms FROM steps "
+        "WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id",
+        (thread_id, checkpoint_ns),
+    ).fetchall()
+    return step_breakdown(rows)
@@ -0,0 +1,147 @@
+"""
+Per-step state size instrumentation.
+
+For every checkpoint the saver records the serialized size of each channel
+that changed, how long serializing the checkpoint took on the caller's path,
+and how long the transaction that wrote it took. Unchanged channels carry
+their size over from the previous step, so each step has the full breakdown
+of the state (messages, search_results, sources, summary, ...).
+
+SizeMonitor logs a warning the first time a thread's field or whole state
+crosses a configured threshold, pointing at the loops and fields that blow up
+memory and prompt sizes.
+"""
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+import json
+import logging
+
+logger = logging.getLogger("LangGraph_DeepSearch.size_stats")
+
+# (thread_id, checkpoint_ns)
+ThreadKey = Tuple[str, str]
+
+# Marks the whole-state warning in a thread's reported thresholds
+_WHOLE_STATE = ""
+
+# Threads whose latest sizes are remembered for threshold checks
+_TRACKED_THREADS = 10000
+
+
+def is_state_field(channel: str) -> bool:
+    """Whether a channel is a state field rather than LangGraph bookkeeping."""
+    return not channel.startswith(("__", "branch:"))
+
+
+def step_breakdown(rows: Iterable[Tuple]) -> List[Dict[str, Any]]:
+    """
+    Per-step size breakdown of a thread.
+
+    Args:
+        rows: (checkpoint_id, step, source, sizes JSON, put_ms, write_ms) in
+            checkpoint order, sizes holding only the channels that changed
+
+    Returns:
+        One dict per step with the size of every field so far ("fields"), the
+        fields that changed, the total, and the put/write times in ms
+    """
+    fields: Dict[str, int] = {}
+    steps = []
+    for checkpoint_id, step, source, sizes, put_ms, write_ms in rows:
+        changed = {k: v for k, v in json.loads(sizes).items() if is_state_field(k)}
+        fields.update(changed)
+        steps.append(
+            {
+                "checkpoint_id": checkpoint_id,
+                "step": step,
+                "source": source,
+                "fields": dict(fields),
+                "changed": sorted(changed),
+                "total": sum(fields.values()),
+                "put_ms": put_ms,
+                "write_ms": write_ms,
+            }
+        )
+    return steps
+
+
+class SizeMonitor:
+    """
+    Warns once per thread when a field or the whole state gets too big.
+
+    Args:
+        warn_field_bytes: Serialized size of one field that triggers a warning (0 = off)
+        warn_state_bytes: Serialized size of the whole state that triggers a warning (0 = off)
+    """
+
+    def __init__(self, warn_field_bytes: int = 0, warn_state_bytes: int = 0):
+        self.warn_field_bytes = warn_field_bytes
+        self.warn_state_bytes = warn_state_bytes
+        # Latest field sizes and the thresholds already reported, per thread
+        self._threads: "OrderedDict[ThreadKey, Tuple[Dict[str, int], Set[str]]]" = (
+            OrderedDict()
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.warn_field_bytes > 0 or self.warn_state_bytes > 0
+
+    def observe(
+        self,
+        key: ThreadKey,
+        step: Optional[int],
+        changed: Dict[str, int],
+        load: Callable[[], Dict[str, int]],
+    ) -> None:
+        """
+        Record a step's changed field sizes and warn about new threshold crossings.
+
+        Args:
+            key: Thread and checkpoint namespace
+            step: Super-step of the checkpoint
+            changed: Sizes of the fields that changed in this step
+            load: Returns the thread's current field sizes when they aren't
+                tracked yet (e.g. after a restart)
+        """
+        if not self.enabled:
+            return
+        entry = self._threads.get(key)
+        if entry is None:
+            entry = self._threads[key] = (load(), set())
+            if len(self._threads) > _TRACKED_THREADS:
+                self._threads.popitem(last=False)
+        else:
+            self._threads.move_to_end(key)
+        sizes, warned = entry
+        sizes.update((k, v) for k, v in changed.items() if is_state_field(k))
+
+        if self.warn_field_bytes > 0:
+            for field, size in changed.items():
+                if (
+                    field in sizes
+                    and size >= self.warn_field_bytes
+                    and field not in warned
+                ):
+                    warned.add(field)
+                    logger.warning(
+                        f"Thread {key[0]}: field '{field}' reached {size / 1024:.0f} KB "
+                        f"at step {step} (warning at {self.warn_field_bytes / 1024:.0f} KB)"
+                    )
+        total = sum(sizes.values())
+        if (
+            self.warn_state_bytes > 0
+            and total >= self.warn_state_bytes
+            and _WHOLE_STATE not in warned
+        ):
+            warned.add(_WHOLE_STATE)
+            largest = sorted(sizes.items(), key=lambda kv: -kv[1])[:3]
+            logger.warning(
+                f"Thread {key[0]}: state reached {total / 1024:.0f} KB at step {step} "
+                f"(warning at {self.warn_state_bytes / 1024:.0f} KB); largest fields: "
+                + ", ".join(f"{k}={v / 1024:.0f} KB" for k, v in largest)
+            )
+
+    def forget(self, thread_id: str) -> None:
+        for key in [key for key in self._threads if key[0] == thread_id]:
+            del self._threads[key]
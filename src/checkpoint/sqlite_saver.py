@@ -0,0 +1,926 @@
+"""
+SQLite-backed LangGraph checkpointer with retention.
+
+Checkpoints, channel values and pending writes live in one SQLite file (WAL
+mode), so a thread can be resumed by another process, e.g. with
+`deepsearch --continue THREAD_ID`. Values use the saver's serde (msgpack by
+default) and large ones are zlib-compressed. Large items of channel values and
+writes (messages, search results, sources) are stored once by content hash
+(see content.py), so a growing list doesn't rewrite its earlier items at every
+step. The serialized size of every field and the write time of each step are
+recorded (see size_stats.py). The latest checkpoints of recently used threads can be kept in memory
+under a global cap (see thread_cache.py). Only the newest `keep_last`
+checkpoints of each thread are kept, together with the channel values they
+reference, and threads untouched for `ttl_seconds` are deleted.
+
+aput/aput_writes serialize immediately but write in the background: whatever
+was queued while the previous batch was being written goes to disk in one
+transaction, so a graph step doesn't wait on the disk. Reads flush the queue
+first, so they always see every checkpoint that was put.
+"""
+
+from collections.abc import AsyncIterator, Iterator, Sequence
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+import asyncio
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+import zlib
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    SerializerProtocol,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+from .content import CONTENT, Contents, join_value, split_refs, split_value
+from .reader import read_state_sizes, read_threads
+from .size_stats import SizeMonitor
+from .thread_cache import ThreadCache
+
+logger = logging.getLogger("LangGraph_DeepSearch.sqlite_saver")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    parent_id TEXT,
+    type TEXT NOT NULL,
+    checkpoint BLOB NOT NULL,
+    metadata_type TEXT NOT NULL,
+    metadata BLOB NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    value BLOB,
+    refs BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT NOT NULL,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    refs BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS threads_updated ON threads (updated_at);
+CREATE TABLE IF NOT EXISTS content (
+    hash BLOB PRIMARY KEY,
+    type TEXT NOT NULL,
+    value BLOB NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS content_refs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    hash BLOB NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, hash)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS content_refs_hash ON content_refs (hash);
+CREATE TABLE IF NOT EXISTS steps (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    step INTEGER,
+    source TEXT,
+    sizes TEXT NOT NULL,
+    put_ms REAL NOT NULL,
+    write_ms REAL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+) WITHOUT ROWID;
+"""
+
+# Serialized values at least this big are zlib-compressed
+_COMPRESS_MIN_BYTES = 1024
+_ZLIB = "+zlib"
+
+# Expired threads are looked for at most this often
+_EXPIRE_EVERY_S = 60.0
+
+# Content rows fetched per query
+_CONTENT_BATCH = 500
+
+# A queued row: (sql, params), (_PUT_CONTENT, (digest, type, data)) or
+# (_STEP_STATS, steps row without write_ms)
+_Row = Tuple[str, Tuple]
+_PUT_CONTENT = "content"
+_STEP_STATS = "steps"
+
+
+class SqliteSaver(BaseCheckpointSaver[str]):
+    """
+    Durable BaseCheckpointSaver backed by SQLite.
+
+    Args:
+        path: SQLite database file (":memory:" for a throwaway checkpointer)
+        serde: Serializer for checkpoints and channel values (default msgpack)
+        keep_last: Checkpoints kept per thread and namespace (0 = keep all)
+        ttl_seconds: Threads not written to for this long are deleted (0 = never)
+        async_writes: Let aput/aput_writes return before their rows are written
+        content_min_bytes: Items of channel values and writes at least this
+            big (serialized) are stored once by content hash (0 = never)
+        cache_bytes: Memory for the latest checkpoints of recently used threads,
+            evicted least recently used first (0 = read every checkpoint from disk)
+        warn_field_bytes: Log a warning when one field of a thread's state
+            reaches this serialized size (0 = never)
+        warn_state_bytes: Log a warning when a thread's whole state reaches
+            this serialized size (0 = never)
+
+    Notes:
+        - Pruning keeps every channel value the kept checkpoints reference,
+          so resuming from the newest checkpoint is unaffected; older ones
+          just disappear from the thread's history.
+        - Graphs using DeltaChannel rebuild values from the parent chain and
+          need keep_last=0.
+    """
+
+    def __init__(
+        self,
+        path: str = ":memory:",
+        *,
+        serde: Optional[SerializerProtocol] = None,
+        keep_last: int = 0,
+        ttl_seconds: float = 0,
+        async_writes: bool = True,
+        content_min_bytes: int = 512,
+        cache_bytes: int = 0,
+        warn_field_bytes: int = 0,
+        warn_state_bytes: int = 0,
+    ):
+        super().__init__(serde=serde)
+        self.path = path
+        self.keep_last = keep_last
+        self.ttl_seconds = ttl_seconds
+        self.async_writes = async_writes
+        self.content_min_bytes = content_min_bytes
+        # Latest checkpoint of recently used threads, in memory
+        self.cache = ThreadCache(cache_bytes) if cache_bytes > 0 else None
+        self.size_monitor = SizeMonitor(warn_field_bytes, warn_state_bytes)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._pending: List[_Row] = []
+        self._pending_threads: Set[Tuple[str, str]] = set()
+        self._pending_lock = threading.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+        self._last_expiry = 0.0
+
+    # Connection management
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Open the database lazily so that importing the graph doesn't touch disk."""
+        if self._conn is None:
+            with self._lock:
+                if self._conn is None:
+                    if self.path != ":memory:":
+                        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+                    conn = sqlite3.connect(
+                        self.path, check_same_thread=False, isolation_level=None
+                    )
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute("PRAGMA synchronous=NORMAL")
+                    conn.executescript(_SCHEMA)
+                    self._conn = conn
+        return self._conn
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # Serialization
+
+    @staticmethod
+    def _compress(type_: str, data: bytes) -> Tuple[str, bytes]:
+        if len(data) >= _COMPRESS_MIN_BYTES:
+            return type_ + _ZLIB, zlib.compress(data, 1)
+        return type_, data
+
+    @staticmethod
+    def _decompress(type_: str, data: Optional[bytes]) -> Tuple[str, Optional[bytes]]:
+        if type_.endswith(_ZLIB):
+            return type_[: -len(_ZLIB)], zlib.decompress(data)
+        return type_, data
+
+    def _dumps(self, value: Any) -> Tuple[str, bytes]:
+        return self._compress(*self.serde.dumps_typed(value))
+
+    def _loads(self, type_: str, data: Optional[bytes]) -> Any:
+        return self.serde.loads_typed(self._decompress(type_, data))
+
+    def _dumps_value(
+        self, value: Any, thread: Tuple[str, str]
+    ) -> Tuple[str, bytes, bytes, List[_Row], int]:
+        """
+        Serialize a channel value or write, moving its large items to content rows.
+
+        Returns:
+            (type, data, refs, rows, size): refs packs the digests the value
+            references; rows store their content and record that the thread
+            uses it; size is the serialized size of the whole value
+        """
+        type_, data, contents = split_value(self.serde, value, self.content_min_bytes)
+        rows: List[_Row] = []
+        size = 0 if type_ == CONTENT else len(data)
+        for key, entry in contents.items():
+            rows.append((_PUT_CONTENT, (key, *entry)))
+            rows.append(
+                ("INSERT OR IGNORE INTO content_refs VALUES (?, ?, ?)", (*thread, key))
+            )
+            size += len(entry[1])
+        return (*self._compress(type_, data), b"".join(contents), rows, size)
+
+    def _put_content(
+        self, conn: sqlite3.Connection, key: bytes, type_: str, data: bytes
+    ) -> None:
+        # Items repeat at every step of a growing list; only new ones are compressed
+        if conn.execute("SELECT 1 FROM content WHERE hash = ?", (key,)).fetchone():
+            return
+        conn.execute(
+            "INSERT INTO content VALUES (?, ?, ?)", (key, *self._compress(type_, data))
+        )
+
+    def _load_contents(self, refs: Set[bytes]) -> Contents:
+        contents: Contents = {}
+        refs_list = list(refs)
+        for start in range(0, len(refs_list), _CONTENT_BATCH):
+            batch = refs_list[start : start + _CONTENT_BATCH]
+            for key, type_, data in self.conn.execute(
+                "SELECT hash, type, value FROM content WHERE hash IN "
+                f"({', '.join('?' * len(batch))})",
+                batch,
+            ):
+                contents[key] = self._decompress(type_, data)
+        return contents
+
+    def _loads_value(
+        self, type_: str, data: Optional[bytes], contents: Contents
+    ) -> Any:
+        return join_value(self.serde, *self._decompress(type_, data), contents)
+
+    # Writing
+
+    def _checkpoint_rows(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> Tuple[List[_Row], RunnableConfig]:
+        started = time.perf_counter()
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        c = checkpoint.copy()
+        values: Dict[str, Any] = c.pop("channel_values")  # type: ignore[misc]
+        rows: List[_Row] = []
+        sizes: Dict[str, int] = {}
+        for channel, version in new_versions.items():
+            if channel in values:
+                type_, data, refs, content_rows, sizes[channel] = self._dumps_value(
+                    values[channel], (thread_id, checkpoint_ns)
+                )
+                rows.extend(content_rows)
+            else:
+                type_, data, refs = "empty", None, None
+                sizes[channel] = 0
+            rows.append(
+                (
+                    "INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        thread_id,
+                        checkpoint_ns,
+                        channel,
+                        str(version),
+                        type_,
+                        data,
+                        refs,
+                    ),
+                )
+            )
+        type_, data = self._dumps(c)
+        full_metadata = get_checkpoint_metadata(config, metadata)
+        meta_type, meta = self._dumps(full_metadata)
+        rows.append(
+            (
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    config["configurable"].get("checkpoint_id"),
+                    type_,
+                    data,
+                    meta_type,
+                    meta,
+                ),
+            )
+        )
+        # Written with the batch's transaction time once it has been flushed
+        rows.append(
+            (
+                _STEP_STATS,
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    full_metadata.get("step"),
+                    full_metadata.get("source"),
+                    json.dumps(sizes),
+                    (time.perf_counter() - started) * 1000,
+                ),
+            )
+        )
+        next_config: RunnableConfig = {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+        return rows, next_config
+
+    def _write_rows(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str,
+    ) -> List[_Row]:
+        configurable = config["configurable"]
+        key = (
+            configurable["thread_id"],
+            configurable.get("checkpoint_ns", ""),
+            configurable["checkpoint_id"],
+        )
+        rows: List[_Row] = []
+        for idx, (channel, value) in enumerate(writes):
+            idx = WRITES_IDX_MAP.get(channel, idx)
+            type_, data, refs, content_rows, _ = self._dumps_value(value, key[:2])
+            rows.extend(content_rows)
+            # Regular writes are never overwritten; special ones (idx < 0) are
+            verb = "INSERT OR REPLACE" if idx < 0 else "INSERT OR IGNORE"
+            rows.append(
+                (
+                    f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (*key, task_id, idx, channel, type_, data, task_path, refs),
+                )
+            )
+        return rows
+
+    def _enqueue(self, rows: List[_Row], thread: Tuple[str, str]) -> None:
+        with self._pending_lock:
+            self._pending.extend(rows)
+            self._pending_threads.add(thread)
+
+    def _queue_checkpoint(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        rows, next_config = self._checkpoint_rows(
+            config, checkpoint, metadata, new_versions
+        )
+        configurable = next_config["configurable"]
+        key = (configurable["thread_id"], configurable["checkpoint_ns"])
+        self._enqueue(rows, key)
+        if self.cache is not None:
+            parent_id = config["configurable"].get("checkpoint_id")
+            self.cache.put(
+                key,
+                CheckpointTuple(
+                    config=next_config,
+                    checkpoint=checkpoint,
+                    metadata=get_checkpoint_metadata(config, metadata),
+                    parent_config=(
+                        {"configurable": {**configurable, "checkpoint_id": parent_id}}
+                        if parent_id
+                        else None
+                    ),
+                    pending_writes=[],
+                ),
+            )
+        return next_config
+
+    def _queue_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str,
+    ) -> None:
+        rows = self._write_rows(config, writes, task_id, task_path)
+        configurable = config["configurable"]
+        key = (configurable["thread_id"], configurable.get("checkpoint_ns", ""))
+        self._enqueue(rows, key)
+        if self.cache is not None:
+            # Reloaded with its pending writes on the next read. Writes for an
+            # older checkpoint can arrive after the next one was cached; they
+            # don't change the latest tuple, so it stays.
+            self.cache.discard(key, configurable["checkpoint_id"])
+
+    def flush(self) -> None:
+        """Write everything queued by aput/aput_writes in one transaction."""
+        with self._lock:
+            with self._pending_lock:
+                rows, self._pending = self._pending, []
+                threads, self._pending_threads = self._pending_threads, set()
+            if not rows:
+                return
+            conn = self.conn
+            now = time.time()
+            started = time.perf_counter()
+            steps = []
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in rows:
+                    if sql is _PUT_CONTENT:
+                        self._put_content(conn, *params)
+                    elif sql is _STEP_STATS:
+                        steps.append(params)
+                    else:
+                        conn.execute(sql, params)
+                write_ms = (time.perf_counter() - started) * 1000
+                conn.executemany(
+                    "INSERT OR REPLACE INTO steps VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(*step, write_ms) for step in steps],
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO threads (thread_id, updated_at) VALUES (?, ?)",
+                    [(thread_id, now) for thread_id in {t for t, _ in threads}],
+                )
+                if self.keep_last > 0:
+                    for thread_id, checkpoint_ns in threads:
+                        self._prune(conn, thread_id, checkpoint_ns, self.keep_last)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                with self._pending_lock:
+                    # Keep the rows queued (in order) so the next flush retries them
+                    self._pending[:0] = rows
+                    self._pending_threads |= threads
+                raise
+            for thread_id, checkpoint_ns, _, step, _, sizes, _ in steps:
+                key = (thread_id, checkpoint_ns)
+                self.size_monitor.observe(
+                    key, step, json.loads(sizes), lambda: self._field_sizes(key)
+                )
+            if self.ttl_seconds > 0 and now - self._last_expiry >= _EXPIRE_EVERY_S:
+                self._last_expiry = now
+                self.expire_threads()
+
+    async def aflush(self) -> None:
+        """Wait until everything queued so far is on disk."""
+        if self._flusher is not None and not self._flusher.done():
+            await asyncio.shield(self._flusher)
+        await asyncio.to_thread(self.flush)
+
+    async def _schedule_flush(self) -> None:
+        if not self.async_writes:
+            await self.aflush()
+            return
+        if self._flusher is not None and not self._flusher.done():
+            return  # The running flusher picks up the new rows on its next pass
+
+        async def run():
+            while self._pending:
+                try:
+                    await asyncio.to_thread(self.flush)
+                except Exception as e:
+                    logger.error(f"Checkpoint write failed: {e}")
+                    return
+
+        self._flusher = asyncio.get_running_loop().create_task(run())
+
+    # Retention
+
+    def _prune(
+        self, conn: sqlite3.Connection, thread_id: str, checkpoint_ns: str, keep: int
+    ) -> None:
+        """Drop all but the newest `keep` checkpoints and what only they reference."""
+        old = [
+            row[0]
+            for row in conn.execute(
+                "SELECT checkpoint_id FROM checkpoints "
+                "WHERE thread_id = ? AND checkpoint_ns = ? "
+                "ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?",
+                (thread_id, checkpoint_ns, keep),
+            )
+        ]
+        if not old:
+            return
+        params = [(thread_id, checkpoint_ns, checkpoint_id) for checkpoint_id in old]
+        conn.executemany(
+            "DELETE FROM checkpoints "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            params,
+        )
+        conn.executemany(
+            "DELETE FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            params,
+        )
+
+        referenced = set()
+        for type_, data in conn.execute(
+            "SELECT type, checkpoint FROM checkpoints "
+            "WHERE thread_id = ? AND checkpoint_ns = ?",
+            (thread_id, checkpoint_ns),
+        ):
+            versions = self._loads(type_, data)["channel_versions"]
+            referenced.update((ch, str(v)) for ch, v in versions.items())
+        stale = [
+            (thread_id, checkpoint_ns, channel, version)
+            for channel, version in conn.execute(
+                "SELECT channel, version FROM blobs "
+                "WHERE thread_id = ? AND checkpoint_ns = ?",
+                (thread_id, checkpoint_ns),
+            )
+            if (channel, version) not in referenced
+        ]
+        conn.executemany(
+            "DELETE FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? "
+            "AND channel = ? AND version = ?",
+            stale,
+        )
+        self._release_content(conn, thread_id, checkpoint_ns)
+
+    def _release_content(
+        self, conn: sqlite3.Connection, thread_id: str, checkpoint_ns: str
+    ) -> None:
+        """Forget content the thread no longer uses; delete it if no thread does."""
+        live: Set[bytes] = set()
+        for table in ("blobs", "writes"):
+            for (refs,) in conn.execute(
+                f"SELECT refs FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? "
+                "AND refs IS NOT NULL",
+                (thread_id, checkpoint_ns),
+            ):
+                live.update(split_refs(refs))
+        dropped = [
+            (thread_id, checkpoint_ns, key)
+            for (key,) in conn.execute(
+                "SELECT hash FROM content_refs WHERE thread_id = ? AND checkpoint_ns = ?",
+                (thread_id, checkpoint_ns),
+            )
+            if key not in live
+        ]
+        conn.executemany(
+            "DELETE FROM content_refs WHERE thread_id = ? AND checkpoint_ns = ? "
+            "AND hash = ?",
+            dropped,
+        )
+        self._delete_orphans(conn, [key for _, _, key in dropped])
+
+    @staticmethod
+    def _delete_orphans(conn: sqlite3.Connection, keys: List[bytes]) -> None:
+        conn.executemany(
+            "DELETE FROM content WHERE hash = ? AND NOT EXISTS "
+            "(SELECT 1 FROM content_refs WHERE content_refs.hash = content.hash)",
+            [(key,) for key in keys],
+        )
+
+    def expire_threads(self, ttl_seconds: Optional[float] = None) -> int:
+        """
+        Delete threads that haven't been written to for ttl_seconds.
+
+        Returns:
+            Number of threads deleted
+        """
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        if ttl <= 0:
+            return 0
+        with self._lock:
+            expired = [
+                row[0]
+                for row in self.conn.execute(
+                    "SELECT thread_id FROM threads WHERE updated_at < ?",
+                    (time.time() - ttl,),
+                )
+            ]
+            for thread_id in expired:
+                self.delete_thread(thread_id)
+        if expired:
+            logger.info(f"Expired {len(expired)} checkpoint threads")
+        return len(expired)
+
+    def state_sizes(
+        self, thread_id: str, checkpoint_ns: str = ""
+    ) -> List[Dict[str, Any]]:
+        """
+        Per-step size breakdown of a thread's state (see size_stats.step_breakdown).
+
+        Steps stay recorded after keep_last prunes their checkpoints, until the
+        thread is deleted.
+        """
+        self.flush()
+        with self._lock:
+            return read_state_sizes(self.conn, thread_id, checkpoint_ns)
+
+    def _field_sizes(self, key: Tuple[str, str]) -> Dict[str, int]:
+        steps = read_state_sizes(self.conn, *key)
+        return steps[-1]["fields"] if steps else {}
+
+    def list_threads(self, limit: int = 20) -> List[Tuple[str, float]]:
+        """Most recently updated threads as (thread_id, updated_at) pairs."""
+        self.flush()
+        with self._lock:
+            return read_threads(self.conn, limit)
+
+    # Reading
+
+    def _load_blobs(
+        self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions
+    ) -> Dict[str, Tuple[str, Optional[bytes], Optional[bytes]]]:
+        """Serialized (type, value, refs) of each channel at the given versions."""
+        blobs = {}
+        for channel, version in versions.items():
+            row = self.conn.execute(
+                "SELECT type, value, refs FROM blobs WHERE thread_id = ? AND "
+                "checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, str(version)),
+            ).fetchone()
+            if row is not None and row[0] != "empty":
+                blobs[channel] = row
+        return blobs
+
+    def _to_tuple(self, row: Tuple) -> CheckpointTuple:
+        (
+            thread_id,
+            checkpoint_ns,
+            checkpoint_id,
+            parent_id,
+            type_,
+            data,
+            metadata_type,
+            metadata,
+        ) = row
+        checkpoint: Checkpoint = self._loads(type_, data)
+        blobs = self._load_blobs(
+            thread_id, checkpoint_ns, checkpoint["channel_versions"]
+        )
+        writes = self.conn.execute(
+            "SELECT task_id, channel, type, value, refs FROM writes WHERE thread_id = ? "
+            "AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_path, task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        # Content shared by several values (e.g. a write and the channel it
+        # appended to) is read once
+        refs: Set[bytes] = set()
+        for *_, packed in (*blobs.values(), *writes):
+            if packed:
+                refs.update(split_refs(packed))
+        contents = self._load_contents(refs) if refs else {}
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint={
+                **checkpoint,
+                "channel_values": {
+                    channel: self._loads_value(type_, value, contents)
+                    for channel, (type_, value, _) in blobs.items()
+                },
+            },
+            metadata=self._loads(metadata_type, metadata),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            pending_writes=[
+                (task_id, channel, self._loads_value(t, v, contents))
+                for task_id, channel, t, v, _ in writes
+            ],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        self.flush()
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        key = (thread_id, checkpoint_ns)
+        checkpoint_id = get_checkpoint_id(config)
+        with self._lock:
+            if self.cache is None:
+                return self._read_tuple(key, checkpoint_id)
+            # Another process may have moved the thread on since it was cached
+            latest = self.conn.execute(
+                "SELECT MAX(checkpoint_id) FROM checkpoints "
+                "WHERE thread_id = ? AND checkpoint_ns = ?",
+                key,
+            ).fetchone()[0]
+            if latest is None:
+                return None
+            if checkpoint_id and checkpoint_id != latest:
+                return self._read_tuple(key, checkpoint_id)
+            item = self.cache.get(key, latest)
+            if item is None:
+                item = self._read_tuple(key, latest)
+                if item is not None:
+                    self.cache.put(key, item, loaded=True)
+            return item
+
+    def _read_tuple(
+        self, key: Tuple[str, str], checkpoint_id: Optional[str]
+    ) -> Optional[CheckpointTuple]:
+        sql = "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+        params: Tuple = key
+        if checkpoint_id:
+            sql += " AND checkpoint_id = ?"
+            params += (checkpoint_id,)
+        else:
+            sql += " ORDER BY checkpoint_id DESC LIMIT 1"
+        row = self.conn.execute(sql, params).fetchone()
+        return self._to_tuple(row) if row else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        self.flush()
+        clauses, params = [], []
+        if config:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (
+                checkpoint_ns := config["configurable"].get("checkpoint_ns")
+            ) is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+        sql = "SELECT * FROM checkpoints"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY thread_id, checkpoint_ns, checkpoint_id DESC"
+
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        for row in rows:
+            if limit is not None and limit <= 0:
+                break
+            if filter:
+                metadata = self._loads(row[6], row[7])
+                if not all(metadata.get(k) == v for k, v in filter.items()):
+                    continue
+            if limit is not None:
+                limit -= 1
+            with self._lock:
+                yield self._to_tuple(row)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        next_config = self._queue_checkpoint(config, checkpoint, metadata, new_versions)
+        self.flush()
+        return next_config
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        self._queue_writes(config, writes, task_id, task_path)
+        self.flush()
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.flush()
+        if self.cache is not None:
+            self.cache.discard_thread(thread_id)
+        self.size_monitor.forget(thread_id)
+        with self._lock:
+            conn = self.conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                keys = [
+                    key
+                    for (key,) in conn.execute(
+                        "SELECT hash FROM content_refs WHERE thread_id = ?",
+                        (thread_id,),
+                    )
+                ]
+                for table in (
+                    "checkpoints",
+                    "blobs",
+                    "writes",
+                    "threads",
+                    "content_refs",
+                    "steps",
+                ):
+                    conn.execute(
+                        f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,)
+                    )
+                self._delete_orphans(conn, keys)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    # Async API: writes are queued and flushed in the background
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        await self.aflush()
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        await self.aflush()
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        next_config = self._queue_checkpoint(config, checkpoint, metadata, new_versions)
+        await self._schedule_flush()
+        return next_config
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        self._queue_writes(config, writes, task_id, task_path)
+        await self._schedule_flush()
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self.aflush()
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None = None) -> str:
+        # Same scheme as InMemorySaver: zero-padded counter plus a random tie-breaker
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
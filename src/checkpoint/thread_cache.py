@@ -0,0 +1,203 @@
+"""
+Memory-capped cache of the latest checkpoint of recently used threads.
+
+A server process handles many threads, and each time a thread is resumed or
+its state is read, its latest checkpoint has to be loaded and deserialized
+again. ThreadCache keeps the latest checkpoint of recently used threads in
+memory, up to a global byte budget. The least recently used thread is evicted
+whenever an insert would exceed it. Checkpoints are already on disk, so an
+evicted thread costs nothing but memory to drop, and it is rehydrated from
+SQLite the next time it is read.
+
+Evictions and rehydrations are recorded as ThreadEvents and passed to
+subscribers, and stats() reports the cache's size and hit rate for
+monitoring.
+"""
+
+from collections import Counter, OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
+import copy
+import logging
+import threading
+import time
+
+from langchain_core.messages import BaseMessage
+from langgraph.checkpoint.base import CheckpointTuple
+
+logger = logging.getLogger("LangGraph_DeepSearch.thread_cache")
+
+# (thread_id, checkpoint_ns)
+ThreadKey = Tuple[str, str]
+
+# Evicted threads remembered so that their next load counts as a rehydration
+_EVICTED_MEMORY = 10000
+
+# Rough per-object overhead added to the payload size of containers
+_OBJECT_BYTES = 64
+
+
+class ThreadEvent(NamedTuple):
+    """An eviction or rehydration of one thread's cached checkpoint."""
+
+    kind: str  # "evict" or "rehydrate"
+    thread_id: str
+    checkpoint_ns: str
+    bytes: int
+    at: float
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Approximate memory footprint of a checkpoint value in bytes.
+
+    Counts text and binary payloads plus a fixed overhead per container or
+    object, which is close enough to budget a cache and much cheaper than
+    measuring real allocations.
+    """
+    if isinstance(value, (str, bytes)):
+        return len(value) + _OBJECT_BYTES
+    if isinstance(value, dict):
+        return _OBJECT_BYTES + sum(
+            estimate_size(k) + estimate_size(v) for k, v in value.items()
+        )
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return _OBJECT_BYTES + sum(estimate_size(item) for item in value)
+    if isinstance(value, BaseMessage):
+        return _OBJECT_BYTES + estimate_size(value.content) + estimate_size(value.id)
+    if hasattr(value, "__dict__"):
+        return _OBJECT_BYTES + estimate_size(vars(value))
+    return _OBJECT_BYTES
+
+
+class ThreadCache:
+    """
+    LRU of the latest CheckpointTuple per thread, capped by estimated size.
+
+    Args:
+        max_bytes: Global budget for all cached checkpoints
+        max_events: Most recent events kept in `events`
+
+    Notes:
+        - Tuples are deep-copied going in and out, so callers can never
+          change a cached checkpoint by mutating the state they were given.
+        - A checkpoint bigger than the whole budget is not cached.
+    """
+
+    def __init__(self, max_bytes: int, max_events: int = 1000):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.events: Deque[ThreadEvent] = deque(maxlen=max_events)
+        self.counts: Counter = Counter()
+        self._entries: "OrderedDict[ThreadKey, Tuple[CheckpointTuple, int]]" = (
+            OrderedDict()
+        )
+        self._evicted: "OrderedDict[ThreadKey, None]" = OrderedDict()
+        self._listeners: List[Callable[[ThreadEvent], None]] = []
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def subscribe(self, listener: Callable[[ThreadEvent], None]) -> None:
+        """Call listener with every eviction and rehydration event."""
+        self._listeners.append(listener)
+
+    def _emit(self, kind: str, key: ThreadKey, size: int) -> None:
+        event = ThreadEvent(kind, key[0], key[1], size, time.time())
+        self.events.append(event)
+        self.counts[kind] += 1
+        logger.debug(f"Thread {kind}: {key[0]} ({size / 1024:.0f} KiB)")
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                logger.warning(f"Thread event listener failed: {e}")
+
+    def get(
+        self, key: ThreadKey, checkpoint_id: Optional[str] = None
+    ) -> Optional[CheckpointTuple]:
+        """
+        A copy of the thread's cached checkpoint.
+
+        Args:
+            key: Thread and checkpoint namespace
+            checkpoint_id: Only return the cached checkpoint if it has this id
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (
+                checkpoint_id is not None
+                and entry[0].config["configurable"]["checkpoint_id"] != checkpoint_id
+            ):
+                self.counts["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counts["hits"] += 1
+            item = entry[0]
+        return copy.deepcopy(item)
+
+    def put(self, key: ThreadKey, item: CheckpointTuple, loaded: bool = False) -> None:
+        """
+        Cache a thread's latest checkpoint, evicting others to stay in budget.
+
+        Args:
+            key: Thread and checkpoint namespace
+            item: The thread's latest checkpoint
+            loaded: The checkpoint was just read from disk (a rehydration if
+                the thread had been evicted)
+        """
+        size = estimate_size(item.checkpoint) + estimate_size(item.pending_writes)
+        item = copy.deepcopy(item)
+        with self._lock:
+            self._put(key, item, size, loaded)
+
+    def _put(
+        self, key: ThreadKey, item: CheckpointTuple, size: int, loaded: bool
+    ) -> None:
+        self.discard(key)
+        if size > self.max_bytes:
+            return
+        while self.bytes + size > self.max_bytes:
+            evicted, (_, evicted_size) = self._entries.popitem(last=False)
+            self.bytes -= evicted_size
+            self._evicted[evicted] = None
+            if len(self._evicted) > _EVICTED_MEMORY:
+                self._evicted.popitem(last=False)
+            self._emit("evict", evicted, evicted_size)
+        self._entries[key] = (item, size)
+        self.bytes += size
+        if loaded and key in self._evicted:
+            del self._evicted[key]
+            self._emit("rehydrate", key, size)
+
+    def discard(self, key: ThreadKey, checkpoint_id: Optional[str] = None) -> None:
+        """Drop a thread's cached checkpoint (only if it has checkpoint_id, if given)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (
+                checkpoint_id is not None
+                and entry[0].config["configurable"]["checkpoint_id"] != checkpoint_id
+            ):
+                return
+            del self._entries[key]
+            self.bytes -= entry[1]
+
+    def discard_thread(self, thread_id: str) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == thread_id]:
+                self.discard(key)
+            for key in [key for key in self._evicted if key[0] == thread_id]:
+                del self._evicted[key]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counts["hits"] + self.counts["misses"]
+        return {
+            "threads": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.counts["hits"],
+            "misses": self.counts["misses"],
+            "hit_rate": self.counts["hits"] / lookups if lookups else 0.0,
+            "evictions": self.counts["evict"],
+            "rehydrations": self.counts["rehydrate"],
+        }
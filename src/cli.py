@@ -1,186 +1,370 @@
 import argparse
 import sys
 import uuid
-import asyncio
 from datetime import datetime
-from .graphs.web_search_graph import graph
+from . import config
 
+# The graph, LangGraph/LangChain and the model clients are imported inside the
+# commands that need them, so --help and the utility commands start instantly
+
+
+def list_threads(limit: int = 20):
+    """List the most recently updated conversation threads in the checkpointer"""
+    from .checkpoint.reader import connect_readonly, read_threads
 
-def list_threads():
-    """List all conversation threads (placeholder - requires checkpointer access)"""
     print("\n📋 Thread Management")
     print("=" * 60)
-    print("⚠️  Thread listing requires LangGraph Studio or custom checkpointer.")
-    print("💡 Tip: Use 'langgraph dev' and access the Studio UI for thread management.")
+    conn = connect_readonly(config.CHECKPOINT_PATH)
+    threads = read_threads(conn, limit) if conn is not None else []
+    if not threads:
+        print("No saved threads yet.")
+    for thread_id, updated_at in threads:
+        print(f"• {thread_id} ({datetime.fromtimestamp(updated_at):%Y-%m-%d %H:%M})")
+    if threads:
+        print("💡 Use --continue THREAD_ID to continue a conversation")
+    print("=" * 60 + "\n")
+
+
+def show_state(thread_id: str):
+    """Print the per-step size of each state field of a thread, and its write times"""
+    from .checkpoint.reader import connect_readonly, read_state_sizes
+
+    print(f"\n📊 State size of thread {thread_id}")
+    print("=" * 60)
+    conn = connect_readonly(config.CHECKPOINT_PATH)
+    steps = read_state_sizes(conn, thread_id) if conn is not None else []
+    if not steps:
+        print("No checkpoints recorded for this thread.")
+        print("=" * 60 + "\n")
+        return
+    print(
+        f"{'step':>4}  {'source':<6}  {'total KB':>8}  {'put ms':>6}  {'write ms':>8}  changed"
+    )
+    for step in steps:
+        changed = ", ".join(
+            f"{field}={step['fields'][field] / 1024:.1f}" for field in step["changed"]
+        )
+        print(
+            f"{step['step'] if step['step'] is not None else '':>4}  "
+            f"{step['source'] or '':<6}  {step['total'] / 1024:>8.1f}  "
+            f"{step['put_ms']:>6.2f}  {step['write_ms'] or 0:>8.2f}  {changed}"
+        )
+    latest = steps[-1]
+    print(f"\nLatest state: {latest['total'] / 1024:.1f} KB")
+    for field, size in sorted(latest["fields"].items(), key=lambda kv: -kv[1]):
+        share = size / latest["total"] if latest["total"] else 0.0
+        print(f"  {field:<28} {size / 1024:>8.1f} KB  {share:>5.0%}")
     print("=" * 60 + "\n")
 
 
-def show_memory():
-    """Show learned lessons from memory store (placeholder - requires store access)"""
+def show_memory(namespace, limit: int = 20):
+    """Show the most recent learned lessons of a namespace from the persistent store"""
+    from .graphs.persistence import get_store
+
+    store = get_store()
     print("\n🧠 Memory Store")
     print("=" * 60)
-    print("⚠️  Direct memory access requires running within LangGraph context.")
-    print("💡 Tip: Use 'langgraph dev' to inspect the store via LangGraph Studio.")
+    lessons = store.search(namespace, limit=limit)
+    if not lessons:
+        print("No lessons learned yet.")
+    for item in lessons:
+        support = item.value.get("support", 1)
+        print(
+            f"• {item.value.get('lesson', '')}"
+            + (f" (×{support})" if support > 1 else "")
+        )
+        print(
+            f"  from: {item.value.get('task_query', '')} ({item.updated_at:%Y-%m-%d})"
+        )
     print("📚 Lessons are automatically recalled at the start of each search.")
     print("=" * 60 + "\n")
 
 
-async def run_search(args, thread_id):
-    """Async function to run the search graph"""
-    thread = {"configurable": {"thread_id": thread_id}}
+async def consolidate_memory(namespace):
+    """Run a full lesson consolidation pass over a namespace of the persistent store"""
+    from .graphs.persistence import get_store
+    from .tools.lesson_consolidation import consolidate_lessons
 
-    if args.verbose:
-        print(f"🔍 Processing query: {args.query}")
-        print(f"🆔 Thread ID: {thread_id}\n")
-    else:
-        sys.stdout.write("\r🔍 Processing query ...\n")
-        sys.stdout.flush()
+    store = get_store()
 
-    # Initial invocation - will stop at human_feedback interrupt unless --no-feedback
-    initial_state = {"query": args.query} if args.query else None
-
-    async for update in graph.astream(initial_state, thread, stream_mode="updates"):
-        # update is a dict with node_name as key and state updates as value
-        for node_name, node_update in update.items():
-            if args.verbose:
-                print(f"🔄 Executing node: {node_name}")
-
-            # Print AI messages as they come from node updates
-            if "messages" in node_update and node_update["messages"]:
-                for msg in node_update["messages"]:
-                    if hasattr(msg, "content") and msg.content:
-                        # Only print if it's a new message
-                        if hasattr(msg, "type"):
-                            if msg.type == "ai":
-                                if not args.verbose:
-                                    sys.stdout.write("\r✓ Query processed!     \n")
-                                    sys.stdout.flush()
-                                print(f"\n🤖 [{node_name}] {msg.content}")
-
-            # Show recalled notes if verbose
-            if args.verbose and "recalled_notes" in node_update:
-                notes = node_update["recalled_notes"]
-                if notes:
-                    print(f"💭 Recalled {len(notes)} past experience(s)")
-
-    # Check if we're at an interrupt point
-    state = await graph.aget_state(thread)
-
-    # Handle human feedback loop
-    if args.no_feedback:
-        # Skip human feedback and auto-approve
-        if state.next and "human_feedback" in state.next:
-            if args.verbose:
-                print("\n⚡ Auto-feedback mode: Proceeding with generated questions\n")
-            from langchain_core.messages import HumanMessage
-
-            await graph.aupdate_state(
-                thread,
-                {
-                    "messages": [
-                        HumanMessage(content="The questions look good, please proceed.")
-                    ]
-                },
-            )
+    llm = None
+    if config.LESSON_MERGE_WITH_LLM:
+        from .llm import report_llm
 
-            # Continue execution
-            async for update in graph.astream(None, thread, stream_mode="updates"):
-                for node_name, node_update in update.items():
-                    if args.verbose:
-                        print(f"🔄 Executing node: {node_name}")
-                    if "messages" in node_update and node_update["messages"]:
-                        for msg in node_update["messages"]:
-                            if hasattr(msg, "content") and msg.content:
-                                if hasattr(msg, "type") and msg.type == "ai":
-                                    print(f"\n🤖 [{node_name}] {msg.content}")
-            state = await graph.aget_state(thread)
-    else:
-        # Normal interactive feedback loop
-        while state.next and "human_feedback" in state.next:
-            # Get human feedback
-            print("\n💬 Please provide feedback on the sub-questions:")
-            print("(Press Enter with no input to proceed as-is)")
-
-            # Run input in executor to avoid blocking the event loop
-            loop = asyncio.get_event_loop()
-            feedback = await loop.run_in_executor(
-                None, lambda: input("\nYour feedback: ").strip()
-            )
+        llm = report_llm
 
-            if not feedback:
-                feedback = "The questions look good, please proceed."
+    print("\n🧠 Consolidating lessons...")
+    stats = await consolidate_lessons(store, full=True, llm=llm, namespace=namespace)
+    print(
+        f"Examined {stats['examined']} lessons: merged {stats['merged']}, "
+        f"{stats['canonical']} new canonical lessons.\n"
+    )
 
-            print(f"\n✓ Received feedback: {feedback}\n")
 
-            # Update state with human feedback message and resume
-            from langchain_core.messages import HumanMessage
+def snapshot_memory():
+    """Write a memory-mapped snapshot of the persistent store's embeddings"""
+    from .graphs.persistence import get_store
+    from .store.snapshot import build_snapshot
 
-            # First, update the state with the human feedback message
-            await graph.aupdate_state(
-                thread, {"messages": [HumanMessage(content=feedback)]}
-            )
+    store = get_store()
 
-            # Then resume from the interrupt (pass None to continue)
-            async for update in graph.astream(None, thread, stream_mode="updates"):
-                # update is a dict with node_name as key and state updates as value
-                for node_name, node_update in update.items():
-                    if args.verbose:
-                        print(f"🔄 Executing node: {node_name}")
-                    # Print AI messages as they come from node updates
-                    if "messages" in node_update and node_update["messages"]:
-                        for msg in node_update["messages"]:
-                            if hasattr(msg, "content") and msg.content:
-                                if hasattr(msg, "type") and msg.type == "ai":
-                                    print(f"\n🤖 [{node_name}] {msg.content}")
-
-            # Check state again for more interrupts
-            state = await graph.aget_state(thread)
-
-    # Get final result
-    result = state.values
-
-    # Print final results
+    if not config.STORE_SNAPSHOT_PATH:
+        print("⚠️  Set STORE_SNAPSHOT_PATH to build a snapshot.")
+        return
+    print("\n🧠 Building memory snapshot...")
+    stats = build_snapshot(
+        store, config.STORE_SNAPSHOT_PATH, dtype=config.STORE_SNAPSHOT_DTYPE
+    )
+    print(
+        f"Wrote {stats['vectors']} embeddings from {stats['namespaces']} namespaces "
+        f"to {config.STORE_SNAPSHOT_PATH} ({stats['bytes'] / 1e6:.1f} MB).\n"
+    )
+
+
+def render_event(args, event, progress):
+    """Print one query event (see runner.py); progress tracks what was printed so far"""
+    kind = event["event"]
+    if kind == "node":
+        if progress.get("line_open"):
+            progress["line_open"] = False
+            print()
+        if args.verbose:
+            print(f"🔄 Executing node: {event['node']}")
+    elif kind == "token":
+        # Streamed text is printed as it arrives; the node's message then isn't repeated
+        if progress.get("streaming") != event["node"]:
+            progress["streaming"] = event["node"]
+            progress["streamed"] = ""
+            print(f"\n🤖 [{event['node']}] ", end="")
+        progress["streamed"] += event["content"]
+        progress["line_open"] = True
+        print(event["content"], end="", flush=True)
+    elif kind == "message":
+        if not args.verbose and not progress.get("processed"):
+            progress["processed"] = True
+            sys.stdout.write("\r✓ Query processed!     \n")
+            sys.stdout.flush()
+        streamed = progress.get("streaming") == event["node"] and (
+            progress.get("streamed", "").strip() == str(event["content"]).strip()
+        )
+        if not streamed:
+            print(f"\n🤖 [{event['node']}] {event['content']}")
+        elif progress.get("line_open"):
+            print()
+        progress.update(streaming=None, line_open=False)
+    elif kind == "notes":
+        if args.verbose:
+            print(f"💭 Recalled {event['count']} past experience(s)")
+    elif kind == "feedback_request":
+        print("\n💬 Please provide feedback on the sub-questions:")
+        print("(Press Enter with no input to proceed as-is)")
+    elif kind == "feedback":
+        if not event["auto"]:
+            print(f"\n✓ Received feedback: {event['content']}\n")
+        elif args.verbose:
+            print("\n⚡ Auto-feedback mode: Proceeding with generated questions\n")
+    elif kind == "error":
+        print(f"\n❌ Search failed: {event['error']}")
+
+
+def print_result(args, result, thread_id):
+    """Print the final results of a query"""
     print("\n" + "=" * 60)
     print("🎯 FINAL SEARCH RESULTS")
     print("=" * 60)
 
-    if "summary" in result and result["summary"]:
+    if result["summary"]:
         print("\n📄 Summary:")
-        summary_content = result["summary"]
-        if hasattr(summary_content, "content"):
-            print(summary_content.content)
-        else:
-            print(summary_content)
+        print(result["summary"])
 
     # Show review score if available
-    if args.verbose and "score" in result and result["score"]:
+    if args.verbose and result["score"]:
         print(f"\n⭐ Review Score: {result['score']}/10")
         if result.get("strengths"):
             print(f"💪 Strengths: {result['strengths']}")
         if result.get("weaknesses"):
             print(f"⚠️  Weaknesses: {result['weaknesses']}")
 
-    if "sources" in result and result["sources"]:
+    if result["sources"]:
         print(f"\n📚 Sources consulted: {len(result['sources'])}")
         if args.verbose:
             print("\nSource details:")
             for i, source in enumerate(result["sources"][:5], 1):  # Show first 5
                 print(
-                    f"  {i}. {source.get('title', 'Untitled')} - {source.get('url', 'No URL')}"
+                    f"  {i}. {source['title'] or 'Untitled'} - {source['url'] or 'No URL'}"
                 )
 
+    if result["degradations"]:
+        print(f"\n⏱️  Budget degradations: {', '.join(result['degradations'])}")
+    if args.verbose and result.get("budget"):
+        print(f"⏱️  Budget usage: {result['budget']}")
+
     # Show learning info if verbose
     if args.verbose:
-        if result.get("recalled_notes"):
-            print(f"\n💭 Used {len(result['recalled_notes'])} past experience(s)")
-        if result.get("lesson_learned"):
-            print("📝 New lesson learned and saved to memory")
+        if result["recalled_notes"]:
+            print(f"\n💭 Used {result['recalled_notes']} past experience(s)")
+        if result["learning_queued"]:
+            print("📝 Plan corrections queued for background learning")
 
     print(f"\n💾 Thread ID: {thread_id}")
     print("💡 Use --continue {thread_id} to continue this conversation")
     print("\n" + "=" * 60 + "\n")
 
 
+async def run_search(args, thread_id):
+    """Async function to run the search graph, in this process or on a running server"""
+    import asyncio
+
+    from .client import request_events, server_available
+
+    # Flags become the request; without budget flags the QUERY_* defaults apply
+    request = {
+        "thread_id": thread_id,
+        "query": args.query,
+        "no_feedback": args.no_feedback,
+        "tokens": args.stream,
+        "tenant": args.tenant,
+        "project": args.project,
+        "deadline_s": args.deadline,
+        "max_llm_calls": args.max_llm_calls,
+        "max_tokens": args.max_tokens,
+    }
+
+    async def ask_feedback():
+        # Run input in executor to avoid blocking the event loop
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            None, lambda: input("\nYour feedback: ").strip()
+        )
+
+    remote = (
+        config.USE_SERVER and not args.local and server_available(config.SERVER_SOCKET)
+    )
+    if remote:
+        events = request_events(
+            config.SERVER_SOCKET, {"op": "query", **request}, ask_feedback
+        )
+    else:
+        from .graphs.web_search_graph import checkpointer, graph, store
+        from .runner import query_events
+        from .tools.learning_queue import schedule_learning, wait_for_learning
+
+        # Pick up learning jobs an earlier run left in the queue
+        schedule_learning(store)
+        events = query_events(graph, request, ask_feedback)
+
+    if args.verbose:
+        print(f"🔍 Processing query: {args.query}")
+        print(f"🆔 Thread ID: {thread_id}")
+        if remote:
+            print(f"🛰️  Using the deepsearch server on {config.SERVER_SOCKET}")
+        print()
+    else:
+        sys.stdout.write("\r🔍 Processing query ...\n")
+        sys.stdout.flush()
+
+    # Stops at the human_feedback interrupt for feedback unless --no-feedback
+    result = None
+    progress = {}
+    async for event in events:
+        render_event(args, event, progress)
+        if event["event"] == "result":
+            result = event
+    if result is None:
+        print(f"💾 Progress is saved; use --continue {thread_id} to retry")
+        return 1
+    print_result(args, result, thread_id)
+
+    if not remote:
+        # Checkpoints are written in the background; make sure the last ones are on disk
+        await checkpointer.aflush()
+
+        # The answer is out; give the learning worker a chance to finish before exit.
+        # Whatever is left stays queued in the store for the next run.
+        if not await wait_for_learning(timeout=config.LEARNING_EXIT_WAIT_SECONDS):
+            print("📝 Learning continues on the next run")
+    return 0
+
+
+async def run_batch_queries(args):
+    """Async function to run a batch of queries concurrently"""
+    from .batch import format_stats, open_output, read_queries, run_batch
+    from .graphs.persistence import get_checkpointer, get_store
+    from .tools.learning_queue import schedule_learning, wait_for_learning
+
+    if args.batch == "-":
+        items = read_queries(sys.stdin)
+    else:
+        with open(args.batch, encoding="utf-8") as f:
+            items = read_queries(f)
+    # Flags are defaults; a batch line can set its own tenant, project and budget
+    defaults = {
+        "tenant": args.tenant,
+        "project": args.project,
+        "deadline_s": args.deadline,
+        "max_llm_calls": args.max_llm_calls,
+        "max_tokens": args.max_tokens,
+    }
+    for item in items:
+        for key, value in defaults.items():
+            if value and not item.get(key):
+                item[key] = value
+
+    concurrency = args.concurrency or config.BATCH_CONCURRENCY
+    workers = args.workers or config.BATCH_WORKERS
+    out = open_output(args.output)
+    try:
+        if workers > 1:
+            from .pool import WorkerPool
+
+            print(
+                f"📦 Running {len(items)} queries on {workers} worker processes, "
+                f"{concurrency} at a time each",
+                file=sys.stderr,
+            )
+            stats = await WorkerPool(workers, concurrency).run(items, out)
+            # Plan diffs queued by the workers are distilled here, once
+            schedule_learning(get_store())
+        else:
+            from .graphs.web_search_graph import graph
+
+            print(
+                f"📦 Running {len(items)} queries, {concurrency} at a time",
+                file=sys.stderr,
+            )
+            schedule_learning(get_store())
+            stats = await run_batch(items, out, concurrency=concurrency, graph=graph)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(format_stats(stats), file=sys.stderr)
+
+    await get_checkpointer().aflush()
+    if not await wait_for_learning(timeout=config.LEARNING_EXIT_WAIT_SECONDS):
+        print("📝 Learning continues on the next run", file=sys.stderr)
+    return stats
+
+
+async def run_search_worker(args):
+    """Async function to run queued sub-question searches until Ctrl+C"""
+    import asyncio
+    import signal
+
+    from .tasks import create_executor
+    from .tasks.worker import run_worker
+
+    queue = create_executor("sqlite")
+    concurrency = args.concurrency or config.SEARCH_WORKER_CONCURRENCY
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    print(f"🔎 Search worker on {queue.path}, {concurrency} at a time (Ctrl+C to stop)")
+    finished = await run_worker(queue, concurrency, stop=stop)
+    queue.close()
+    print(f"🔎 Search worker stopped after {finished} searches")
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="DeepSearch - AI-powered deep web search with closed-loop learning",
@@ -191,8 +375,17 @@ Examples:
   deepsearch --query "Compare Python async frameworks" --thread-id my-research
   deepsearch --query "Explain quantum computing" --no-feedback
   deepsearch --query "AI safety concerns" --verbose
+  deepsearch --query "Latest Rust release" --deadline 30 --max-llm-calls 20
+  deepsearch --batch queries.jsonl --concurrency 8 --output results.jsonl
+  deepsearch --batch queries.jsonl --workers 4 --output results.jsonl
+  deepsearch --serve
+  deepsearch --search-worker --concurrency 8
+  deepsearch --query "What is LangGraph?" --stream
   deepsearch --list-threads
+  deepsearch --show-state search_20250101_120000_ab12cd34
   deepsearch --show-memory
+  deepsearch --snapshot-memory
+  deepsearch --query "Quarterly churn drivers" --tenant acme --project analytics
         """,
     )
     parser.add_argument("-q", "--query", type=str, help="The search query to process")
@@ -212,14 +405,101 @@ Examples:
         action="store_true",
         help="Show detailed execution information",
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Print answers token by token as they are generated",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        metavar="SECONDS",
+        help="Wall-clock budget for the query; the graph degrades as it runs out",
+    )
+    parser.add_argument(
+        "--max-llm-calls",
+        type=int,
+        help="Maximum number of LLM calls for the query",
+    )
+    parser.add_argument(
+        "--max-tokens",
+        type=int,
+        help="Maximum number of LLM tokens for the query",
+    )
+    parser.add_argument(
+        "--tenant",
+        type=str,
+        help="Tenant whose lessons are recalled and saved (default TENANT_ID)",
+    )
+    parser.add_argument(
+        "--project",
+        type=str,
+        help="Project within the tenant (default PROJECT_ID)",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run a warm server that queries from this CLI are sent to (see SERVER_SOCKET)",
+    )
+    parser.add_argument(
+        "--search-worker",
+        action="store_true",
+        help="Run sub-question searches queued in SEARCH_TASK_DB "
+        "(for SEARCH_EXECUTOR=sqlite)",
+    )
+    parser.add_argument(
+        "--local",
+        action="store_true",
+        help="Run the query in this process even if a server is running",
+    )
+    parser.add_argument(
+        "--batch",
+        type=str,
+        metavar="FILE",
+        help="Run the queries in a JSONL file ('-' for stdin) concurrently without feedback",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        help="Queries in flight at once in batch mode (default BATCH_CONCURRENCY), "
+        "or searches with --search-worker (default SEARCH_WORKER_CONCURRENCY)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Worker processes for batch mode, each with its own event loop "
+        "(default BATCH_WORKERS)",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        metavar="FILE",
+        help="Write batch results as JSONL to FILE instead of stdout",
+    )
     parser.add_argument(
         "--list-threads", action="store_true", help="List all conversation threads"
     )
+    parser.add_argument(
+        "--show-state",
+        type=str,
+        metavar="THREAD_ID",
+        help="Show the size of each state field of a thread, step by step",
+    )
     parser.add_argument(
         "--show-memory",
         action="store_true",
         help="Show learned lessons from memory store",
     )
+    parser.add_argument(
+        "--consolidate-memory",
+        action="store_true",
+        help="Merge near-duplicate lessons in the memory store",
+    )
+    parser.add_argument(
+        "--snapshot-memory",
+        action="store_true",
+        help="Write a memory-mapped snapshot of the memory store for fast startup",
+    )
     parser.add_argument(
         "--continue",
         dest="continue_thread",
@@ -235,14 +515,62 @@ Examples:
         list_threads()
         return 0
 
-    if args.show_memory:
-        show_memory()
+    if args.show_state:
+        show_state(args.show_state)
+        return 0
+
+    if args.snapshot_memory:
+        snapshot_memory()
         return 0
 
+    # Everything below runs the event loop (asyncio alone costs ~50ms to import)
+    import asyncio
+
+    if args.show_memory or args.consolidate_memory:
+        from .tools.namespaces import lesson_namespace
+
+        namespace = lesson_namespace(
+            args.tenant or config.TENANT_ID, args.project or config.PROJECT_ID
+        )
+        if args.show_memory:
+            show_memory(namespace)
+        else:
+            asyncio.run(consolidate_memory(namespace))
+        return 0
+
+    if args.serve:
+        from .server import serve
+
+        try:
+            asyncio.run(serve())
+        except RuntimeError as e:
+            parser.error(str(e))
+        return 0
+
+    if args.search_worker:
+        asyncio.run(run_search_worker(args))
+        return 0
+
+    if args.batch:
+        try:
+            stats = asyncio.run(run_batch_queries(args))
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        except KeyboardInterrupt:
+            print("\n\n⚠️  Batch interrupted by user.", file=sys.stderr)
+            from .graphs.persistence import get_checkpointer
+
+            get_checkpointer().flush()
+            return 1
+        return 1 if stats["failed"] else 0
+
     # Validate that query is provided for search operations
     if not args.query and not args.continue_thread:
         parser.error(
-            "--query is required unless using --list-threads, --show-memory, or --continue"
+            "--query is required unless using --batch, --serve, --search-worker, "
+            "--list-threads, "
+            "--show-state, --show-memory, --consolidate-memory, --snapshot-memory, "
+            "or --continue"
         )
 
     # Generate or use provided thread ID
@@ -260,11 +588,13 @@ Examples:
 
     try:
         # Run the async search function
-        asyncio.run(run_search(args, thread_id))
-        return 0
+        return asyncio.run(run_search(args, thread_id))
 
     except KeyboardInterrupt:
         print("\n\n⚠️  Search interrupted by user.")
+        from .graphs.persistence import get_checkpointer
+
+        get_checkpointer().flush()
         print(f"💾 Thread saved: {thread_id}")
         return 1
     except Exception as e:
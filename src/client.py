@@ -0,0 +1,68 @@
+"""
+Thin client of the `deepsearch --serve` daemon.
+
+Only uses the standard library, so a CLI invocation that hands its query to a
+running daemon never imports LangGraph, LangChain or the model clients.
+"""
+
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+import asyncio
+import json
+import os
+import socket
+
+# Longest line (one event) read from the daemon
+_LINE_LIMIT = 2**24
+
+
+def server_available(path: str) -> bool:
+    """Whether a daemon is accepting connections on the Unix socket at path."""
+    if not path or not hasattr(socket, "AF_UNIX") or not os.path.exists(path):
+        return False
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(0.5)
+        try:
+            sock.connect(path)
+        except OSError:
+            return False
+    return True
+
+
+def _encode(message: Dict[str, Any]) -> bytes:
+    return (json.dumps(message, ensure_ascii=False) + "\n").encode()
+
+
+async def request_events(
+    path: str,
+    request: Dict[str, Any],
+    ask_feedback: Optional[Callable[[], Awaitable[str]]] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Send a request to the daemon and yield the events it streams back.
+
+    Args:
+        path: Daemon's Unix socket
+        request: {"op": "query", ...} (see runner.query_events), or {"op": "status"}
+        ask_feedback: Answers feedback_request events; after the event is
+            yielded, its reply is sent back to the daemon
+    """
+    reader, writer = await asyncio.open_unix_connection(path, limit=_LINE_LIMIT)
+    try:
+        writer.write(_encode(request))
+        await writer.drain()
+        while line := await reader.readline():
+            event = json.loads(line)
+            yield event
+            if event.get("event") == "feedback_request":
+                feedback = await ask_feedback() if ask_feedback is not None else ""
+                writer.write(_encode({"feedback": feedback}))
+                await writer.drain()
+    finally:
+        writer.close()
+
+
+async def server_status(path: str) -> Dict[str, Any]:
+    """The daemon's status (pid, uptime, queries served, cache stats)."""
+    async for event in request_events(path, {"op": "status"}):
+        return event
+    raise ConnectionError(f"No status from the server on {path}")
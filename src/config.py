@@ -44,6 +44,20 @@ MINMAX_API_KEY = os.getenv("MINMAX_API_KEY", "")
 MINMAX_MODEL = os.getenv("MINMAX_MODEL", "MiniMax-M2.1")
 MINMAX_TEMPERATURE = get_float("MINMAX_TEMPERATURE", 0.7)
 
+# Embeddings (shared by lesson recall/saving and sub-question dedup)
+# Backend: "qwen" (DashScope API), "ollama" (local server) or "hash" (offline, deterministic)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "qwen").lower()
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "")
+EMBEDDING_DIMS = get_int("EMBEDDING_DIMS", 1024)
+# Max texts per provider request (DashScope text-embedding-v3 accepts 10)
+EMBEDDING_BATCH_SIZE = get_int("EMBEDDING_BATCH_SIZE", 10)
+# How long concurrent callers are collected into one request
+EMBEDDING_COALESCE_MS = get_float("EMBEDDING_COALESCE_MS", 5.0)
+EMBEDDING_MAX_RETRIES = get_int("EMBEDDING_MAX_RETRIES", 3)
+EMBEDDING_CACHE_SIZE = get_int("EMBEDDING_CACHE_SIZE", 10000)
+# Persistent embedding cache ("" to disable)
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", ".deepsearch/embeddings.db")
+
 # Tools
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY", "")
 SERP_API_KEY = os.getenv("SERP_API_KEY", "")
@@ -54,8 +68,22 @@ SEARXNG_ENABLED = get_bool("SEARXNG_ENABLED", False)
 
 WOLFRAM_APP_ID = os.getenv("WOLFRAM_APP_ID", "")
 
+# Routing
+# Classify clear approvals / rewrite requests locally before asking the LLM router
+FEEDBACK_FAST_PATH = get_bool("FEEDBACK_FAST_PATH", True)
+FEEDBACK_FAST_PATH_CONFIDENCE = get_float("FEEDBACK_FAST_PATH_CONFIDENCE", 0.6)
+# Answer simple or already-answered queries directly instead of running deep search
+ENABLE_DIRECT_ANSWER = get_bool("ENABLE_DIRECT_ANSWER", True)
+DIRECT_ANSWER_CONFIDENCE = get_float("DIRECT_ANSWER_CONFIDENCE", 0.8)
+# Cached answers older than this are searched again (0 = never expire); queries
+# about recent events ("latest", "today", ...) are never cached
+ANSWER_CACHE_TTL_HOURS = get_float("ANSWER_CACHE_TTL_HOURS", 24.0)
+
 # Search
 MAX_SUB_QUESTIONS: int = get_int("MAX_SUB_QUESTIONS", 5)
+# Drop sub-questions whose embedding similarity to an earlier one reaches the threshold
+SUB_QUESTION_DEDUP = get_bool("SUB_QUESTION_DEDUP", True)
+SUB_QUESTION_DEDUP_THRESHOLD = get_float("SUB_QUESTION_DEDUP_THRESHOLD", 0.9)
 MAX_SEARCH_RESULTS: int = get_int("MAX_SEARCH_RESULTS", 5)
 SEARCH_TIMEOUT: int = get_int("SEARCH_TIMEOUT", 10)
 
@@ -64,11 +92,123 @@ SCRAPING_STRATEGY = os.getenv("SCRAPING_STRATEGY", "crawl4ai")
 MAX_SCRAPE_PAGES = get_int("MAX_SCRAPE_PAGES", 5)
 SCRAPE_TIMEOUT = get_int("SCRAPE_TIMEOUT", 30)
 
+# Search branches (one per sub-question): "inline" runs them in the graph's process,
+# "sqlite" queues them in SEARCH_TASK_DB for `deepsearch --search-worker` processes
+SEARCH_EXECUTOR = os.getenv("SEARCH_EXECUTOR", "inline").lower()
+SEARCH_TASK_DB = os.getenv("SEARCH_TASK_DB", ".deepsearch/search_tasks.db")
+# A claimed task still running after the lease is handed to another worker (first
+# result wins); a task is given up after SEARCH_TASK_MAX_ATTEMPTS claims
+SEARCH_TASK_LEASE_SECONDS = get_float("SEARCH_TASK_LEASE_SECONDS", 60.0)
+SEARCH_TASK_MAX_ATTEMPTS = get_int("SEARCH_TASK_MAX_ATTEMPTS", 3)
+# How long search_web waits for a queued branch before recording it as failed
+SEARCH_TASK_TIMEOUT_SECONDS = get_float("SEARCH_TASK_TIMEOUT_SECONDS", 300.0)
+# Finished tasks are kept this long, so a resumed thread reuses their results
+SEARCH_TASK_TTL_HOURS = get_float("SEARCH_TASK_TTL_HOURS", 24.0)
+# Tasks each search worker runs at once
+SEARCH_WORKER_CONCURRENCY = get_int("SEARCH_WORKER_CONCURRENCY", 4)
+
 # Review and Improve
 MAX_SUMMARISE_ITERATIONS = get_int("MAX_SUMMARISE_ITERATIONS", 1)
+# Message history: keep this many latest messages (plus human messages and the
+# newest summary) verbatim, collapse older ones into a digest of at most
+# MESSAGE_DIGEST_LINES lines (MESSAGE_KEEP_RECENT=0 keeps everything)
+MESSAGE_KEEP_RECENT = get_int("MESSAGE_KEEP_RECENT", 8)
+MESSAGE_DIGEST_LINES = get_int("MESSAGE_DIGEST_LINES", 20)
+# Local citation-coverage check before the LLM review
+LOCAL_REVIEW = get_bool("LOCAL_REVIEW", True)
+LOCAL_REVIEW_HIGH_COVERAGE = get_float("LOCAL_REVIEW_HIGH_COVERAGE", 0.8)
+LOCAL_REVIEW_LOW_COVERAGE = get_float("LOCAL_REVIEW_LOW_COVERAGE", 0.3)
+
+# Per-query budget (0 = unlimited). Nodes degrade as the budget runs out:
+# skip review -> skip relevance judging -> cap sub-questions -> basic search depth
+QUERY_DEADLINE_SECONDS = get_float("QUERY_DEADLINE_SECONDS", 0.0)
+QUERY_MAX_LLM_CALLS = get_int("QUERY_MAX_LLM_CALLS", 0)
+QUERY_MAX_TOKENS = get_int("QUERY_MAX_TOKENS", 0)
+BUDGET_CAPPED_SUB_QUESTIONS = get_int("BUDGET_CAPPED_SUB_QUESTIONS", 2)
+
+# Queries in flight at once in batch mode (deepsearch --batch)
+BATCH_CONCURRENCY = get_int("BATCH_CONCURRENCY", 4)
+# Worker processes in batch mode, each running BATCH_CONCURRENCY queries (1 = in-process)
+BATCH_WORKERS = get_int("BATCH_WORKERS", 1)
+
+# Daemon (deepsearch --serve): Unix socket the CLI talks to, optional local HTTP
+# port (0 = off; requests need the token written next to the socket), and whether
+# query commands use a running daemon
+SERVER_SOCKET = os.getenv("SERVER_SOCKET", ".deepsearch/deepsearch.sock")
+SERVER_HTTP_PORT = get_int("SERVER_HTTP_PORT", 0)
+USE_SERVER = get_bool("USE_SERVER", True)
 
 # Learning
 ENABLE_LEARNING = get_bool("ENABLE_LEARNING", True)
+# Default tenant/project for lesson namespaces (graph config "tenant_id"/"project_id"
+# override them per run); empty = the single shared namespace
+TENANT_ID = os.getenv("TENANT_ID", "")
+PROJECT_ID = os.getenv("PROJECT_ID", "")
+# Also recall from the shared lesson namespace when running as a tenant
+LESSON_SHARED_TIER = get_bool("LESSON_SHARED_TIER", True)
+# Plan diffs are queued in the store and distilled by a background worker,
+# LEARNING_BATCH_SIZE diffs per LLM call; failed jobs are retried this many times
+LEARNING_BATCH_SIZE = get_int("LEARNING_BATCH_SIZE", 8)
+LEARNING_MAX_ATTEMPTS = get_int("LEARNING_MAX_ATTEMPTS", 3)
+# A worker's claim on the jobs it is distilling; once it runs out (the worker died
+# or hung) another worker takes the jobs over
+LEARNING_CLAIM_SECONDS = get_float("LEARNING_CLAIM_SECONDS", 300.0)
+# How long the CLI waits for the worker after printing the answer (the rest stays queued)
+LEARNING_EXIT_WAIT_SECONDS = get_float("LEARNING_EXIT_WAIT_SECONDS", 60.0)
+# Drain the learning queue in this process; batch worker processes turn it off and
+# leave their jobs to the supervising process
+LEARNING_WORKER = get_bool("LEARNING_WORKER", True)
+# Merge near-duplicate lessons in the background after new ones are saved
+LESSON_CONSOLIDATION = get_bool("LESSON_CONSOLIDATION", True)
+LESSON_MERGE_THRESHOLD = get_float("LESSON_MERGE_THRESHOLD", 0.92)
+# Rewrite merged clusters into one lesson with a (batched) LLM call
+LESSON_MERGE_WITH_LLM = get_bool("LESSON_MERGE_WITH_LLM", True)
+# How lessons are matched on recall: "hybrid" (embeddings + BM25 keywords fused by
+# reciprocal rank), "vector" or "lexical" (keywords only, no embedding calls).
+# Hybrid uses keywords alone while the embedder is down or slower than the timeout
+LESSON_RECALL_MODE = os.getenv("LESSON_RECALL_MODE", "hybrid").lower()
+LESSON_VECTOR_TIMEOUT_MS = get_float("LESSON_VECTOR_TIMEOUT_MS", 1500.0)
+LESSON_RRF_K = get_int("LESSON_RRF_K", 60)
+# Recall ranks lessons by a weighted mix of similarity, usefulness (share of
+# recalls whose plan needed no correction) and recency (halves every half-life)
+LESSON_WEIGHT_SIMILARITY = get_float("LESSON_WEIGHT_SIMILARITY", 0.7)
+LESSON_WEIGHT_USEFULNESS = get_float("LESSON_WEIGHT_USEFULNESS", 0.2)
+LESSON_WEIGHT_RECENCY = get_float("LESSON_WEIGHT_RECENCY", 0.1)
+LESSON_HALF_LIFE_DAYS = get_float("LESSON_HALF_LIFE_DAYS", 30.0)
+# Evict the least useful, least recently used lessons above this count (0 = unlimited)
+LESSON_MAX_COUNT = get_int("LESSON_MAX_COUNT", 5000)
+# SQLite file that persists lessons and cached answers across runs (":memory:" to disable)
+STORE_PATH = os.getenv("STORE_PATH", ".deepsearch/store.db")
+# Namespaces with at least this many lesson embeddings are searched through an
+# IVF (approximate nearest-neighbour) index; ANN_NPROBE trades speed for recall
+ANN_MIN_VECTORS = get_int("ANN_MIN_VECTORS", 50000)
+ANN_NPROBE = get_int("ANN_NPROBE", 32)
+# Memory-mapped, quantized copy of the store's embeddings (built with
+# `deepsearch --snapshot-memory`) that workers open instead of loading them from SQLite
+STORE_SNAPSHOT_PATH = os.getenv("STORE_SNAPSHOT_PATH", ".deepsearch/snapshot")
+STORE_SNAPSHOT_DTYPE = os.getenv("STORE_SNAPSHOT_DTYPE", "int8").lower()
+# Rebuild an existing snapshot in the background once its namespaces are this many
+# embedding writes behind the store (0 = only rebuild with --snapshot-memory)
+STORE_SNAPSHOT_REBUILD_WRITES = get_int("STORE_SNAPSHOT_REBUILD_WRITES", 50)
+# SQLite file holding conversation checkpoints, so `--continue THREAD_ID` works
+# across processes (":memory:" keeps them in-process only)
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", ".deepsearch/checkpoints.db")
+# Checkpoints kept per thread (0 = keep the full history)
+CHECKPOINT_KEEP_LAST = get_int("CHECKPOINT_KEEP_LAST", 20)
+# Threads untouched for this many hours are deleted (0 = never)
+CHECKPOINT_TTL_HOURS = get_float("CHECKPOINT_TTL_HOURS", 24 * 30)
+# Write checkpoints in the background instead of within each graph step
+CHECKPOINT_ASYNC_WRITES = get_bool("CHECKPOINT_ASYNC_WRITES", True)
+# List items and values at least this big (serialized) are stored once by content
+# hash instead of in every checkpoint that contains them (0 = disable)
+CHECKPOINT_CONTENT_MIN_BYTES = get_int("CHECKPOINT_CONTENT_MIN_BYTES", 512)
+# Memory for the latest checkpoints of recently used threads; the least recently
+# used are evicted and reloaded from disk when needed (0 = no cache)
+CHECKPOINT_CACHE_MB = get_float("CHECKPOINT_CACHE_MB", 256)
+# Warn when one field of a thread's state, or the whole state, reaches this many
+# KB serialized (0 = never); `deepsearch --show-state THREAD_ID` shows the breakdown
+CHECKPOINT_WARN_FIELD_KB = get_int("CHECKPOINT_WARN_FIELD_KB", 1024)
+CHECKPOINT_WARN_STATE_KB = get_int("CHECKPOINT_WARN_STATE_KB", 4096)
 
 
 RERANKER_MODEL = os.getenv("RERANKER_MODEL", "jina")
@@ -0,0 +1,11 @@
+"""Embedding backends and the shared embedding service."""
+
+from .service import EmbeddingService, get_embedding_service
+from .qwen_embedder import aembed_texts
+
+
+__all__ = [
+    "EmbeddingService",
+    "get_embedding_service",
+    "aembed_texts",
+]
@@ -0,0 +1,106 @@
+"""
+Embedding providers used by the shared EmbeddingService.
+
+A backend only has to turn one provider-sized batch of texts into vectors;
+batching, caching, coalescing and retries are handled by the service.
+"""
+
+from typing import List, Protocol
+import hashlib
+import math
+import re
+
+# Dashscope API Base URL
+DASHSCOPE_BASE_URL = "https://dashscope.aliyuncs.com/compatible-mode/v1"
+
+
+class BackendUnavailable(Exception):
+    """The backend can't embed at all (e.g. no API key); requests aren't retried."""
+
+
+class EmbeddingBackend(Protocol):
+    """Anything that can embed a batch of texts asynchronously."""
+
+    # Identifies the vector space, so cached vectors from another model are never reused
+    name: str
+
+    async def embed(self, texts: List[str]) -> List[List[float]]: ...
+
+
+class QwenBackend:
+    """DashScope (Qwen) embeddings through the OpenAI-compatible API."""
+
+    def __init__(self, api_key: str, model: str = "text-embedding-v3", dims: int = 0):
+        self.api_key = api_key
+        self.model = model
+        self.dims = dims
+        self.name = f"qwen:{model}:{dims or 'default'}"
+        # Without a key the backend can't be used; callers fall back to keyword search
+        self.configured = bool(api_key)
+        self._client = None
+
+    @property
+    def client(self):
+        """The API client, built on first use (so a missing key doesn't fail construction)."""
+        if self._client is None:
+            if not self.configured:
+                raise BackendUnavailable("QWEN_API_KEY is not set")
+            from openai import AsyncOpenAI
+
+            self._client = AsyncOpenAI(
+                api_key=self.api_key, base_url=DASHSCOPE_BASE_URL
+            )
+        return self._client
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        kwargs = {"dimensions": self.dims} if self.dims else {}
+        response = await self.client.embeddings.create(
+            model=self.model, input=texts, **kwargs
+        )
+        return [e.embedding for e in sorted(response.data, key=lambda e: e.index)]
+
+
+class OllamaBackend:
+    """Embeddings from a local Ollama server (e.g. bge-m3)."""
+
+    def __init__(self, model: str = "bge-m3"):
+        from langchain_ollama import OllamaEmbeddings
+
+        self.model = model
+        self.name = f"ollama:{model}"
+        self.client = OllamaEmbeddings(model=model)
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        return await self.client.aembed_documents(texts)
+
+
+class HashBackend:
+    """
+    Deterministic, offline stand-in for a real embedding model.
+
+    Hashes words and character trigrams into a fixed number of signed buckets,
+    so texts that share vocabulary end up close together. Good enough for
+    development, tests and benchmarks; not a substitute for semantic embeddings.
+    """
+
+    def __init__(self, dims: int = 256):
+        self.dims = dims
+        self.name = f"hash:{dims}"
+
+    def _embed_one(self, text: str) -> List[float]:
+        vector = [0.0] * self.dims
+        words = re.findall(r"\w+", text.lower())
+        features = words + [
+            w[i : i + 3] for w in words if len(w) > 3 for i in range(len(w) - 2)
+        ]
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dims
+            sign = 1.0 if digest[4] & 1 else -1.0
+            vector[bucket] += sign
+
+        norm = math.sqrt(sum(v * v for v in vector))
+        return [v / norm for v in vector] if norm else vector
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed_one(text) for text in texts]
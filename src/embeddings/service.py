@@ -0,0 +1,323 @@
+"""
+Shared embedding service - one place where every embedding in the app is computed.
+
+Concurrent callers are coalesced into provider-sized batches, results are
+cached in memory (LRU) and on disk (SQLite) keyed by a hash of the backend
+and the text, and transient provider failures are retried with backoff. After a
+request fails for good the service reports itself unavailable for a cooldown,
+so callers with a fallback (e.g. keyword recall) don't wait on it again.
+"""
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from src import config
+from src.embeddings.backends import (
+    BackendUnavailable,
+    EmbeddingBackend,
+    HashBackend,
+    OllamaBackend,
+    QwenBackend,
+)
+
+logger = logging.getLogger("LangGraph_DeepSearch.embedding_service")
+
+
+class _DiskCache:
+    """Content-hash keyed float32 vectors in a small SQLite file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.path != ":memory:":
+                Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start : start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for key, blob in self.conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    chunk,
+                ):
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def put_many(self, items: List[Tuple[str, List[float]]]) -> None:
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [
+                    (key, np.asarray(vector, dtype=np.float32).tobytes())
+                    for key, vector in items
+                ],
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class EmbeddingService:
+    """
+    Batched, cached front-end for an EmbeddingBackend.
+
+    Args:
+        backend: Provider that embeds one batch of texts
+        batch_size: Max texts per provider request
+        coalesce_ms: How long to wait for other callers before sending a request
+        max_retries: Retries per batch on provider errors (exponential backoff)
+        cache_size: Entries kept in the in-memory LRU (0 disables it)
+        cache_path: SQLite file for the persistent cache (None/"" disables it)
+        failure_cooldown_s: How long `available` stays False after a request
+            fails all its retries
+    """
+
+    def __init__(
+        self,
+        backend: EmbeddingBackend,
+        *,
+        batch_size: int = 10,
+        coalesce_ms: float = 5.0,
+        max_retries: int = 3,
+        cache_size: int = 10000,
+        cache_path: Optional[str] = None,
+        failure_cooldown_s: float = 30.0,
+    ):
+        self.backend = backend
+        self.batch_size = max(1, batch_size)
+        self.coalesce_s = max(coalesce_ms, 0.0) / 1000
+        self.max_retries = max(0, max_retries)
+        self.cache_size = cache_size
+        self._lru: OrderedDict[str, List[float]] = OrderedDict()
+        self._disk = _DiskCache(cache_path) if cache_path else None
+        self.failure_cooldown_s = failure_cooldown_s
+        self._unavailable_until = 0.0
+
+        # Per event loop: texts waiting for the next flush, and in-flight futures
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Dict[str, str] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._batch_tasks: set = set()
+
+        self.stats = {"requests": 0, "texts_embedded": 0, "lru_hits": 0, "disk_hits": 0}
+
+    @property
+    def available(self) -> bool:
+        """
+        False when the backend isn't configured (e.g. no API key), or while
+        cooling down from a request that failed all its retries.
+        """
+        if not getattr(self.backend, "configured", True):
+            return False
+        return time.monotonic() >= self._unavailable_until
+
+    def key(self, text: str) -> str:
+        """Cache key: hash of the backend's vector space plus the exact text."""
+        return hashlib.sha256(
+            f"{self.backend.name}\0{text}".encode("utf-8")
+        ).hexdigest()
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, preserving order. Duplicates are only embedded once."""
+        if not texts:
+            return []
+
+        keys = [self.key(text) for text in texts]
+        vectors: Dict[str, List[float]] = {}
+        for key in keys:
+            cached = self._lru_get(key)
+            if cached is not None:
+                vectors[key] = cached
+                self.stats["lru_hits"] += 1
+
+        missing = list({k: None for k in keys if k not in vectors})
+        if missing and self._disk is not None:
+            try:
+                found = await asyncio.to_thread(self._disk.get_many, missing)
+            except Exception as e:
+                logger.warning(f"Embedding disk cache read failed: {e}")
+                found = {}
+            for key, vector in found.items():
+                vectors[key] = vector
+                self._lru_put(key, vector)
+            self.stats["disk_hits"] += len(found)
+            missing = [k for k in missing if k not in found]
+
+        if missing:
+            text_by_key = dict(zip(keys, texts))
+            # Shielded: the futures are shared with coalesced callers, and one
+            # caller timing out mustn't cancel the others' embeddings
+            futures = [
+                asyncio.shield(self._enqueue(key, text_by_key[key])) for key in missing
+            ]
+            for key, vector in zip(missing, await asyncio.gather(*futures)):
+                vectors[key] = vector
+
+        return [vectors[key] for key in keys]
+
+    async def embed_query(self, text: str) -> List[float]:
+        return (await self.embed([text]))[0]
+
+    # Coalescing
+
+    def _enqueue(self, key: str, text: str) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Futures are bound to a loop; start fresh if we are called from a new one
+            self._loop = loop
+            self._queue = {}
+            self._inflight = {}
+            self._flush_task = None
+
+        future = self._inflight.get(key)
+        if future is not None:
+            return future
+
+        future = loop.create_future()
+        self._inflight[key] = future
+        self._queue[key] = text
+        if len(self._queue) >= self.batch_size:
+            self._flush()
+        elif self._flush_task is None:
+            self._flush_task = loop.create_task(self._flush_later())
+        return future
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.coalesce_s)
+        self._flush_task = None
+        self._flush()
+
+    def _flush(self) -> None:
+        batch, self._queue = list(self._queue.items()), {}
+        for start in range(0, len(batch), self.batch_size):
+            task = asyncio.get_running_loop().create_task(
+                self._run_batch(batch[start : start + self.batch_size])
+            )
+            # Hold a reference so the task isn't garbage-collected mid-flight
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[str, str]]) -> None:
+        keys = [key for key, _ in batch]
+        try:
+            vectors = await self._call_backend([text for _, text in batch])
+        except Exception as e:
+            for key in keys:
+                future = self._inflight.pop(key, None)
+                if future is not None and not future.done():
+                    future.set_exception(e)
+            return
+
+        # Persist before resolving so a caller that exits right away doesn't lose the write
+        if self._disk is not None:
+            try:
+                await asyncio.to_thread(self._disk.put_many, list(zip(keys, vectors)))
+            except Exception as e:
+                logger.warning(f"Embedding disk cache write failed: {e}")
+
+        for key, vector in zip(keys, vectors):
+            self._lru_put(key, vector)
+            future = self._inflight.pop(key, None)
+            if future is not None and not future.done():
+                future.set_result(vector)
+
+    async def _call_backend(self, texts: List[str]) -> List[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.stats["requests"] += 1
+                vectors = await self.backend.embed(texts)
+                if len(vectors) != len(texts):
+                    raise ValueError(
+                        f"Backend returned {len(vectors)} vectors for {len(texts)} texts"
+                    )
+                self.stats["texts_embedded"] += len(texts)
+                self._unavailable_until = 0.0
+                return vectors
+            except Exception as e:
+                if isinstance(e, BackendUnavailable) or attempt == self.max_retries:
+                    logger.error(f"Embedding failed after {attempt + 1} attempts: {e}")
+                    self._unavailable_until = time.monotonic() + self.failure_cooldown_s
+                    raise
+                delay = 0.5 * 2**attempt
+                logger.warning(f"Embedding request failed ({e}), retrying in {delay}s")
+                await asyncio.sleep(delay)
+
+    # In-memory LRU
+
+    def _lru_get(self, key: str) -> Optional[List[float]]:
+        vector = self._lru.get(key)
+        if vector is not None:
+            self._lru.move_to_end(key)
+        return vector
+
+    def _lru_put(self, key: str, vector: List[float]) -> None:
+        if self.cache_size <= 0:
+            return
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.cache_size:
+            self._lru.popitem(last=False)
+
+    def close(self) -> None:
+        if self._disk is not None:
+            self._disk.close()
+
+
+def create_backend(name: str, model: str = "", dims: int = 0) -> EmbeddingBackend:
+    """Build a backend by name ("qwen", "ollama" or "hash")."""
+    if name == "qwen":
+        return QwenBackend(config.QWEN_API_KEY, model or "text-embedding-v3", dims)
+    if name == "ollama":
+        return OllamaBackend(model or "bge-m3")
+    if name == "hash":
+        return HashBackend(dims or 256)
+    raise ValueError(f"Unknown embedding backend: {name}")
+
+
+_service: Optional[EmbeddingService] = None
+
+
+def get_embedding_service() -> EmbeddingService:
+    """Return the process-wide embedding service configured from EMBEDDING_* settings."""
+    global _service
+    if _service is None:
+        _service = EmbeddingService(
+            create_backend(
+                config.EMBEDDING_BACKEND, config.EMBEDDING_MODEL, config.EMBEDDING_DIMS
+            ),
+            batch_size=config.EMBEDDING_BATCH_SIZE,
+            coalesce_ms=config.EMBEDDING_COALESCE_MS,
+            max_retries=config.EMBEDDING_MAX_RETRIES,
+            cache_size=config.EMBEDDING_CACHE_SIZE,
+            cache_path=config.EMBEDDING_CACHE_PATH or None,
+        )
+    return _service
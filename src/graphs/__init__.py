@@ -1,3 +1,11 @@
-from .web_search_graph import graph
+# The graph is compiled on first access, so that importing a sibling module
+# (e.g. persistence) doesn't build it
+def __getattr__(name):
+    if name != "graph":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from .web_search_graph import graph
+
+    return graph
+
 
 __all__ = ["graph"]
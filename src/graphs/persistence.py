@@ -0,0 +1,48 @@
+"""
+The process-wide checkpointer and store, built on first use.
+
+The graph is compiled with both, and CLI commands that only manage memory
+(--show-memory, --consolidate-memory, --snapshot-memory) use the store alone
+without importing the graph, its nodes and their model clients.
+"""
+
+from functools import cache
+
+from src import config
+
+
+@cache
+def get_checkpointer():
+    """Conversation state persists on disk so threads can be continued by a later run."""
+    from src.checkpoint import SqliteSaver
+
+    return SqliteSaver(
+        config.CHECKPOINT_PATH,
+        keep_last=config.CHECKPOINT_KEEP_LAST,
+        ttl_seconds=config.CHECKPOINT_TTL_HOURS * 3600,
+        async_writes=config.CHECKPOINT_ASYNC_WRITES,
+        content_min_bytes=config.CHECKPOINT_CONTENT_MIN_BYTES,
+        cache_bytes=int(config.CHECKPOINT_CACHE_MB * 2**20),
+        warn_field_bytes=config.CHECKPOINT_WARN_FIELD_KB * 1024,
+        warn_state_bytes=config.CHECKPOINT_WARN_STATE_KB * 1024,
+    )
+
+
+@cache
+def get_store():
+    """Lessons and cached answers persist on disk; lessons are searchable by embedding."""
+    from src.embeddings.qwen_embedder import aembed_texts
+    from src.store import SqliteStore
+
+    return SqliteStore(
+        config.STORE_PATH,
+        index={
+            "dims": config.EMBEDDING_DIMS,
+            "embed": aembed_texts,
+            "fields": ["lesson", "task_query"],
+        },
+        ann_min_vectors=config.ANN_MIN_VECTORS,
+        ann_nprobe=config.ANN_NPROBE,
+        snapshot_path=config.STORE_SNAPSHOT_PATH or None,
+        snapshot_rebuild_writes=config.STORE_SNAPSHOT_REBUILD_WRITES,
+    )
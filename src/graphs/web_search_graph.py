@@ -1,8 +1,8 @@
 from langgraph.graph import StateGraph, START, END
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.store.memory import InMemoryStore
 from src.state import WebSearchState
 from src.nodes.question_nodes import (
+    extract_query,
+    answer_directly,
     plan,
     summarise,
     should_break_query,
@@ -14,7 +14,9 @@ from src.nodes.question_nodes import (
 from src.nodes.search_nodes import search_web
 from src.nodes.review_nodes import review
 from src.nodes.learning_nodes import recall_from_memory
-from src.graphs.learn_graph import learn_graph
+from src.nodes.router_nodes import route_query, record_route
+from src.tools.answer_cache import current_store, lookup_answer
+from src.graphs.persistence import get_checkpointer, get_store
 from src import config
 import logging
 
@@ -35,10 +37,38 @@ def should_start_with_recall(state: WebSearchState):
         return "plan"
 
 
+async def route_start(state: WebSearchState):
+    """
+    Conditional edge from START: send trivially answerable or already-answered
+    queries to the direct-answer path, everything else through deep search.
+    """
+    if config.ENABLE_DIRECT_ANSWER:
+        try:
+            query = extract_query(state)
+        except ValueError:
+            query = ""
+
+        if query and await lookup_answer(current_store(), query):
+            logger.debug("Cached answer found: routing to answer_directly")
+            record_route("cached")
+            return "answer_directly"
+
+        if query:
+            route, confidence = route_query(query, config.DIRECT_ANSWER_CONFIDENCE)
+            logger.debug(f"Query route: {route} (confidence={confidence:.2f})")
+            if route == "direct":
+                return "answer_directly"
+
+    return should_start_with_recall(state)
+
+
 # Build the graph with Closed-loop Learning System
-# Flow: [recall] -> plan -> human_feedback -> search -> summarise [→ async learn] -> review
+# Flow: [answer_directly] | [recall] -> plan -> human_feedback -> search -> summarise [→ learning queue] -> review
 builder = StateGraph(state_schema=WebSearchState)
 
+# Phase 0: Direct-answer fast path for simple or already-answered queries
+builder.add_node("answer_directly", answer_directly)
+
 # Phase 1: Recall node (beginning only)
 builder.add_node("recall", recall_from_memory)
 
@@ -53,44 +83,40 @@ builder.add_node("search_web", search_web)
 builder.add_node("summarise", summarise)
 builder.add_node("review", review)
 
-# Phase 5: Async learning subgraph
-builder.add_node("learn", learn_graph)
-
 # Edge Definitions
 
-# START: conditional based on ENABLE_LEARNING
-builder.add_conditional_edges(START, should_start_with_recall, ["recall", "plan"])
+# START: direct answer for simple queries, otherwise recall (if ENABLE_LEARNING) or plan
+builder.add_conditional_edges(START, route_start, ["answer_directly", "recall", "plan"])
+
+# Direct answers finish immediately
+builder.add_edge("answer_directly", END)
 
 # After recall: always go to plan
 builder.add_edge("recall", "plan")
 
 # From plan: decide whether to get human feedback or skip
 builder.add_conditional_edges(
-    "plan", should_skip_human_feedback, ["human_feedback", "search_web"]
+    "plan", should_skip_human_feedback, ["human_feedback", "search_web", "summarise"]
 )
 
 # Phase 2: Human feedback -> decide next step
 builder.add_conditional_edges(
-    "human_feedback", should_break_query, ["plan", "search_web"]
+    "human_feedback", should_break_query, ["plan", "search_web", "summarise"]
 )
 
 # Execution phase
 builder.add_edge("search_web", "summarise")
 
-# From summarise: use new router (may Send to learn async + continue to review/END)
-builder.add_conditional_edges(
-    "summarise", after_summarise_router, ["learn", "review", END]
-)
+# From summarise: continue to review or finish (summarise queues learning for the
+# background worker, so the run never waits for it)
+builder.add_conditional_edges("summarise", after_summarise_router, ["review", END])
 
 # From review: decide whether to loop back or finish
 builder.add_conditional_edges("review", is_review_finished, ["plan", "summarise", END])
 
-# Learn subgraph always goes to END (it runs async)
-builder.add_edge("learn", END)
-
 # Compile
-checkpointer = MemorySaver()
-store = InMemoryStore()
+checkpointer = get_checkpointer()
+store = get_store()
 graph = builder.compile(
     checkpointer=checkpointer, store=store, interrupt_before=["human_feedback"]
 )
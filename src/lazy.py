@@ -0,0 +1,86 @@
+"""
+Deferred construction of expensive module-level objects.
+
+Model and search clients pull in their provider SDKs (openai, ollama, tavily)
+and build HTTP clients when created. Wrapping them in Lazy keeps the module
+attributes that nodes import and tests patch, while the SDK import and the
+client construction happen on first use instead of at import time.
+"""
+
+from typing import Any, Callable
+import threading
+
+
+class Lazy:
+    """
+    Proxy that builds its target on first attribute access.
+
+    Args:
+        factory: Builds the target; imports of heavy SDKs belong inside it
+        name: Shown in repr() before the target is built
+    """
+
+    def __init__(self, factory: Callable[[], Any], name: str = ""):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_name", name or getattr(factory, "__name__", ""))
+        object.__setattr__(self, "_target", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _resolve(self) -> Any:
+        if self._target is None:
+            with self._lock:
+                if self._target is None:
+                    object.__setattr__(self, "_target", self._factory())
+        return self._target
+
+    @property
+    def built(self) -> bool:
+        return self._target is not None
+
+    def build(self) -> Any:
+        """Build the target now (e.g. to warm up a long-running process)."""
+        return self._resolve()
+
+    def __getattr__(self, name: str) -> Any:
+        # Introspection (hasattr(x, "__self__"), "__wrapped__", ...) mustn't build
+        if name.startswith("__") and not self.built:
+            raise AttributeError(name)
+        return getattr(self._resolve(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._resolve(), name, value)
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return self._resolve()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        if self._target is None:
+            return f"<Lazy {self._name} (not built)>"
+        return repr(self._target)
+
+
+def _deferred(name: str) -> Callable[..., Any]:
+    def method(self, *args: Any, **kwargs: Any) -> Any:
+        return getattr(self._resolve(), name)(*args, **kwargs)
+
+    method.__name__ = name
+    return method
+
+
+class LazyRunnable(Lazy):
+    """
+    Lazy chat model or tool whose Runnable methods can be looked up unbuilt.
+
+    Compiling a graph inspects the globals its node functions use (looking
+    for subgraphs), which reads attributes such as `llm.with_structured_output`.
+    These are real methods here, so that doesn't build the model.
+    """
+
+    invoke = _deferred("invoke")
+    ainvoke = _deferred("ainvoke")
+    stream = _deferred("stream")
+    astream = _deferred("astream")
+    batch = _deferred("batch")
+    abatch = _deferred("abatch")
+    bind_tools = _deferred("bind_tools")
+    with_structured_output = _deferred("with_structured_output")
@@ -1,45 +1,76 @@
-from langchain_openai import ChatOpenAI
-from langchain_ollama import ChatOllama
+"""
+Chat models used by the nodes.
+
+Models are built on first use (see src.lazy), so importing the nodes or the
+graph doesn't import the OpenAI / Ollama SDKs or open their HTTP clients.
+"""
+
 from src import config
+from src.lazy import LazyRunnable
+
+QWEN_BASE_URL = "https://dashscope.aliyuncs.com/compatible-mode/v1"
+
+
+def _chat_openai(**kwargs):
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(**kwargs)
+
+
+def _chat_ollama(**kwargs):
+    from langchain_ollama import ChatOllama
 
-openai_llm = ChatOpenAI(
-    model=config.OPENAI_MODEL,
-    temperature=config.OPENAI_TEMPERATURE,
-    api_key=config.OPENAI_API_KEY,
+    return ChatOllama(**kwargs)
+
+
+openai_llm = LazyRunnable(
+    lambda: _chat_openai(
+        model=config.OPENAI_MODEL,
+        temperature=config.OPENAI_TEMPERATURE,
+        api_key=config.OPENAI_API_KEY,
+    ),
+    "openai_llm",
 )
 
-qwen_llm = ChatOpenAI(
-    model=config.QWEN_MODEL,
-    temperature=config.QWEN_TEMPERATURE,
-    api_key=config.QWEN_API_KEY,
-    base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
+qwen_llm = LazyRunnable(
+    lambda: _chat_openai(
+        model=config.QWEN_MODEL,
+        temperature=config.QWEN_TEMPERATURE,
+        api_key=config.QWEN_API_KEY,
+        base_url=QWEN_BASE_URL,
+    ),
+    "qwen_llm",
 )
 
-minmax_llm = ChatOpenAI(
-    model=config.MINMAX_MODEL,
-    temperature=config.MINMAX_TEMPERATURE,
-    api_key=config.MINMAX_API_KEY,
-    base_url="https://api.minimax.io",
+minmax_llm = LazyRunnable(
+    lambda: _chat_openai(
+        model=config.MINMAX_MODEL,
+        temperature=config.MINMAX_TEMPERATURE,
+        api_key=config.MINMAX_API_KEY,
+        base_url="https://api.minimax.io",
+    ),
+    "minmax_llm",
 )
 
-ollama_llm = ChatOllama(
-    model="qwen3:8b",
-    temperature=0,
+ollama_llm = LazyRunnable(
+    lambda: _chat_ollama(model="qwen3:8b", temperature=0), "ollama_llm"
 )
 
 question_model = config.QUESTION_MODEL.lower()
 if "qwen" in question_model:
-    question_llm = ChatOpenAI(
-        model=question_model,
-        temperature=config.QWEN_TEMPERATURE,
-        api_key=config.QWEN_API_KEY,
-        base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
+    question_llm = LazyRunnable(
+        lambda: _chat_openai(
+            model=question_model,
+            temperature=config.QWEN_TEMPERATURE,
+            api_key=config.QWEN_API_KEY,
+            base_url=QWEN_BASE_URL,
+        ),
+        "question_llm",
     )
 elif "ollama" in question_model:
-    question_llm = ChatOllama(
-        model="qwen3:8b",
-        temperature=0,
-        async_client=True,
+    question_llm = LazyRunnable(
+        lambda: _chat_ollama(model="qwen3:8b", temperature=0, async_client=True),
+        "question_llm",
     )
 else:
     print(
@@ -49,20 +80,22 @@ else:
 
 report_model = config.REPORT_MODEL.lower()
 if "qwen" in report_model:
-    report_llm = ChatOpenAI(
-        model=report_model,
-        temperature=config.QWEN_TEMPERATURE,
-        api_key=config.QWEN_API_KEY,
-        base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
+    report_llm = LazyRunnable(
+        lambda: _chat_openai(
+            model=report_model,
+            temperature=config.QWEN_TEMPERATURE,
+            api_key=config.QWEN_API_KEY,
+            base_url=QWEN_BASE_URL,
+        ),
+        "report_llm",
     )
 elif "ollama" in report_model:
-    report_llm = ChatOllama(
-        model="qwen3:8b",
-        temperature=0,
+    report_llm = LazyRunnable(
+        lambda: _chat_ollama(model="qwen3:8b", temperature=0), "report_llm"
     )
 else:
     print(
-        "Unsupported report model: {report_model}. No LLM will be configured for report nodes."
+        f"Unsupported report model: {report_model}. No LLM will be configured for report nodes."
     )
     report_llm = None
 
@@ -2,7 +2,15 @@ from pydantic import BaseModel, Field
 from langchain.messages import SystemMessage, AIMessage
 from src.state import LearningState, RecallState
 from src.llm import report_llm  # Use same model as summarise
-from src.tools.consult_note import recall_notes, save_lesson
+from src.tools.consult_note import (
+    current_lesson_namespace,
+    recall_lessons,
+    record_lesson_outcome,
+    save_lesson,
+)
+from src.tools.lesson_consolidation import schedule_consolidation
+from src.tools.learning_queue import plan_changed
+from src.tools.answer_cache import current_store
 from src.prompts import WRITE_NOTES_PROMPT
 from langgraph.config import get_store
 from langgraph.graph import END
@@ -31,7 +39,11 @@ async def recall_from_memory(state: RecallState):
                 break
 
     store = get_store()
-    recalled_notes = await recall_notes(store, query, limit=3)
+    # Tenant/project from the run's config, plus the shared tier
+    recalled = await recall_lessons(
+        store, query, limit=3, namespace=current_lesson_namespace()
+    )
+    recalled_notes = [item.value.get("lesson", "") for item in recalled]
 
     notes_summary = ""
     if recalled_notes:
@@ -47,6 +59,7 @@ async def recall_from_memory(state: RecallState):
     return {
         "query": query,
         "recalled_notes": recalled_notes,
+        "recalled_lesson_keys": [item.key for item in recalled],
         "messages": [AIMessage(content=message_content)],
     }
 
@@ -63,6 +76,7 @@ async def compare_and_learn(state: LearningState):
     - plan_a: Initial plan
     - plan_b: Final plan
     - human_feedback: (optional) User's feedback
+    - recalled_lesson_keys: (optional) Lessons recalled for plan_a
     """
     plan_a = state.get("plan_a", "")
     plan_b = state.get("plan_b", "")
@@ -74,9 +88,18 @@ async def compare_and_learn(state: LearningState):
         logger.debug("No plans to compare, skipping learning phase")
         return {"lesson_learned": None}
 
-    # If plans are identical, no lesson to learn
-    if plan_a == plan_b:
-        logger.debug("Plans are identical, no lesson to learn")
+    # Lessons behind a plan the human had to change count against them in recall
+    namespace = current_lesson_namespace()
+    await record_lesson_outcome(
+        current_store(),
+        state.get("recalled_lesson_keys", []),
+        corrected=plan_changed(plan_a, plan_b),
+        namespace=namespace,
+    )
+
+    # If the sub-questions were approved unchanged, no lesson to learn
+    if not plan_changed(plan_a, plan_b):
+        logger.debug("Plan approved unchanged, no lesson to learn")
         return {"lesson_learned": None}
 
     # Use report_llm (same as summarise) to analyze the difference and extract lesson
@@ -106,7 +129,9 @@ async def compare_and_learn(state: LearningState):
         if result.has_lesson and result.lesson:
             # Save the lesson to store
             store = get_store()
-            await save_lesson(store, result.lesson, query)
+            if await save_lesson(store, result.lesson, query, namespace=namespace):
+                # Merge it with near-duplicates off the request path
+                schedule_consolidation(store, namespace)
 
             logger.info(f"[ASYNC LEARNING] Learned new lesson: {result.lesson}")
 
@@ -132,7 +157,7 @@ def should_learn(state: LearningState):
     plan_a = state.get("plan_a", "")
     plan_b = state.get("plan_b", "")
 
-    if plan_a and plan_b and plan_a != plan_b:
+    if plan_a and plan_b and plan_changed(plan_a, plan_b):
         return "compare_and_learn"
     else:
         return END
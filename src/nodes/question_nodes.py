@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from src.state import Plan, WebSearchState
+from src.state import SUMMARY_NAME, Plan, WebSearchState
 from typing import List, Literal
 from src.llm import question_llm as llm
 from src.llm import report_llm as summarize_llm
@@ -7,8 +7,22 @@ from langgraph.types import Send
 from langgraph.graph import END
 from langchain.messages import SystemMessage, HumanMessage, AIMessage
 from src.prompts import BREAK_QUESTIONS_PROMPT, SYNTHESIS_PROMPT
+from src.nodes.router_nodes import route_feedback, choose_fanout_width
+from src.nodes.review_nodes import format_sources
+from src.embeddings.qwen_embedder import aembed_texts
+from src.budget import degrade, release_budget
+from src.tools.answer_cache import (
+    current_store,
+    is_reusable_run,
+    lookup_answer,
+    save_answer,
+)
+from src.tools.learning_queue import enqueue_learning, plan_changed
+from src.tools.consult_note import current_lesson_namespace
 from src import config
 import logging
+import math
+import re
 
 logger = logging.getLogger("LangGraph_DeepSearch.question_nodes")
 
@@ -50,6 +64,82 @@ def extract_query(state: Plan):
     raise ValueError("No query found in state")
 
 
+def normalize_question(question: str) -> str:
+    """Normalise a sub-question so that trivially different phrasings share a key."""
+    text = re.sub(r"\s+", " ", question).strip().lower()
+    return text.rstrip("?？.。!！ ")
+
+
+def select_pending_questions(
+    questions: List[str], search_results: List[dict]
+) -> List[str]:
+    """
+    Return the sub-questions that still need a search.
+    A question is reused when an earlier search in this thread returned results for it
+    without an error, so review-driven re-planning only pays for new or changed questions.
+    """
+    searched = {
+        normalize_question(result.get("question", ""))
+        for result in search_results
+        if result.get("results") and not result.get("error")
+    }
+
+    pending = []
+    seen = set()
+    for question in questions:
+        key = normalize_question(question)
+        if key in searched or key in seen:
+            continue
+        seen.add(key)
+        pending.append(question)
+    return pending
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+def _lexical_similarity(a: str, b: str) -> float:
+    """Token-set cosine, used when embeddings are unavailable."""
+    tokens_a = set(normalize_question(a).split())
+    tokens_b = set(normalize_question(b).split())
+    if not tokens_a or not tokens_b:
+        return 0.0
+    return len(tokens_a & tokens_b) / math.sqrt(len(tokens_a) * len(tokens_b))
+
+
+async def drop_redundant_questions(questions: List[str], threshold: float) -> List[str]:
+    """
+    Drop sub-questions that are near-duplicates of an earlier one.
+    Similarity is measured on embeddings, falling back to token overlap
+    if the embedding call fails.
+    """
+    if len(questions) < 2:
+        return questions
+
+    try:
+        vectors = await aembed_texts(questions)
+
+        def similarity(i: int, j: int) -> float:
+            return _cosine(vectors[i], vectors[j])
+
+    except Exception as e:
+        logger.debug(f"Embedding sub-questions failed, using lexical similarity: {e}")
+
+        def similarity(i: int, j: int) -> float:
+            return _lexical_similarity(questions[i], questions[j])
+
+    kept: List[int] = []
+    for i in range(len(questions)):
+        if all(similarity(i, j) < threshold for j in kept):
+            kept.append(i)
+        else:
+            logger.debug(f"Dropping redundant sub-question: {questions[i]}")
+    return [questions[i] for i in kept]
+
+
 async def plan(state: Plan):
     """
     Generate a list of sub-questions based on user's original query.
@@ -74,10 +164,16 @@ async def plan(state: Plan):
 
     structured_llm = llm.with_structured_output(Sub_Questions)
 
+    # Fan-out width scales with query complexity; human feedback may ask for more
+    if human_feedback and not score:
+        max_questions = config.MAX_SUB_QUESTIONS
+    else:
+        max_questions = choose_fanout_width(query, config.MAX_SUB_QUESTIONS)
+
     messages = [
         SystemMessage(
             content=BREAK_QUESTIONS_PROMPT.format(query=query)
-            + f"\nRemember the max number of sub questions shouldn't exceed {config.MAX_SUB_QUESTIONS}."
+            + f"\nRemember the max number of sub questions shouldn't exceed {max_questions}."
         )
     ]
 
@@ -115,6 +211,26 @@ async def plan(state: Plan):
     questions = results.questions
     reason = results.reason
 
+    # Every sub-question is a search branch, so enforce the width in code too
+    if config.SUB_QUESTION_DEDUP:
+        questions = await drop_redundant_questions(
+            questions, config.SUB_QUESTION_DEDUP_THRESHOLD
+        )
+    questions = questions[:max_questions]
+
+    degradations = []
+    if degrade("cap_sub_questions"):
+        questions = questions[: config.BUDGET_CAPPED_SUB_QUESTIONS]
+        degradations.append("cap_sub_questions")
+
+    # Only dispatch searches for sub-questions without usable results in this thread
+    pending_questions = select_pending_questions(
+        questions, state.get("search_results", [])
+    )
+    reused = len(questions) - len(pending_questions)
+    if reused:
+        logger.debug(f"Reusing search results for {reused} sub-question(s)")
+
     # Capture Plan A on first invocation (inline plan capture)
     plan_a = state.get("plan_a", "")
     result_dict = {
@@ -124,15 +240,24 @@ async def plan(state: Plan):
         )
         + 1,
         "questions": questions,
+        "pending_questions": pending_questions,
         "messages": [
             AIMessage(
                 content="I'm now going to search for these topics:\n"
                 + "\n".join(f"**{i + 1}**. **{q}**" for i, q in enumerate(questions))
                 + f"\n\n**Reason for these sub-questions:**\n{reason}"
+                + (
+                    f"\n\nReusing existing results for {reused} sub-question(s)."
+                    if reused
+                    else ""
+                )
             )
         ],
     }
 
+    if degradations:
+        result_dict["degradations"] = degradations
+
     # Only capture plan_a if it's the first time (plan_a is empty)
     if not plan_a:
         plan_content = ""
@@ -157,6 +282,44 @@ def should_skip_human_feedback(state: Plan):
 async def should_break_query(state: Plan):
     """
     Decide the next step based on human feedback.
+    Clear approvals and rewrite requests are routed locally; only ambiguous
+    feedback is sent to the LLM router.
+    """
+    human_feedback = state.get("human_feedback", "")
+    next_step = None
+    if config.FEEDBACK_FAST_PATH:
+        next_step, confidence = route_feedback(
+            human_feedback, config.FEEDBACK_FAST_PATH_CONFIDENCE
+        )
+        next_step_reason = (
+            f"Fast-path feedback classifier (confidence={confidence:.2f})"
+        )
+
+    if next_step is None:
+        next_step, next_step_reason = await _llm_feedback_router(state)
+
+    # Check the number of iterations to prevent infinite loops
+    break_iteration = state.get("break_questions_iterations_count", 0)
+    if break_iteration >= 3:
+        logger.debug(
+            f"Reached maximum break iterations ({break_iteration}). Forcing next step to 'search_web'."
+        )
+        next_step = "search_web"
+
+    # Log the router decision and reasoning for debugging and transparency
+    logger.debug(f"Router decision: {next_step}")
+    logger.debug(f"Router reasoning: {next_step_reason}")
+
+    if next_step == "plan":
+        return next_step
+    else:
+        return map_search(state)
+
+
+async def _llm_feedback_router(state: Plan):
+    """
+    Ask the LLM whether the human feedback requires re-planning.
+    Returns (next_step, reason).
     """
 
     class Router(BaseModel):
@@ -212,25 +375,7 @@ async def should_break_query(state: Plan):
     )
 
     result = await structured_router.ainvoke(messages)
-    next_step = result.next_step
-    next_step_reason = result.reason
-
-    # Check the number of iterations to prevent infinite loops
-    break_iteration = state.get("break_questions_iterations_count", 0)
-    if break_iteration >= 3:
-        logger.debug(
-            f"Reached maximum break iterations ({break_iteration}). Forcing next step to 'search_web'."
-        )
-        next_step = "search_web"
-
-    # Log the router decision and reasoning for debugging and transparency
-    logger.debug(f"Router decision: {next_step}")
-    logger.debug(f"Router reasoning: {next_step_reason}")
-
-    if next_step == "plan":
-        return next_step
-    else:
-        return map_search(state)
+    return result.next_step, result.reason
 
 
 def human_feedback(state: Plan):
@@ -259,34 +404,49 @@ def human_feedback(state: Plan):
 
 def map_search(state: Plan):
     """
-    Use Send to dispatch each sub-question to the search_web node for searching.
+    Use Send to dispatch each pending sub-question to the search_web node for searching.
+    Sub-questions whose results are already in state are not searched again;
+    if nothing is pending, go straight to summarise with the existing results.
     """
-    questions = state.get(
-        "questions", [state["query"]]
-    )  # If no sub-questions, search the original query directly
+    questions = state.get("pending_questions")
+    if questions is None:
+        questions = state.get(
+            "questions", [state["query"]]
+        )  # If no sub-questions, search the original query directly
+    if not questions:
+        logger.debug("All sub-questions already searched, skipping to summarise")
+        return "summarise"
     return [Send("search_web", {"query": question}) for question in questions]
 
 
 async def answer_directly(state: Plan):
     """
-    Generate an answer directly based on the original query and existing information without further search.
-    Uses LLM to generate a direct response based on the information in the current state.
+    Answer the original query directly without decomposition or further search.
+    This is the direct-answer fast path: repeated queries get their cached deep-search
+    answer, otherwise the LLM answers from its own knowledge and any context in state.
     """
-    query = state["query"]
-    context = state.get("search_results", [])
-    prompt = f"Based on the following context, answer the question: {query}\nContext: {context}"
+    query = extract_query(state)
 
-    messages = [SystemMessage(content=prompt)]
+    cached_answer = await lookup_answer(current_store(), query)
+    if cached_answer:
+        logger.debug("Answering from cached deep-search result")
+        answer = AIMessage(content=cached_answer)
+    else:
+        context = state.get("search_results", [])
+        prompt = f"Based on the following context, answer the question: {query}\nContext: {context}"
 
-    answer = await llm.ainvoke(messages)
+        messages = [SystemMessage(content=prompt)]
+
+        answer = await llm.ainvoke(messages)  # answer is already an AIMessage
+    # Kept verbatim by message compaction until a newer answer supersedes it
+    answer.name = SUMMARY_NAME
+    # The run ends here
+    release_budget()
 
-    # Track the direct answer with both user query and AI response
     return {
-        "context": answer,
-        "messages": [
-            HumanMessage(content=query),
-            answer,  # answer is already an AIMessage
-        ],
+        "query": query,
+        "summary": answer,
+        "messages": [answer],
     }
 
 
@@ -295,13 +455,14 @@ async def summarise(state: WebSearchState):
     Summarize the search results and extract key information and insights.
     Uses LLM to analyze each search result and generate a comprehensive summary.
 
-    After summarization, asynchronously triggers learning if enabled.
+    After summarization, queues the plan diff for the background learning worker if enabled.
     """
 
     prompt = SYNTHESIS_PROMPT.format(
         query=state["query"],
         context=state["search_results"],
-        sources=state.get("sources", []),
+        # The numbering the report's [n] citations refer to, also used by review
+        sources=format_sources(state.get("sources", [])),
     )
 
     score = state.get("score", None)
@@ -316,57 +477,84 @@ async def summarise(state: WebSearchState):
     messages = [SystemMessage(content=prompt)]
 
     summary = await summarize_llm.ainvoke(messages)
+    summary.name = SUMMARY_NAME
 
     # Track the summarization with the actual summary content
-    return {
+    result = {
         "summary": summary,
         "messages": [summary],
         "summarise_iterations": state.get("summarise_iterations", 0) + 1,
     }
 
+    # Reused searches count once per executed plan; plans rewritten after
+    # human feedback never get here, and review rounds reuse the same plan
+    plan_iteration = state.get("break_questions_iterations_count", 0)
+    pending_questions = state.get("pending_questions")
+    if (
+        pending_questions is not None
+        and state.get("searches_counted_plan", 0) != plan_iteration
+    ):
+        reused = len(state.get("questions", [])) - len(pending_questions)
+        result["searches_reused"] = state.get("searches_reused", 0) + reused
+        result["searches_counted_plan"] = plan_iteration
+    # Out of budget: the review loop is the first thing to go
+    if degrade("skip_review"):
+        result["degradations"] = ["skip_review"]
+
+    # Cache the answer for the direct-answer fast path once no review will follow
+    if (
+        result["summarise_iterations"] >= config.MAX_SUMMARISE_ITERATIONS
+        or "degradations" in result
+    ) and is_reusable_run(state):
+        await save_answer(current_store(), state["query"], summary.content)
+
+    # Learn from the plan diff off the critical path (identical diffs are queued once)
+    # Judge the recalled lessons once, not after every review round
+    recalled_lesson_keys = (
+        state.get("recalled_lesson_keys", [])
+        if result["summarise_iterations"] <= 1
+        else []
+    )
+    if (
+        config.ENABLE_LEARNING
+        and state.get("plan_a")
+        and state.get("plan_b")
+        # An approved plan only credits the lessons behind it
+        and (recalled_lesson_keys or plan_changed(state["plan_a"], state["plan_b"]))
+    ):
+        logger.debug("Queueing plan diff for background learning")
+        await enqueue_learning(
+            current_store(),
+            state["query"],
+            state["plan_a"],
+            state["plan_b"],
+            human_feedback=state.get("human_feedback", ""),
+            recalled_lesson_keys=recalled_lesson_keys,
+            namespace=current_lesson_namespace(),
+        )
+    return result
+
 
 def after_summarise_router(state: WebSearchState):
     """
-    After summarise completes, decide next steps:
-    1. Always check if should continue to review
-    2. If learning enabled and plans exist, Send to learn subgraph asynchronously
-
-    Returns a list that may contain:
-    - Send("learn", {...}) for async learning
-    - "review" or other next steps
+    After summarise completes, continue to review unless the review loop is
+    finished or skipped. Learning does not hold up the run: summarise has
+    already queued the plan diff for the background learning worker.
     """
     from src import config
 
     summarise_iterations = state.get("summarise_iterations", 1)
-    plan_a = state.get("plan_a", "")
-    plan_b = state.get("plan_b", "")
-
-    results = []
-
-    # Async learning: Send to learn subgraph if enabled and plans exist
-    if config.ENABLE_LEARNING and plan_a and plan_b:
-        logger.debug("Triggering async learning after summarise")
-        # Send relevant state to learn subgraph
-        results.append(
-            Send(
-                "learn",
-                {
-                    "query": state.get("query", ""),
-                    "plan_a": plan_a,
-                    "plan_b": plan_b,
-                    "human_feedback": state.get("human_feedback", ""),
-                },
-            )
-        )
 
-    # Determine main flow continuation
-    if summarise_iterations >= config.MAX_SUMMARISE_ITERATIONS:
-        # Max iterations reached, stop here (learning happens async)
-        return results if results else END
+    if (
+        summarise_iterations >= config.MAX_SUMMARISE_ITERATIONS
+        or "skip_review" in state.get("degradations", [])
+    ):
+        # Max iterations reached, stop here (learning happens in the background)
+        release_budget()
+        return END
     else:
         # Continue to review
-        results.append("review")
-        return results if len(results) > 1 else "review"
+        return "review"
 
 
 async def is_review_finished(state: WebSearchState):
@@ -384,8 +572,19 @@ async def is_review_finished(state: WebSearchState):
 
     if score > 7:
         # Good score, we're done (learning already happened async)
+        release_budget()
         return END
 
+    if degrade("skip_review"):
+        # Out of budget for another improvement loop
+        release_budget()
+        return END
+
+    # The local citation check already knows what to fix
+    if state.get("review_next_step"):
+        logger.debug(f"Verifier Router decision (local): {state['review_next_step']}")
+        return state["review_next_step"]
+
     class Router(BaseModel):
         """
         Router node that decides the next step based on human feedback.
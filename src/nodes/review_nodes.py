@@ -1,21 +1,193 @@
 from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
 from langchain.messages import AIMessage
 from src.prompts import REVIEW_REPORT_PROMPT
-from src.state import Review
+from src.state import Review, Source
 from src.llm import question_llm as llm
+from src.tools.answer_cache import current_store, is_reusable_run, save_answer
+from src import config
+import logging
+import re
+
+logger = logging.getLogger("LangGraph_DeepSearch.review_nodes")
+
+_CITATION_PATTERN = re.compile(r"\[(\d+(?:\s*[,\-–]\s*\d+)*)\]")
+_REFERENCES_HEADING = re.compile(
+    r"^\s*(?:#+\s*|\*\*)?(?:references|sources|参考文献|参考资料)\b.*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?。！？])\s+|\n+")
+
+
+def unique_sources(sources: List[Source]) -> List[Source]:
+    """
+    Sources deduplicated by URL, in first-seen order. The synthesis prompt
+    numbers this list, so [n] in a report cites its n-th entry.
+    """
+    seen: set = set()
+    unique: List[Source] = []
+    for source in sources:
+        key = (source.get("url") or source.get("title") or "").strip().rstrip("/")
+        if key in seen:
+            continue
+        seen.add(key)
+        unique.append(source)
+    return unique
+
+
+def format_sources(sources: List[Source]) -> str:
+    """Numbered "[n] title - url" lines for the unique sources, as given to the synthesis prompt."""
+    return "\n".join(
+        f"[{i}] {source.get('title', '')} - {source.get('url', '')}"
+        for i, source in enumerate(unique_sources(sources), 1)
+    )
+
+
+def _parse_citation(group: str) -> List[int]:
+    """Expand a citation group such as "1, 3-5" into its source numbers."""
+    numbers: List[int] = []
+    for part in re.split(r"\s*,\s*", group):
+        bounds = re.split(r"\s*[\-–]\s*", part)
+        if len(bounds) == 2 and bounds[0].isdigit() and bounds[1].isdigit():
+            start, end = int(bounds[0]), int(bounds[1])
+            numbers.extend(range(start, min(end, start + 50) + 1))
+        elif part.isdigit():
+            numbers.append(int(part))
+    return numbers
+
+
+def assess_citations(report: str, sources: List[Source]) -> Dict[str, Any]:
+    """
+    Measure how well a report is grounded in its sources without calling an LLM.
+
+    Parses the inline [n] citations in the report body, maps them to the
+    numbered source list of the synthesis prompt (see format_sources) and computes:
+    - claim_coverage: share of claim sentences carrying at least one citation
+    - unused_source_ratio: share of sources never cited
+    - missing_references: cited numbers that don't map to a source
+
+    Args:
+        report: The summary text
+        sources: Sources the summary was generated from
+
+    Returns:
+        Dictionary of citation metrics
+    """
+    sources = unique_sources(sources)
+    heading = _REFERENCES_HEADING.search(report)
+    body = report[: heading.start()] if heading else report
+
+    claims = 0
+    cited_claims = 0
+    cited: set = set()
+    for sentence in _SENTENCE_SPLIT.split(body):
+        sentence = sentence.strip()
+        if sentence.startswith("#"):
+            continue
+        numbers = [
+            n
+            for group in _CITATION_PATTERN.findall(sentence)
+            for n in _parse_citation(group)
+        ]
+        cited.update(numbers)
+        # Only sentences with some substance count as claims
+        if len(_CITATION_PATTERN.sub("", sentence).split()) >= 6:
+            claims += 1
+            if numbers:
+                cited_claims += 1
+
+    valid = {n for n in cited if 1 <= n <= len(sources)}
+    return {
+        "claims": claims,
+        "cited_claims": cited_claims,
+        "claim_coverage": cited_claims / claims if claims else 0.0,
+        "unused_source_ratio": 1 - len(valid) / len(sources) if sources else 0.0,
+        "missing_references": sorted(cited - valid),
+    }
+
+
+def local_review_decision(
+    metrics: Dict[str, Any], num_sources: int
+) -> Optional[Dict[str, Any]]:
+    """
+    Decide from citation metrics alone whether the LLM review can be skipped.
+
+    Returns None when the metrics are inconclusive; otherwise the review
+    update to apply, including "review_next_step" for low-quality reports.
+    """
+    if metrics["claims"] == 0:
+        return None
+
+    coverage = metrics["claim_coverage"]
+    missing = metrics["missing_references"]
+    summary = (
+        f"{metrics['cited_claims']}/{metrics['claims']} claims cited, "
+        f"{metrics['unused_source_ratio']:.0%} of sources unused"
+    )
+
+    if (
+        num_sources
+        and not missing
+        and coverage >= config.LOCAL_REVIEW_HIGH_COVERAGE
+        and metrics["unused_source_ratio"] <= 0.5
+    ):
+        return {
+            "score": 9,
+            "strengths": f"Well grounded in the sources ({summary}).",
+            "weaknesses": "None found by the citation check.",
+            "review_next_step": None,
+        }
+
+    if not num_sources or missing or coverage < config.LOCAL_REVIEW_LOW_COVERAGE:
+        weaknesses = [summary]
+        if missing:
+            weaknesses.append(f"citations without a matching source: {missing}")
+        # Too little material means searching again; otherwise rewrite with citations
+        next_step = "plan" if num_sources < 3 else "summarise"
+        return {
+            "score": 4,
+            "strengths": "N/A",
+            "weaknesses": "Poorly grounded report: " + "; ".join(weaknesses) + ".",
+            "review_next_step": next_step,
+        }
+
+    return None
 
 
 async def review(state: Review):
     """
     Review the generated summary and provide feedback for improvement.
     This node can be used to capture human feedback on the summary and update the state accordingly for further refinement.
+    A local citation-coverage check runs first; clearly good or clearly poor reports
+    are scored without calling the LLM.
     """
     report = state.get("summary", "")
+    query = state.get("query", "")
+    numbered_sources = unique_sources(state.get("sources", []))
+
+    if config.LOCAL_REVIEW:
+        report_text = getattr(report, "content", report)
+        metrics = assess_citations(
+            report_text if isinstance(report_text, str) else str(report_text),
+            numbered_sources,
+        )
+        decision = local_review_decision(metrics, len(numbered_sources))
+        logger.debug(f"Local citation check: {metrics} -> {decision}")
+        if decision is not None:
+            if decision["score"] > 7 and is_reusable_run(state):
+                await save_answer(current_store(), query, report_text)
+            message = (
+                f"Review feedback (citation check):\n\n**Score**={decision['score']},"
+                f"\n**Strengths**={decision['strengths']},"
+                f"\n**Weaknesses**={decision['weaknesses']}"
+            )
+            return {**decision, "messages": [AIMessage(content=message)]}
 
     sources = ""
-    for source in state.get("sources", []):
+    for i, source in enumerate(numbered_sources, 1):
         content = (
-            source.get("title", "")
+            f"[{i}] "
+            + source.get("title", "")
             + ":\n"
             + source.get("url", "")
             + ":\n"
@@ -23,8 +195,6 @@ async def review(state: Review):
         )
         sources += content + "\n\n"
 
-    query = state.get("query", "")
-
     # Generate review report using the prompt
     prompt = REVIEW_REPORT_PROMPT.format(query=query, sources=sources, report=report)
 
@@ -41,9 +211,14 @@ async def review(state: Review):
         message = f"Error during review: {str(e)}"
         feedback = Review(score=0, strengths="N/A", weaknesses="Error during review")
 
+    # A well-reviewed report can serve repeated queries on the direct-answer fast path
+    if feedback.score > 7 and is_reusable_run(state):
+        await save_answer(current_store(), query, getattr(report, "content", report))
+
     return {
         "score": feedback.score,
         "strengths": feedback.strengths,
         "weaknesses": feedback.weaknesses,
+        "review_next_step": None,
         "messages": [AIMessage(content=message)],
     }
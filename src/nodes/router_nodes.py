@@ -0,0 +1,228 @@
+from collections import Counter
+from typing import List, Literal, Optional, Tuple
+import math
+import re
+import logging
+
+logger = logging.getLogger("LangGraph_DeepSearch.router_nodes")
+
+FeedbackIntent = Literal["search_web", "plan"]
+QueryRoute = Literal["direct", "deep"]
+
+# How often each routing path fires, for logging and monitoring
+ROUTER_STATS: Counter = Counter()
+
+# Words that only ever appear in plain approvals
+_APPROVAL_WORDS = {
+    "ok", "okay", "yes", "yep", "yeah", "sure", "lgtm", "good", "great", "fine",
+    "perfect", "proceed", "continue", "go", "ahead", "approve", "approved",
+    "agree", "correct", "nice", "excellent", "sounds", "looks", "look", "right",
+}  # fmt: skip
+
+# Filler that may surround an approval without changing its meaning
+_FILLER_WORDS = {
+    "the", "these", "this", "they", "it", "its", "all", "questions", "question",
+    "sub", "plan", "please", "to", "me", "with", "as", "is", "are", "and",
+    "thanks", "thank", "you", "just", "that", "s", "fine", "well", "now", "on",
+}  # fmt: skip
+
+# Verbs and phrases that signal the human wants the plan rewritten
+_REVISE_PATTERN = re.compile(
+    r"\b(add|remove|delete|drop|replace|rewrite|rephrase|change|modify|split|merge|"
+    r"combine|include|exclude|focus|instead|narrow|broaden|expand|shorten|fewer|"
+    r"more specific|less|missing|should also|what about|swap)\b"
+)
+
+# Negations that can flip a revise cue into an approval ("no need to change")
+_NEGATION_PATTERN = re.compile(r"\b(no|not|don't|dont|nothing|never|without)\b")
+
+# Exemplars for nearest-neighbour classification of feedback the rules can't settle
+_EXEMPLARS: List[Tuple[str, FeedbackIntent]] = [
+    ("the questions look good please proceed", "search_web"),
+    ("looks good to me go ahead", "search_web"),
+    ("that covers everything start searching", "search_web"),
+    ("happy with these questions run the search", "search_web"),
+    ("no changes needed", "search_web"),
+    ("all good search now", "search_web"),
+    ("add a question about pricing", "plan"),
+    ("remove the second question", "plan"),
+    ("make the questions more specific", "plan"),
+    ("focus more on recent research", "plan"),
+    ("split the first question into two", "plan"),
+    ("these questions miss the point try again", "plan"),
+    ("rewrite the questions to compare both options", "plan"),
+    ("i also want to know about the history", "plan"),
+]
+
+
+def _tokenize(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+
+def _set_cosine(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / math.sqrt(len(a) * len(b))
+
+
+def _nearest_neighbour(tokens: List[str]) -> Tuple[Optional[FeedbackIntent], float]:
+    """Label feedback by its closest exemplar; confidence is the margin between labels."""
+    token_set = set(tokens)
+    best: dict = {"search_web": 0.0, "plan": 0.0}
+    for exemplar, label in _EXEMPLARS:
+        best[label] = max(best[label], _set_cosine(token_set, set(_tokenize(exemplar))))
+
+    label = max(best, key=best.get)
+    other = "plan" if label == "search_web" else "search_web"
+    if best[label] == 0.0:
+        return None, 0.0
+    confidence = best[label] * (1.0 - best[other] / best[label])
+    return label, confidence
+
+
+def classify_feedback(feedback: str | None) -> Tuple[Optional[FeedbackIntent], float]:
+    """
+    Classify human feedback on the sub-questions without calling an LLM.
+
+    Clear approvals map to "search_web" and clear rewrite requests map to "plan".
+    Returns (None, confidence) when the feedback is ambiguous, so the caller
+    can fall back to the LLM router.
+
+    Args:
+        feedback: Raw human feedback text
+
+    Returns:
+        Tuple of (next step or None, confidence between 0 and 1)
+    """
+    text = (feedback or "").strip().lower()
+    if not text:
+        return "search_web", 1.0
+
+    tokens = _tokenize(text)
+    revise_cue = _REVISE_PATTERN.search(text)
+    negated = _NEGATION_PATTERN.search(text)
+
+    if not revise_cue:
+        # Approval when every word is approval vocabulary or filler
+        if any(t in _APPROVAL_WORDS for t in tokens) and all(
+            t in _APPROVAL_WORDS or t in _FILLER_WORDS for t in tokens
+        ):
+            return "search_web", 1.0
+    elif not negated:
+        return "plan", 0.9
+
+    return _nearest_neighbour(tokens)
+
+
+def route_feedback(
+    feedback: str | None, threshold: float
+) -> Tuple[Optional[FeedbackIntent], float]:
+    """
+    Fast-path routing for human feedback.
+    Returns the classified next step when its confidence reaches the threshold,
+    otherwise None to signal that the LLM router must decide. Both outcomes are
+    counted in ROUTER_STATS.
+    """
+    intent, confidence = classify_feedback(feedback)
+    if intent is not None and confidence >= threshold:
+        ROUTER_STATS["feedback_fast_path"] += 1
+    else:
+        ROUTER_STATS["feedback_llm"] += 1
+        intent = None
+
+    total = ROUTER_STATS["feedback_fast_path"] + ROUTER_STATS["feedback_llm"]
+    logger.info(
+        f"Feedback fast path {'hit' if intent else 'miss'} "
+        f"(confidence={confidence:.2f}); fast-path rate "
+        f"{ROUTER_STATS['feedback_fast_path']}/{total}"
+    )
+    return intent, confidence
+
+
+# Cues that a query needs several angles or careful synthesis
+_COMPLEX_PATTERN = re.compile(
+    r"\b(compare|comparison|versus|vs|difference|differences|between|pros|cons|"
+    r"trade-?offs?|impact|effects?|analy[sz]e|analysis|evaluate|why|how does|how do|"
+    r"explain|history|future|strategy|strategies|best practices|recommend)\b"
+)
+
+# Cues that the answer depends on fresh information, so it needs a web search
+_FRESHNESS_PATTERN = re.compile(
+    r"\b(latest|recent|recently|today|yesterday|this week|this month|this year|"
+    r"current|currently|now|news|price|prices|stock|release|released|20\d\d)\b"
+)
+
+# Short factual question openers
+_FACTOID_PATTERN = re.compile(
+    r"^(what is|what's|what are|who is|who was|who wrote|who invented|when did|"
+    r"when was|where is|how many|how much|define|what does)\b"
+)
+
+# CamelCase / versioned names (e.g. "LangGraph", "GPT-4o") are often niche or new
+_NICHE_NAME_PATTERN = re.compile(r"\b([a-z]+[A-Z]\w*|[A-Z][a-z]+[A-Z]\w*|\w+-?\d\w*)\b")
+
+
+def estimate_complexity(query: str) -> float:
+    """
+    Cheap, LLM-free estimate of how much research a query needs.
+
+    Returns:
+        Score between 0 (trivially answerable) and 1 (needs full deep search)
+    """
+    text = query.strip()
+    lowered = text.lower()
+    words = _tokenize(lowered)
+
+    score = min(len(words) / 30, 0.5)
+    score += 0.25 * len(_COMPLEX_PATTERN.findall(lowered))
+    score += 0.2 * max(text.count("?") - 1, 0)
+    score += 0.15 * (lowered.count(" and ") + lowered.count(","))
+    if needs_fresh_data(lowered):
+        score += 0.5
+    if _NICHE_NAME_PATTERN.search(text):
+        score += 0.4
+    if _FACTOID_PATTERN.match(lowered):
+        score -= 0.2
+    elif "?" not in text:
+        # Topic-style queries ("AI safety concerns") usually want a report
+        score += 0.25
+
+    return min(max(score, 0.0), 1.0)
+
+
+def needs_fresh_data(query: str) -> bool:
+    """Whether the query asks about something recent ("latest", "today", a year, ...)."""
+    return bool(_FRESHNESS_PATTERN.search(query.lower()))
+
+
+def choose_fanout_width(query: str, max_width: int) -> int:
+    """
+    Pick how many sub-questions (search branches) a query deserves.
+    Scales linearly with estimate_complexity between 1 and max_width.
+    """
+    complexity = estimate_complexity(query)
+    return max(1, min(max_width, round(1 + complexity * (max_width - 1))))
+
+
+def route_query(query: str, threshold: float) -> Tuple[QueryRoute, float]:
+    """
+    Decide whether a query can be answered directly or needs deep search.
+    The direct route is only taken when its confidence (1 - complexity)
+    reaches the threshold. Route counts are kept in ROUTER_STATS.
+    """
+    confidence = 1.0 - estimate_complexity(query)
+    route: QueryRoute = "direct" if confidence >= threshold else "deep"
+    record_route(route)
+    return route, confidence
+
+
+def record_route(route: str) -> None:
+    """Count a START routing decision and log the traffic share of each route."""
+    ROUTER_STATS[f"route_{route}"] += 1
+    total = sum(v for k, v in ROUTER_STATS.items() if k.startswith("route_"))
+    shares = ", ".join(
+        f"{k[len('route_') :]}={v / total:.0%}"
+        for k, v in sorted(ROUTER_STATS.items())
+        if k.startswith("route_")
+    )
+    logger.info(f"Query routed to '{route}' ({shares} of {total} queries)")
@@ -1,12 +1,16 @@
 from pydantic import BaseModel, Field
 from src.state import Search
-from typing import Dict
+from typing import Any, Dict, List
 from src.llm import question_llm as llm
 from langchain.messages import SystemMessage, AIMessage
 from src.tools.search_tool import search_tavily_impl, search_tavily, get_date
 from src.prompts import RELEVANCE_CHECK_PROMPT
+from langgraph.config import get_config
 from langgraph.prebuilt import ToolNode
+from src.budget import degrade
+from src.tasks import SearchExecutor, get_search_executor, task_key
 import logging
+import uuid
 
 logger = logging.getLogger("LangGraph_DeepSearch.search_nodes")
 
@@ -56,86 +60,140 @@ async def judge_relevance(query: str, search_result: Dict[str, str]) -> bool:
         return True
 
 
-async def search_web(state: Search):
-    """
-    Execute Tavily search for the query and use LLM to filter irrelevant results.
-    LLM can decide to use search tools or other tools as needed.
-    """
-    query = state.get("query")
-    search_results = []
+async def _search_with_tools(query: str) -> List[Dict[str, str]]:
+    """Let the LLM call the search tools for the query and collect the search results."""
+    # Define tools and create ToolNode
+    tools = [search_tavily, get_date]
+    tool_node = ToolNode(tools)
 
-    try:
-        # Define tools and create ToolNode
-        tools = [search_tavily, get_date]
-        tool_node = ToolNode(tools)
+    results = []
+    llm_with_tools = llm.bind_tools(tools)
 
-        # Try to use LLM with tools (if supported)
-        results = []
-        try:
-            llm_with_tools = llm.bind_tools(tools)
-
-            # Invoke LLM with tools
-            ai_message = await llm_with_tools.ainvoke(
-                [
-                    SystemMessage(
-                        content=f"Search for information about: {query}\nUse the search_tavily tool to find relevant information."
-                    )
-                ]
+    # Invoke LLM with tools
+    ai_message = await llm_with_tools.ainvoke(
+        [
+            SystemMessage(
+                content=f"Search for information about: {query}\nUse the search_tavily tool to find relevant information."
             )
+        ]
+    )
 
-            # Extract results from tool calls using ToolNode
-            if hasattr(ai_message, "tool_calls") and ai_message.tool_calls:
-                # ToolNode automatically executes all tool calls and returns ToolMessages
-                node_result = await tool_node.ainvoke({"messages": [ai_message]})
-
-                # Extract search results from ToolMessages
-                for message in node_result.get("messages", []):
-                    # ToolMessage.content contains the tool's return value
-                    if hasattr(message, "name") and message.name == "search_tavily":
-                        tool_result = message.content
-                        # search_tavily_impl returns a list of dicts
-                        if isinstance(tool_result, list):
-                            results.extend(tool_result)
-                        elif isinstance(tool_result, str):
-                            # If it's a string, it might be an error or serialized result
-                            try:
-                                import json
-
-                                parsed = json.loads(tool_result)
-                                if isinstance(parsed, list):
-                                    results.extend(parsed)
-                                else:
-                                    results.append(parsed)
-                            except (json.JSONDecodeError, TypeError, ValueError):
-                                # If can't parse, treat as single result
-                                results.append({"content": tool_result})
+    # Extract results from tool calls using ToolNode
+    if hasattr(ai_message, "tool_calls") and ai_message.tool_calls:
+        # ToolNode automatically executes all tool calls and returns ToolMessages
+        node_result = await tool_node.ainvoke({"messages": [ai_message]})
+
+        # Extract search results from ToolMessages
+        for message in node_result.get("messages", []):
+            # ToolMessage.content contains the tool's return value
+            if hasattr(message, "name") and message.name == "search_tavily":
+                tool_result = message.content
+                # search_tavily_impl returns a list of dicts
+                if isinstance(tool_result, list):
+                    results.extend(tool_result)
+                elif isinstance(tool_result, str):
+                    # If it's a string, it might be an error or serialized result
+                    try:
+                        import json
+
+                        parsed = json.loads(tool_result)
+                        if isinstance(parsed, list):
+                            results.extend(parsed)
                         else:
-                            results.append(tool_result)
-        except Exception as tool_error:
-            # If LLM doesn't support tools or bind_tools fails, log and continue to fallback
-            logger.debug(f"Tool calling not supported or failed: {str(tool_error)}")
+                            results.append(parsed)
+                    except (json.JSONDecodeError, TypeError, ValueError):
+                        # If can't parse, treat as single result
+                        results.append({"content": tool_result})
+                else:
+                    results.append(tool_result)
+    return results
+
+
+async def search_branch(query: str, degradations: List[str]) -> Dict[str, Any]:
+    """
+    Search one sub-question and keep the relevant results.
+
+    Runs in the graph's process, or on a search worker when search_web hands
+    the branch to a task queue (see src.tasks).
+
+    Args:
+        query: Sub-question to search
+        degradations: Budget degradations search_web decided on
+            ("skip_relevance", "basic_search")
+
+    Returns:
+        The branch's search_results entry: question, results (and error)
+    """
+    try:
+        # Try to use LLM with tools (if supported)
+        # Out of budget: skip the tool-calling LLM and run a basic-depth search directly
+        results = []
+        search_depth = "basic" if "basic_search" in degradations else "advanced"
+        if "basic_search" not in degradations:
+            try:
+                results = await _search_with_tools(query)
+            except Exception as tool_error:
+                # If LLM doesn't support tools or bind_tools fails, log and continue to fallback
+                logger.debug(f"Tool calling not supported or failed: {str(tool_error)}")
 
         # Fallback: if LLM didn't call search tool or tool calling failed, call it directly
         if not results:
             logger.debug(f"Using direct search implementation for query: {query}")
-            results = search_tavily_impl(query=query)
+            results = search_tavily_impl(query=query, search_depth=search_depth)
 
         # Use judge_relevance to filter results
         filtered_results = []
         for result in results:
             # Ensure result is a dict with expected structure
             if isinstance(result, dict):
-                if await judge_relevance(query, result):
+                if "skip_relevance" in degradations or await judge_relevance(
+                    query, result
+                ):
                     filtered_results.append(result)
 
         logger.debug(
             f"For query {query}, keeping {len(filtered_results)} out of {len(results)} results\n"
         )
 
-        search_results.append({"question": query, "results": filtered_results})
+        return {"question": query, "results": filtered_results}
     except Exception as e:
         logger.error(f"Search Failed '{query}': {str(e)}")
-        search_results.append({"question": query, "results": [], "error": str(e)})
+        return {"question": query, "results": [], "error": str(e)}
+
+
+async def _run_on_executor(
+    executor: SearchExecutor, query: str, degradations: List[str]
+) -> Dict[str, Any]:
+    try:
+        thread_id = get_config()["configurable"].get("thread_id") or ""
+    except RuntimeError:
+        thread_id = ""
+    # Without a thread there is nothing to resume, so don't share results across runs
+    key = task_key(thread_id or str(uuid.uuid4()), query, degradations)
+    try:
+        return await executor.run(key, {"query": query, "degradations": degradations})
+    except Exception as e:
+        logger.error(f"Search task failed '{query}': {str(e)}")
+        return {"question": query, "results": [], "error": str(e)}
+
+
+async def search_web(state: Search):
+    """
+    Execute Tavily search for the query and use LLM to filter irrelevant results.
+    LLM can decide to use search tools or other tools as needed.
+    Under budget pressure, relevance judging is skipped and a basic-depth direct search is used.
+    With SEARCH_EXECUTOR set, the search runs on a task-queue worker instead of in this process.
+    """
+    query = state.get("query")
+    degradations = [
+        step for step in ("skip_relevance", "basic_search") if degrade(step)
+    ]
+
+    executor = get_search_executor()
+    if executor is None:
+        search_results = [await search_branch(query, degradations)]
+    else:
+        search_results = [await _run_on_executor(executor, query, degradations)]
 
     # Track search action with summary of what was searched
     search_summary = f"Search for: **{query}** (Found {len(search_results[0].get('results', []))} relevant results)"
@@ -148,4 +206,7 @@ async def search_web(state: Search):
             if "results" in result
             for item in result["results"]
         ],
+        # Counted here, not when planning: rejected plans never reach search_web
+        "searches_dispatched": 1,
+        "degradations": degradations,
     }
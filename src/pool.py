@@ -0,0 +1,244 @@
+"""
+Multi-process batch mode - queries spread over worker processes (deepsearch --batch --workers N)
+
+One event loop runs many queries while they wait on the providers, but state
+serialisation, JSON parsing, checkpoint writes and ranking all hold the GIL,
+so a busy batch tops out at one core. The pool starts N worker processes, each
+with its own event loop and compiled graph, running up to `concurrency`
+queries at a time. The workers share the on-disk checkpointer, store and
+embedding cache (SQLite in WAL mode, so they read concurrently and queue up
+for writes).
+
+Queries are balanced by pulling: all workers read from one task queue and a
+worker only takes the next query when it has a free slot, so a worker stuck on
+slow queries doesn't hold a backlog while others idle. Results come back on a
+result queue and are written as JSON lines as they finish, as in batch.run_batch.
+
+Workers don't drain the learning queue (config.LEARNING_WORKER is turned off
+in them): plan diffs they queue are distilled once by the supervisor after the
+batch, instead of several processes racing for the same jobs.
+"""
+
+from typing import Any, Dict, IO, List
+import asyncio
+import importlib
+import json
+import logging
+import multiprocessing
+import queue
+import time
+import uuid
+
+from src import config
+from src.batch import batch_stats, run_query
+
+logger = logging.getLogger("LangGraph_DeepSearch.pool")
+
+# Graph each worker runs unless told otherwise ("module:attribute")
+DEFAULT_GRAPH = "src.graphs.web_search_graph:graph"
+
+# How often the supervisor checks for workers that died while it waits
+_POLL_SECONDS = 0.5
+
+
+def load_graph(ref: str):
+    """
+    Import a compiled graph from "module:attribute".
+
+    The attribute may also be a zero-argument factory returning the graph
+    (e.g. a test or benchmark graph built with fake providers).
+    """
+    module_name, _, attribute = ref.partition(":")
+    target = getattr(importlib.import_module(module_name), attribute)
+    if callable(target) and not hasattr(target, "astream"):
+        target = target()
+    return target
+
+
+async def _serve_tasks(
+    index: int,
+    graph_ref: str,
+    concurrency: int,
+    batch_id: str,
+    tasks,
+    results,
+) -> int:
+    graph = load_graph(graph_ref)
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(max(1, concurrency))
+    running = set()
+    served = 0
+
+    async def run(position: int, item: Dict[str, Any], submitted: float) -> None:
+        try:
+            # Wall-clock time, since the query was queued by another process
+            result = await run_query(
+                graph, item, batch_id, queued_s=max(0.0, time.time() - submitted)
+            )
+            result["worker"] = index
+            results.put(("result", index, (position, result)))
+        finally:
+            slots.release()
+
+    while True:
+        await slots.acquire()
+        # Only take a query when one can start right away (pull-based balancing)
+        task = await loop.run_in_executor(None, tasks.get)
+        if task is None:
+            slots.release()
+            break
+        served += 1
+        running.add(asyncio.create_task(run(*task)))
+        running = {t for t in running if not t.done()}
+
+    if running:
+        await asyncio.gather(*running)
+    # Async checkpoint writes must reach the disk before the process exits
+    aflush = getattr(graph.checkpointer, "aflush", None)
+    if aflush is not None:
+        await aflush()
+    return served
+
+
+def _worker_main(
+    index: int,
+    graph_ref: str,
+    concurrency: int,
+    batch_id: str,
+    tasks,
+    results,
+) -> None:
+    """Entry point of a worker process."""
+    config.LEARNING_WORKER = False
+    try:
+        served = asyncio.run(
+            _serve_tasks(index, graph_ref, concurrency, batch_id, tasks, results)
+        )
+    except Exception as e:
+        results.put(("error", index, f"{type(e).__name__}: {e}"))
+        return
+    results.put(("done", index, served))
+
+
+class WorkerPool:
+    """
+    Runs a batch of queries across worker processes.
+
+    Args:
+        workers: Number of worker processes
+        concurrency: Queries in flight at once in each worker
+        graph_ref: "module:attribute" of the graph (or graph factory) each
+            worker imports
+    """
+
+    def __init__(
+        self, workers: int, concurrency: int = 4, graph_ref: str = DEFAULT_GRAPH
+    ):
+        self.workers = max(1, workers)
+        self.concurrency = max(1, concurrency)
+        self.graph_ref = graph_ref
+        # Fresh interpreters: forking would copy the parent's event loop, open
+        # SQLite connections and provider clients into every worker
+        self._context = multiprocessing.get_context("spawn")
+
+    async def run(self, items: List[Dict[str, Any]], out: IO[str]) -> Dict[str, Any]:
+        """
+        Run the queries and write each result as one JSON line when it finishes.
+
+        Args:
+            items: Parsed batch lines (see batch.read_queries)
+            out: Text stream receiving one JSON object per finished query
+
+        Returns:
+            Batch statistics as batch.run_batch returns them, plus "workers"
+            and "per_worker" (queries each worker finished)
+        """
+        batch_id = f"batch_{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        tasks = self._context.Queue()
+        results = self._context.Queue()
+        started = time.perf_counter()
+        for position, item in enumerate(items):
+            tasks.put((position, item, time.time()))
+        for _ in range(self.workers):
+            tasks.put(None)
+
+        processes = [
+            self._context.Process(
+                target=_worker_main,
+                args=(i, self.graph_ref, self.concurrency, batch_id, tasks, results),
+                name=f"deepsearch-worker-{i}",
+                daemon=True,
+            )
+            for i in range(self.workers)
+        ]
+        for process in processes:
+            process.start()
+
+        loop = asyncio.get_running_loop()
+        pending = dict(enumerate(items))
+        finished: set = set()
+        per_worker = {i: 0 for i in range(self.workers)}
+        errors: Dict[int, str] = {}
+        latencies, failed = [], 0
+
+        def write(result: Dict[str, Any]) -> None:
+            nonlocal failed
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+            if "error" in result:
+                failed += 1
+            else:
+                latencies.append(result["latency_s"])
+
+        try:
+            while pending and len(finished) < self.workers:
+                try:
+                    kind, index, payload = await loop.run_in_executor(
+                        None, results.get, True, _POLL_SECONDS
+                    )
+                except queue.Empty:
+                    for i, process in enumerate(processes):
+                        if i not in finished and not process.is_alive():
+                            errors.setdefault(
+                                i, f"worker exited with code {process.exitcode}"
+                            )
+                            finished.add(i)
+                    continue
+                if kind == "result":
+                    position, result = payload
+                    pending.pop(position, None)
+                    per_worker[index] += 1
+                    write(result)
+                elif kind == "error":
+                    logger.error(f"Worker {index} failed: {payload}")
+                    errors[index] = payload
+                    finished.add(index)
+                else:
+                    finished.add(index)
+
+            # Queries taken by a worker that died never come back
+            reason = "; ".join(sorted(set(errors.values()))) or "no worker finished it"
+            for item in pending.values():
+                write(
+                    {
+                        "id": item["id"],
+                        "query": item["query"],
+                        "error": f"WorkerError: {reason}",
+                    }
+                )
+        finally:
+            for process in processes:
+                process.join(timeout=10)
+                if process.is_alive():
+                    process.terminate()
+            # Sentinels of workers that died are never read
+            tasks.cancel_join_thread()
+            tasks.close()
+            results.close()
+
+        stats = batch_stats(
+            len(items), latencies, failed, time.perf_counter() - started
+        )
+        stats["workers"] = self.workers
+        stats["per_worker"] = per_worker
+        return stats
@@ -7,6 +7,8 @@ from .search_prompts import (
 
 from .learning_prompts import (
     WRITE_NOTES_PROMPT,
+    WRITE_NOTES_BATCH_PROMPT,
+    MERGE_LESSONS_PROMPT,
 )
 
 __all__ = [
@@ -15,4 +17,6 @@ __all__ = [
     "RELEVANCE_CHECK_PROMPT",
     "REVIEW_REPORT_PROMPT",
     "WRITE_NOTES_PROMPT",
+    "WRITE_NOTES_BATCH_PROMPT",
+    "MERGE_LESSONS_PROMPT",
 ]
@@ -23,3 +23,28 @@ WRITE_NOTES_PROMPT = """You are a learning analysis expert. Analyze the differen
 - lesson: A one-sentence summary of the lesson (e.g., "When plotting sine waves, label the extrema")
 - reasoning: A brief explanation of why this lesson matters
 """
+
+WRITE_NOTES_BATCH_PROMPT = """You are a learning analysis expert. Each case below is a past task where the agent drafted a plan (Plan A) and a human changed it into the final plan (Plan B). For every case, analyze the differences and distill a reusable lesson.
+
+{cases}
+
+## Analysis Requirements
+1. Identify key differences between Plan A and Plan B
+2. Analyze why the human made these modifications
+3. Distill one concise, actionable lesson per case
+4. This lesson should help the agent produce better plans for similar tasks in the future
+
+## Output Requirements
+- lessons: One entry per case, in the same order
+  - has_lesson: Set to true if the difference is meaningful and worth learning from
+  - lesson: A one-sentence summary of the lesson (e.g., "When plotting sine waves, label the extrema")
+"""
+
+MERGE_LESSONS_PROMPT = """You are maintaining a notebook of lessons an agent learned from past research tasks. Each group below contains near-duplicate lessons that will be merged into one.
+
+{groups}
+
+## Output Requirements
+For every group, in the same order, write one concise, actionable sentence that keeps everything the group's lessons agree on and any specific detail worth keeping. Do not invent new advice.
+- lessons: One merged lesson per group
+"""
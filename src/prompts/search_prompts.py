@@ -35,8 +35,8 @@ Context from web sources:
 
 ### Instructions
 1. **Comprehensive Answer:** Provide a well-structured answer based *only* on the context provided. Include specific facts, data, and details.
-2. **Attribution:** You must cite your sources. Use [number] format (e.g., [1], [2]) inline with the text where the information is used.
-3. **Reference List:** At the end of your response, list the sources in IEEE style. Ensure there are no duplicate references.
+2. **Attribution:** You must cite your sources. Use [number] format (e.g., [1], [2]) inline with the text where the information is used, where the number is the source's number in the Sources list below.
+3. **Reference List:** At the end of your response, list the cited sources in IEEE style, keeping their numbers from the Sources list. Ensure there are no duplicate references.
 4. **Limitations:** If the provided context is insufficient to answer the query, acknowledge this limitation.
 5. **Language:** **Always answer in the same language as the user's query.** (e.g., if the query is in Chinese, answer in Chinese, even if the sources are in English).
 
@@ -45,7 +45,7 @@ Context from web sources:
 - **Detailed Analysis** (with inline citations)
 - **References**
 
-Sources:
+Sources (cite each by its number):
 {sources}
 
 Reference your sources professionally in IEEE reference style for example:
@@ -0,0 +1,159 @@
+"""
+One query through the search graph, as a stream of JSON-serialisable events.
+
+The CLI renders these events whether the graph runs in its own process or in
+the `deepsearch --serve` daemon (which forwards them over a socket), and batch
+mode keeps the final result of each query. Events are dicts with an "event"
+key:
+
+- node: a node finished ("node")
+- message: an AI message a node produced ("node", "content")
+- token: a streamed LLM token, only if the request asks for tokens ("node", "content")
+- notes: past experiences were recalled ("count")
+- feedback_request: the plan awaits feedback; the runner then awaits ask_feedback()
+- feedback: the feedback the run continues with ("content", "auto")
+- result: the final state ("summary", "sources", "score", ..., "budget")
+"""
+
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+import time
+
+from langchain_core.messages import AIMessageChunk, HumanMessage
+
+from src.budget import QueryBudget, budget_from_config, with_budget
+from src.tools.learning_queue import plan_changed
+
+# Feedback given on the plan when nobody is there to review it (--no-feedback)
+AUTO_APPROVAL = "The questions look good, please proceed."
+
+# Budget keys a request may set for its query
+BUDGET_KEYS = ("deadline_s", "max_llm_calls", "max_tokens")
+
+Event = Dict[str, Any]
+
+
+def thread_config(request: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Graph config of a query request.
+
+    Args:
+        request: "thread_id", and optionally "tenant", "project" and budget keys
+            (without budget keys the QUERY_* defaults apply)
+    """
+    thread: Dict[str, Any] = {"configurable": {"thread_id": request["thread_id"]}}
+    # Lessons are recalled from and saved to the tenant's own namespace
+    if request.get("tenant"):
+        thread["configurable"]["tenant_id"] = request["tenant"]
+    if request.get("project"):
+        thread["configurable"]["project_id"] = request["project"]
+    if any(request.get(key) for key in BUDGET_KEYS):
+        budget = QueryBudget.from_dict(request)
+    else:
+        budget = budget_from_config()
+    if budget is not None:
+        thread = with_budget(thread, budget)
+    return thread
+
+
+def final_result(values: Dict[str, Any]) -> Event:
+    """The JSON-serialisable part of a finished query's state."""
+    summary = values.get("summary")
+    return {
+        "event": "result",
+        "summary": getattr(summary, "content", summary) or "",
+        "sources": [
+            {"title": s.get("title", ""), "url": s.get("url", "")}
+            for s in values.get("sources", [])
+        ],
+        "score": values.get("score"),
+        "strengths": values.get("strengths"),
+        "weaknesses": values.get("weaknesses"),
+        "degradations": values.get("degradations", []),
+        "recalled_notes": len(values.get("recalled_notes") or []),
+        "learning_queued": bool(
+            values.get("plan_a")
+            and values.get("plan_b")
+            and plan_changed(values["plan_a"], values["plan_b"])
+        ),
+    }
+
+
+async def _stream(graph, value, thread, tokens: bool) -> AsyncIterator[Event]:
+    modes = ["updates", "messages"] if tokens else ["updates"]
+    async for mode, chunk in graph.astream(value, thread, stream_mode=modes):
+        if mode == "messages":
+            message, metadata = chunk
+            if isinstance(message, AIMessageChunk) and isinstance(message.content, str):
+                if message.content:
+                    yield {
+                        "event": "token",
+                        "node": metadata.get("langgraph_node", ""),
+                        "content": message.content,
+                    }
+            continue
+        # chunk is a dict with node_name as key and state updates as value
+        for node_name, node_update in chunk.items():
+            if node_name == "__interrupt__":
+                continue  # reported as feedback_request once the stream ends
+            yield {"event": "node", "node": node_name}
+            if not isinstance(node_update, dict):
+                continue
+            for msg in node_update.get("messages") or []:
+                if getattr(msg, "type", None) == "ai" and msg.content:
+                    yield {
+                        "event": "message",
+                        "node": node_name,
+                        "content": msg.content,
+                    }
+            if node_update.get("recalled_notes"):
+                yield {"event": "notes", "count": len(node_update["recalled_notes"])}
+
+
+async def query_events(
+    graph,
+    request: Dict[str, Any],
+    ask_feedback: Optional[Callable[[], Awaitable[str]]] = None,
+) -> AsyncIterator[Event]:
+    """
+    Run a query (or continue a thread) to completion, yielding its events.
+
+    Args:
+        graph: Compiled search graph
+        request: "thread_id" plus optional "query" (omit to continue the
+            thread), "no_feedback", "tokens", "tenant", "project" and budget keys
+        ask_feedback: Returns the user's feedback on the plan ("" approves it);
+            without it, or with "no_feedback", plans are approved automatically
+    """
+    thread = thread_config(request)
+    budget = thread["configurable"].get("budget")
+    tokens = bool(request.get("tokens"))
+    auto = request.get("no_feedback") or ask_feedback is None
+
+    initial_state = {"query": request["query"]} if request.get("query") else None
+    async for event in _stream(graph, initial_state, thread, tokens):
+        yield event
+
+    state = await graph.aget_state(thread)
+    while state.next and "human_feedback" in state.next:
+        if auto:
+            feedback = AUTO_APPROVAL
+        else:
+            yield {"event": "feedback_request"}
+            waiting_since = time.monotonic()
+            feedback = (await ask_feedback()).strip() or AUTO_APPROVAL
+            if budget is not None:
+                # Time spent waiting for the human doesn't count against the deadline
+                budget.exclude(time.monotonic() - waiting_since)
+        yield {"event": "feedback", "content": feedback, "auto": bool(auto)}
+
+        await graph.aupdate_state(
+            thread, {"messages": [HumanMessage(content=feedback)]}
+        )
+        # Resume from the interrupt (pass None to continue)
+        async for event in _stream(graph, None, thread, tokens):
+            yield event
+        state = await graph.aget_state(thread)
+
+    result = final_result(state.values)
+    result["budget"] = budget.report() if budget is not None else None
+    yield result
@@ -0,0 +1,304 @@
+"""
+Long-running query daemon (deepsearch --serve).
+
+A CLI invocation pays for interpreter startup, imports, TLS handshakes to the
+providers and cold caches. The daemon pays for them once: it keeps the
+compiled graph, the model and search clients (and their connection pools),
+the embedding cache, the store and the checkpointer's thread cache warm, and
+runs every query it is sent on one event loop.
+
+Unix socket protocol (newline-delimited JSON): the client sends one request,
+{"op": "query", ...} (see runner.query_events), and receives the query's
+events, one per line, starting with {"event": "start", "thread_id": ...}.
+After a feedback_request event the client replies with {"feedback": "..."}.
+{"op": "status"} returns the daemon's status and {"op": "shutdown"} stops it.
+
+Optional HTTP on 127.0.0.1: POST /query with the request as JSON body streams
+the events as NDJSON (there is no way to send feedback, so plans are
+approved automatically), and GET /status returns the status. Any local user
+can reach a loopback port, so every HTTP request must carry
+"Authorization: Bearer <token>", with the token the daemon writes to an
+owner-only file next to the socket (token_path) each time it starts.
+"""
+
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
+import hmac
+import json
+import logging
+import os
+import secrets
+import signal
+import time
+import uuid
+
+from src import config
+from src.client import server_available
+from src.runner import query_events
+
+logger = logging.getLogger("LangGraph_DeepSearch.server")
+
+# Longest request line and HTTP body accepted
+_LINE_LIMIT = 2**20
+
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def new_thread_id() -> str:
+    return f"search_{datetime.now():%Y%m%d_%H%M%S}_{str(uuid.uuid4())[:8]}"
+
+
+class QueryServer:
+    """
+    Serves queries against one compiled graph over a Unix socket and HTTP.
+
+    Args:
+        graph: Compiled search graph shared by all queries
+        socket_path: Unix socket to listen on (created with owner-only access)
+        http_port: Port for HTTP on 127.0.0.1 (0 = no HTTP)
+        checkpointer: Reported in status (thread cache stats)
+    """
+
+    def __init__(self, graph, socket_path: str, http_port: int = 0, checkpointer=None):
+        self.graph = graph
+        self.socket_path = socket_path
+        self.http_port = http_port
+        # Bearer token for HTTP requests, new for every daemon
+        self.token = secrets.token_urlsafe(32)
+        self.token_path = str(Path(socket_path).with_suffix(".token"))
+        self.checkpointer = checkpointer
+        self.started_at = time.monotonic()
+        self.queries = 0
+        self.active = 0
+        self._servers = []
+        self._stopped = asyncio.Event()
+
+    def status(self) -> Dict[str, Any]:
+        cache = getattr(self.checkpointer, "cache", None)
+        return {
+            "event": "status",
+            "pid": os.getpid(),
+            "uptime_s": round(time.monotonic() - self.started_at, 1),
+            "queries": self.queries,
+            "active": self.active,
+            "socket": self.socket_path,
+            "http_port": self.http_port,
+            "thread_cache": cache.stats() if cache is not None else None,
+        }
+
+    async def start(self) -> None:
+        """Start listening; fails if another daemon serves the socket."""
+        path = Path(self.socket_path)
+        if path.exists():
+            if server_available(self.socket_path):
+                raise RuntimeError(f"A server is already running on {path}")
+            path.unlink()  # left over from a daemon that didn't shut down cleanly
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._servers.append(
+            await asyncio.start_unix_server(
+                self._handle_socket, str(path), limit=_LINE_LIMIT
+            )
+        )
+        os.chmod(path, 0o600)
+        if self.http_port:
+            self._write_token()
+            self._servers.append(
+                await asyncio.start_server(
+                    self._handle_http, "127.0.0.1", self.http_port, limit=_LINE_LIMIT
+                )
+            )
+        logger.info(
+            f"Serving on {path}" + (f" and :{self.http_port}" if self.http_port else "")
+        )
+
+    def _write_token(self) -> None:
+        """Write the HTTP token to token_path, readable by the owner only."""
+        Path(self.token_path).unlink(missing_ok=True)
+        fd = os.open(self.token_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(self.token + "\n")
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    async def serve_forever(self) -> None:
+        """Serve until stop() is called, then close the listeners."""
+        try:
+            await self._stopped.wait()
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        self._servers = []
+        Path(self.socket_path).unlink(missing_ok=True)
+        if self.http_port:
+            Path(self.token_path).unlink(missing_ok=True)
+
+    async def _run_query(
+        self,
+        request: Dict[str, Any],
+        send: Send,
+        ask_feedback: Optional[Callable[[], Awaitable[str]]],
+    ) -> None:
+        request.setdefault("thread_id", new_thread_id())
+        self.queries += 1
+        self.active += 1
+        try:
+            await send({"event": "start", "thread_id": request["thread_id"]})
+            async for event in query_events(self.graph, request, ask_feedback):
+                await send(event)
+        except ConnectionError:
+            # The run stops here; its progress is checkpointed for --continue
+            logger.info(f"Client of thread {request['thread_id']} disconnected")
+        except Exception as e:
+            logger.exception(f"Query on thread {request['thread_id']} failed")
+            try:
+                await send({"event": "error", "error": f"{type(e).__name__}: {e}"})
+            except ConnectionError:
+                pass
+        finally:
+            self.active -= 1
+
+    async def _handle_socket(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        async def send(event: Dict[str, Any]) -> None:
+            writer.write((json.dumps(event, ensure_ascii=False) + "\n").encode())
+            await writer.drain()
+
+        async def ask_feedback() -> str:
+            line = await reader.readline()
+            if not line:
+                raise ConnectionError("client disconnected while asked for feedback")
+            return json.loads(line).get("feedback", "")
+
+        try:
+            line = await reader.readline()
+            if not line:
+                return
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError as e:
+                await send({"event": "error", "error": f"Invalid request: {e}"})
+                return
+            op = request.pop("op", "query")
+            if op == "status":
+                await send(self.status())
+            elif op == "shutdown":
+                await send({"event": "stopping"})
+                self.stop()
+            elif op == "query":
+                await self._run_query(request, send, ask_feedback)
+            else:
+                await send({"event": "error", "error": f"Unknown op: {op}"})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_http(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        def respond(status: str, content_type: str) -> None:
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                "Connection: close\r\n\r\n".encode()
+            )
+
+        async def send(event: Dict[str, Any]) -> None:
+            writer.write((json.dumps(event, ensure_ascii=False) + "\n").encode())
+            await writer.drain()
+
+        try:
+            method, target, _ = (await reader.readline()).decode().split(" ", 2)
+            length = 0
+            authorization = ""
+            while (header := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = header.decode().partition(":")
+                name = name.strip().lower()
+                if name == "content-length":
+                    length = int(value)
+                elif name == "authorization":
+                    authorization = value.strip()
+            body = await reader.readexactly(length) if length else b""
+
+            scheme, _, token = authorization.partition(" ")
+            if scheme.lower() != "bearer" or not hmac.compare_digest(
+                token.strip().encode(), self.token.encode()
+            ):
+                respond("401 Unauthorized", "application/json")
+                await send(
+                    {
+                        "event": "error",
+                        "error": f"Send 'Authorization: Bearer <token>' ({self.token_path})",
+                    }
+                )
+                return
+
+            if method == "GET" and target == "/status":
+                respond("200 OK", "application/json")
+                await send(self.status())
+            elif method == "POST" and target == "/query":
+                request = json.loads(body or b"{}")
+                if not isinstance(request, dict) or not request.get("query"):
+                    respond("400 Bad Request", "application/json")
+                    await send({"event": "error", "error": 'Expected {"query": ...}'})
+                    return
+                respond("200 OK", "application/x-ndjson")
+                await self._run_query({**request, "no_feedback": True}, send, None)
+            else:
+                respond("404 Not Found", "application/json")
+                await send({"event": "error", "error": f"No route {method} {target}"})
+        except (ValueError, asyncio.IncompleteReadError):
+            respond("400 Bad Request", "application/json")
+            await send({"event": "error", "error": "Malformed request"})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def warm_up() -> None:
+    """Build the model and search clients now rather than on the first query."""
+    from src.llm import question_llm, report_llm
+    from src.tools.search_tool import client
+
+    for lazy in (question_llm, report_llm, client):
+        if lazy is not None:
+            lazy.build()
+
+
+async def serve(
+    socket_path: str = config.SERVER_SOCKET, http_port: int = config.SERVER_HTTP_PORT
+) -> None:
+    """Run the daemon until SIGINT/SIGTERM or a shutdown request."""
+    from src.graphs.web_search_graph import checkpointer, graph, store
+    from src.tools.learning_queue import schedule_learning, wait_for_learning
+
+    warm_up()
+    schedule_learning(store)
+    server = QueryServer(graph, socket_path, http_port, checkpointer=checkpointer)
+    await server.start()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, server.stop)
+    print(
+        f"🛰️  deepsearch server ready on {socket_path}"
+        + (
+            f" and http://127.0.0.1:{http_port} (token in {server.token_path})"
+            if http_port
+            else ""
+        )
+        + " (Ctrl+C to stop)"
+    )
+    try:
+        await server.serve_forever()
+    finally:
+        await checkpointer.aflush()
+        await wait_for_learning(timeout=config.LEARNING_EXIT_WAIT_SECONDS)
+        print("🛰️  deepsearch server stopped")
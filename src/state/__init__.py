@@ -7,6 +7,7 @@ from .states import (
     LearningState,
     RecallState,
 )
+from .compaction import SUMMARY_NAME, add_and_compact_messages, compact_messages
 
 __all__ = [
     "Plan",
@@ -16,4 +17,7 @@ __all__ = [
     "Review",
     "LearningState",
     "RecallState",
+    "SUMMARY_NAME",
+    "add_and_compact_messages",
+    "compact_messages",
 ]
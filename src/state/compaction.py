@@ -0,0 +1,116 @@
+"""
+Message-history compaction.
+
+Every node appends AIMessages (the plan listing, one per search branch, each
+summary, review feedback), so without trimming a thread's history grows with
+every plan and review round. The `messages` reducer of WebSearchState compacts
+after each update:
+
+- human messages, the newest summary and the last few messages stay verbatim
+- older progress messages and superseded summaries collapse into one digest
+  message with a single short line each, of which only the newest are kept
+
+The newest summary is the same message object as the `summary` field, so the
+checkpointer stores its text once.
+"""
+
+from typing import List
+import re
+
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage
+from langgraph.graph.message import Messages, add_messages
+
+from src import config
+
+# Name of the messages holding an answer (summaries and direct answers)
+SUMMARY_NAME = "summary"
+
+# Id and name of the digest message replacing compacted ones
+DIGEST_ID = "history-digest"
+DIGEST_NAME = "history"
+_DIGEST_HEADER = "Earlier progress (compacted):"
+
+# Characters of a compacted message kept in its digest line
+_DIGEST_LINE_CHARS = 160
+
+_MARKDOWN = re.compile(r"[*_`#>]+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _digest_line(message: AnyMessage) -> str:
+    content = message.content
+    if not isinstance(content, str):
+        content = " ".join(
+            block.get("text", "") if isinstance(block, dict) else str(block)
+            for block in content
+        )
+    text = _WHITESPACE.sub(" ", _MARKDOWN.sub("", content)).strip()
+    if len(text) > _DIGEST_LINE_CHARS:
+        text = text[: _DIGEST_LINE_CHARS - 1].rstrip() + "…"
+    return f"- [{message.name or message.type}] {text}"
+
+
+def compact_messages(
+    messages: List[AnyMessage], keep_recent: int, max_digest_lines: int
+) -> List[AnyMessage]:
+    """
+    Collapse old progress messages into a single digest message.
+
+    Args:
+        messages: Message history, oldest first
+        keep_recent: Messages at the end kept verbatim (0 = no compaction)
+        max_digest_lines: Lines kept in the digest, newest first
+
+    Returns:
+        The compacted history; the input list if nothing was compacted
+    """
+    if keep_recent <= 0 or len(messages) <= keep_recent:
+        return messages
+
+    latest_summary = next(
+        (m.id for m in reversed(messages) if m.name == SUMMARY_NAME), None
+    )
+    recent_start = len(messages) - keep_recent
+    kept: List[AnyMessage] = []
+    lines: List[str] = []
+    digest_at = None
+    compacted = 0
+    for i, message in enumerate(messages):
+        if message.id == DIGEST_ID:
+            lines.extend(message.content.split("\n")[1:])
+        elif (
+            i >= recent_start
+            or isinstance(message, HumanMessage)
+            or message.id == latest_summary
+        ):
+            kept.append(message)
+            continue
+        else:
+            lines.append(_digest_line(message))
+            compacted += 1
+        if digest_at is None:
+            digest_at = len(kept)
+
+    if not compacted:
+        return messages
+    digest = AIMessage(
+        id=DIGEST_ID,
+        name=DIGEST_NAME,
+        content="\n".join(
+            [
+                _DIGEST_HEADER,
+                *(lines[-max_digest_lines:] if max_digest_lines > 0 else []),
+            ]
+        ),
+    )
+    kept.insert(digest_at, digest)
+    return kept
+
+
+def add_and_compact_messages(left: Messages, right: Messages) -> List[AnyMessage]:
+    """add_messages followed by compaction with the MESSAGE_* settings."""
+    return compact_messages(
+        add_messages(left, right),
+        config.MESSAGE_KEEP_RECENT,
+        config.MESSAGE_DIGEST_LINES,
+    )
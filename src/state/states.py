@@ -1,7 +1,25 @@
 from typing import TypedDict, List, Dict, Annotated
+from langchain_core.messages import AnyMessage
 from langgraph.graph import MessagesState
 import operator
 
+from .compaction import add_and_compact_messages
+
+
+def merge_unique(left: List[str], right: List[str]) -> List[str]:
+    """Reducer that appends new entries, keeping each value once in first-seen order."""
+    return left + [item for item in right if item not in left]
+
+
+class CompactMessagesState(MessagesState):
+    """
+    MessagesState whose old progress messages are collapsed into a digest (see
+    compaction.py). Every state sharing a graph with WebSearchState uses it,
+    since a channel can only have one reducer.
+    """
+
+    messages: Annotated[List[AnyMessage], add_and_compact_messages]
+
 
 class Source(TypedDict):
     """Information for each source"""
@@ -22,18 +40,20 @@ class LearningState(TypedDict):
     plan_b: str  # Final plan (after human modification)
     human_feedback: str | None  # Human's feedback on the plan
     lesson_learned: str | None  # Extracted lesson from comparison
+    recalled_lesson_keys: List[str]  # Store keys of the lessons recalled for plan_a
 
 
-class RecallState(MessagesState):
+class RecallState(CompactMessagesState):
     """
     Generic state for recall functionality - can be reused across different graphs.
     """
 
     query: str  # The task/query to search memory for
     recalled_notes: List[str]  # Notes retrieved from memory store
+    recalled_lesson_keys: List[str]  # Store keys of the recalled notes
 
 
-class Search(MessagesState):
+class Search(CompactMessagesState):
     query: str  # Search query
     search_results: Annotated[
         List[Dict[str, str]], operator.add
@@ -41,9 +61,11 @@ class Search(MessagesState):
     sources: Annotated[
         List[Source], operator.add
     ]  # Source information used to generate search results
+    searches_dispatched: Annotated[int, operator.add]  # 1 per search_web branch
+    degradations: Annotated[List[str], merge_unique]  # Budget degradations applied
 
 
-class WebSearchState(MessagesState):
+class WebSearchState(CompactMessagesState):
     query: str  # User's original query
     questions: List[str]  # List of decomposed queries
     break_questions_iterations_count: (
@@ -58,16 +80,31 @@ class WebSearchState(MessagesState):
     score: int | None  # Overall score for the summary
     strengths: str | None  # Overall positive feedback
     weaknesses: str | None  # Overall negative feedback
+    review_next_step: str | None  # Next step decided by the local citation check
     summarise_iterations: int  # Number of iterations for review and feedback
 
+    # Incremental re-planning fields
+    pending_questions: List[str]  # Sub-questions that still need a search
+    searches_reused: int  # Searches skipped because results already exist
+    searches_dispatched: Annotated[
+        int, operator.add
+    ]  # Searches actually sent to search_web
+    searches_counted_plan: (
+        int  # Plan (by break_questions_iterations_count) already counted
+    )
+
+    # Per-query budget: degradation steps taken, reported in the final state
+    degradations: Annotated[List[str], merge_unique]
+
     # Closed-loop Learning System fields
     recalled_notes: List[str]  # Notes retrieved from memory store
+    recalled_lesson_keys: List[str]  # Store keys of the recalled notes
     plan_a: str  # Agent's initial plan before human feedback
     plan_b: str  # Human-modified plan (final plan used for execution)
     lesson_learned: str | None  # Distilled lesson from plan comparison
 
 
-class Plan(MessagesState):
+class Plan(CompactMessagesState):
     query: str  # User's original query
     questions: List[str]  # List of decomposed queries
     break_questions_iterations_count: (
@@ -78,6 +115,15 @@ class Plan(MessagesState):
     strengths: str | None  # Overall positive feedback
     weaknesses: str | None  # Overall negative feedback
     summarise_iterations: int  # Number of iterations for review and feedback
+    search_results: Annotated[List[Dict[str, str]], operator.add]  # Search materials
+
+    # Incremental re-planning fields
+    pending_questions: List[str]  # Sub-questions that still need a search
+    searches_reused: int  # Searches skipped because results already exist
+    searches_dispatched: Annotated[
+        int, operator.add
+    ]  # Searches actually sent to search_web
+    degradations: Annotated[List[str], merge_unique]  # Budget degradations applied
 
     # Closed-loop Learning System fields
     recalled_notes: List[str]  # Notes retrieved from memory store
@@ -85,7 +131,7 @@ class Plan(MessagesState):
     plan_b: str  # Human-modified plan (final plan used for execution)
 
 
-class Review(MessagesState):
+class Review(CompactMessagesState):
     query: str  # User's original query
     sources: Annotated[
         List[Source], operator.add
@@ -94,3 +140,6 @@ class Review(MessagesState):
     score: int | None  # Overall score for the summary
     strengths: str | None  # Overall positive feedback
     weaknesses: str | None  # Overall negative feedback
+    review_next_step: str | None  # Next step decided by the local citation check
+    plan_a: str  # Agent's initial plan before human feedback
+    plan_b: str  # Human-modified plan; a changed plan's answer isn't cached
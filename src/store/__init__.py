@@ -0,0 +1,13 @@
+"""Persistent LangGraph store implementations."""
+
+from .sqlite_store import SqliteStore
+from .lexical import lexical_search
+from .snapshot import LessonSnapshot, build_snapshot
+
+
+__all__ = [
+    "SqliteStore",
+    "lexical_search",
+    "LessonSnapshot",
+    "build_snapshot",
+]
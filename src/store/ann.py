@@ -0,0 +1,132 @@
+"""
+Inverted-file (IVF) approximate nearest-neighbour index in NumPy.
+
+Vectors are clustered with spherical k-means; a query only scores the rows in
+the few clusters whose centroids are closest to it. The index stores row
+numbers, not vectors, so it sits on top of the matrix the store already keeps
+in memory, and only the centroids plus each row's cluster id need persisting.
+"""
+
+from typing import List, Optional
+import math
+
+import numpy as np
+
+# Rows scored per chunk when assigning vectors to clusters, to bound memory
+_ASSIGN_CHUNK = 65536
+
+
+class IVFIndex:
+    """
+    Cluster-based ANN index over the rows of an external, L2-normalised matrix.
+
+    Args:
+        centroids: (nlist, dims) unit-length cluster centres
+        trained_count: Number of vectors the centroids were trained on,
+            used to decide when the index has outgrown its cluster count
+    """
+
+    def __init__(self, centroids: np.ndarray, trained_count: int = 0):
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.trained_count = trained_count
+        self.members: List[List[int]] = [[] for _ in range(self.nlist)]
+        self._arrays: List[Optional[np.ndarray]] = [None] * self.nlist
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @property
+    def dims(self) -> int:
+        return self.centroids.shape[1]
+
+    @staticmethod
+    def default_nlist(count: int) -> int:
+        """Roughly sqrt(n) clusters keeps both centroid and in-list scans small."""
+        return max(8, int(math.sqrt(count)))
+
+    @classmethod
+    def train(
+        cls,
+        matrix: np.ndarray,
+        nlist: Optional[int] = None,
+        iterations: int = 10,
+        sample_size: Optional[int] = None,
+        seed: int = 0,
+    ) -> "IVFIndex":
+        """
+        Fit centroids with spherical k-means on (a sample of) the matrix rows.
+
+        Args:
+            matrix: (n, dims) unit-length vectors
+            nlist: Number of clusters (default: default_nlist(n))
+            iterations: k-means iterations
+            sample_size: Rows used for training (default: 64 per cluster)
+            seed: RNG seed, so the same data always gives the same index
+        """
+        count = len(matrix)
+        nlist = min(nlist or cls.default_nlist(count), count)
+        rng = np.random.default_rng(seed)
+        sample_size = min(count, sample_size or 64 * nlist)
+        sample = matrix[rng.choice(count, sample_size, replace=False)]
+
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            # Re-seed empty clusters from random sample rows
+            if empty.any():
+                sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+                norms[empty] = 1.0
+            centroids = sums / norms
+
+        return cls(centroids, trained_count=count)
+
+    def assign(self, vectors: np.ndarray) -> np.ndarray:
+        """Nearest cluster id for each row of vectors."""
+        vectors = np.atleast_2d(vectors)
+        labels = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), _ASSIGN_CHUNK):
+            chunk = vectors[start : start + _ASSIGN_CHUNK]
+            labels[start : start + len(chunk)] = np.argmax(
+                chunk @ self.centroids.T, axis=1
+            )
+        return labels
+
+    def build(self, labels: np.ndarray) -> None:
+        """(Re)build the inverted lists from one cluster id per matrix row."""
+        labels = np.asarray(labels, dtype=np.int64)
+        order = np.argsort(labels, kind="stable")
+        bounds = np.searchsorted(labels[order], np.arange(self.nlist + 1))
+        self.members = [
+            order[bounds[i] : bounds[i + 1]].tolist() for i in range(self.nlist)
+        ]
+        self._arrays = [None] * self.nlist
+
+    def add(self, row: int, label: int) -> None:
+        """Register a newly appended matrix row."""
+        self.members[label].append(row)
+        self._arrays[label] = None
+
+    def candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        """Matrix rows in the nprobe clusters closest to the query."""
+        nprobe = min(max(nprobe, 1), self.nlist)
+        sims = self.centroids @ query
+        probes = np.argpartition(-sims, nprobe - 1)[:nprobe]
+        lists = []
+        for label in probes:
+            if self._arrays[label] is None:
+                self._arrays[label] = np.asarray(self.members[label], dtype=np.int64)
+            lists.append(self._arrays[label])
+        return np.concatenate(lists) if lists else np.empty(0, dtype=np.int64)
+
+    def to_bytes(self) -> bytes:
+        return self.centroids.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes, dims: int, trained_count: int) -> "IVFIndex":
+        centroids = np.frombuffer(data, dtype=np.float32).reshape(-1, dims)
+        return cls(centroids.copy(), trained_count=trained_count)
@@ -0,0 +1,113 @@
+"""
+Keyword (BM25) search over any LangGraph store.
+
+SqliteStore keeps an FTS5 index up to date on every write and answers
+lexical_search itself. Other stores (e.g. InMemoryStore in tests or under
+`langgraph dev`) are listed and scored in Python, which is fine for the small
+stores they hold.
+"""
+
+from typing import Dict, List, Sequence, Tuple
+import math
+import re
+
+from langgraph.store.base import BaseStore, SearchItem
+
+# BM25 term-frequency saturation and length normalisation
+K1 = 1.2
+B = 0.75
+
+# Items listed per page when scoring in Python
+_PAGE = 500
+
+
+def tokenize(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+def bm25_scores(query: str, documents: List[List[str]]) -> List[float]:
+    """BM25 score of every tokenized document for the query terms."""
+    terms = set(tokenize(query))
+    if not terms or not documents:
+        return [0.0] * len(documents)
+
+    avg_len = sum(len(doc) for doc in documents) / len(documents) or 1.0
+    doc_freq: Dict[str, int] = {term: 0 for term in terms}
+    counts = []
+    for doc in documents:
+        tf: Dict[str, int] = {}
+        for token in doc:
+            if token in terms:
+                tf[token] = tf.get(token, 0) + 1
+        for term in tf:
+            doc_freq[term] += 1
+        counts.append(tf)
+
+    n = len(documents)
+    idf = {t: math.log(1 + (n - df + 0.5) / (df + 0.5)) for t, df in doc_freq.items()}
+    scores = []
+    for doc, tf in zip(documents, counts):
+        norm = K1 * (1 - B + B * len(doc) / avg_len)
+        scores.append(sum(idf[t] * f * (K1 + 1) / (f + norm) for t, f in tf.items()))
+    return scores
+
+
+async def lexical_search(
+    store: BaseStore,
+    namespace_prefix: Tuple[str, ...],
+    query: str,
+    *,
+    limit: int = 10,
+    fields: Sequence[str] = (),
+) -> List[SearchItem]:
+    """
+    Best keyword matches for the query under namespace_prefix, without embeddings.
+
+    Args:
+        store: LangGraph Store instance
+        namespace_prefix: Namespace (and everything nested under it) to search
+        query: Free-text query
+        limit: Maximum number of items to return
+        fields: Value fields scored when the store has no keyword index of its
+            own (default: every string value)
+
+    Returns:
+        Matching items, best first, with the BM25 score as `score`
+    """
+    if hasattr(store, "alexical_search"):
+        return await store.alexical_search(namespace_prefix, query, limit=limit)
+
+    items: List[SearchItem] = []
+    offset = 0
+    while True:
+        page = await store.asearch(namespace_prefix, limit=_PAGE, offset=offset)
+        items.extend(page)
+        if len(page) < _PAGE:
+            break
+        offset += _PAGE
+
+    def text(value) -> str:
+        keys = fields or [k for k, v in value.items() if isinstance(v, str)]
+        return " ".join(str(value.get(k, "")) for k in keys)
+
+    scores = bm25_scores(query, [tokenize(text(item.value)) for item in items])
+    ranked = sorted(
+        (
+            (score, item)
+            for score, item in zip(scores, items)
+            if score > 0 and item.value is not None
+        ),
+        key=lambda pair: pair[0],
+        reverse=True,
+    )
+    return [
+        SearchItem(
+            item.namespace,
+            item.key,
+            item.value,
+            item.created_at,
+            item.updated_at,
+            score=score,
+        )
+        for score, item in ranked[:limit]
+    ]
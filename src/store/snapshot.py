@@ -0,0 +1,300 @@
+"""
+Memory-mapped, quantized snapshots of a SqliteStore's vector index.
+
+Loading a namespace's index from the store decodes one float32 blob per
+embedding, which takes seconds for a large lesson corpus and gives every
+worker process its own copy. A snapshot holds the same unit-length embeddings
+quantized to int8 (or float16) in a .npy file that is memory-mapped instead:
+opening it costs milliseconds and the OS shares its pages between processes.
+
+Layout of a snapshot directory:
+    vectors.npy  (rows, dims) int8 or float16 embeddings, namespaces contiguous
+    scales.npy   (rows,) float32 per-row scale of the int8 rows
+    meta.db      SQLite table of namespaces: row range, the store's vector
+                 version when built, keys and fields (stored once, with an
+                 id per row) and ANN cluster ids
+
+A namespace is served from the snapshot only while the store's vector version
+for it still matches; once lessons are added, changed or deleted the store
+falls back to loading from SQLite until the snapshot is rebuilt.
+"""
+
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+import json
+import logging
+import shutil
+import sqlite3
+import time
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: builds aren't serialised between processes
+    fcntl = None
+
+logger = logging.getLogger("LangGraph_DeepSearch.snapshot")
+
+DTYPES = ("int8", "float16")
+
+# Rows dequantized at a time when scoring a whole namespace
+_CHUNK = 65536
+
+_META_SCHEMA = """
+CREATE TABLE info (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE namespaces (
+    prefix TEXT PRIMARY KEY,
+    start INTEGER NOT NULL,
+    stop INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    keys TEXT NOT NULL,
+    key_ids BLOB NOT NULL,
+    fields TEXT NOT NULL,
+    field_ids BLOB NOT NULL,
+    list_ids BLOB
+);
+"""
+
+
+class QuantizedMatrix:
+    """
+    Read-only (rows, dims) matrix of quantized unit vectors.
+
+    Supports what the store's search does with an embedding matrix: len(),
+    .shape, scoring with `matrix @ query`, and row selection with
+    `matrix[rows]`, which returns dequantized float32 rows. np.asarray()
+    dequantizes everything, e.g. before the store writes to the matrix.
+    """
+
+    def __init__(self, data: np.ndarray, scales: Optional[np.ndarray] = None):
+        self.data = data
+        self.scales = scales
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.data.shape
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, rows) -> np.ndarray:
+        block = self.data[rows].astype(np.float32)
+        if self.scales is not None:
+            block *= self.scales[rows][..., None]
+        return block
+
+    def __matmul__(self, query: np.ndarray) -> np.ndarray:
+        scores = np.empty(len(self.data), dtype=np.float32)
+        for start in range(0, len(self.data), _CHUNK):
+            stop = start + _CHUNK
+            chunk = self.data[start:stop].astype(np.float32) @ query
+            if self.scales is not None:
+                chunk *= self.scales[start:stop]
+            scores[start:stop] = chunk
+        return scores
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        matrix = self[:]
+        return matrix if dtype is None else matrix.astype(dtype, copy=False)
+
+
+def quantize(
+    matrix: np.ndarray, dtype: str = "int8"
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Quantize unit-length rows: int8 with one symmetric scale per row, or float16.
+
+    Returns:
+        (data, scales); scales is None for float16
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"Unknown snapshot dtype '{dtype}', expected one of {DTYPES}")
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if dtype == "float16":
+        return matrix.astype(np.float16), None
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    data = np.rint(matrix / scales[:, None]).astype(np.int8)
+    return data, scales.astype(np.float32)
+
+
+class NamespaceSnapshot:
+    """One namespace's rows in a snapshot; row i embeds field_ids[i] of key_ids[i]."""
+
+    def __init__(
+        self,
+        version: int,
+        keys: List[str],
+        key_ids: np.ndarray,
+        fields: List[str],
+        field_ids: np.ndarray,
+        matrix: QuantizedMatrix,
+        labels: Optional[np.ndarray],
+    ):
+        self.version = version
+        self.keys = keys
+        self.key_ids = key_ids
+        self.fields = fields
+        self.field_ids = field_ids
+        self.matrix = matrix
+        self.labels = labels
+
+
+class LessonSnapshot:
+    """An opened snapshot directory. Namespaces are read on first use."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._data = np.load(self.path / "vectors.npy", mmap_mode="r")
+        scales_path = self.path / "scales.npy"
+        self._scales = (
+            np.load(scales_path, mmap_mode="r") if scales_path.exists() else None
+        )
+        self._meta = sqlite3.connect(
+            f"file:{self.path / 'meta.db'}?mode=ro", uri=True, check_same_thread=False
+        )
+        self.dtype = str(self._data.dtype)
+        self.versions: Dict[str, int] = dict(
+            self._meta.execute("SELECT prefix, version FROM namespaces")
+        )
+
+    @classmethod
+    def open(cls, path: Union[str, Path, None]) -> Optional["LessonSnapshot"]:
+        """The snapshot at path, or None if there is none (or it can't be read)."""
+        if not path or not (Path(path) / "meta.db").exists():
+            return None
+        try:
+            return cls(path)
+        except (OSError, ValueError, sqlite3.Error) as e:
+            logger.warning(f"Ignoring unreadable snapshot {path}: {e}")
+            return None
+
+    def load(self, prefix: str) -> Optional[NamespaceSnapshot]:
+        row = self._meta.execute(
+            "SELECT start, stop, version, keys, key_ids, fields, field_ids, list_ids "
+            "FROM namespaces WHERE prefix = ?",
+            (prefix,),
+        ).fetchone()
+        if row is None:
+            return None
+        start, stop, version, keys, key_ids, fields, field_ids, list_ids = row
+        scales = self._scales[start:stop] if self._scales is not None else None
+        return NamespaceSnapshot(
+            version,
+            json.loads(keys),
+            np.frombuffer(key_ids, dtype=np.int32),
+            json.loads(fields),
+            np.frombuffer(field_ids, dtype=np.uint16),
+            QuantizedMatrix(self._data[start:stop], scales),
+            np.frombuffer(list_ids, dtype=np.int32) if list_ids else None,
+        )
+
+    def close(self) -> None:
+        self._meta.close()
+
+
+def build_snapshot(
+    store,
+    path: Union[str, Path],
+    namespace_prefix: Tuple[str, ...] = (),
+    dtype: str = "int8",
+    wait: bool = True,
+) -> Optional[Dict[str, int]]:
+    """
+    Write a snapshot of the store's embeddings under namespace_prefix.
+    The new snapshot replaces any existing one at path; processes that still
+    have the old one mapped keep reading it until they reopen. One process
+    builds at a time (a lock file next to the snapshot).
+
+    Args:
+        store: SqliteStore to snapshot
+        path: Snapshot directory
+        namespace_prefix: Namespaces to include (default: all)
+        dtype: "int8" (4x smaller than float32) or "float16" (2x)
+        wait: Wait for another process's build to finish instead of skipping
+
+    Returns:
+        Counts of namespaces and rows written, and the size in bytes, or None
+        if another process was building and wait is False
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_name(path.name + ".lock"), "w") as lock:
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | (0 if wait else fcntl.LOCK_NB))
+            except BlockingIOError:
+                return None
+        return _write_snapshot(store, path, namespace_prefix, dtype)
+
+
+def _write_snapshot(
+    store, path: Path, namespace_prefix: Tuple[str, ...], dtype: str
+) -> Dict[str, int]:
+    started = time.perf_counter()
+    tmp = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    namespaces = store.read_vectors(namespace_prefix)
+    dims = namespaces[0][3].shape[1] if namespaces else 0
+    matrices, rows = [], []
+    offset = 0
+    for prefix, version, slots, matrix, labels in namespaces:
+        if matrix.shape[1] != dims:
+            logger.warning(f"Skipping '{prefix}': {matrix.shape[1]} dims, not {dims}")
+            continue
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrices.append(matrix / norms)
+        key_index: Dict[str, int] = {}
+        key_ids = [key_index.setdefault(key, len(key_index)) for key, _ in slots]
+        field_index: Dict[str, int] = {}
+        field_ids = [field_index.setdefault(f, len(field_index)) for _, f in slots]
+        has_labels = all(label is not None for label in labels)
+        rows.append(
+            (
+                prefix,
+                offset,
+                offset + len(slots),
+                version,
+                json.dumps(list(key_index)),
+                np.array(key_ids, dtype=np.int32).tobytes(),
+                json.dumps(list(field_index)),
+                np.array(field_ids, dtype=np.uint16).tobytes(),
+                np.asarray(labels, dtype=np.int32).tobytes() if has_labels else None,
+            )
+        )
+        offset += len(slots)
+
+    data, scales = quantize(
+        np.vstack(matrices) if matrices else np.empty((0, dims), np.float32), dtype
+    )
+    np.save(tmp / "vectors.npy", data)
+    if scales is not None:
+        np.save(tmp / "scales.npy", scales)
+    meta = sqlite3.connect(tmp / "meta.db")
+    meta.executescript(_META_SCHEMA)
+    meta.executemany(
+        "INSERT INTO info (name, value) VALUES (?, ?)",
+        [("dtype", dtype), ("dims", str(dims)), ("created", str(time.time()))],
+    )
+    meta.executemany("INSERT INTO namespaces VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    meta.commit()
+    meta.close()
+
+    old = path.with_name(path.name + ".old")
+    shutil.rmtree(old, ignore_errors=True)
+    if path.exists():
+        path.rename(old)
+    tmp.rename(path)
+    shutil.rmtree(old, ignore_errors=True)
+
+    size = sum(f.stat().st_size for f in path.iterdir())
+    logger.info(
+        f"Wrote snapshot of {offset} vectors in {len(rows)} namespaces to {path} "
+        f"({size / 1e6:.1f} MB) in {time.perf_counter() - started:.1f}s"
+    )
+    return {"namespaces": len(rows), "vectors": offset, "bytes": size}
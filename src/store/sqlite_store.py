@@ -0,0 +1,1241 @@
+"""
+SQLite-backed LangGraph store with an embedded vector index.
+
+Items live in a single SQLite file (WAL mode, so other processes can read while
+one writes). Embeddings are stored next to the items as float32 blobs and loaded
+lazily into per-namespace NumPy matrices for cosine-similarity search. Large
+namespaces get an IVF index (see ann.py) so queries only scan a few clusters.
+The same indexed fields also go into an FTS5 table for BM25 keyword search,
+which keeps working when the embedding service doesn't. A memory-mapped
+snapshot (see snapshot.py) can stand in for loading the embeddings from SQLite.
+"""
+
+from collections import defaultdict
+from collections.abc import Iterable
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+import asyncio
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+from langgraph.store.base import (
+    BaseStore,
+    GetOp,
+    IndexConfig,
+    Item,
+    ListNamespacesOp,
+    Op,
+    PutOp,
+    Result,
+    SearchItem,
+    SearchOp,
+    ensure_embeddings,
+    get_text_at_path,
+    tokenize_path,
+)
+from langgraph.store.memory import _compare_values, _does_match
+from src.store.ann import IVFIndex
+from src.store.snapshot import LessonSnapshot, QuantizedMatrix, build_snapshot
+
+logger = logging.getLogger("LangGraph_DeepSearch.sqlite_store")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    prefix TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (prefix, key)
+);
+CREATE TABLE IF NOT EXISTS vectors (
+    prefix TEXT NOT NULL,
+    key TEXT NOT NULL,
+    field TEXT NOT NULL,
+    embedding BLOB NOT NULL,
+    list_id INTEGER,
+    PRIMARY KEY (prefix, key, field)
+);
+CREATE INDEX IF NOT EXISTS items_updated ON items (prefix, updated_at);
+CREATE TABLE IF NOT EXISTS ann_index (
+    prefix TEXT PRIMARY KEY,
+    dims INTEGER NOT NULL,
+    trained_count INTEGER NOT NULL,
+    centroids BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS vector_versions (
+    prefix TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+"""
+
+# BM25 index over the indexed text fields; rowid is the item's rowid in `items`
+_LEXICAL_SCHEMA = """
+CREATE VIRTUAL TABLE lexical USING fts5(text, tokenize = 'porter unicode61')
+"""
+
+# Query terms used for keyword search
+_MAX_QUERY_TERMS = 32
+# Query terms found in more documents than this are skipped (if any rarer term
+# is left): scoring cost grows with their postings while their IDF is small
+_COMMON_TERM_DOCS = 500
+
+# (namespace, key, field) an embedding belongs to
+VectorSlot = Tuple[Tuple[str, ...], str, str]
+
+
+def _to_prefix(namespace: Tuple[str, ...]) -> str:
+    # Namespace labels can't contain "." (enforced by BaseStore), so this is reversible
+    return ".".join(namespace)
+
+
+def _to_namespace(prefix: str) -> Tuple[str, ...]:
+    return tuple(prefix.split(".")) if prefix else ()
+
+
+class _NamespaceIndex:
+    """Normalised embedding matrix for one namespace, kept in sync with the vectors table."""
+
+    def __init__(self):
+        self._slots: Optional[List[Tuple[str, str]]] = []  # (key, field) per row
+        self._rows: Optional[Dict[Tuple[str, str], int]] = {}
+        # Snapshot rows as (keys, key id per row, fields, field id per row),
+        # turned into slots only when a write needs them
+        self._snapshot_slots: Optional[Tuple] = None
+        self._matrix: Union[np.ndarray, QuantizedMatrix, None] = None
+        self._pending: List[np.ndarray] = []
+        self._row_keys: Optional[np.ndarray] = None  # key id per row
+        self._keys: List[str] = []
+        # Optional ANN index; labels holds each row's cluster id
+        self.ann: Optional[IVFIndex] = None
+        self.labels: List[int] = []
+        self._ann_stale = False
+
+    @property
+    def slots(self) -> List[Tuple[str, str]]:
+        if self._slots is None:
+            keys, key_ids, fields, field_ids = self._snapshot_slots
+            self._slots = list(
+                zip(
+                    map(keys.__getitem__, key_ids.tolist()),
+                    map(fields.__getitem__, field_ids.tolist()),
+                )
+            )
+            self._snapshot_slots = None
+        return self._slots
+
+    @slots.setter
+    def slots(self, slots: List[Tuple[str, str]]) -> None:
+        self._slots = slots
+        self._snapshot_slots = None
+        self._rows = None
+
+    @property
+    def rows(self) -> Dict[Tuple[str, str], int]:
+        if self._rows is None:
+            self._rows = {slot: i for i, slot in enumerate(self.slots)}
+        return self._rows
+
+    def __len__(self) -> int:
+        if self._slots is None:
+            return len(self._row_keys)
+        return len(self._slots)
+
+    def load(self, slots: List[Tuple[str, str]], matrix: np.ndarray) -> None:
+        """Bulk-load rows read from disk, normalising them in one pass."""
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.slots = list(slots)
+        self._matrix = matrix / norms
+        self._pending = []
+        self._row_keys = None
+
+    def load_snapshot(
+        self,
+        keys: List[str],
+        key_ids: np.ndarray,
+        fields: List[str],
+        field_ids: np.ndarray,
+        matrix: QuantizedMatrix,
+    ) -> None:
+        """Map normalised snapshot rows; per-row Python objects are built lazily."""
+        self._slots = None
+        self._rows = None
+        self._snapshot_slots = (keys, key_ids, fields, field_ids)
+        self._matrix = matrix
+        self._pending = []
+        self._row_keys = key_ids.astype(np.int64)
+        self._keys = keys
+
+    def set_ann(self, ann: IVFIndex, labels: np.ndarray) -> None:
+        self.ann = ann
+        self.labels = np.asarray(labels, dtype=np.int64).tolist()
+        ann.build(labels)
+        self._ann_stale = False
+
+    def upsert(
+        self, key: str, field: str, vector: np.ndarray, label: Optional[int] = None
+    ) -> None:
+        norm = np.linalg.norm(vector)
+        vector = vector / norm if norm else vector
+        if self.ann is not None and label is None:
+            label = int(self.ann.assign(vector)[0])
+        slot = (key, field)
+        if slot in self.rows:
+            row = self.rows[slot]
+            if isinstance(self._matrix, QuantizedMatrix):
+                # Mapped snapshot rows are read-only; copy them on first write
+                self._matrix = np.asarray(self._matrix)
+            self.matrix[row] = vector
+            if self.ann is not None:
+                self.labels[row] = label
+                self._ann_stale = True
+            return
+        self.rows[slot] = len(self.slots)
+        self.slots.append(slot)
+        self._pending.append(vector)
+        self._row_keys = None
+        if self.ann is not None:
+            self.labels.append(label)
+            self.ann.add(len(self.slots) - 1, label)
+
+    def remove_keys(self, keys: set) -> None:
+        keep = [i for i, (k, _) in enumerate(self.slots) if k not in keys]
+        if len(keep) == len(self.slots):
+            return
+        matrix = self.matrix
+        self._matrix = matrix[keep] if matrix is not None else None
+        self.slots = [self.slots[i] for i in keep]
+        self._row_keys = None
+        if self.ann is not None:
+            self.labels = [self.labels[i] for i in keep]
+            self._ann_stale = True
+
+    @property
+    def matrix(self) -> Union[np.ndarray, QuantizedMatrix, None]:
+        if self._pending:
+            pending = np.stack(self._pending).astype(np.float32, copy=False)
+            if self._matrix is not None and len(self._matrix):
+                pending = np.vstack([self._matrix, pending])
+            self._matrix = pending
+            self._pending = []
+        return self._matrix
+
+    def top_k(
+        self, query: np.ndarray, k: int, nprobe: Optional[int] = None
+    ) -> List[Tuple[float, str]]:
+        """
+        Best-scoring keys (max over their embedded fields), highest first.
+        With an ANN index and nprobe set, only rows in the nprobe nearest
+        clusters are scored; otherwise every row is.
+        """
+        matrix = self.matrix
+        if matrix is None or not len(matrix) or k <= 0:
+            return []
+        if self._row_keys is None:
+            ids: Dict[str, int] = {}
+            self._row_keys = np.array(
+                [ids.setdefault(key, len(ids)) for key, _ in self.slots],
+                dtype=np.int64,
+            )
+            self._keys = list(ids)
+
+        if self.ann is not None and nprobe:
+            if self._ann_stale:
+                self.ann.build(np.asarray(self.labels))
+                self._ann_stale = False
+            rows = self.ann.candidates(query, nprobe)
+            scores = matrix[rows] @ query
+            key_ids, inverse = np.unique(self._row_keys[rows], return_inverse=True)
+            per_key = np.full(len(key_ids), -np.inf, dtype=np.float32)
+            np.maximum.at(per_key, inverse, scores)
+        else:
+            scores = matrix @ query
+            key_ids = None
+            if len(self._keys) == len(self):
+                # One embedded field per key: key ids follow row order
+                per_key = scores
+            else:
+                per_key = np.full(len(self._keys), -np.inf, dtype=np.float32)
+                np.maximum.at(per_key, self._row_keys, scores)
+
+        k = min(k, len(per_key))
+        if k == 0:
+            return []
+        top = np.argpartition(-per_key, k - 1)[:k]
+        top = top[np.argsort(-per_key[top])]
+        if key_ids is not None:
+            return [(float(per_key[i]), self._keys[key_ids[i]]) for i in top]
+        return [(float(per_key[i]), self._keys[i]) for i in top]
+
+
+class SqliteStore(BaseStore):
+    """
+    Persistent BaseStore backed by SQLite, with optional semantic search.
+
+    Args:
+        path: SQLite database file (":memory:" for a throwaway store)
+        index: Same IndexConfig as InMemoryStore ("dims", "embed", "fields")
+        ann_min_vectors: Namespaces with at least this many embeddings are
+            searched through an IVF index instead of a full scan (0 = never)
+        ann_nprobe: Clusters scanned per ANN query; higher is slower but more exact
+        snapshot_path: Snapshot directory (see snapshot.py) to map embeddings
+            from instead of loading them from SQLite, while it is current
+
+    Notes:
+        - Each batch() call is written in a single transaction.
+        - Embedding failures don't lose data: the item is stored unindexed and
+          can still be fetched by key or listed, it just won't rank in semantic search.
+        - Writes from other processes are picked up through PRAGMA data_version.
+        - ANN centroids and each vector's cluster id are persisted, so reopening
+          a large store doesn't retrain. The index is retrained once a namespace
+          grows to 4x the size it was trained on.
+        - With an index config, the indexed fields are also kept in an FTS5
+          table in the same transaction, searchable with lexical_search (BM25)
+          without calling the embedding model.
+        - claim()/aclaim() lease an item to one worker atomically (used by the
+          learning queue).
+        - Every change to a namespace's embeddings (or their ANN clusters)
+          bumps its version in vector_versions; a snapshot is only used for
+          namespaces whose version it was built at. With
+          snapshot_rebuild_writes, an existing snapshot is rebuilt in a
+          background thread once its namespaces are that many writes behind
+          (counting every process's writes).
+    """
+
+    def __init__(
+        self,
+        path: str = ":memory:",
+        *,
+        index: Optional[IndexConfig] = None,
+        ann_min_vectors: int = 0,
+        ann_nprobe: int = 16,
+        snapshot_path: Optional[str] = None,
+        snapshot_rebuild_writes: int = 0,
+    ):
+        self.path = path
+        self.snapshot_path = snapshot_path
+        self.snapshot_rebuild_writes = snapshot_rebuild_writes
+        self._snapshot: Optional[LessonSnapshot] = None
+        self._snapshot_mtime: Optional[float] = None
+        self._rebuild: Optional[threading.Thread] = None
+        self.ann_min_vectors = ann_min_vectors
+        self.ann_nprobe = ann_nprobe
+        self._anns: Dict[str, Optional[IVFIndex]] = {}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._data_version: Optional[int] = None
+        self._indexes: Dict[str, _NamespaceIndex] = {}
+        self._prefixes: Dict[str, List[str]] = {}
+        self._lexical = False
+
+        self.index_config = dict(index) if index else None
+        self.embeddings = None
+        if self.index_config:
+            self.embeddings = ensure_embeddings(self.index_config.get("embed"))
+            self.index_config["__tokenized_fields"] = [
+                (p, tokenize_path(p)) if p != "$" else (p, p)
+                for p in (self.index_config.get("fields") or ["$"])
+            ]
+
+    # Connection management
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Open the database lazily so that importing the graph doesn't touch disk."""
+        if self._conn is None:
+            with self._lock:
+                if self._conn is None:
+                    if self.path != ":memory:":
+                        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+                    conn = sqlite3.connect(
+                        self.path, check_same_thread=False, isolation_level=None
+                    )
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute("PRAGMA synchronous=NORMAL")
+                    conn.executescript(_SCHEMA)
+                    columns = {r[1] for r in conn.execute("PRAGMA table_info(vectors)")}
+                    if "list_id" not in columns:
+                        # Stores created before the ANN index was added
+                        conn.execute("ALTER TABLE vectors ADD COLUMN list_id INTEGER")
+                    if self.index_config:
+                        self._lexical = self._init_lexical(conn)
+                    self._conn = conn
+        return self._conn
+
+    def _init_lexical(self, conn: sqlite3.Connection) -> bool:
+        """Create the FTS5 table, filling it from existing items on first use."""
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'lexical'"
+        ).fetchone()
+        if exists:
+            return True
+        try:
+            conn.execute(_LEXICAL_SCHEMA)
+        except sqlite3.OperationalError as e:
+            logger.warning(f"SQLite has no FTS5, keyword search disabled: {e}")
+            return False
+
+        rows = []
+        for rowid, value in conn.execute("SELECT rowid, value FROM items"):
+            texts = self._index_texts(json.loads(value), None)
+            if texts:
+                rows.append((rowid, "\n".join(t for t, _ in texts)))
+        if rows:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany("INSERT INTO lexical (rowid, text) VALUES (?, ?)", rows)
+            conn.execute("COMMIT")
+            logger.info(f"Built keyword index for {len(rows)} existing items")
+        return True
+
+    def close(self) -> None:
+        if self._rebuild is not None:
+            self._rebuild.join()
+            self._rebuild = None
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._indexes.clear()
+            self._prefixes.clear()
+            self._anns.clear()
+            if self._snapshot is not None:
+                self._snapshot.close()
+                self._snapshot = None
+                self._snapshot_mtime = None
+
+    def _refresh_if_changed(self) -> None:
+        """Drop cached vector indexes when another connection has written to the file."""
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if self._data_version is not None and version != self._data_version:
+            self._indexes.clear()
+            self._prefixes.clear()
+            self._anns.clear()
+        self._data_version = version
+
+    # BaseStore API
+
+    def batch(self, ops: Iterable[Op]) -> List[Result]:
+        ops = list(ops)
+        puts = self._dedupe_puts(ops)
+        to_embed = self._extract_texts(puts)
+        vectors: List[List[float]] = []
+        if to_embed:
+            try:
+                vectors = self.embeddings.embed_documents([t for t, _ in to_embed])
+            except Exception as e:
+                logger.warning(f"Embedding failed, storing items unindexed: {e}")
+
+        queries = self._search_queries(ops)
+        query_vectors = {}
+        if queries:
+            try:
+                query_vectors = dict(
+                    zip(queries, self.embeddings.embed_documents(queries))
+                )
+            except Exception as e:
+                logger.warning(f"Query embedding failed, returning unranked: {e}")
+
+        return self._run(ops, puts, to_embed, vectors, query_vectors)
+
+    async def abatch(self, ops: Iterable[Op]) -> List[Result]:
+        ops = list(ops)
+        puts = self._dedupe_puts(ops)
+        to_embed = self._extract_texts(puts)
+        vectors: List[List[float]] = []
+        if to_embed:
+            try:
+                vectors = await self.embeddings.aembed_documents(
+                    [t for t, _ in to_embed]
+                )
+            except Exception as e:
+                logger.warning(f"Embedding failed, storing items unindexed: {e}")
+
+        queries = self._search_queries(ops)
+        query_vectors = {}
+        if queries:
+            try:
+                embedded = await asyncio.gather(
+                    *(self.embeddings.aembed_query(q) for q in queries)
+                )
+                query_vectors = dict(zip(queries, embedded))
+            except Exception as e:
+                logger.warning(f"Query embedding failed, returning unranked: {e}")
+
+        return await asyncio.to_thread(
+            self._run, ops, puts, to_embed, vectors, query_vectors
+        )
+
+    # Keyword search (not part of the BaseStore API)
+
+    def lexical_search(
+        self, namespace_prefix: Tuple[str, ...], query: str, *, limit: int = 10
+    ) -> List[SearchItem]:
+        """
+        BM25 keyword search over the indexed fields of items under namespace_prefix.
+        Never calls the embedding model. Scores are positive, higher is better.
+        """
+        terms = list(dict.fromkeys(re.findall(r"\w+", query.lower())))
+        if not terms or limit <= 0:
+            return []
+        phrases = ['"' + t + '"' for t in terms[:_MAX_QUERY_TERMS]]
+        sql = (
+            "SELECT i.prefix, i.key, i.value, i.created_at, i.updated_at, "
+            "-bm25(lexical) AS score FROM lexical JOIN items i ON i.rowid = lexical.rowid "
+            "WHERE lexical MATCH ?"
+        )
+        params: List[Any] = []
+        prefix = _to_prefix(namespace_prefix)
+        if prefix:
+            sql += " AND (i.prefix = ? OR substr(i.prefix, 1, ?) = ?)"
+            params += [prefix, len(prefix) + 1, prefix + "."]
+        sql += " ORDER BY score DESC LIMIT ?"
+
+        with self._lock:
+            conn = self.conn
+            if not self._lexical:
+                return []
+            rare = [p for p in phrases if not self._is_common(conn, p)]
+            match = " OR ".join(rare or phrases)
+            rows = conn.execute(sql, [match, *params, limit]).fetchall()
+        return [self._row_to_item(row[:5], SearchItem, score=row[5]) for row in rows]
+
+    @staticmethod
+    def _is_common(conn: sqlite3.Connection, phrase: str) -> bool:
+        # Stops counting at the threshold, so a common term costs no more than a rare one
+        count = conn.execute(
+            "SELECT COUNT(*) FROM (SELECT rowid FROM lexical WHERE lexical MATCH ? LIMIT ?)",
+            (phrase, _COMMON_TERM_DOCS + 1),
+        ).fetchone()[0]
+        return count > _COMMON_TERM_DOCS
+
+    async def alexical_search(
+        self, namespace_prefix: Tuple[str, ...], query: str, *, limit: int = 10
+    ) -> List[SearchItem]:
+        return await asyncio.to_thread(
+            self.lexical_search, namespace_prefix, query, limit=limit
+        )
+
+    # Leases (not part of the BaseStore API)
+
+    def claim(
+        self, namespace: Tuple[str, ...], key: str, owner: str, lease_s: float
+    ) -> Optional[Item]:
+        """
+        Atomically lease an item to owner, for work queues shared by several
+        processes. Sets value["claimed_by"] and value["claim_until"] in one
+        UPDATE, unless another owner holds a lease that hasn't run out.
+
+        Returns:
+            The claimed item, or None if it is gone or leased to someone else
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self.conn.execute(
+                "UPDATE items SET value = json_set(value, '$.claimed_by', ?, "
+                "'$.claim_until', ?), updated_at = ? WHERE prefix = ? AND key = ? "
+                "AND (coalesce(json_extract(value, '$.claim_until'), 0) < ? "
+                "OR json_extract(value, '$.claimed_by') = ?)",
+                (
+                    owner,
+                    now + lease_s,
+                    datetime.now(timezone.utc).isoformat(),
+                    _to_prefix(namespace),
+                    key,
+                    now,
+                    owner,
+                ),
+            )
+            if cursor.rowcount == 0:
+                return None
+            return self._get(GetOp(namespace, key))
+
+    async def aclaim(
+        self, namespace: Tuple[str, ...], key: str, owner: str, lease_s: float
+    ) -> Optional[Item]:
+        return await asyncio.to_thread(self.claim, namespace, key, owner, lease_s)
+
+    def update_fields(
+        self,
+        items: List[Tuple[Tuple[str, ...], str]],
+        set_fields: Optional[Dict[str, Any]] = None,
+        add: Optional[Dict[str, float]] = None,
+    ) -> int:
+        """
+        Change some top-level fields of existing items in one transaction,
+        leaving the rest of each value and its embeddings alone. add increments
+        numeric fields (a missing field counts as 0), so counters several
+        processes update concurrently all keep their increments.
+
+        Returns:
+            Number of items updated (missing items are skipped)
+        """
+        set_fields, add = set_fields or {}, add or {}
+        for field in (*set_fields, *add):
+            if not field.isidentifier():
+                raise ValueError(f"Not a plain field name: {field!r}")
+        if not items or not (set_fields or add):
+            return 0
+
+        assignments: List[str] = []
+        params: List[Any] = []
+        for field, value in set_fields.items():
+            assignments.append(f"'$.{field}', json(?)")
+            params.append(json.dumps(value, ensure_ascii=False))
+        for field, amount in add.items():
+            assignments.append(
+                f"'$.{field}', coalesce(json_extract(value, '$.{field}'), 0) + ?"
+            )
+            params.append(amount)
+        sql = (
+            f"UPDATE items SET value = json_set(value, {', '.join(assignments)}), "
+            "updated_at = ? WHERE prefix = ? AND key = ?"
+        )
+        now = datetime.now(timezone.utc).isoformat()
+
+        with self._lock:
+            conn = self.conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = conn.executemany(
+                    sql, [(*params, now, _to_prefix(ns), key) for ns, key in items]
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            return cursor.rowcount
+
+    async def aupdate_fields(
+        self,
+        items: List[Tuple[Tuple[str, ...], str]],
+        set_fields: Optional[Dict[str, Any]] = None,
+        add: Optional[Dict[str, float]] = None,
+    ) -> int:
+        return await asyncio.to_thread(self.update_fields, items, set_fields, add)
+
+    # Batch execution
+
+    @staticmethod
+    def _dedupe_puts(ops: List[Op]) -> Dict[Tuple[Tuple[str, ...], str], PutOp]:
+        """Keep only the last write per (namespace, key), like InMemoryStore."""
+        puts: Dict[Tuple[Tuple[str, ...], str], PutOp] = {}
+        for op in ops:
+            if isinstance(op, PutOp):
+                puts[(op.namespace, op.key)] = op
+        return puts
+
+    def _index_texts(
+        self, value: Dict[str, Any], index: Optional[List[str]]
+    ) -> List[Tuple[str, str]]:
+        """(text, field) pairs to index for a value, per the index config or PutOp.index."""
+        if index is None:
+            paths = self.index_config["__tokenized_fields"]
+        else:
+            paths = [(ix, tokenize_path(ix)) for ix in index]
+        pairs: List[Tuple[str, str]] = []
+        for path, field in paths:
+            texts = get_text_at_path(value, field)
+            if len(texts) > 1:
+                pairs.extend((text, f"{path}.{i}") for i, text in enumerate(texts))
+            elif texts:
+                pairs.append((texts[0], path))
+        return pairs
+
+    def _extract_texts(
+        self, puts: Dict[Tuple[Tuple[str, ...], str], PutOp]
+    ) -> List[Tuple[str, VectorSlot]]:
+        if not (self.index_config and self.embeddings):
+            return []
+
+        to_embed: List[Tuple[str, VectorSlot]] = []
+        for op in puts.values():
+            if op.value is None or op.index is False:
+                continue
+            for text, field in self._index_texts(op.value, op.index):
+                to_embed.append((text, (op.namespace, op.key, field)))
+        return to_embed
+
+    def _search_queries(self, ops: List[Op]) -> List[str]:
+        if not (self.index_config and self.embeddings):
+            return []
+        return sorted({op.query for op in ops if isinstance(op, SearchOp) and op.query})
+
+    def _run(
+        self,
+        ops: List[Op],
+        puts: Dict[Tuple[Tuple[str, ...], str], PutOp],
+        to_embed: List[Tuple[str, VectorSlot]],
+        vectors: List[List[float]],
+        query_vectors: Dict[str, List[float]],
+    ) -> List[Result]:
+        with self._lock:
+            self._refresh_if_changed()
+            results: List[Result] = []
+            for op in ops:
+                if isinstance(op, GetOp):
+                    results.append(self._get(op))
+                elif isinstance(op, SearchOp):
+                    results.append(self._search(op, query_vectors.get(op.query)))
+                elif isinstance(op, ListNamespacesOp):
+                    results.append(self._list_namespaces(op))
+                elif isinstance(op, PutOp):
+                    results.append(None)
+                else:
+                    raise ValueError(f"Unknown operation type: {type(op)}")
+
+            if puts:
+                self._apply_puts(puts, to_embed, vectors)
+            return results
+
+    def _apply_puts(
+        self,
+        puts: Dict[Tuple[Tuple[str, ...], str], PutOp],
+        to_embed: List[Tuple[str, VectorSlot]],
+        vectors: List[List[float]],
+    ) -> None:
+        now = datetime.now(timezone.utc).isoformat()
+        deletes = [
+            (_to_prefix(ns), key) for (ns, key), op in puts.items() if op.value is None
+        ]
+        upserts = [
+            (_to_prefix(ns), key, json.dumps(op.value), now, now)
+            for (ns, key), op in puts.items()
+            if op.value is not None
+        ]
+        # Re-indexed items drop their old vectors before the new ones are inserted
+        reindexed = [
+            (_to_prefix(ns), key)
+            for (ns, key), op in puts.items()
+            if op.value is not None and op.index is not False
+        ]
+        vector_rows = [
+            (
+                _to_prefix(ns),
+                key,
+                field,
+                np.asarray(vector, dtype=np.float32).tobytes(),
+                self._assign_cluster(_to_prefix(ns), vector),
+            )
+            for (_, (ns, key, field)), vector in zip(to_embed, vectors)
+        ]
+
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self._lexical:
+                self._delete_lexical(conn, deletes + reindexed)
+            conn.executemany("DELETE FROM items WHERE prefix = ? AND key = ?", deletes)
+            conn.executemany(
+                "DELETE FROM vectors WHERE prefix = ? AND key = ?", deletes + reindexed
+            )
+            conn.executemany(
+                "INSERT INTO items (prefix, key, value, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT (prefix, key) DO UPDATE SET "
+                "value = excluded.value, updated_at = excluded.updated_at",
+                upserts,
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO vectors (prefix, key, field, embedding, list_id) "
+                "VALUES (?, ?, ?, ?, ?)",
+                vector_rows,
+            )
+            if self._lexical:
+                self._insert_lexical(conn, puts)
+            changed = {p for p, _ in deletes + reindexed} | {
+                row[0] for row in vector_rows
+            }
+            self._bump_versions(conn, changed)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        self._prefixes.clear()
+        self._maybe_rebuild_snapshot(changed)
+
+        # Keep already-loaded vector indexes in sync with what we just wrote
+        removed: Dict[str, set] = defaultdict(set)
+        for prefix, key in deletes + reindexed:
+            removed[prefix].add(key)
+        for prefix, keys in removed.items():
+            if prefix in self._indexes:
+                self._indexes[prefix].remove_keys(keys)
+        for prefix, key, field, blob, label in vector_rows:
+            if prefix in self._indexes:
+                self._indexes[prefix].upsert(
+                    key, field, np.frombuffer(blob, dtype=np.float32), label
+                )
+
+    @staticmethod
+    def _bump_versions(conn: sqlite3.Connection, prefixes: Iterable[str]) -> None:
+        """Mark the namespaces' embeddings as changed, invalidating their snapshot."""
+        conn.executemany(
+            "INSERT INTO vector_versions (prefix, version) VALUES (?, 1) "
+            "ON CONFLICT (prefix) DO UPDATE SET version = version + 1",
+            [(prefix,) for prefix in prefixes],
+        )
+
+    @staticmethod
+    def _delete_lexical(conn: sqlite3.Connection, items: List[Tuple[str, str]]) -> None:
+        # FTS5 only deletes quickly by rowid, which mirrors the item's rowid
+        conn.executemany(
+            "DELETE FROM lexical WHERE rowid = "
+            "(SELECT rowid FROM items WHERE prefix = ? AND key = ?)",
+            items,
+        )
+
+    def _insert_lexical(
+        self, conn: sqlite3.Connection, puts: Dict[Tuple[Tuple[str, ...], str], PutOp]
+    ) -> None:
+        rows = []
+        for (ns, key), op in puts.items():
+            if op.value is None or op.index is False:
+                continue
+            texts = self._index_texts(op.value, op.index)
+            if texts:
+                rows.append(("\n".join(t for t, _ in texts), _to_prefix(ns), key))
+        conn.executemany(
+            "INSERT INTO lexical (rowid, text) "
+            "SELECT rowid, ? FROM items WHERE prefix = ? AND key = ?",
+            rows,
+        )
+
+    def _row_to_item(self, row: Tuple, cls=Item, **extra: Any) -> Item:
+        prefix, key, value, created_at, updated_at = row
+        return cls(
+            namespace=_to_namespace(prefix),
+            key=key,
+            value=json.loads(value),
+            created_at=datetime.fromisoformat(created_at),
+            updated_at=datetime.fromisoformat(updated_at),
+            **extra,
+        )
+
+    def _get(self, op: GetOp) -> Optional[Item]:
+        row = self.conn.execute(
+            "SELECT prefix, key, value, created_at, updated_at FROM items "
+            "WHERE prefix = ? AND key = ?",
+            (_to_prefix(op.namespace), op.key),
+        ).fetchone()
+        return self._row_to_item(row) if row else None
+
+    @staticmethod
+    def _prefix_clause(namespace_prefix: Tuple[str, ...]) -> Tuple[str, Tuple]:
+        """SQL condition matching a namespace and everything nested under it."""
+        if not namespace_prefix:
+            return "1", ()
+        prefix = _to_prefix(namespace_prefix)
+        # "/" sorts right after ".", so this range covers exactly "<prefix>.*"
+        return "(prefix = ? OR (prefix >= ? AND prefix < ?))", (
+            prefix,
+            prefix + ".",
+            prefix + "/",
+        )
+
+    def _matching_prefixes(
+        self, table: str, namespace_prefix: Tuple[str, ...]
+    ) -> List[str]:
+        # DISTINCT scans the whole table, so the prefix list is cached until the next write
+        if table not in self._prefixes:
+            rows = self.conn.execute(f"SELECT DISTINCT prefix FROM {table}")
+            self._prefixes[table] = sorted(r[0] for r in rows)
+        if not namespace_prefix:
+            return list(self._prefixes[table])
+        prefix = _to_prefix(namespace_prefix)
+        return [
+            p
+            for p in self._prefixes[table]
+            if p == prefix or p.startswith(prefix + ".")
+        ]
+
+    def _load_index(self, prefix: str) -> _NamespaceIndex:
+        index = self._indexes.get(prefix)
+        if index is None and self._load_snapshot(prefix):
+            index = self._indexes[prefix]
+        if index is None:
+            index = _NamespaceIndex()
+            rows = self.conn.execute(
+                "SELECT key, field, embedding, list_id FROM vectors WHERE prefix = ?",
+                (prefix,),
+            ).fetchall()
+            if rows:
+                matrix = np.frombuffer(
+                    b"".join(row[2] for row in rows), dtype=np.float32
+                ).reshape(len(rows), -1)
+                index.load([(key, field) for key, field, _, _ in rows], matrix)
+                self._attach_ann(prefix, index, [row[3] for row in rows])
+            self._indexes[prefix] = index
+        return index
+
+    # Snapshots
+
+    def _vector_version(self, prefix: str) -> int:
+        row = self.conn.execute(
+            "SELECT version FROM vector_versions WHERE prefix = ?", (prefix,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _get_snapshot(self) -> Optional[LessonSnapshot]:
+        """The snapshot at snapshot_path, reopened when it has been rebuilt."""
+        if not self.snapshot_path:
+            return None
+        try:
+            mtime = (Path(self.snapshot_path) / "meta.db").stat().st_mtime
+        except OSError:
+            mtime = None
+        if mtime != self._snapshot_mtime:
+            if self._snapshot is not None:
+                self._snapshot.close()
+            self._snapshot = LessonSnapshot.open(self.snapshot_path)
+            self._snapshot_mtime = mtime
+        return self._snapshot
+
+    def _load_snapshot(self, prefix: str) -> bool:
+        """Map a namespace's index from the snapshot if it is current."""
+        snapshot = self._get_snapshot()
+        if snapshot is None or prefix not in snapshot.versions:
+            return False
+        if snapshot.versions[prefix] != self._vector_version(prefix):
+            logger.debug(f"Snapshot of '{prefix}' is out of date, loading from SQLite")
+            return False
+        loaded = snapshot.load(prefix)
+        if loaded is None or not len(loaded.matrix):
+            return False
+        index = _NamespaceIndex()
+        index.load_snapshot(
+            loaded.keys, loaded.key_ids, loaded.fields, loaded.field_ids, loaded.matrix
+        )
+        labels = loaded.labels if loaded.labels is not None else [None] * len(index)
+        self._attach_ann(prefix, index, labels)
+        self._indexes[prefix] = index
+        return True
+
+    def _maybe_rebuild_snapshot(self, prefixes: Iterable[str]) -> None:
+        """Rebuild the snapshot in the background once it is snapshot_rebuild_writes behind."""
+        if not self.snapshot_rebuild_writes or not prefixes:
+            return
+        if self._rebuild is not None and self._rebuild.is_alive():
+            return
+        snapshot = self._get_snapshot()
+        if snapshot is None or not set(prefixes) & set(snapshot.versions):
+            return
+        versions = dict(
+            self.conn.execute("SELECT prefix, version FROM vector_versions")
+        )
+        behind = sum(versions.get(p, 0) - v for p, v in snapshot.versions.items())
+        if behind < self.snapshot_rebuild_writes:
+            return
+        logger.info(f"Snapshot is {behind} writes behind, rebuilding in the background")
+        self._rebuild = threading.Thread(
+            target=self._rebuild_snapshot,
+            args=(snapshot.dtype,),
+            name="snapshot-rebuild",
+            daemon=True,
+        )
+        self._rebuild.start()
+
+    def _rebuild_snapshot(self, dtype: str) -> None:
+        try:
+            # Skipped while another process is building one
+            build_snapshot(self, self.snapshot_path, dtype=dtype, wait=False)
+        except Exception as e:
+            logger.warning(f"Snapshot rebuild failed: {e}")
+
+    def read_vectors(
+        self, namespace_prefix: Tuple[str, ...] = ()
+    ) -> List[Tuple[str, int, List[Tuple[str, str]], np.ndarray, List[Optional[int]]]]:
+        """
+        Every namespace's embeddings under namespace_prefix, read consistently.
+
+        Returns:
+            (prefix, version, (key, field) slots, float32 matrix, cluster ids)
+            per namespace
+        """
+        clause, params = self._prefix_clause(namespace_prefix)
+        with self._lock:
+            conn = self.conn
+            conn.execute("BEGIN")
+            try:
+                versions = dict(
+                    conn.execute("SELECT prefix, version FROM vector_versions")
+                )
+                rows = conn.execute(
+                    "SELECT prefix, key, field, embedding, list_id FROM vectors "
+                    f"WHERE {clause} ORDER BY prefix",
+                    params,
+                ).fetchall()
+            finally:
+                conn.execute("COMMIT")
+
+        by_prefix: Dict[str, List[Tuple]] = defaultdict(list)
+        for row in rows:
+            by_prefix[row[0]].append(row[1:])
+        namespaces = []
+        for prefix, group in by_prefix.items():
+            matrix = np.frombuffer(
+                b"".join(row[2] for row in group), dtype=np.float32
+            ).reshape(len(group), -1)
+            namespaces.append(
+                (
+                    prefix,
+                    versions.get(prefix, 0),
+                    [(key, field) for key, field, _, _ in group],
+                    matrix,
+                    [row[3] for row in group],
+                )
+            )
+        return namespaces
+
+    # ANN index
+
+    def _get_ann(self, prefix: str) -> Optional[IVFIndex]:
+        """Persisted IVF centroids for a namespace, if it has been trained."""
+        if prefix not in self._anns:
+            row = self.conn.execute(
+                "SELECT dims, trained_count, centroids FROM ann_index WHERE prefix = ?",
+                (prefix,),
+            ).fetchone()
+            self._anns[prefix] = (
+                IVFIndex.from_bytes(row[2], row[0], row[1]) if row else None
+            )
+        return self._anns[prefix]
+
+    def _assign_cluster(self, prefix: str, vector: List[float]) -> Optional[int]:
+        if not self.ann_min_vectors:
+            return None
+        ann = self._get_ann(prefix)
+        if ann is None or len(vector) != ann.dims:
+            return None
+        return int(ann.assign(np.asarray(vector, dtype=np.float32))[0])
+
+    def _attach_ann(
+        self,
+        prefix: str,
+        index: _NamespaceIndex,
+        labels: Union[List[Optional[int]], np.ndarray],
+    ) -> None:
+        """Attach the persisted IVF index (if any) to freshly loaded rows."""
+        if not self.ann_min_vectors:
+            return
+        ann = self._get_ann(prefix)
+        if ann is None or ann.dims != index.matrix.shape[1]:
+            return
+
+        # Rows written without a cluster id (e.g. before training) are assigned now;
+        # snapshot labels come as an array and are never missing
+        missing = []
+        if not isinstance(labels, np.ndarray):
+            missing = [i for i, label in enumerate(labels) if label is None]
+        if missing:
+            assigned = ann.assign(index.matrix[missing])
+            for i, label in zip(missing, assigned.tolist()):
+                labels[i] = label
+            self._save_labels(prefix, index, missing, labels)
+        index.set_ann(ann, np.asarray(labels, dtype=np.int64))
+
+    def _train_ann(self, prefix: str, index: _NamespaceIndex) -> None:
+        started = time.perf_counter()
+        ann = IVFIndex.train(index.matrix)
+        labels = ann.assign(index.matrix)
+
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO ann_index (prefix, dims, trained_count, centroids) "
+                "VALUES (?, ?, ?, ?)",
+                (prefix, ann.dims, ann.trained_count, ann.to_bytes()),
+            )
+            self._save_labels(prefix, index, range(len(labels)), labels, commit=False)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+
+        self._anns[prefix] = ann
+        index.set_ann(ann, labels)
+        self._maybe_rebuild_snapshot([prefix])
+        logger.info(
+            f"Trained ANN index for '{prefix}': {ann.trained_count} vectors, "
+            f"{ann.nlist} clusters in {time.perf_counter() - started:.1f}s"
+        )
+
+    def _save_labels(self, prefix, index, rows, labels, commit: bool = True) -> None:
+        params = [
+            (int(labels[i]), prefix, index.slots[i][0], index.slots[i][1]) for i in rows
+        ]
+        sql = (
+            "UPDATE vectors SET list_id = ? WHERE prefix = ? AND key = ? AND field = ?"
+        )
+        if commit:
+            with self._lock:
+                conn = self.conn
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.executemany(sql, params)
+                    self._bump_versions(conn, [prefix])
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+                self._data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+                self._maybe_rebuild_snapshot([prefix])
+        else:
+            self.conn.executemany(sql, params)
+            self._bump_versions(self.conn, [prefix])
+
+    def _maybe_retrain(self, prefix: str, index: _NamespaceIndex) -> None:
+        """Train on first crossing ann_min_vectors, retrain after 4x growth."""
+        if not self.ann_min_vectors or len(index) < self.ann_min_vectors:
+            return
+        if index.ann is None or len(index) > 4 * index.ann.trained_count:
+            self._train_ann(prefix, index)
+
+    def _fetch_items(self, prefix: str, keys: List[str]) -> Dict[str, Tuple]:
+        rows = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start : start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for row in self.conn.execute(
+                "SELECT prefix, key, value, created_at, updated_at FROM items "
+                f"WHERE prefix = ? AND key IN ({placeholders})",
+                (prefix, *chunk),
+            ):
+                rows[row[1]] = row
+        return rows
+
+    def _matches_filter(self, value: Dict[str, Any], filter: Optional[Dict]) -> bool:
+        if not filter:
+            return True
+        return all(_compare_values(value.get(k), v) for k, v in filter.items())
+
+    def _search(
+        self, op: SearchOp, query_vector: Optional[List[float]]
+    ) -> List[SearchItem]:
+        if query_vector is None:
+            return self._search_unranked(op, limit=op.limit, offset=op.offset)
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        query = query / norm if norm else query
+
+        indexes = [
+            (prefix, self._load_index(prefix))
+            for prefix in self._matching_prefixes("vectors", op.namespace_prefix)
+        ]
+        for prefix, index in indexes:
+            self._maybe_retrain(prefix, index)
+        total = sum(len(index) for _, index in indexes)
+
+        wanted = op.offset + op.limit
+        # Widen the candidate pool until enough items pass the filter;
+        # only the first round uses the ANN index, later rounds scan exactly
+        k = max(wanted * 2, 32)
+        nprobe = self.ann_nprobe if any(i.ann for _, i in indexes) else None
+        while True:
+            candidates = [
+                (score, prefix, key)
+                for prefix, index in indexes
+                for score, key in index.top_k(query, k, nprobe)
+            ]
+            candidates.sort(key=lambda c: c[0], reverse=True)
+            found = self._load_candidates(candidates, op.filter)
+            if len(found) >= wanted or (k >= total and not nprobe):
+                break
+            k *= 4
+            nprobe = None
+
+        results = found[op.offset : wanted]
+        if len(results) < op.limit:
+            # Items without embeddings still show up after the scored ones
+            results.extend(
+                self._search_unranked(
+                    op,
+                    limit=op.limit - len(results),
+                    offset=max(op.offset - len(found), 0),
+                    unindexed_only=True,
+                )
+            )
+        return results
+
+    def _load_candidates(
+        self, candidates: List[Tuple[float, str, str]], filter: Optional[Dict]
+    ) -> List[SearchItem]:
+        by_prefix: Dict[str, List[str]] = defaultdict(list)
+        for _, prefix, key in candidates:
+            by_prefix[prefix].append(key)
+        rows = {
+            (prefix, key): row
+            for prefix, keys in by_prefix.items()
+            for key, row in self._fetch_items(prefix, keys).items()
+        }
+
+        found: List[SearchItem] = []
+        for score, prefix, key in candidates:
+            row = rows.get((prefix, key))
+            if row is None:
+                continue
+            item = self._row_to_item(row, SearchItem, score=score)
+            if self._matches_filter(item.value, filter):
+                found.append(item)
+        return found
+
+    def _search_unranked(
+        self,
+        op: SearchOp,
+        limit: int,
+        offset: int,
+        unindexed_only: bool = False,
+    ) -> List[SearchItem]:
+        clause, params = self._prefix_clause(op.namespace_prefix)
+        sql = (
+            "SELECT prefix, key, value, created_at, updated_at FROM items "
+            f"WHERE {clause}"
+        )
+        if unindexed_only:
+            sql += (
+                " AND NOT EXISTS (SELECT 1 FROM vectors v "
+                "WHERE v.prefix = items.prefix AND v.key = items.key)"
+            )
+        sql += " ORDER BY updated_at DESC"
+        if not op.filter:
+            # Without a filter SQLite can page for us
+            sql += " LIMIT ? OFFSET ?"
+            params = (*params, limit, offset)
+            offset = 0
+
+        results: List[SearchItem] = []
+        skipped = 0
+        for row in self.conn.execute(sql, params):
+            item = self._row_to_item(row, SearchItem)
+            if not self._matches_filter(item.value, op.filter):
+                continue
+            if skipped < offset:
+                skipped += 1
+                continue
+            results.append(item)
+            if len(results) >= limit:
+                break
+        return results
+
+    def _list_namespaces(self, op: ListNamespacesOp) -> List[Tuple[str, ...]]:
+        namespaces = [_to_namespace(p) for p in self._matching_prefixes("items", ())]
+        if op.match_conditions:
+            namespaces = [
+                ns
+                for ns in namespaces
+                if all(_does_match(cond, ns) for cond in op.match_conditions)
+            ]
+        if op.max_depth is not None:
+            namespaces = sorted({ns[: op.max_depth] for ns in namespaces})
+        else:
+            namespaces = sorted(namespaces)
+        return namespaces[op.offset : op.offset + op.limit]
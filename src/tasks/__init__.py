@@ -0,0 +1,13 @@
+"""Search branches on a pluggable task queue, and the workers that run them."""
+
+from .executor import SearchExecutor, create_executor, get_search_executor, task_key
+from .sqlite_queue import SqliteTaskQueue
+
+
+__all__ = [
+    "SearchExecutor",
+    "create_executor",
+    "get_search_executor",
+    "task_key",
+    "SqliteTaskQueue",
+]
@@ -0,0 +1,54 @@
+"""
+Pluggable executors for search branches.
+
+map_search fans a query out into one search_web branch per sub-question. By
+default search_web runs its branch in the graph's own process; with an
+executor configured it hands the branch to a task queue instead and waits for
+the result, so the branches of one query can run on many worker processes or
+machines. search_web still decides the budget degradations and merges the
+result into search_results/sources, so the graph state is the same either way.
+"""
+
+from functools import cache
+from typing import Any, Dict, List, Optional, Protocol
+import hashlib
+import json
+
+from src import config
+
+
+class SearchExecutor(Protocol):
+    """Runs a search branch somewhere and returns its search_results entry."""
+
+    async def run(self, key: str, payload: Dict[str, Any]) -> Dict[str, Any]: ...
+
+
+def task_key(thread_id: str, query: str, degradations: List[str]) -> str:
+    """
+    Idempotent key of a search branch: the same sub-question, searched the
+    same way in the same thread, is the same task.
+    """
+    data = json.dumps([thread_id, query, sorted(degradations)], ensure_ascii=False)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def create_executor(name: str) -> Optional[SearchExecutor]:
+    """Build an executor by name ("inline" = None, or "sqlite")."""
+    if name == "inline":
+        return None
+    if name == "sqlite":
+        from .sqlite_queue import SqliteTaskQueue
+
+        return SqliteTaskQueue(
+            config.SEARCH_TASK_DB,
+            lease_s=config.SEARCH_TASK_LEASE_SECONDS,
+            max_attempts=config.SEARCH_TASK_MAX_ATTEMPTS,
+            timeout_s=config.SEARCH_TASK_TIMEOUT_SECONDS,
+        )
+    raise ValueError(f"Unknown search executor: {name}")
+
+
+@cache
+def get_search_executor() -> Optional[SearchExecutor]:
+    """The process-wide executor configured by SEARCH_EXECUTOR (None = inline)."""
+    return create_executor(config.SEARCH_EXECUTOR)
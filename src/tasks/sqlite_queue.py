@@ -0,0 +1,259 @@
+"""
+Durable search-branch task queue in a SQLite file.
+
+Tasks are rows keyed by an idempotent task key (see executor.task_key).
+Submitting a key that is already queued, running or done adds nothing, so a
+branch that runs again after a crash or a resumed thread gets the first
+result instead of searching twice. Results without any search results (or
+with an error) are not reused: re-searching such a question searches again.
+Workers claim a task with a lease; a task
+still unfinished when its lease runs out (a straggler, or a worker that died)
+is handed to the next worker that asks, and the first result written wins.
+A task is given up after max_attempts claims.
+
+Any process that can open the file can submit or work: several worker
+processes on one machine, or machines sharing the file.
+"""
+
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    key TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, created_at);
+"""
+
+
+class SqliteTaskQueue:
+    """
+    Search-branch executor backed by a task table in SQLite.
+
+    The graph side calls run(), which queues the task and waits for a worker
+    to finish it; workers (see worker.run_worker) call claim(), then
+    complete() or fail().
+
+    Args:
+        path: SQLite file shared by the graph processes and the workers
+        lease_s: How long a claimed task belongs to its worker before it is
+            handed to another one
+        max_attempts: Claims per task before it is marked failed
+        timeout_s: How long run() waits for a result
+        poll_s: How often run() checks for the result
+    """
+
+    def __init__(
+        self,
+        path: str,
+        lease_s: float = 60.0,
+        max_attempts: int = 3,
+        timeout_s: float = 300.0,
+        poll_s: float = 0.2,
+    ):
+        self.path = path
+        self.lease_s = lease_s
+        self.max_attempts = max(1, max_attempts)
+        self.timeout_s = timeout_s
+        self.poll_s = poll_s
+        self._conn: Optional[sqlite3.Connection] = None
+        # Reentrant: the methods hold it while opening the connection through conn
+        self._lock = threading.RLock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            with self._lock:
+                if self._conn is None:
+                    if self.path != ":memory:":
+                        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+                    conn = sqlite3.connect(
+                        self.path,
+                        check_same_thread=False,
+                        isolation_level=None,
+                        timeout=30.0,
+                    )
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute("PRAGMA synchronous=NORMAL")
+                    conn.executescript(_SCHEMA)
+                    self._conn = conn
+        return self._conn
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # Graph side
+
+    def submit(self, key: str, payload: Dict[str, Any]) -> bool:
+        """
+        Queue a task unless the key is already queued, running or done.
+        A task that failed before, or finished without results (or with an
+        error), is queued again, so a question searched again gets a new search.
+
+        Returns:
+            True if the task was (re)queued
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self.conn.execute(
+                "INSERT INTO tasks (key, payload, status, created_at, updated_at) "
+                "VALUES (?, ?, 'pending', ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET status = 'pending', attempts = 0, "
+                "worker = NULL, lease_until = NULL, error = NULL, updated_at = ? "
+                "WHERE status = 'failed' OR (status = 'done' AND "
+                "(coalesce(json_array_length(result, '$.results'), 0) = 0 "
+                "OR json_extract(result, '$.error') IS NOT NULL))",
+                (key, json.dumps(payload, ensure_ascii=False), now, now, now),
+            )
+            return cursor.rowcount > 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """The task's status, attempts, worker, result and error, or None."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT status, attempts, worker, result, error FROM tasks WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if row is None:
+            return None
+        status, attempts, worker, result, error = row
+        return {
+            "status": status,
+            "attempts": attempts,
+            "worker": worker,
+            "result": json.loads(result) if result is not None else None,
+            "error": error,
+        }
+
+    async def run(self, key: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Queue a search branch and wait for a worker's result.
+
+        Raises:
+            RuntimeError: The task failed on every attempt
+            TimeoutError: No result within timeout_s
+        """
+        await asyncio.to_thread(self.submit, key, payload)
+        deadline = time.monotonic() + self.timeout_s
+        while True:
+            task = await asyncio.to_thread(self.get, key)
+            if task is not None and task["status"] == "done":
+                return task["result"]
+            if task is not None and task["status"] == "failed":
+                raise RuntimeError(
+                    f"Search task failed after {task['attempts']} attempts: {task['error']}"
+                )
+            if time.monotonic() >= deadline:
+                raise TimeoutError(
+                    f"No search worker finished the task in {self.timeout_s:.0f}s"
+                )
+            await asyncio.sleep(self.poll_s)
+
+    # Worker side
+
+    def claim(self, worker: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        Take the oldest queued task, or one whose lease has run out.
+
+        Returns:
+            (key, payload), or None when there is nothing to do
+        """
+        now = time.time()
+        with self._lock:
+            conn = self.conn
+            # IMMEDIATE: two workers mustn't both read the same task as free
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "UPDATE tasks SET status = 'failed', updated_at = ?, "
+                    "error = coalesce(error, 'lease expired on every attempt') "
+                    "WHERE status = 'running' AND lease_until < ? AND attempts >= ?",
+                    (now, now, self.max_attempts),
+                )
+                row = conn.execute(
+                    "SELECT key, payload FROM tasks WHERE status = 'pending' "
+                    "OR (status = 'running' AND lease_until < ?) "
+                    "ORDER BY created_at LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is not None:
+                    conn.execute(
+                        "UPDATE tasks SET status = 'running', attempts = attempts + 1, "
+                        "worker = ?, lease_until = ?, updated_at = ? WHERE key = ?",
+                        (worker, now + self.lease_s, now, row[0]),
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def complete(self, key: str, result: Dict[str, Any]) -> bool:
+        """
+        Store a task's result; the first result wins.
+
+        Returns:
+            False if another worker had already finished the task
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self.conn.execute(
+                "UPDATE tasks SET status = 'done', result = ?, error = NULL, "
+                "lease_until = NULL, updated_at = ? WHERE key = ? AND status != 'done'",
+                (json.dumps(result, ensure_ascii=False), now, key),
+            )
+            return cursor.rowcount > 0
+
+    def fail(self, key: str, worker: str, error: str) -> bool:
+        """
+        Record a failed attempt: the task is queued again until attempts run out.
+
+        Returns:
+            False if the task is no longer this worker's, e.g. its lease ran
+            out and another worker reclaimed it
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self.conn.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' "
+                "ELSE 'pending' END, error = ?, lease_until = NULL, updated_at = ? "
+                "WHERE key = ? AND status = 'running' AND worker = ?",
+                (self.max_attempts, error, now, key, worker),
+            )
+            return cursor.rowcount > 0
+
+    def prune(self, max_age_s: float) -> int:
+        """Delete finished tasks older than max_age_s; returns how many."""
+        with self._lock:
+            cursor = self.conn.execute(
+                "DELETE FROM tasks WHERE status IN ('done', 'failed') AND updated_at < ?",
+                (time.time() - max_age_s,),
+            )
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        """Task counts by status."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT status, count(*) FROM tasks GROUP BY status"
+            ).fetchall()
+        return dict(rows)
@@ -0,0 +1,169 @@
+"""
+Search workers - claim search-branch tasks from a SqliteTaskQueue and run them.
+
+`deepsearch --search-worker` runs one in the foreground; point SEARCH_TASK_DB
+at the file the graph processes use. LocalWorkers starts a few worker
+processes on this machine, e.g. for tests.
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+import asyncio
+import importlib
+import logging
+import multiprocessing
+import os
+import socket
+
+from src import config
+from src.tasks.sqlite_queue import SqliteTaskQueue
+
+logger = logging.getLogger("LangGraph_DeepSearch.search_worker")
+
+# Runs one branch: called with the task payload, returns the search_results entry
+DEFAULT_HANDLER = "src.nodes.search_nodes:search_branch"
+
+
+def load_handler(ref: str) -> Callable[..., Any]:
+    """Import a branch handler from "module:attribute"."""
+    module_name, _, attribute = ref.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+async def run_worker(
+    queue: SqliteTaskQueue,
+    concurrency: int = 4,
+    handler_ref: str = DEFAULT_HANDLER,
+    stop: Optional[asyncio.Event] = None,
+    name: str = "",
+) -> int:
+    """
+    Run search tasks until stop is set, up to `concurrency` at a time.
+
+    Args:
+        queue: Task queue shared with the graph processes
+        concurrency: Tasks in flight at once
+        handler_ref: "module:attribute" of the branch handler
+        stop: Set it to stop claiming; tasks in flight still finish
+        name: Recorded as the task's worker (default host:pid)
+
+    Returns:
+        Number of tasks this worker finished first
+    """
+    handler = load_handler(handler_ref)
+    name = name or f"{socket.gethostname()}:{os.getpid()}"
+    stop = stop or asyncio.Event()
+    slots = asyncio.Semaphore(max(1, concurrency))
+    running = set()
+    finished = 0
+
+    async def run(key: str, payload: Dict[str, Any]) -> None:
+        nonlocal finished
+        try:
+            result = await handler(**payload)
+        except Exception as e:
+            logger.warning(f"Search task {key[:12]} failed: {e}")
+            if not await asyncio.to_thread(
+                queue.fail, key, name, f"{type(e).__name__}: {e}"
+            ):
+                # Our lease ran out and another worker owns the task now
+                logger.info(f"Search task {key[:12]} was reclaimed by another worker")
+        else:
+            if await asyncio.to_thread(queue.complete, key, result):
+                finished += 1
+            else:
+                # Re-dispatched after its lease ran out, and the other worker won
+                logger.info(f"Search task {key[:12]} was already finished elsewhere")
+        finally:
+            slots.release()
+
+    if config.SEARCH_TASK_TTL_HOURS > 0:
+        await asyncio.to_thread(queue.prune, config.SEARCH_TASK_TTL_HOURS * 3600)
+    logger.info(f"Search worker {name} started ({concurrency} at a time)")
+    while not stop.is_set():
+        await slots.acquire()
+        task = await asyncio.to_thread(queue.claim, name)
+        if task is None:
+            slots.release()
+            try:
+                await asyncio.wait_for(stop.wait(), queue.poll_s)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        running.add(asyncio.create_task(run(*task)))
+        running = {t for t in running if not t.done()}
+
+    if running:
+        await asyncio.gather(*running)
+    return finished
+
+
+def _worker_process(
+    path: str,
+    lease_s: float,
+    max_attempts: int,
+    concurrency: int,
+    handler_ref: str,
+) -> None:
+    queue = SqliteTaskQueue(path, lease_s=lease_s, max_attempts=max_attempts)
+    try:
+        asyncio.run(run_worker(queue, concurrency, handler_ref))
+    except KeyboardInterrupt:
+        pass
+
+
+class LocalWorkers:
+    """
+    Search worker processes on this machine, running until stop() (or the end
+    of a with block).
+
+    Args:
+        queue: Queue whose file, lease and attempt settings the workers use
+        workers: Number of processes
+        concurrency: Tasks in flight in each process
+        handler_ref: "module:attribute" of the branch handler
+    """
+
+    def __init__(
+        self,
+        queue: SqliteTaskQueue,
+        workers: int = 2,
+        concurrency: int = 4,
+        handler_ref: str = DEFAULT_HANDLER,
+    ):
+        self.queue = queue
+        self.workers = max(1, workers)
+        self.concurrency = concurrency
+        self.handler_ref = handler_ref
+        self.processes: List[multiprocessing.Process] = []
+
+    def start(self) -> "LocalWorkers":
+        context = multiprocessing.get_context("spawn")
+        for i in range(self.workers):
+            process = context.Process(
+                target=_worker_process,
+                args=(
+                    self.queue.path,
+                    self.queue.lease_s,
+                    self.queue.max_attempts,
+                    self.concurrency,
+                    self.handler_ref,
+                ),
+                name=f"search-worker-{i}",
+                daemon=True,
+            )
+            process.start()
+            self.processes.append(process)
+        return self
+
+    def stop(self) -> None:
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join(timeout=10)
+        self.processes = []
+
+    def __enter__(self) -> "LocalWorkers":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
@@ -1,6 +1,18 @@
 """External tool integrations."""
 
-from .search_tool import search_tavily
+# Exports are imported on first access, so that the memory commands can use
+# the lightweight modules (e.g. namespaces) without importing the search tools
+_EXPORTS = {
+    "search_tavily": ".search_tool",
+}
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+
+    return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
 
 
 __all__ = [
@@ -0,0 +1,159 @@
+from langgraph.config import get_config, get_store
+from langgraph.store.base import BaseStore
+from typing import Optional, Tuple
+from datetime import datetime
+from src import config
+from src.tools.namespaces import lesson_namespace
+import hashlib
+import logging
+import time
+
+logger = logging.getLogger("LangGraph_DeepSearch.answer_cache")
+
+# Store namespace for finished deep-search answers without a tenant; a tenant's
+# answers live next to its lessons, under ("tenants", tenant, project, "answers")
+ANSWER_NAMESPACE = ("answers",)
+
+
+def current_store() -> Optional[BaseStore]:
+    """Return the store of the graph run we are executing in, if any."""
+    try:
+        return get_store()
+    except RuntimeError:
+        # Called outside of a graph run (e.g. directly from tests)
+        return None
+
+
+def answer_namespace(
+    tenant_id: Optional[str] = None, project_id: Optional[str] = None
+) -> Tuple[str, ...]:
+    """Namespace holding the cached answers of a tenant's project (the global one without a tenant)."""
+    if not tenant_id:
+        return ANSWER_NAMESPACE
+    return (*lesson_namespace(tenant_id, project_id)[:-1], "answers")
+
+
+def current_answer_namespace() -> Tuple[str, ...]:
+    """
+    Answer namespace of the graph run we are executing in, from
+    configurable["tenant_id"]/["project_id"] or the TENANT_ID/PROJECT_ID defaults.
+    """
+    try:
+        configurable = get_config().get("configurable", {})
+    except RuntimeError:
+        # Called outside of a graph run (e.g. directly from tests)
+        configurable = {}
+    return answer_namespace(
+        configurable.get("tenant_id") or config.TENANT_ID,
+        configurable.get("project_id") or config.PROJECT_ID,
+    )
+
+
+def answer_key(query: str) -> str:
+    """Stable store key for a query, insensitive to case, spacing and trailing punctuation."""
+    normalized = " ".join(query.lower().split()).rstrip("?？.。!！ ")
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def is_cacheable(query: str) -> bool:
+    """Queries about recent events ("latest", "today", ...) are always searched."""
+    # Deferred: src.nodes imports this module
+    from src.nodes.router_nodes import needs_fresh_data
+
+    return bool(query) and not needs_fresh_data(query)
+
+
+def is_reusable_run(state: dict) -> bool:
+    """
+    Whether a finished run's answer may serve the plain query again. Not when
+    human feedback changed the plan: that answer is for the amended request.
+    """
+    # Deferred: the learning queue pulls in the LLM and lesson store modules
+    from src.tools.learning_queue import plan_changed
+
+    plan_a, plan_b = state.get("plan_a", ""), state.get("plan_b", "")
+    return not (plan_a and plan_b and plan_changed(plan_a, plan_b))
+
+
+def is_expired(value: dict, now: Optional[float] = None) -> bool:
+    """Whether a cached answer is older than ANSWER_CACHE_TTL_HOURS."""
+    if config.ANSWER_CACHE_TTL_HOURS <= 0:
+        return False
+    # Entries cached before answers were timestamped count as expired
+    cached_at = value.get("cached_at", 0.0)
+    return (now or time.time()) - cached_at > config.ANSWER_CACHE_TTL_HOURS * 3600
+
+
+async def lookup_answer(
+    store: BaseStore, query: str, namespace: Optional[Tuple[str, ...]] = None
+) -> Optional[str]:
+    """
+    Look up a previously finished answer for the same query.
+    Queries about recent events always miss, and expired answers are deleted.
+
+    Args:
+        store: LangGraph Store instance
+        query: The user's query
+        namespace: Answer namespace (default: the current run's tenant/project)
+
+    Returns:
+        The cached answer text, or None if the query hasn't been answered recently
+    """
+    if store is None or not is_cacheable(query):
+        return None
+
+    namespace = namespace or current_answer_namespace()
+    key = answer_key(query)
+    try:
+        item = await store.aget(namespace, key)
+        if not item or not item.value:
+            return None
+        if is_expired(item.value):
+            logger.debug(f"Cached answer expired for query: {query[:50]}...")
+            await store.adelete(namespace, key)
+            return None
+        return item.value.get("answer") or None
+    except Exception as e:
+        logger.error(f"Error looking up cached answer: {str(e)}")
+        return None
+
+
+async def save_answer(
+    store: BaseStore,
+    query: str,
+    answer: str,
+    namespace: Optional[Tuple[str, ...]] = None,
+) -> bool:
+    """
+    Cache a finished answer so that repeated queries can skip deep search.
+    Answers to queries about recent events are not cached.
+
+    Args:
+        store: LangGraph Store instance
+        query: The user's query
+        answer: The final answer text
+        namespace: Answer namespace (default: the current run's tenant/project)
+
+    Returns:
+        True if the answer was cached, False otherwise
+    """
+    if store is None or not answer or not is_cacheable(query):
+        return False
+
+    try:
+        await store.aput(
+            namespace or current_answer_namespace(),
+            answer_key(query),
+            {
+                "query": query,
+                "answer": answer,
+                "timestamp": str(datetime.now()),
+                "cached_at": time.time(),
+            },
+            index=False,
+        )
+        logger.debug(f"Cached answer for query: {query[:50]}...")
+        return True
+    except Exception as e:
+        logger.error(f"Error caching answer: {str(e)}")
+        return False
@@ -1,44 +1,357 @@
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import tool
-from langgraph.store.base import BaseStore
-from typing import List, Optional
+from langgraph.config import get_config
+from langgraph.store.base import BaseStore, GetOp, Item, PutOp, SearchItem
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from datetime import datetime, timezone
+from src import config
+from src.embeddings.service import get_embedding_service
+from src.store.lexical import lexical_search
+from src.tools.namespaces import LESSON_NAMESPACE, lesson_namespace
+import asyncio
 import logging
 
 logger = logging.getLogger("LangGraph_DeepSearch.consult_note")
 
-# Store namespace for lessons learned
-LESSON_NAMESPACE = ("lessons",)
+# Similar lessons fetched per recalled lesson before re-ranking by usage
+_CANDIDATE_FACTOR = 4
+# Lesson fields matched by keyword recall (the same fields the store embeds)
+LESSON_TEXT_FIELDS = ("lesson", "task_query")
 
 
-async def recall_notes(store: BaseStore, query: str, limit: int = 3) -> List[str]:
+def get_lesson_namespace(run_config: Optional[RunnableConfig]) -> Tuple[str, ...]:
     """
-    Search the lesson store for relevant past experiences.
-    Used in the "Recall" phase of the closed-loop learning system.
+    Lesson namespace for a graph run, from configurable["tenant_id"] and
+    configurable["project_id"], falling back to the TENANT_ID/PROJECT_ID defaults.
+    """
+    configurable = (run_config or {}).get("configurable", {})
+    return lesson_namespace(
+        configurable.get("tenant_id") or config.TENANT_ID,
+        configurable.get("project_id") or config.PROJECT_ID,
+    )
+
+
+def current_lesson_namespace() -> Tuple[str, ...]:
+    """Return the lesson namespace of the graph run we are executing in."""
+    try:
+        return get_lesson_namespace(get_config())
+    except RuntimeError:
+        # Called outside of a graph run (e.g. from the learning worker or tests)
+        return get_lesson_namespace(None)
+
+
+def recall_namespaces(namespace: Tuple[str, ...]) -> List[Tuple[str, ...]]:
+    """Namespaces searched on recall: the tenant's own, plus the shared tier if enabled."""
+    if namespace != LESSON_NAMESPACE and config.LESSON_SHARED_TIER:
+        return [namespace, LESSON_NAMESPACE]
+    return [namespace]
+
+
+def lesson_usefulness(value: Dict[str, Any]) -> float:
+    """
+    Share of recalls whose plan was accepted without correction, with one
+    pseudo-count either way so unproven lessons start at 0.5.
+    """
+    helpful = value.get("helpful", 0)
+    corrections = value.get("corrections", 0)
+    return (helpful + 1) / (helpful + corrections + 2)
+
+
+def lesson_recency(item: Item, now: Optional[datetime] = None) -> float:
+    """Exponential decay since the lesson was last saved or recalled (1.0 = just now)."""
+    now = now or datetime.now(timezone.utc)
+    updated_at = item.updated_at
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    age_days = max(0.0, (now - updated_at).total_seconds() / 86400)
+    return 0.5 ** (age_days / max(config.LESSON_HALF_LIFE_DAYS, 1e-6))
+
+
+def rank_lessons(
+    items: Iterable[SearchItem], now: Optional[datetime] = None
+) -> List[SearchItem]:
+    """Order recalled lessons by a weighted mix of similarity, usefulness and recency."""
+
+    def combined(item: SearchItem) -> float:
+        return (
+            config.LESSON_WEIGHT_SIMILARITY * (item.score or 0.0)
+            + config.LESSON_WEIGHT_USEFULNESS * lesson_usefulness(item.value)
+            + config.LESSON_WEIGHT_RECENCY * lesson_recency(item, now)
+        )
+
+    return sorted(items, key=combined, reverse=True)
+
+
+def fuse_rankings(rankings: List[List[SearchItem]], k: int = 60) -> List[SearchItem]:
+    """
+    Reciprocal-rank fusion of several rankings of the same kind of item.
+    The fused score is scaled so that an item ranked first everywhere scores 1.0.
+    """
+    fused: Dict[Tuple[Tuple[str, ...], str], List[Any]] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            entry = fused.setdefault((item.namespace, item.key), [0.0, item])
+            entry[0] += 1.0 / (k + rank + 1)
+    best = len(rankings) / (k + 1)
+    return [
+        SearchItem(
+            item.namespace,
+            item.key,
+            item.value,
+            item.created_at,
+            item.updated_at,
+            score=score / best,
+        )
+        for score, item in sorted(fused.values(), key=lambda e: e[0], reverse=True)
+    ]
+
+
+def _by_score(results: Iterable[List[SearchItem]]) -> List[SearchItem]:
+    items = [item for items in results for item in items if item.value]
+    return sorted(items, key=lambda item: item.score, reverse=True)
+
+
+async def _vector_candidates(
+    store: BaseStore, query: str, k: int, namespaces: List[Tuple[str, ...]]
+) -> List[SearchItem]:
+    """Semantic matches, or none if the embedder doesn't answer within the timeout."""
+    timeout = config.LESSON_VECTOR_TIMEOUT_MS / 1000 or None
+    try:
+        results = await asyncio.wait_for(
+            asyncio.gather(
+                *(store.asearch(ns, query=query, limit=k) for ns in namespaces)
+            ),
+            timeout,
+        )
+    except asyncio.TimeoutError:
+        logger.warning("Vector recall timed out, using keyword matches only")
+        return []
+    # Items listed without a score mean the store couldn't embed the query
+    return _by_score(
+        [item for item in items if item.score is not None] for items in results
+    )
+
+
+async def _lexical_candidates(
+    store: BaseStore, query: str, k: int, namespaces: List[Tuple[str, ...]]
+) -> List[SearchItem]:
+    """BM25 keyword matches, scored relative to the best match (1.0)."""
+    ranked = _by_score(
+        await asyncio.gather(
+            *(
+                lexical_search(store, ns, query, limit=k, fields=LESSON_TEXT_FIELDS)
+                for ns in namespaces
+            )
+        )
+    )
+    if not ranked:
+        return []
+    best = ranked[0].score or 1.0
+    return [
+        SearchItem(
+            item.namespace,
+            item.key,
+            item.value,
+            item.created_at,
+            item.updated_at,
+            score=item.score / best,
+        )
+        for item in ranked
+    ]
+
+
+def _embeddings_available() -> bool:
+    try:
+        return get_embedding_service().available
+    except Exception as e:
+        # A backend that can't even be built (missing SDK, bad settings) is down too
+        logger.warning(f"Embedding service unavailable: {e}")
+        return False
+
+
+async def _recall_candidates(
+    store: BaseStore, query: str, k: int, namespaces: List[Tuple[str, ...]]
+) -> List[SearchItem]:
+    """
+    Candidate lessons with a 0..1 relevance score, per LESSON_RECALL_MODE:
+    "vector" (cosine), "lexical" (BM25) or "hybrid" (both, fused by
+    reciprocal rank). Hybrid falls back to keywords alone while the embedding
+    service is down or too slow.
+    """
+    mode = config.LESSON_RECALL_MODE
+    if mode == "vector":
+        return await _vector_candidates(store, query, k, namespaces)
+    if mode == "lexical" or not _embeddings_available():
+        return await _lexical_candidates(store, query, k, namespaces)
+
+    vector, lexical = await asyncio.gather(
+        _vector_candidates(store, query, k, namespaces),
+        _lexical_candidates(store, query, k, namespaces),
+    )
+    if vector and lexical:
+        return fuse_rankings([vector, lexical], k=config.LESSON_RRF_K)
+    return vector or lexical
+
+
+async def update_lessons(
+    store: BaseStore,
+    lessons: List[Item],
+    set_fields: Optional[Dict[str, Any]] = None,
+    add: Optional[Dict[str, int]] = None,
+) -> int:
+    """
+    Change only some fields of stored lessons: add increments usage counters,
+    set_fields overwrites. Stores with an atomic field update
+    (SqliteStore.aupdate_fields) do it in one transaction, so concurrent
+    recalls, outcomes and consolidation keep each other's increments; on other
+    stores the lessons' values as read are written back with the changes.
+
+    Returns:
+        Number of lessons updated
+    """
+    if not lessons:
+        return 0
+    if hasattr(store, "aupdate_fields"):
+        return await store.aupdate_fields(
+            [(item.namespace, item.key) for item in lessons], set_fields, add
+        )
+
+    # index=False keeps the existing embeddings; only these fields change
+    await store.abatch(
+        [
+            PutOp(
+                item.namespace,
+                item.key,
+                {
+                    **item.value,
+                    **(set_fields or {}),
+                    **{
+                        field: item.value.get(field, 0) + amount
+                        for field, amount in (add or {}).items()
+                    },
+                },
+                index=False,
+            )
+            for item in lessons
+        ]
+    )
+    return len(lessons)
+
+
+async def recall_lessons(
+    store: BaseStore,
+    query: str,
+    limit: int = 3,
+    namespace: Tuple[str, ...] = LESSON_NAMESPACE,
+) -> List[SearchItem]:
+    """
+    Search the lesson store and return the best lessons as store items.
+    Candidates are fetched by relevance (see _recall_candidates) from the
+    namespace and the shared tier, re-ranked together with rank_lessons, and
+    the returned lessons get their recall count and last-recalled time updated.
 
     Args:
         store: LangGraph Store instance
         query: Search query or task description
-        limit: Maximum number of notes to retrieve
+        limit: Maximum number of lessons to retrieve
+        namespace: Lesson namespace to search (see lesson_namespace)
 
     Returns:
-        List of relevant lesson strings
+        Recalled lesson items, best first
     """
     if store is None:
         logger.warning("No store provided, returning empty notes")
         return []
 
     try:
-        # Search for similar lessons using semantic search
-        results = await store.asearch(LESSON_NAMESPACE, query=query, limit=limit)
-        notes = [item.value.get("lesson", "") for item in results if item.value]
-        logger.debug(f"Recalled {len(notes)} notes for query: {query[:50]}...")
-        return notes
+        candidates = await _recall_candidates(
+            store, query, limit * _CANDIDATE_FACTOR, recall_namespaces(namespace)
+        )
+        recalled = rank_lessons(candidates)[:limit]
+        await update_lessons(
+            store,
+            recalled,
+            set_fields={"last_recalled": str(datetime.now(timezone.utc))},
+            add={"recall_count": 1},
+        )
+        logger.debug(f"Recalled {len(recalled)} notes for query: {query[:50]}...")
+        return recalled
     except Exception as e:
         logger.error(f"Error recalling notes: {str(e)}")
         return []
 
 
+async def recall_notes(
+    store: BaseStore,
+    query: str,
+    limit: int = 3,
+    namespace: Tuple[str, ...] = LESSON_NAMESPACE,
+) -> List[str]:
+    """
+    Search the lesson store for relevant past experiences.
+    Used in the "Recall" phase of the closed-loop learning system.
+
+    Args:
+        store: LangGraph Store instance
+        query: Search query or task description
+        limit: Maximum number of notes to retrieve
+        namespace: Lesson namespace to search (see lesson_namespace)
+
+    Returns:
+        List of relevant lesson strings
+    """
+    results = await recall_lessons(store, query, limit=limit, namespace=namespace)
+    return [item.value.get("lesson", "") for item in results]
+
+
+async def record_lesson_outcome(
+    store: BaseStore,
+    keys: List[str],
+    corrected: bool,
+    namespace: Tuple[str, ...] = LESSON_NAMESPACE,
+) -> int:
+    """
+    Record whether a plan made with the given recalled lessons needed correction.
+    Used in the "Learn" phase to feed lesson usefulness back into recall ranking.
+
+    Args:
+        store: LangGraph Store instance
+        keys: Keys of the lessons recalled for the plan
+        corrected: True if the human changed the plan, False if it was accepted
+        namespace: Lesson namespace the plan was made in; recalled lessons are
+            looked up there and in the shared tier
+
+    Returns:
+        Number of lessons updated (lessons merged or evicted since are skipped)
+    """
+    if store is None or not keys:
+        return 0
+
+    field = "corrections" if corrected else "helpful"
+    try:
+        items = await store.abatch(
+            [
+                GetOp(searched, key)
+                for searched in recall_namespaces(namespace)
+                for key in keys
+            ]
+        )
+        updated = await update_lessons(
+            store, [item for item in items if item is not None], add={field: 1}
+        )
+        logger.debug(f"Recorded {field} for {updated} recalled lesson(s)")
+        return updated
+    except Exception as e:
+        logger.error(f"Error recording lesson outcome: {str(e)}")
+        return 0
+
+
 async def save_lesson(
-    store: BaseStore, lesson: str, task_query: str, lesson_id: Optional[str] = None
+    store: BaseStore,
+    lesson: str,
+    task_query: str,
+    lesson_id: Optional[str] = None,
+    namespace: Tuple[str, ...] = LESSON_NAMESPACE,
 ) -> bool:
     """
     Save a distilled lesson to the store.
@@ -49,6 +362,7 @@ async def save_lesson(
         lesson: The distilled lesson/experience to save
         task_query: The original task query (for context)
         lesson_id: Optional specific ID for the lesson
+        namespace: Lesson namespace to save into (see lesson_namespace)
 
     Returns:
         True if successful, False otherwise
@@ -66,12 +380,15 @@ async def save_lesson(
 
         key = lesson_id or str(uuid.uuid4())
         await store.aput(
-            LESSON_NAMESPACE,
+            namespace,
             key,
             {
                 "lesson": lesson,
                 "task_query": task_query,
                 "timestamp": str(__import__("datetime").datetime.now()),
+                # Picked up and merged into a canonical lesson by consolidate_lessons
+                "support": 1,
+                "consolidated": False,
             },
         )
         logger.info(f"Saved lesson: {lesson[:100]}...")
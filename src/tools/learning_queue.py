@@ -0,0 +1,395 @@
+"""
+Durable queue of learning jobs, drained by a background worker.
+
+summarise enqueues the query's plan diff (Plan A vs Plan B) into the store
+instead of running the learn subgraph on the graph's critical path. A single
+background worker per process drains the queue, distilling up to
+LEARNING_BATCH_SIZE diffs per LLM call, saves the resulting lessons and then
+schedules lesson consolidation. Jobs live in the store, so those left behind
+when a process exits are picked up by the next worker.
+
+Several processes may drain the same store (the CLI, the server, a batch
+supervisor). A worker claims each job before distilling it, holding it for
+LEARNING_CLAIM_SECONDS, and deletes it only once it is finished; jobs of a
+worker that died are taken over when its claim runs out.
+"""
+
+from typing import Dict, List, Optional, Set, Tuple
+from datetime import datetime, timezone
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import socket
+import time
+import uuid
+
+from pydantic import BaseModel, Field
+from langchain.messages import SystemMessage
+from langgraph.store.base import BaseStore, Item, PutOp, SearchItem
+
+from src import config
+from src.prompts import WRITE_NOTES_BATCH_PROMPT
+from src.tools.consult_note import LESSON_NAMESPACE, record_lesson_outcome, save_lesson
+from src.tools.lesson_consolidation import schedule_consolidation
+
+logger = logging.getLogger("LangGraph_DeepSearch.learning_queue")
+
+# Store namespace for pending learning jobs
+LEARNING_QUEUE_NAMESPACE = ("learning_queue",)
+
+# Jobs read from the store per page
+_PAGE = 200
+
+# Job fields that hold a worker's claim
+_CLAIM_FIELDS = ("claimed_by", "claim_until")
+
+
+class BatchedLesson(BaseModel):
+    has_lesson: bool = Field(
+        description="Whether there is a meaningful lesson to learn from the difference"
+    )
+    lesson: str = Field(
+        description="A concise, actionable lesson learned from the plan comparison"
+    )
+
+
+class LessonBatch(BaseModel):
+    lessons: List[BatchedLesson] = Field(description="One entry per case, in order")
+
+
+_PLAN_ITEM = re.compile(r"^\s*\d+\.\s+(.*\S)\s*$", re.MULTILINE)
+
+
+def plan_questions(plan: str) -> List[str]:
+    """The numbered sub-questions of a plan, without the feedback heading plan_b carries."""
+    return _PLAN_ITEM.findall(plan or "")
+
+
+def plan_changed(plan_a: str, plan_b: str) -> bool:
+    """
+    Whether the human's feedback changed the sub-questions. plan_b always
+    carries the feedback (an approval too), so the question lists are compared;
+    plans without numbered questions are compared as text.
+    """
+    questions_a, questions_b = plan_questions(plan_a), plan_questions(plan_b)
+    if not questions_a and not questions_b:
+        return plan_a.strip() != plan_b.strip()
+    return questions_a != questions_b
+
+
+def job_key(
+    query: str, plan_a: str, plan_b: str, namespace: Tuple[str, ...] = LESSON_NAMESPACE
+) -> str:
+    """Same diff, same key, so a diff still in the queue is not queued twice."""
+    payload = "\x1f".join((*namespace, query, plan_a, plan_b))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+async def enqueue_learning(
+    store: BaseStore,
+    query: str,
+    plan_a: str,
+    plan_b: str,
+    human_feedback: Optional[str] = None,
+    recalled_lesson_keys: Optional[List[str]] = None,
+    namespace: Tuple[str, ...] = LESSON_NAMESPACE,
+) -> bool:
+    """
+    Queue a plan diff for the background learning worker and make sure it runs.
+
+    Args:
+        store: LangGraph Store instance
+        query: The task being learned from
+        plan_a: Initial plan
+        plan_b: Final plan
+        human_feedback: User's feedback on the plan
+        recalled_lesson_keys: Lessons recalled for plan_a, credited or blamed
+            depending on whether the plan needed correction
+        namespace: Lesson namespace the lesson is saved into
+
+    Returns:
+        True if the job was queued, False otherwise
+    """
+    if store is None or not plan_a or not plan_b:
+        return False
+
+    key = job_key(query, plan_a, plan_b, namespace)
+    try:
+        if await store.aget(LEARNING_QUEUE_NAMESPACE, key) is not None:
+            # Already waiting for the worker with its recalled lessons attached
+            schedule_learning(store)
+            return True
+        # Jobs are never searched by meaning, so skip embedding them
+        await store.aput(
+            LEARNING_QUEUE_NAMESPACE,
+            key,
+            {
+                "query": query,
+                "plan_a": plan_a,
+                "plan_b": plan_b,
+                "human_feedback": human_feedback or "",
+                "recalled_lesson_keys": recalled_lesson_keys or [],
+                "namespace": list(namespace),
+                "attempts": 0,
+                "enqueued_at": str(datetime.now(timezone.utc)),
+            },
+            index=False,
+        )
+    except Exception as e:
+        logger.error(f"Error queueing learning job: {str(e)}")
+        return False
+
+    schedule_learning(store)
+    return True
+
+
+async def pending_jobs(store: BaseStore) -> List[SearchItem]:
+    """Queued jobs, oldest first."""
+    jobs: List[SearchItem] = []
+    offset = 0
+    while True:
+        page = await store.asearch(LEARNING_QUEUE_NAMESPACE, limit=_PAGE, offset=offset)
+        jobs.extend(page)
+        if len(page) < _PAGE:
+            break
+        offset += _PAGE
+    return sorted(jobs, key=lambda item: item.created_at)
+
+
+def _claimed_by_other(value: Dict, owner: str, now: float) -> bool:
+    return value.get("claim_until", 0) >= now and value.get("claimed_by") != owner
+
+
+async def claim_job(store: BaseStore, job: SearchItem, owner: str) -> Optional[Item]:
+    """
+    Claim a queued job for LEARNING_CLAIM_SECONDS, unless another worker holds it.
+
+    Stores with an atomic claim (SqliteStore.aclaim) decide in one write. On
+    other stores the claim is written and read back, which only narrows the race.
+
+    Returns:
+        The claimed job, or None if it is gone or claimed by another worker
+    """
+    lease_s = config.LEARNING_CLAIM_SECONDS
+    if hasattr(store, "aclaim"):
+        return await store.aclaim(LEARNING_QUEUE_NAMESPACE, job.key, owner, lease_s)
+
+    current = await store.aget(LEARNING_QUEUE_NAMESPACE, job.key)
+    now = time.time()
+    if current is None or _claimed_by_other(current.value, owner, now):
+        return None
+    await store.aput(
+        LEARNING_QUEUE_NAMESPACE,
+        job.key,
+        {**current.value, "claimed_by": owner, "claim_until": now + lease_s},
+        index=False,
+    )
+    current = await store.aget(LEARNING_QUEUE_NAMESPACE, job.key)
+    if current is None or current.value.get("claimed_by") != owner:
+        return None
+    return current
+
+
+async def _distill(jobs: List[SearchItem], llm) -> Optional[List[BatchedLesson]]:
+    """One lesson per job from a single LLM call, or None if the call failed."""
+    cases = "\n\n".join(
+        f"# Case {i + 1}\n"
+        f"## Original Task\n{job.value['query']}\n"
+        f"## Human Feedback\n{job.value['human_feedback'] or 'No feedback provided'}\n"
+        f"## Agent's Initial Plan (Plan A)\n{job.value['plan_a']}\n"
+        f"## Final-Modified Plan (Plan B)\n{job.value['plan_b']}"
+        for i, job in enumerate(jobs)
+    )
+    try:
+        result = await llm.with_structured_output(LessonBatch).ainvoke(
+            [SystemMessage(content=WRITE_NOTES_BATCH_PROMPT.format(cases=cases))]
+        )
+    except Exception as e:
+        logger.warning(f"Batched lesson extraction failed: {e}")
+        return None
+    if len(result.lessons) != len(jobs):
+        logger.warning("LLM returned the wrong number of lessons, retrying later")
+        return None
+    return result.lessons
+
+
+def _job_namespace(job: SearchItem) -> Tuple[str, ...]:
+    return tuple(job.value.get("namespace") or LESSON_NAMESPACE)
+
+
+async def process_learning_batch(
+    store: BaseStore,
+    jobs: List[SearchItem],
+    llm,
+    learned: Optional[Set[Tuple[str, ...]]] = None,
+) -> Dict[str, int]:
+    """
+    Learn from a batch of claimed jobs and remove them from the queue.
+    Jobs from different namespaces share the LLM call; each lesson is saved
+    into its own job's namespace, which is added to `learned`. Jobs left for
+    a retry are released for the next worker.
+
+    Returns:
+        Counts of finished jobs, saved lessons and jobs left for a retry
+    """
+    stats = {"done": 0, "lessons": 0, "retry": 0}
+    done: List[SearchItem] = []
+    to_distill: List[SearchItem] = []
+
+    for job in jobs:
+        value = job.value
+        if value.get("recalled_lesson_keys"):
+            await record_lesson_outcome(
+                store,
+                value["recalled_lesson_keys"],
+                corrected=plan_changed(value["plan_a"], value["plan_b"]),
+                namespace=_job_namespace(job),
+            )
+        if not plan_changed(value["plan_a"], value["plan_b"]):
+            # Approved as proposed: nothing to distill
+            done.append(job)
+        else:
+            to_distill.append(job)
+
+    lessons = await _distill(to_distill, llm) if to_distill else []
+    ops: List[PutOp] = []
+    if lessons is None:
+        for job in to_distill:
+            attempts = job.value.get("attempts", 0) + 1
+            if attempts >= config.LEARNING_MAX_ATTEMPTS:
+                logger.error(f"Dropping learning job after {attempts} attempts")
+                done.append(job)
+                continue
+            # Outcomes are recorded already; don't count them twice on retry
+            value = {
+                **{k: v for k, v in job.value.items() if k not in _CLAIM_FIELDS},
+                "attempts": attempts,
+                "recalled_lesson_keys": [],
+            }
+            ops.append(PutOp(LEARNING_QUEUE_NAMESPACE, job.key, value, index=False))
+            stats["retry"] += 1
+    else:
+        for job, result in zip(to_distill, lessons):
+            if result.has_lesson and result.lesson:
+                namespace = _job_namespace(job)
+                if await save_lesson(
+                    store, result.lesson, job.value["query"], namespace=namespace
+                ):
+                    stats["lessons"] += 1
+                    if learned is not None:
+                        learned.add(namespace)
+                    logger.info(f"[ASYNC LEARNING] Learned new lesson: {result.lesson}")
+            done.append(job)
+
+    ops.extend(PutOp(LEARNING_QUEUE_NAMESPACE, job.key, None) for job in done)
+    if ops:
+        await store.abatch(ops)
+    stats["done"] = len(done)
+    return stats
+
+
+async def drain_learning_queue(
+    store: BaseStore, llm=None, learned: Optional[Set[Tuple[str, ...]]] = None
+) -> Dict[str, int]:
+    """
+    Claim and process queued jobs in batches of LEARNING_BATCH_SIZE until the
+    queue is empty or only jobs that just failed, or that other workers hold,
+    are left.
+
+    Args:
+        store: LangGraph Store instance
+        llm: Chat model used to distill lessons (default report_llm)
+        learned: Collects the namespaces that received new lessons
+
+    Returns:
+        Totals of finished jobs, saved lessons and jobs left for a retry
+    """
+    if llm is None:
+        from src.llm import report_llm
+
+        llm = report_llm
+
+    totals = {"done": 0, "lessons": 0, "retry": 0}
+    owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    # Jobs that just failed here, or that another worker is processing
+    skipped = set()
+    batch_size = max(1, config.LEARNING_BATCH_SIZE)
+    while True:
+        jobs = [job for job in await pending_jobs(store) if job.key not in skipped]
+        if not jobs:
+            break
+        for start in range(0, len(jobs), batch_size):
+            batch = []
+            for job in jobs[start : start + batch_size]:
+                claimed = await claim_job(store, job, owner)
+                if claimed is None:
+                    skipped.add(job.key)
+                else:
+                    batch.append(claimed)
+            if not batch:
+                continue
+            stats = await process_learning_batch(store, batch, llm, learned)
+            for name, count in stats.items():
+                totals[name] += count
+            if stats["retry"]:
+                skipped.update(job.key for job in batch)
+
+    if totals["done"]:
+        logger.info(f"Learning queue: {totals}")
+    return totals
+
+
+_task: Optional[asyncio.Task] = None
+_rerun = False
+
+
+def schedule_learning(store: BaseStore) -> Optional[asyncio.Task]:
+    """
+    Drain the learning queue in the background without blocking the caller.
+    Only one worker runs at a time; jobs queued while it runs trigger one more
+    drain afterwards. Namespaces with new lessons are handed on to
+    schedule_consolidation. Does nothing where config.LEARNING_WORKER is off.
+    """
+    global _task, _rerun
+    if store is None or not config.LEARNING_WORKER:
+        return None
+    if _task is not None and not _task.done():
+        _rerun = True
+        return _task
+
+    async def run():
+        global _rerun
+        while True:
+            _rerun = False
+            learned: Set[Tuple[str, ...]] = set()
+            try:
+                await drain_learning_queue(store, learned=learned)
+            except Exception as e:
+                logger.error(f"Learning worker failed: {str(e)}")
+                return
+            for namespace in learned:
+                schedule_consolidation(store, namespace)
+            if not _rerun:
+                return
+
+    _task = asyncio.get_running_loop().create_task(run())
+    return _task
+
+
+async def wait_for_learning(timeout: Optional[float] = None) -> bool:
+    """
+    Wait for the background learning worker, e.g. before a CLI process exits.
+    Jobs still queued on timeout stay in the store for the next worker.
+
+    Returns:
+        True if the worker finished (or wasn't running), False on timeout
+    """
+    if _task is None or _task.done():
+        return True
+    try:
+        await asyncio.wait_for(asyncio.shield(_task), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
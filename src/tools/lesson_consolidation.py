@@ -0,0 +1,334 @@
+"""
+Background consolidation of learned lessons.
+
+save_lesson stores every lesson as a new, unconsolidated entry. A consolidation
+pass walks those entries, merges each one into the most similar canonical
+lesson (bumping its support count) or promotes it to a canonical lesson itself,
+and optionally asks the LLM to rewrite every merged cluster in one batched call.
+Once the store grows past LESSON_MAX_COUNT, the least useful and least recently
+used lessons are evicted after the pass.
+"""
+
+from typing import Any, Dict, List, Optional, Set, Tuple
+from datetime import datetime, timezone
+import asyncio
+import logging
+import math
+
+import numpy as np
+from pydantic import BaseModel, Field
+from langchain.messages import SystemMessage
+from langgraph.store.base import BaseStore, Item, PutOp, SearchItem
+
+from src import config
+from src.embeddings.qwen_embedder import aembed_texts
+from src.prompts import MERGE_LESSONS_PROMPT
+from src.tools.consult_note import (
+    LESSON_NAMESPACE,
+    lesson_recency,
+    lesson_usefulness,
+    update_lessons,
+)
+
+logger = logging.getLogger("LangGraph_DeepSearch.lesson_consolidation")
+
+# Canonical lessons compared against each new lesson
+_CANDIDATES = 5
+# Task queries remembered per canonical lesson
+_MAX_TASK_QUERIES = 5
+# Clusters rewritten per LLM call
+_LLM_BATCH = 10
+# Lessons read from the store per page
+_PAGE = 200
+# Eviction trims the store to this share of LESSON_MAX_COUNT so it doesn't run
+# again after every new lesson
+_EVICT_TO = 0.9
+
+
+class MergedLessons(BaseModel):
+    lessons: List[str] = Field(description="One merged lesson per group, in order")
+
+
+async def _pending_lessons(
+    store: BaseStore, full: bool, namespace: Tuple[str, ...]
+) -> List[SearchItem]:
+    """Lessons to examine, oldest first so the earliest phrasing becomes canonical."""
+    lessons: List[SearchItem] = []
+    offset = 0
+    while True:
+        page = await store.asearch(
+            namespace,
+            filter=None if full else {"consolidated": False},
+            limit=_PAGE,
+            offset=offset,
+        )
+        lessons.extend(page)
+        if len(page) < _PAGE:
+            break
+        offset += _PAGE
+    return sorted(lessons, key=lambda item: item.created_at)
+
+
+async def _most_similar(
+    store: BaseStore, lesson: SearchItem
+) -> tuple[Optional[SearchItem], float]:
+    """Closest canonical lesson in the same namespace by lesson-text similarity (not task query)."""
+    text = lesson.value.get("lesson", "")
+    candidates = [
+        item
+        for item in await store.asearch(
+            lesson.namespace,
+            query=text,
+            filter={"consolidated": True},
+            limit=_CANDIDATES,
+        )
+        if item.key != lesson.key
+    ]
+    if not candidates:
+        return None, 0.0
+
+    # The store ranks by the best of all indexed fields; re-score on lesson text only
+    vectors = np.asarray(
+        await aembed_texts([text] + [c.value.get("lesson", "") for c in candidates]),
+        dtype=np.float32,
+    )
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    scores = vectors[1:] @ vectors[0]
+    best = int(np.argmax(scores))
+    return candidates[best], float(scores[best])
+
+
+def _merge_changes(
+    canonical: Dict[str, Any], member: Dict[str, Any]
+) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    """Fields merging member sets on the canonical lesson, and the counters it adds to."""
+    queries = canonical.get("task_queries") or [canonical.get("task_query", "")]
+    new_query = member.get("task_query", "")
+    if new_query and new_query not in queries:
+        queries = (queries + [new_query])[-_MAX_TASK_QUERIES:]
+    set_fields = {
+        "task_queries": [q for q in queries if q],
+        "consolidated": True,
+        "timestamp": str(datetime.now()),
+    }
+    add = {
+        # A canonical lesson without a support count supports itself
+        "support": member.get("support", 1) + (0 if "support" in canonical else 1),
+        # Usage counters follow the lesson into its canonical form
+        **{
+            field: member.get(field, 0)
+            for field in ("recall_count", "helpful", "corrections")
+        },
+    }
+    return set_fields, add
+
+
+async def _rewrite_clusters(
+    store: BaseStore,
+    clusters: Dict[str, Dict[str, Any]],
+    llm,
+    namespace: Tuple[str, ...],
+) -> None:
+    """Rewrite merged clusters into single lessons, _LLM_BATCH clusters per call."""
+    keys = list(clusters)
+    for start in range(0, len(keys), _LLM_BATCH):
+        batch = keys[start : start + _LLM_BATCH]
+        groups = "\n\n".join(
+            f"## Group {i + 1}\n"
+            + "\n".join(f"- {text}" for text in clusters[key]["texts"])
+            for i, key in enumerate(batch)
+        )
+        try:
+            result = await llm.with_structured_output(MergedLessons).ainvoke(
+                [SystemMessage(content=MERGE_LESSONS_PROMPT.format(groups=groups))]
+            )
+        except Exception as e:
+            logger.warning(f"LLM lesson merge failed, keeping canonical text: {e}")
+            continue
+        if len(result.lessons) != len(batch):
+            logger.warning("LLM returned the wrong number of merged lessons, skipping")
+            continue
+
+        for key, lesson in zip(batch, result.lessons):
+            if not lesson.strip():
+                continue
+            # The new text is re-embedded, so the whole value is written; read it
+            # again first to keep counters updated since the merge
+            current = await store.aget(namespace, key)
+            if current is not None:
+                value = {**current.value, "lesson": lesson.strip()}
+                await store.aput(namespace, key, value)
+
+
+async def consolidate_lessons(
+    store: BaseStore,
+    *,
+    threshold: Optional[float] = None,
+    full: bool = False,
+    llm=None,
+    namespace: Tuple[str, ...] = LESSON_NAMESPACE,
+) -> Dict[str, int]:
+    """
+    Merge near-duplicate lessons into canonical lessons with a support count.
+
+    Args:
+        store: LangGraph Store instance
+        threshold: Cosine similarity at which two lessons are merged
+            (default LESSON_MERGE_THRESHOLD)
+        full: Re-examine every lesson, not only those saved since the last pass
+            (use once for stores that predate consolidation)
+        llm: Chat model used to rewrite merged clusters, or None to keep the
+            canonical lesson's wording
+        namespace: Lesson namespace to consolidate (lessons are never merged
+            across namespaces)
+
+    Returns:
+        Counts of examined, merged and newly canonical lessons
+    """
+    threshold = config.LESSON_MERGE_THRESHOLD if threshold is None else threshold
+    stats = {"examined": 0, "merged": 0, "canonical": 0}
+    # Canonical key -> merged value and the texts that went into it
+    clusters: Dict[str, Dict[str, Any]] = {}
+    merged_away = set()
+
+    for lesson in await _pending_lessons(store, full, namespace):
+        if lesson.key in merged_away:
+            continue
+        stats["examined"] += 1
+
+        canonical, score = await _most_similar(store, lesson)
+        if canonical is not None and score >= threshold:
+            cluster = clusters.get(canonical.key)
+            base = cluster["value"] if cluster else canonical.value
+            set_fields, add = _merge_changes(base, lesson.value)
+            # Only the merged fields change, so concurrent recalls keep their counts
+            await update_lessons(
+                store,
+                [
+                    Item(
+                        value=base,
+                        key=canonical.key,
+                        namespace=namespace,
+                        created_at=canonical.created_at,
+                        updated_at=canonical.updated_at,
+                    )
+                ],
+                set_fields=set_fields,
+                add=add,
+            )
+            await store.adelete(namespace, lesson.key)
+            value = {
+                **base,
+                **set_fields,
+                **{field: base.get(field, 0) + n for field, n in add.items()},
+            }
+
+            texts = cluster["texts"] if cluster else [base.get("lesson", "")]
+            clusters[canonical.key] = {
+                "value": value,
+                "texts": texts + [lesson.value.get("lesson", "")],
+            }
+            merged_away.add(lesson.key)
+            stats["merged"] += 1
+            logger.debug(
+                f"Merged lesson {lesson.key} into {canonical.key} (similarity={score:.2f})"
+            )
+        elif not lesson.value.get("consolidated"):
+            await update_lessons(
+                store,
+                [lesson],
+                set_fields={
+                    "support": lesson.value.get("support", 1),
+                    "consolidated": True,
+                },
+            )
+            stats["canonical"] += 1
+
+    if llm is not None and clusters:
+        await _rewrite_clusters(store, clusters, llm, namespace)
+
+    if stats["examined"]:
+        logger.info(f"Lesson consolidation: {stats}")
+    return stats
+
+
+def _retention(item: SearchItem, now: datetime) -> float:
+    """How much a lesson is worth keeping; repeatedly learned lessons count for more."""
+    support = item.value.get("support", 1)
+    return (
+        lesson_usefulness(item.value)
+        * lesson_recency(item, now)
+        * math.log2(1 + max(support, 1))
+    )
+
+
+async def evict_lessons(
+    store: BaseStore,
+    max_count: Optional[int] = None,
+    namespace: Tuple[str, ...] = LESSON_NAMESPACE,
+) -> int:
+    """
+    Drop the lessons least worth keeping once a namespace holds more than max_count.
+
+    Args:
+        store: LangGraph Store instance
+        max_count: Lesson capacity per namespace (default LESSON_MAX_COUNT, 0 = unlimited)
+        namespace: Lesson namespace to trim
+
+    Returns:
+        Number of lessons evicted
+    """
+    max_count = config.LESSON_MAX_COUNT if max_count is None else max_count
+    if store is None or max_count <= 0:
+        return 0
+
+    lessons = await _pending_lessons(store, True, namespace)
+    if len(lessons) <= max_count:
+        return 0
+
+    now = datetime.now(timezone.utc)
+    lessons.sort(key=lambda item: _retention(item, now))
+    evicted = lessons[: len(lessons) - int(max_count * _EVICT_TO)]
+    await store.abatch([PutOp(namespace, item.key, None) for item in evicted])
+    logger.info(f"Evicted {len(evicted)} of {len(lessons)} lessons from {namespace}")
+    return len(evicted)
+
+
+_task: Optional[asyncio.Task] = None
+# Namespaces with lessons saved since their last pass
+_pending: Set[Tuple[str, ...]] = set()
+
+
+def schedule_consolidation(
+    store: BaseStore, namespace: Tuple[str, ...] = LESSON_NAMESPACE
+) -> Optional[asyncio.Task]:
+    """
+    Run a consolidation pass, then eviction, over a lesson namespace in the
+    background without blocking the caller. Only one pass runs at a time;
+    namespaces scheduled during a pass get a pass of their own afterwards so
+    that lessons saved meanwhile are not left waiting.
+    """
+    global _task
+    if store is None or not (config.LESSON_CONSOLIDATION or config.LESSON_MAX_COUNT):
+        return None
+    _pending.add(tuple(namespace))
+    if _task is not None and not _task.done():
+        return _task
+
+    async def run():
+        llm = None
+        if config.LESSON_MERGE_WITH_LLM:
+            from src.llm import report_llm
+
+            llm = report_llm
+        while _pending:
+            namespace = _pending.pop()
+            try:
+                if config.LESSON_CONSOLIDATION:
+                    await consolidate_lessons(store, llm=llm, namespace=namespace)
+                await evict_lessons(store, namespace=namespace)
+            except Exception as e:
+                logger.error(f"Lesson consolidation failed: {str(e)}")
+
+    _task = asyncio.get_running_loop().create_task(run())
+    return _task
@@ -0,0 +1,28 @@
+"""
+Store namespaces of the lessons of each tenant and project.
+
+Stdlib only, so CLI commands that read or consolidate memory can resolve a
+namespace without importing the tools and their LangChain dependencies.
+"""
+
+from typing import Optional, Tuple
+
+# Store namespace for lessons learned without a tenant; with tenants it is the
+# shared tier that every tenant's recall can draw on
+LESSON_NAMESPACE = ("lessons",)
+# Tenant lessons live under ("tenants", tenant, project, "lessons"), outside the
+# shared namespace, so each tenant/project is its own index partition
+TENANT_NAMESPACE_ROOT = "tenants"
+DEFAULT_PROJECT = "default"
+
+
+def lesson_namespace(
+    tenant_id: Optional[str] = None, project_id: Optional[str] = None
+) -> Tuple[str, ...]:
+    """Namespace holding the lessons of a tenant's project (the shared one without a tenant)."""
+    if not tenant_id:
+        return LESSON_NAMESPACE
+    project_id = project_id or DEFAULT_PROJECT
+    if "." in tenant_id or "." in project_id:
+        raise ValueError("Tenant and project ids can't contain '.'")
+    return (TENANT_NAMESPACE_ROOT, tenant_id, project_id, "lessons")
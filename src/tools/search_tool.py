@@ -1,8 +1,8 @@
 from typing import List, Dict, Any, Literal, Union
 from langchain_core.tools import tool
 from pydantic import BaseModel, Field
-from langchain_tavily import TavilySearch
 from src import config
+from src.lazy import LazyRunnable
 
 
 class TavilySearchInput(BaseModel):
@@ -39,15 +39,21 @@ def _extract_results(
     return results
 
 
-# Create one instance to improve efficiency
+def _tavily_client():
+    from langchain_tavily import TavilySearch
+
+    return TavilySearch(
+        max_results=config.MAX_SEARCH_RESULTS, api_key=config.TAVILY_API_KEY
+    )
+
+
+# Create one instance to improve efficiency (built on the first search)
 api_key = config.TAVILY_API_KEY
 if not api_key:
     print("Warning: TAVILY_API_KEY not found in configuration.")
     client = None
 else:
-    client = TavilySearch(
-        max_results=config.MAX_SEARCH_RESULTS, api_key=config.TAVILY_API_KEY
-    )
+    client = LazyRunnable(_tavily_client, "tavily")
 
 
 def search_tavily_impl(
@@ -0,0 +1,156 @@
+"""
+Tests for concurrent batch mode
+"""
+
+import asyncio
+import io
+import json
+import operator
+from typing import Annotated
+
+import pytest
+from langchain_core.messages import AIMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import END, START, MessagesState, StateGraph
+from src.batch import read_queries, run_batch
+from src.runner import AUTO_APPROVAL
+
+
+class BatchState(MessagesState):
+    query: str
+    summary: str
+    sources: Annotated[list, operator.add]
+    score: int
+
+
+class InFlight:
+    """Counts queries inside the graph at the same time."""
+
+    def __init__(self):
+        self.now = 0
+        self.peak = 0
+
+
+def build_graph(in_flight: InFlight, delay: float = 0.02):
+    """Plan -> (interrupt) human_feedback -> search, like the web search graph."""
+
+    async def plan(state):
+        if state["query"] == "boom":
+            raise RuntimeError("planner exploded")
+        in_flight.now += 1
+        in_flight.peak = max(in_flight.peak, in_flight.now)
+        await asyncio.sleep(0.2 if state["query"] == "slow" else delay)
+        in_flight.now -= 1
+        return {"messages": [AIMessage(content=f"Plan for {state['query']}")]}
+
+    async def search(state):
+        approved = state["messages"][-1].content == AUTO_APPROVAL
+        return {
+            "summary": f"Answer to {state['query']}",
+            "sources": [{"title": "Doc", "url": "https://example.com", "raw": "x"}],
+            "score": 9 if approved else 0,
+        }
+
+    builder = StateGraph(BatchState)
+    builder.add_node("plan", plan)
+    builder.add_node("human_feedback", lambda state: {})
+    builder.add_node("search", search)
+    builder.add_edge(START, "plan")
+    builder.add_edge("plan", "human_feedback")
+    builder.add_edge("human_feedback", "search")
+    builder.add_edge("search", END)
+    return builder.compile(
+        checkpointer=InMemorySaver(), interrupt_before=["human_feedback"]
+    )
+
+
+def results(out: io.StringIO):
+    return [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+class TestReadQueries:
+    """Test cases for batch input parsing"""
+
+    def test_formats(self):
+        """Test JSON objects, JSON strings and plain lines, skipping blanks"""
+        items = read_queries(
+            [
+                '{"query": "first", "id": "a", "tenant": "acme"}\n',
+                "\n",
+                '"second"\n',
+                "third question\n",
+            ]
+        )
+
+        assert [item["query"] for item in items] == [
+            "first",
+            "second",
+            "third question",
+        ]
+        assert [item["id"] for item in items] == ["a", "2", "3"]
+        assert items[0]["tenant"] == "acme"
+
+    def test_rejects_line_without_query(self):
+        """Test that a JSON object without a query names its line"""
+        with pytest.raises(ValueError, match="Line 2"):
+            read_queries(['"ok"', '{"id": "x"}'])
+
+
+class TestRunBatch:
+    """Test cases for run_batch"""
+
+    @pytest.mark.asyncio
+    async def test_runs_all_with_auto_approval(self):
+        """Test that every query finishes past the feedback interrupt"""
+        graph = build_graph(InFlight())
+        out = io.StringIO()
+
+        stats = await run_batch(
+            read_queries([f"q{i}" for i in range(5)]), out, 3, graph=graph
+        )
+
+        rows = results(out)
+        assert sorted(row["query"] for row in rows) == [f"q{i}" for i in range(5)]
+        for row in rows:
+            assert row["summary"] == f"Answer to {row['query']}"
+            assert row["sources"] == [{"title": "Doc", "url": "https://example.com"}]
+            assert row["score"] == 9
+            assert row["latency_s"] >= 0
+        assert stats["queries"] == stats["succeeded"] == 5
+        assert stats["queries_per_minute"] > 0
+        assert set(stats["latency_s"]) == {"p50", "p90", "p99"}
+
+    @pytest.mark.asyncio
+    async def test_concurrency_bound(self):
+        """Test that no more than `concurrency` queries are in flight"""
+        in_flight = InFlight()
+        graph = build_graph(in_flight)
+
+        await run_batch(
+            read_queries([f"q{i}" for i in range(8)]), io.StringIO(), 3, graph=graph
+        )
+
+        assert in_flight.peak == 3
+
+    @pytest.mark.asyncio
+    async def test_streams_in_completion_order(self):
+        """Test that results are written as queries finish, not in input order"""
+        graph = build_graph(InFlight(), delay=0)
+
+        out = io.StringIO()
+        await run_batch(read_queries(["slow", "fast"]), out, 2, graph=graph)
+
+        assert [row["query"] for row in results(out)] == ["fast", "slow"]
+
+    @pytest.mark.asyncio
+    async def test_failed_query_is_reported(self):
+        """Test that one failing query doesn't stop the batch"""
+        graph = build_graph(InFlight())
+        out = io.StringIO()
+
+        stats = await run_batch(read_queries(["ok", "boom"]), out, 2, graph=graph)
+
+        by_query = {row["query"]: row for row in results(out)}
+        assert "planner exploded" in by_query["boom"]["error"]
+        assert by_query["ok"]["score"] == 9
+        assert stats["failed"] == 1 and stats["succeeded"] == 1
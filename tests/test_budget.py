@@ -0,0 +1,128 @@
+"""
+Tests for the per-query budget and degradation modes
+"""
+
+import time
+from unittest.mock import patch, MagicMock
+from langchain_core.outputs import LLMResult
+from langgraph.graph import END
+from src.budget import (
+    DEGRADATION_STEPS,
+    QueryBudget,
+    get_budget,
+    release_budget,
+    with_budget,
+)
+
+
+class TestQueryBudget:
+    """Test cases for QueryBudget accounting"""
+
+    def test_no_limits_never_degrades(self):
+        """Test that an unlimited budget applies no degradation"""
+        budget = QueryBudget()
+        budget.llm_calls = 1000
+        assert budget.degradations() == []
+
+    def test_degradations_follow_order(self):
+        """Test that degradations are applied in the configured order"""
+        budget = QueryBudget(max_llm_calls=10)
+
+        budget.llm_calls = 5
+        assert budget.degradations() == ["skip_review"]
+
+        budget.llm_calls = 10
+        assert budget.degradations() == [step for step, _ in DEGRADATION_STEPS]
+
+    def test_deadline_pressure(self):
+        """Test that elapsed wall-clock time counts against the deadline"""
+        budget = QueryBudget(deadline_s=10)
+        budget.started_at = time.monotonic() - 6
+        assert budget.should("skip_review")
+        assert not budget.should("basic_search")
+
+        budget.exclude(6)
+        assert budget.degradations() == []
+
+    def test_callback_counts_calls_and_tokens(self):
+        """Test that LLM callbacks are counted against the budget"""
+        budget = QueryBudget(max_tokens=100)
+        budget.on_chat_model_start({}, [[]])
+        budget.on_llm_end(
+            LLMResult(generations=[], llm_output={"token_usage": {"total_tokens": 70}})
+        )
+
+        assert budget.llm_calls == 1
+        assert budget.tokens_used == 70
+        assert budget.should("skip_relevance")
+
+    def test_get_budget_from_config(self):
+        """Test that budgets are found in graph config, including plain dicts"""
+        budget = QueryBudget(deadline_s=5)
+        config = with_budget({"configurable": {"thread_id": "t1"}}, budget)
+        assert get_budget(config) is budget
+        assert budget in config["callbacks"]
+
+        dict_config = {"configurable": {"thread_id": "t2", "budget": {"max_tokens": 5}}}
+        assert get_budget(dict_config) is get_budget(dict_config)
+        assert get_budget({"configurable": {}}) is None
+
+    def test_dict_budgets_are_per_run_and_released(self):
+        """Test that dict budgets are keyed by run and dropped when the run finishes"""
+        from src import budget as budget_module
+
+        first = {"configurable": {"thread_id": "t3", "run_id": "r1", "budget": {}}}
+        resumed = {"configurable": {"thread_id": "t3", "run_id": "r2", "budget": {}}}
+        budget = get_budget(first)
+        assert get_budget(resumed) is not budget
+
+        release_budget(first)
+        release_budget(resumed)
+        assert not any(
+            "t3" in k or "r1" in k or "r2" in k for k in budget_module._DICT_BUDGETS
+        )
+        assert get_budget(first) is not budget
+        release_budget(first)
+
+    def test_dict_budgets_are_capped(self):
+        """Test that budgets of runs that never finish don't accumulate"""
+        from src import budget as budget_module
+
+        with patch.object(budget_module, "_MAX_DICT_BUDGETS", 2):
+            for run_id in ("a", "b", "c"):
+                get_budget({"configurable": {"run_id": run_id, "budget": {}}})
+            assert "run:a" not in budget_module._DICT_BUDGETS
+            assert len(budget_module._DICT_BUDGETS) <= 2
+
+
+class TestBudgetDegradation:
+    """Test cases for nodes consulting the budget"""
+
+    @patch("src.nodes.question_nodes.degrade", return_value=True)
+    def test_router_skips_review_when_degraded(self, _mock_degrade):
+        """Test that after_summarise_router ends when review is skipped"""
+        from src.nodes.question_nodes import after_summarise_router
+
+        state = {"summarise_iterations": 1, "degradations": ["skip_review"]}
+        assert after_summarise_router(state) == END
+
+    async def test_search_web_degrades(self):
+        """Test that search_web skips relevance judging and uses basic depth"""
+        from src.nodes import search_nodes
+
+        results = [{"title": "T", "url": "http://t", "content": "C"}]
+        with (
+            patch.object(search_nodes, "degrade", return_value=True),
+            patch.object(
+                search_nodes, "search_tavily_impl", return_value=results
+            ) as mock_search,
+            patch.object(search_nodes, "judge_relevance") as mock_judge,
+            patch.object(search_nodes, "llm", MagicMock()) as mock_llm,
+        ):
+            update = await search_nodes.search_web({"query": "q"})
+
+        mock_search.assert_called_once_with(query="q", search_depth="basic")
+        mock_judge.assert_not_called()
+        mock_llm.bind_tools.assert_not_called()
+        assert update["sources"] == results
+        assert update["degradations"] == ["skip_relevance", "basic_search"]
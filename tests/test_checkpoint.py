@@ -0,0 +1,349 @@
+"""
+Tests for the SQLite-backed checkpointer
+"""
+
+import hashlib
+import operator
+import sqlite3
+import time
+from typing import Annotated, TypedDict
+
+import pytest
+from langgraph.graph import END, START, StateGraph
+from src.checkpoint import SqliteSaver
+
+
+class CounterState(TypedDict):
+    steps: Annotated[list, operator.add]
+    note: str
+
+
+def build_graph():
+    """Two-node graph that interrupts between its nodes."""
+    builder = StateGraph(CounterState)
+    builder.add_node("first", lambda state: {"steps": ["first"], "note": "x" * 5000})
+    builder.add_node("second", lambda state: {"steps": ["second"]})
+    builder.add_edge(START, "first")
+    builder.add_edge("first", "second")
+    builder.add_edge("second", END)
+    return builder
+
+
+class SourcesState(TypedDict):
+    sources: Annotated[list, operator.add]
+    rounds: int
+
+
+def build_looping_graph(rounds: int = 10):
+    """Graph that appends one large source per round, like the review loop."""
+
+    def research(state):
+        n = state["rounds"]
+        content = " ".join(
+            hashlib.sha256(f"{n}-{i}".encode()).hexdigest() for i in range(40)
+        )
+        source = {"url": f"https://example.com/{n}", "content": content}
+        return {"sources": [source], "rounds": n + 1}
+
+    builder = StateGraph(SourcesState)
+    builder.add_node("research", research)
+    builder.add_edge(START, "research")
+    builder.add_conditional_edges(
+        "research", lambda state: END if state["rounds"] >= rounds else "research"
+    )
+    return builder
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "checkpoints.db")
+
+
+def thread(thread_id):
+    return {"configurable": {"thread_id": thread_id}}
+
+
+class TestSqliteSaver:
+    """Test cases for SqliteSaver"""
+
+    def test_round_trip(self, path):
+        """Test that state, history and large compressed values read back intact"""
+        saver = SqliteSaver(path)
+        graph = build_graph().compile(checkpointer=saver)
+
+        result = graph.invoke({"steps": [], "note": ""}, thread("t1"))
+
+        state = graph.get_state(thread("t1"))
+        assert state.values == result
+        assert state.values["note"] == "x" * 5000
+        assert len(list(graph.get_state_history(thread("t1")))) == 4
+        assert saver.conn.execute(
+            "SELECT COUNT(*) FROM content WHERE type LIKE '%+zlib'"
+        ).fetchone()[0]
+        saver.close()
+
+    def test_resume_from_another_instance(self, path):
+        """Test that an interrupted thread continues in a new process"""
+        first = build_graph().compile(
+            checkpointer=SqliteSaver(path), interrupt_before=["second"]
+        )
+        first.invoke({"steps": [], "note": ""}, thread("t1"))
+        assert first.get_state(thread("t1")).next == ("second",)
+        first.checkpointer.close()
+
+        second = build_graph().compile(
+            checkpointer=SqliteSaver(path), interrupt_before=["second"]
+        )
+        result = second.invoke(None, thread("t1"))
+
+        assert result["steps"] == ["first", "second"]
+        second.checkpointer.close()
+
+    def test_keep_last_prunes_checkpoints_and_blobs(self, path):
+        """Test that only the newest checkpoints and the values they use are kept"""
+        saver = SqliteSaver(path, keep_last=2)
+        graph = build_graph().compile(checkpointer=saver)
+
+        for _ in range(3):
+            graph.invoke({"steps": [], "note": ""}, thread("t1"))
+
+        history = list(graph.get_state_history(thread("t1")))
+        assert len(history) == 2
+        assert history[0].values["steps"] == ["first", "second"] * 3
+        referenced = {
+            (channel, str(version))
+            for item in saver.list(thread("t1"))
+            for channel, version in item.checkpoint["channel_versions"].items()
+        }
+        stored = set(saver.conn.execute("SELECT channel, version FROM blobs"))
+        assert stored == referenced
+        saver.close()
+
+    def test_large_items_stored_once(self, path):
+        """Test that a growing list doesn't rewrite its earlier items at each step"""
+
+        def run(content_min_bytes):
+            saver = SqliteSaver(
+                f"{path}.{content_min_bytes}", content_min_bytes=content_min_bytes
+            )
+            graph = build_looping_graph().compile(checkpointer=saver)
+            result = graph.invoke({"sources": [], "rounds": 0}, thread("t1"))
+            size = sum(
+                saver.conn.execute(
+                    f"SELECT COALESCE(SUM(LENGTH(value)), 0) FROM {table}"
+                ).fetchone()[0]
+                for table in ("blobs", "writes", "content")
+            )
+            history = [s.values for s in graph.get_state_history(thread("t1"))]
+            saver.close()
+            return result, history, size
+
+        result, history, size = run(512)
+        plain_result, plain_history, plain_size = run(0)
+
+        assert result == plain_result
+        assert history == plain_history
+        assert len(result["sources"]) == 10
+        assert size * 3 < plain_size
+
+    def test_delete_thread_keeps_shared_content(self, path):
+        """Test that content is deleted only once no thread references it"""
+        saver = SqliteSaver(path)
+        graph = build_graph().compile(checkpointer=saver)
+        graph.invoke({"steps": [], "note": ""}, thread("a"))
+        graph.invoke({"steps": [], "note": ""}, thread("b"))
+        assert saver.conn.execute("SELECT COUNT(*) FROM content").fetchone()[0] == 1
+
+        saver.delete_thread("a")
+        assert graph.get_state(thread("b")).values["note"] == "x" * 5000
+
+        saver.delete_thread("b")
+        assert saver.conn.execute("SELECT COUNT(*) FROM content").fetchone()[0] == 0
+        saver.close()
+
+    def test_expire_threads(self, path):
+        """Test that threads untouched for longer than the TTL are deleted"""
+        saver = SqliteSaver(path, ttl_seconds=3600)
+        graph = build_graph().compile(checkpointer=saver)
+        graph.invoke({"steps": [], "note": ""}, thread("old"))
+        graph.invoke({"steps": [], "note": ""}, thread("new"))
+        saver.conn.execute(
+            "UPDATE threads SET updated_at = ? WHERE thread_id = 'old'",
+            (time.time() - 7200,),
+        )
+
+        assert saver.expire_threads() == 1
+        assert graph.get_state(thread("old")).values == {}
+        assert [t for t, _ in saver.list_threads()] == ["new"]
+        assert not saver.conn.execute(
+            "SELECT COUNT(*) FROM blobs WHERE thread_id = 'old'"
+        ).fetchone()[0]
+        saver.close()
+
+    @pytest.mark.asyncio
+    async def test_async_writes_are_batched(self, path):
+        """Test that aput returns before writing and reads see queued checkpoints"""
+        saver = SqliteSaver(path)
+        graph = build_graph().compile(checkpointer=saver)
+        transactions = []
+        original = saver.flush
+
+        def counting_flush():
+            if saver._pending:
+                transactions.append(len(saver._pending))
+            original()
+
+        saver.flush = counting_flush
+
+        result = await graph.ainvoke({"steps": [], "note": ""}, thread("t1"))
+
+        state = await graph.aget_state(thread("t1"))
+        assert state.values == result
+        assert not saver._pending
+        # Rows queued while a batch was being written go out together
+        assert sum(transactions) > len(transactions)
+        saver.close()
+
+    @pytest.mark.asyncio
+    async def test_sync_writes_option(self, path):
+        """Test that async_writes=False writes each checkpoint before aput returns"""
+        saver = SqliteSaver(path, async_writes=False)
+        graph = build_graph().compile(checkpointer=saver)
+
+        await graph.ainvoke({"steps": [], "note": ""}, thread("t1"))
+
+        assert not saver._pending
+        assert saver.conn.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0] == 4
+        saver.close()
+
+    def test_failed_flush_keeps_rows_queued(self, path):
+        """Test that rows survive a failed transaction and are written on retry"""
+        saver = SqliteSaver(path)
+        saver._enqueue([("INSERT INTO missing VALUES (?)", (1,))], ("t1", ""))
+
+        with pytest.raises(sqlite3.OperationalError):
+            saver.flush()
+        assert saver._pending
+
+        saver.conn.execute("CREATE TABLE missing (x INTEGER)")
+        saver.flush()
+        assert not saver._pending
+        assert saver.conn.execute("SELECT x FROM missing").fetchall() == [(1,)]
+        saver.close()
+
+
+class TestThreadCache:
+    """Test cases for the in-memory cache of recent threads"""
+
+    def test_reads_served_from_memory(self, path):
+        """Test that reading a thread's state after a run doesn't touch disk"""
+        saver = SqliteSaver(path, cache_bytes=10**6)
+        graph = build_graph().compile(checkpointer=saver)
+        result = graph.invoke({"steps": [], "note": ""}, thread("t1"))
+
+        state = graph.get_state(thread("t1"))
+
+        assert state.values == result
+        assert saver.cache.stats()["hits"] == 1
+
+    def test_cached_state_isolated_from_mutation(self, path):
+        """Test that mutating returned state can't change the cached checkpoint"""
+        saver = SqliteSaver(path, cache_bytes=10**6)
+        graph = build_graph().compile(checkpointer=saver)
+        graph.invoke({"steps": [], "note": ""}, thread("t1"))
+
+        graph.get_state(thread("t1")).values["steps"].append("mutated")
+
+        assert graph.get_state(thread("t1")).values["steps"] == ["first", "second"]
+
+    def test_evicts_lru_under_cap_and_rehydrates(self, path):
+        """Test that the cap evicts the least recent thread and it reloads on access"""
+        events = []
+        saver = SqliteSaver(path, cache_bytes=10**6)
+        saver.cache.subscribe(events.append)
+        graph = build_graph().compile(checkpointer=saver)
+        graph.invoke({"steps": [], "note": ""}, thread("a"))
+        # Room for two threads; channel versions vary a few bytes run to run
+        saver.cache.max_bytes = saver.cache.bytes * 5 // 2
+
+        for name in ("b", "c"):
+            graph.invoke({"steps": [], "note": ""}, thread(name))
+
+        assert saver.cache.bytes <= saver.cache.max_bytes
+        assert [(e.kind, e.thread_id) for e in events] == [("evict", "a")]
+        assert graph.get_state(thread("a")).values["steps"] == ["first", "second"]
+        assert ("rehydrate", "a") in [(e.kind, e.thread_id) for e in events]
+        assert saver.cache.stats()["rehydrations"] == 1
+
+    def test_sees_writes_from_another_process(self, path):
+        """Test that a cached thread is reloaded once another saver moves it on"""
+        first = build_graph().compile(
+            checkpointer=SqliteSaver(path, cache_bytes=10**6),
+            interrupt_before=["second"],
+        )
+        second = build_graph().compile(
+            checkpointer=SqliteSaver(path, cache_bytes=10**6),
+            interrupt_before=["second"],
+        )
+        first.invoke({"steps": [], "note": ""}, thread("t1"))
+        assert first.get_state(thread("t1")).next == ("second",)
+
+        second.invoke(None, thread("t1"))
+
+        assert first.get_state(thread("t1")).values["steps"] == ["first", "second"]
+
+    def test_delete_thread_drops_cache(self, path):
+        """Test that deleted threads are not served from memory"""
+        saver = SqliteSaver(path, cache_bytes=10**6)
+        graph = build_graph().compile(checkpointer=saver)
+        graph.invoke({"steps": [], "note": ""}, thread("t1"))
+
+        saver.delete_thread("t1")
+
+        assert graph.get_state(thread("t1")).values == {}
+        assert len(saver.cache) == 0
+
+
+class TestStateSizes:
+    """Test cases for per-step state size instrumentation"""
+
+    def test_breakdown_per_step(self, path):
+        """Test that each step records every field's size and its write time"""
+        saver = SqliteSaver(path, keep_last=2)
+        graph = build_looping_graph(rounds=3).compile(checkpointer=saver)
+        graph.invoke({"sources": [], "rounds": 0}, thread("t1"))
+
+        steps = saver.state_sizes("t1")
+
+        assert [s["step"] for s in steps] == [-1, 0, 1, 2, 3]
+        sources = [s["fields"].get("sources", 0) for s in steps]
+        assert sources[1] < sources[2] < sources[3] < sources[4]
+        assert steps[-1]["changed"] == ["rounds", "sources"]
+        assert steps[-1]["total"] == sum(steps[-1]["fields"].values())
+        assert all(s["write_ms"] is not None and s["put_ms"] >= 0 for s in steps)
+        saver.close()
+
+    def test_warns_once_per_threshold(self, path, caplog):
+        """Test that crossing a field threshold is logged once per thread"""
+        saver = SqliteSaver(path, warn_field_bytes=5000, warn_state_bytes=8000)
+        graph = build_looping_graph(rounds=5).compile(checkpointer=saver)
+
+        with caplog.at_level("WARNING", logger="LangGraph_DeepSearch.size_stats"):
+            graph.invoke({"sources": [], "rounds": 0}, thread("t1"))
+
+        messages = [r.getMessage() for r in caplog.records]
+        assert len(messages) == 2
+        assert "field 'sources'" in messages[0]
+        assert "largest fields: sources=" in messages[1]
+        saver.close()
+
+    def test_delete_thread_drops_steps(self, path):
+        """Test that a deleted thread has no size history"""
+        saver = SqliteSaver(path)
+        graph = build_graph().compile(checkpointer=saver)
+        graph.invoke({"steps": [], "note": ""}, thread("t1"))
+
+        saver.delete_thread("t1")
+
+        assert saver.state_sizes("t1") == []
+        saver.close()
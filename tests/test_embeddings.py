@@ -0,0 +1,231 @@
+"""
+Tests for the shared embedding service
+"""
+
+import asyncio
+import math
+import pytest
+from src.embeddings.backends import BackendUnavailable, HashBackend, QwenBackend
+from src.embeddings.service import EmbeddingService, create_backend
+
+
+class RecordingBackend:
+    """Backend that records each request and returns a vector per text."""
+
+    name = "recording"
+
+    def __init__(self, fail_times: int = 0):
+        self.calls = []
+        self.fail_times = fail_times
+
+    async def embed(self, texts):
+        self.calls.append(list(texts))
+        if self.fail_times:
+            self.fail_times -= 1
+            raise RuntimeError("rate limited")
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+def make_service(backend, **kwargs):
+    kwargs.setdefault("coalesce_ms", 1)
+    kwargs.setdefault("max_retries", 0)
+    return EmbeddingService(backend, **kwargs)
+
+
+class TestEmbeddingService:
+    """Test cases for EmbeddingService"""
+
+    @pytest.mark.asyncio
+    async def test_preserves_order_and_dedupes(self):
+        """Test that duplicates in one call are embedded once and order is kept"""
+        backend = RecordingBackend()
+        service = make_service(backend)
+
+        vectors = await service.embed(["a", "bbb", "a"])
+
+        assert vectors == [[1.0, 1.0], [3.0, 1.0], [1.0, 1.0]]
+        assert sum(len(c) for c in backend.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_lru_cache_hit_skips_backend(self):
+        """Test that a repeated text is served from memory"""
+        backend = RecordingBackend()
+        service = make_service(backend)
+
+        await service.embed(["hello"])
+        await service.embed(["hello"])
+
+        assert len(backend.calls) == 1
+        assert service.stats["lru_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_lru_evicts_oldest(self):
+        """Test that the LRU is bounded by cache_size"""
+        backend = RecordingBackend()
+        service = make_service(backend, cache_size=2)
+
+        await service.embed(["a", "b", "c"])
+        await service.embed(["a"])
+
+        assert len(backend.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_coalesces_concurrent_callers(self):
+        """Test that concurrent callers share one provider request"""
+        backend = RecordingBackend()
+        service = make_service(backend, coalesce_ms=20)
+
+        results = await asyncio.gather(
+            service.embed(["one"]), service.embed(["two"]), service.embed(["one"])
+        )
+
+        assert len(backend.calls) == 1
+        assert sorted(backend.calls[0]) == ["one", "two"]
+        assert results[0] == results[2]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_leaves_coalesced_callers_alone(self):
+        """Test that one caller timing out doesn't cancel another's shared embedding"""
+        backend = RecordingBackend()
+        service = make_service(backend, coalesce_ms=100)
+
+        async def impatient():
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(service.embed(["q"]), 0.01)
+
+        _, vectors = await asyncio.gather(impatient(), service.embed(["q"]))
+
+        assert vectors == [[1.0, 1.0]]
+        assert len(backend.calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_splits_into_provider_sized_batches(self):
+        """Test that requests never exceed batch_size texts"""
+        backend = RecordingBackend()
+        service = make_service(backend, batch_size=3)
+
+        await service.embed([f"text {i}" for i in range(7)])
+
+        assert [len(c) for c in backend.calls] == [3, 3, 1]
+
+    @pytest.mark.asyncio
+    async def test_retries_transient_failures(self):
+        """Test that a failed request is retried"""
+        backend = RecordingBackend(fail_times=1)
+        service = make_service(backend, max_retries=2)
+
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(asyncio, "sleep", _no_sleep)
+            vectors = await service.embed(["x"])
+
+        assert vectors == [[1.0, 1.0]]
+        assert len(backend.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_raises_after_retries_exhausted(self):
+        """Test that persistent failures reach the caller and aren't cached"""
+        backend = RecordingBackend(fail_times=5)
+        service = make_service(backend)
+
+        with pytest.raises(RuntimeError):
+            await service.embed(["x"])
+
+        backend.fail_times = 0
+        assert await service.embed(["x"]) == [[1.0, 1.0]]
+
+    @pytest.mark.asyncio
+    async def test_unavailable_after_failure_until_cooldown(self):
+        """Test that a failed request marks the service unavailable for a while"""
+        backend = RecordingBackend(fail_times=1)
+        service = make_service(backend, failure_cooldown_s=60)
+        assert service.available
+
+        with pytest.raises(RuntimeError):
+            await service.embed(["x"])
+        assert not service.available
+
+        service.failure_cooldown_s = 0
+        service._unavailable_until = 0.0
+        assert service.available
+        assert await service.embed(["x"]) == [[1.0, 1.0]]
+        assert service.available
+
+    @pytest.mark.asyncio
+    async def test_disk_cache_survives_restart(self, tmp_path):
+        """Test that the persistent cache is reused by a new service instance"""
+        path = str(tmp_path / "embeddings.db")
+        first_backend = RecordingBackend()
+        first = make_service(first_backend, cache_path=path)
+        await first.embed(["persist me"])
+        first.close()
+
+        second_backend = RecordingBackend()
+        second = make_service(second_backend, cache_path=path)
+        vectors = await second.embed(["persist me"])
+        second.close()
+
+        assert vectors == [[10.0, 1.0]]
+        assert second_backend.calls == []
+        assert second.stats["disk_hits"] == 1
+
+    def test_cache_key_depends_on_backend(self):
+        """Test that vectors from different models never share cache entries"""
+        a = make_service(HashBackend(dims=8))
+        b = make_service(HashBackend(dims=16))
+
+        assert a.key("text") != b.key("text")
+
+    def test_unknown_backend(self):
+        """Test that an unknown backend name is rejected"""
+        with pytest.raises(ValueError):
+            create_backend("nope")
+
+    @pytest.mark.asyncio
+    async def test_unconfigured_backend_is_unavailable(self):
+        """Test that a backend without an API key is built, reported down and not retried"""
+        backend = QwenBackend("", dims=512)
+        service = make_service(backend, max_retries=3)
+
+        assert not service.available
+        with pytest.raises(BackendUnavailable):
+            await service.embed(["text"])
+        assert service.stats["requests"] == 1
+
+    def test_qwen_dims(self):
+        """Test that create_backend passes the configured dimensions to Qwen"""
+        assert create_backend("qwen", dims=512).dims == 512
+
+
+class TestHashBackend:
+    """Test cases for the deterministic offline backend"""
+
+    @pytest.mark.asyncio
+    async def test_deterministic_and_normalised(self):
+        """Test that the same text always gives the same unit vector"""
+        backend = HashBackend(dims=64)
+
+        first, second = await backend.embed(["same text", "same text"])
+
+        assert first == second
+        assert math.isclose(sum(v * v for v in first), 1.0)
+
+    @pytest.mark.asyncio
+    async def test_shared_words_are_closer(self):
+        """Test that overlapping texts score higher than unrelated ones"""
+        backend = HashBackend(dims=256)
+        query, related, unrelated = await backend.embed(
+            [
+                "renewable energy storage",
+                "energy storage for renewable grids",
+                "medieval poetry",
+            ]
+        )
+
+        def dot(a, b):
+            return sum(x * y for x, y in zip(a, b))
+
+        assert dot(query, related) > dot(query, unrelated)
+
+
+async def _no_sleep(_seconds):
+    return None
@@ -2,6 +2,7 @@
 Tests for graph structure and execution
 """
 
+import pytest
 from unittest.mock import patch, MagicMock
 
 
@@ -97,6 +98,48 @@ class TestGraphEdges:
         assert builder is not None
 
 
+class TestStartRouting:
+    """Test cases for the START router"""
+
+    @pytest.mark.asyncio
+    @patch("src.graphs.web_search_graph.config")
+    async def test_simple_query_routes_to_direct_answer(self, mock_config):
+        """Test that simple queries skip deep search"""
+        from src.graphs.web_search_graph import route_start
+
+        mock_config.ENABLE_DIRECT_ANSWER = True
+        mock_config.DIRECT_ANSWER_CONFIDENCE = 0.8
+
+        result = await route_start({"query": "Who wrote Hamlet?"})
+        assert result == "answer_directly"
+
+    @pytest.mark.asyncio
+    @patch("src.graphs.web_search_graph.config")
+    async def test_complex_query_routes_to_deep_search(self, mock_config):
+        """Test that complex queries go through recall / plan"""
+        from src.graphs.web_search_graph import route_start
+
+        mock_config.ENABLE_DIRECT_ANSWER = True
+        mock_config.DIRECT_ANSWER_CONFIDENCE = 0.8
+        mock_config.ENABLE_LEARNING = True
+
+        result = await route_start({"query": "Compare Python async frameworks"})
+        assert result == "recall"
+
+    @pytest.mark.asyncio
+    @patch("src.graphs.web_search_graph.lookup_answer")
+    @patch("src.graphs.web_search_graph.config")
+    async def test_cached_query_routes_to_direct_answer(self, mock_config, mock_lookup):
+        """Test that already-answered queries skip deep search"""
+        from src.graphs.web_search_graph import route_start
+
+        mock_config.ENABLE_DIRECT_ANSWER = True
+        mock_lookup.return_value = "Cached report"
+
+        result = await route_start({"query": "Compare Python async frameworks"})
+        assert result == "answer_directly"
+
+
 class TestGraphInterrupts:
     """Test cases for graph interrupt behavior"""
 
@@ -0,0 +1,91 @@
+"""
+Tests for the multi-process batch worker pool
+"""
+
+import asyncio
+import io
+import json
+import os
+
+import pytest
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import END, START, StateGraph
+from typing_extensions import TypedDict
+
+from src.batch import format_stats
+from src.pool import WorkerPool, load_graph
+
+
+class PoolState(TypedDict, total=False):
+    query: str
+    summary: str
+
+
+def build_graph():
+    """One-node graph run by the workers; "fail" raises, "crash" kills the worker."""
+
+    async def answer(state):
+        if state["query"] == "fail":
+            raise RuntimeError("provider down")
+        if state["query"] == "crash":
+            os._exit(3)
+        await asyncio.sleep(0.3)  # provider latency, so no worker takes the whole batch
+        return {"summary": f"Answer to {state['query']}"}
+
+    builder = StateGraph(PoolState)
+    builder.add_node("answer", answer)
+    builder.add_edge(START, "answer")
+    builder.add_edge("answer", END)
+    return builder.compile(checkpointer=InMemorySaver())
+
+
+GRAPH = "tests.test_pool:build_graph"
+
+
+async def run_pool(queries, workers=2, concurrency=2, graph_ref=GRAPH):
+    items = [{"id": str(i), "query": query} for i, query in enumerate(queries)]
+    out = io.StringIO()
+    stats = await WorkerPool(workers, concurrency, graph_ref).run(items, out)
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    return stats, {result["id"]: result for result in results}
+
+
+class TestWorkerPool:
+    """Test cases for pool.WorkerPool"""
+
+    def test_load_graph_calls_factories(self):
+        """Test that a "module:attribute" factory is called for the graph"""
+        assert hasattr(load_graph(GRAPH), "astream")
+
+    @pytest.mark.asyncio
+    async def test_queries_spread_over_workers(self):
+        """Test that every query comes back once and both workers take some"""
+        stats, results = await run_pool([f"q{i}" for i in range(12)] + ["fail"])
+
+        assert sorted(results, key=int) == [str(i) for i in range(13)]
+        assert results["0"]["summary"] == "Answer to q0"
+        assert "provider down" in results["12"]["error"]
+        assert {results[i]["worker"] for i in results} == {0, 1}
+        assert stats["succeeded"] == 12 and stats["failed"] == 1
+        assert stats["workers"] == 2 and sum(stats["per_worker"].values()) == 13
+        assert "2 workers finished" in format_stats(stats)
+
+    @pytest.mark.asyncio
+    async def test_worker_crash(self):
+        """Test that a dead worker's query fails and the others still finish"""
+        stats, results = await run_pool(
+            ["crash"] + [f"q{i}" for i in range(5)], concurrency=1
+        )
+
+        assert "WorkerError" in results["0"]["error"]
+        assert "exited with code 3" in results["0"]["error"]
+        assert all("summary" in results[str(i)] for i in range(1, 6))
+        assert stats["failed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_graph_import_failure(self):
+        """Test that workers that can't load the graph fail the batch, not hang"""
+        stats, results = await run_pool(["q"], graph_ref="tests.test_pool:missing")
+
+        assert "AttributeError" in results["0"]["error"]
+        assert stats["failed"] == 1
@@ -0,0 +1,237 @@
+"""
+Tests for the query runner, the daemon and its thin client
+"""
+
+import asyncio
+import json
+import operator
+import socket
+import stat
+from pathlib import Path
+from typing import Annotated
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import END, START, MessagesState, StateGraph
+from src.client import request_events, server_available, server_status
+from src.runner import AUTO_APPROVAL, query_events
+from src.server import QueryServer
+
+
+class ServerState(MessagesState):
+    query: str
+    summary: str
+    sources: Annotated[list, operator.add]
+
+
+def build_graph():
+    """Plan -> (interrupt) human_feedback -> summarise with a streaming model."""
+
+    async def plan(state):
+        return {"messages": [AIMessage(content=f"Plan for {state['query']}")]}
+
+    async def summarise(state):
+        feedback = state["messages"][-1].content
+        model = GenericFakeChatModel(
+            messages=iter([AIMessage(content=f"Answer after {feedback}")])
+        )
+        summary = await model.ainvoke("summarise")
+        return {
+            "messages": [summary],
+            "summary": summary.content,
+            "sources": [{"title": "Doc", "url": "https://example.com"}],
+        }
+
+    builder = StateGraph(ServerState)
+    builder.add_node("plan", plan)
+    builder.add_node("human_feedback", lambda state: {})
+    builder.add_node("summarise", summarise)
+    builder.add_edge(START, "plan")
+    builder.add_edge("plan", "human_feedback")
+    builder.add_edge("human_feedback", "summarise")
+    builder.add_edge("summarise", END)
+    return builder.compile(
+        checkpointer=InMemorySaver(), interrupt_before=["human_feedback"]
+    )
+
+
+async def collect(events):
+    return [event async for event in events]
+
+
+@pytest.fixture
+async def server(tmp_path):
+    server = QueryServer(build_graph(), str(tmp_path / "ds.sock"))
+    await server.start()
+    yield server
+    await server.close()
+
+
+class TestQueryEvents:
+    """Test cases for runner.query_events"""
+
+    @pytest.mark.asyncio
+    async def test_feedback_round_trip(self):
+        """Test that the plan waits for feedback and the run continues with it"""
+
+        async def ask_feedback():
+            return "add pricing"
+
+        events = await collect(
+            query_events(build_graph(), {"thread_id": "t1", "query": "q"}, ask_feedback)
+        )
+
+        kinds = [event["event"] for event in events]
+        assert kinds.index("feedback_request") < kinds.index("feedback")
+        assert events[-1]["event"] == "result"
+        assert events[-1]["summary"] == "Answer after add pricing"
+        assert events[-1]["sources"] == [{"title": "Doc", "url": "https://example.com"}]
+
+    @pytest.mark.asyncio
+    async def test_auto_approval_and_tokens(self):
+        """Test --no-feedback approval and token events when requested"""
+        events = await collect(
+            query_events(
+                build_graph(),
+                {"thread_id": "t2", "query": "q", "no_feedback": True, "tokens": True},
+            )
+        )
+
+        assert "feedback_request" not in [event["event"] for event in events]
+        tokens = [event for event in events if event["event"] == "token"]
+        assert {event["node"] for event in tokens} == {"summarise"}
+        assert "".join(event["content"] for event in tokens) == (
+            f"Answer after {AUTO_APPROVAL}"
+        )
+
+
+class TestQueryServer:
+    """Test cases for the daemon and its client"""
+
+    @pytest.mark.asyncio
+    async def test_query_over_socket(self, server):
+        """Test a query with feedback through the thin client"""
+
+        async def ask_feedback():
+            return "more depth"
+
+        assert server_available(server.socket_path)
+        events = await collect(
+            request_events(
+                server.socket_path,
+                {"op": "query", "query": "q", "thread_id": "s1"},
+                ask_feedback,
+            )
+        )
+
+        assert events[0] == {"event": "start", "thread_id": "s1"}
+        assert events[-1]["summary"] == "Answer after more depth"
+        status = await server_status(server.socket_path)
+        assert status["queries"] == 1 and status["active"] == 0
+
+    @pytest.mark.asyncio
+    async def test_concurrent_clients(self, server):
+        """Test that queries from several clients run on the one daemon"""
+        runs = [
+            collect(
+                request_events(
+                    server.socket_path,
+                    {"op": "query", "query": f"q{i}", "no_feedback": True},
+                )
+            )
+            for i in range(4)
+        ]
+
+        results = await asyncio.gather(*runs)
+
+        assert len({events[0]["thread_id"] for events in results}) == 4
+        assert all(events[-1]["event"] == "result" for events in results)
+
+    @pytest.mark.asyncio
+    async def test_client_disconnect_during_feedback(self, server):
+        """Test that a client leaving at the feedback prompt doesn't hurt the daemon"""
+        reader, writer = await asyncio.open_unix_connection(server.socket_path)
+        writer.write(b'{"op": "query", "query": "q", "thread_id": "gone"}\n')
+        while json.loads(await reader.readline())["event"] != "feedback_request":
+            pass
+        writer.close()
+        await asyncio.sleep(0.05)
+
+        assert server.active == 0
+        state = await server.graph.aget_state({"configurable": {"thread_id": "gone"}})
+        assert state.next == ("human_feedback",)
+
+    @pytest.mark.asyncio
+    async def test_refuses_second_server_and_replaces_stale_socket(
+        self, server, tmp_path
+    ):
+        """Test socket ownership between daemons"""
+        with pytest.raises(RuntimeError, match="already running"):
+            await QueryServer(build_graph(), server.socket_path).start()
+
+        stale = tmp_path / "stale.sock"
+        stale.touch()
+        assert not server_available(str(stale))
+        replacement = QueryServer(build_graph(), str(stale))
+        await replacement.start()
+        assert server_available(str(stale))
+        await replacement.close()
+        assert not stale.exists()
+
+    @pytest.mark.asyncio
+    async def test_http_query(self, tmp_path):
+        """Test NDJSON streaming over local HTTP"""
+        server = QueryServer(build_graph(), str(tmp_path / "h.sock"), http_port=0)
+        await server.start()
+        http = await asyncio.start_server(server._handle_http, "127.0.0.1", 0)
+        port = http.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            body = json.dumps({"query": "q", "thread_id": "h1"}).encode()
+            writer.write(
+                b"POST /query HTTP/1.1\r\nHost: localhost\r\n"
+                + f"Authorization: Bearer {server.token}\r\n".encode()
+                + f"Content-Length: {len(body)}\r\n\r\n".encode()
+                + body
+            )
+            response = await reader.read()
+            writer.close()
+        finally:
+            http.close()
+            await server.close()
+
+        head, _, stream = response.partition(b"\r\n\r\n")
+        assert head.startswith(b"HTTP/1.1 200 OK")
+        assert b"application/x-ndjson" in head
+        events = [json.loads(line) for line in stream.splitlines()]
+        assert events[-1]["summary"] == f"Answer after {AUTO_APPROVAL}"
+
+    @pytest.mark.asyncio
+    async def test_http_requires_token(self, tmp_path):
+        """Test that HTTP requests need the token from the owner-only file"""
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        server = QueryServer(build_graph(), str(tmp_path / "h.sock"), http_port=port)
+        await server.start()
+
+        async def status(token=None):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            auth = f"Authorization: Bearer {token}\r\n" if token else ""
+            writer.write(f"GET /status HTTP/1.1\r\n{auth}\r\n".encode())
+            response = await reader.read()
+            writer.close()
+            return response
+
+        token_file = Path(server.token_path)
+        try:
+            assert stat.S_IMODE(token_file.stat().st_mode) == 0o600
+            assert token_file.read_text().strip() == server.token
+            assert (await status()).startswith(b"HTTP/1.1 401")
+            assert (await status("wrong")).startswith(b"HTTP/1.1 401")
+            assert (await status(server.token)).startswith(b"HTTP/1.1 200 OK")
+        finally:
+            await server.close()
+        assert not token_file.exists()
@@ -0,0 +1,142 @@
+"""
+Import-time regression tests for CLI startup and lazy model construction
+"""
+
+from pathlib import Path
+import os
+import subprocess
+import sys
+
+from src.lazy import Lazy
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Packages the utility commands must not import
+HEAVY = (
+    "langgraph",
+    "langchain",
+    "langchain_core",
+    "langchain_openai",
+    "langchain_ollama",
+    "langchain_tavily",
+    "openai",
+    "numpy",
+    "src.llm",
+    "src.graphs.web_search_graph",
+)
+
+# The memory commands open the store (LangGraph's BaseStore) but nothing else
+MEMORY_COMMAND_HEAVY = (
+    "langchain",
+    "langchain_core.tracers",
+    "langchain_openai",
+    "langchain_ollama",
+    "langchain_tavily",
+    "openai",
+    "src.llm",
+    "src.tools.search_tool",
+    "src.tools.consult_note",
+    "src.graphs.web_search_graph",
+)
+
+# Provider SDKs only imported when a model or search client is first used
+PROVIDER_SDKS = ("langchain_openai", "langchain_ollama", "langchain_tavily", "openai")
+
+# Cumulative import time allowed for src.cli (measured at ~15ms)
+CLI_IMPORT_BUDGET_US = 100_000
+
+
+def import_times(statement: str, **env: str) -> dict:
+    """Cumulative import time in µs of every module a statement imports (python -X importtime)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, **env},
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:") :].split("|")
+        times[module.strip()] = int(cumulative)
+    return times
+
+
+def heavy_imports(times: dict, packages=HEAVY) -> list:
+    return sorted(
+        m for m in times if any(m == p or m.startswith(p + ".") for p in packages)
+    )
+
+
+class TestStartup:
+    """Test cases for deferred imports"""
+
+    def test_cli_import_is_light(self):
+        """Test that importing the CLI loads neither the graph nor LangChain"""
+        times = import_times("import src.cli")
+
+        assert heavy_imports(times) == []
+        assert times["src.cli"] < CLI_IMPORT_BUDGET_US
+
+    def test_utility_command_is_light(self):
+        """Test that --list-threads reads checkpoints without importing LangGraph"""
+        times = import_times(
+            "import sys; sys.argv = ['deepsearch', '--list-threads']; "
+            "from src.cli import main; main()"
+        )
+
+        assert "src.checkpoint.reader" in times
+        assert heavy_imports(times) == []
+
+    def test_help_is_light(self):
+        """Test that --help prints usage without importing LangGraph"""
+        times = import_times(
+            "import sys; sys.argv = ['deepsearch', '--help']; "
+            "from src.cli import main\n"
+            "try:\n    main()\nexcept SystemExit:\n    pass"
+        )
+
+        assert "src.cli" in times
+        assert heavy_imports(times) == []
+
+    def test_show_memory_skips_tools(self, tmp_path):
+        """Test that --show-memory opens the store without the tools, models or graph"""
+        times = import_times(
+            "import sys; sys.argv = ['deepsearch', '--show-memory', '--tenant', 'acme']; "
+            "from src.cli import main; main()",
+            STORE_PATH=str(tmp_path / "store.db"),
+        )
+
+        assert "src.tools.namespaces" in times
+        assert heavy_imports(times, MEMORY_COMMAND_HEAVY) == []
+
+    def test_graph_import_defers_provider_sdks(self):
+        """Test that compiling the graph doesn't import the model and search SDKs"""
+        times = import_times("import src.graphs.web_search_graph")
+
+        assert "src.graphs.web_search_graph" in times
+        assert heavy_imports(times, PROVIDER_SDKS) == []
+
+
+class TestLazy:
+    """Test cases for the Lazy proxy"""
+
+    def test_builds_once_on_first_use(self):
+        """Test that the factory runs on first attribute access only"""
+        calls = []
+
+        def build():
+            calls.append(1)
+            return "model"
+
+        model = Lazy(build, "model")
+        assert not model.built
+        assert "not built" in repr(model)
+
+        assert model.upper() == "MODEL"
+        assert model.lower() == "model"
+        assert model.built
+        assert calls == [1]
@@ -0,0 +1,95 @@
+"""
+Tests for state reducers and message-history compaction
+"""
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import END, START, StateGraph
+from langgraph.graph.message import add_messages
+from src.state import SUMMARY_NAME, WebSearchState, compact_messages
+from src.state.compaction import DIGEST_ID
+from unittest.mock import patch
+
+
+def review_round(i):
+    """Messages one plan -> search -> summarise -> review round appends."""
+    return [
+        AIMessage(content=f"I'm now going to search for these topics:\n**1**. q{i}"),
+        AIMessage(content=f"Search for: **q{i}** (Found 5 relevant results)"),
+        AIMessage(content=f"Answer {i} " + "detail " * 300, name=SUMMARY_NAME),
+        AIMessage(content=f"Review feedback:\n\n**Score**={i}"),
+    ]
+
+
+def run_rounds(rounds, keep_recent=4, digest_lines=6):
+    messages = add_messages([], [HumanMessage(content="query")])
+    for i in range(rounds):
+        messages = compact_messages(
+            add_messages(messages, review_round(i)),
+            keep_recent,
+            digest_lines,
+        )
+    return messages
+
+
+class TestMessageCompaction:
+    """Test cases for compact_messages"""
+
+    def test_short_history_untouched(self):
+        """Test that histories within keep_recent are returned as they are"""
+        messages = [HumanMessage(content="q", id="1"), AIMessage(content="a", id="2")]
+
+        assert compact_messages(messages, 4, 10) is messages
+
+    def test_keeps_humans_recent_and_latest_summary(self):
+        """Test what stays verbatim and that the rest becomes one digest"""
+        messages = run_rounds(3)
+
+        assert messages[0].content == "query"
+        digest = messages[1]
+        assert digest.id == DIGEST_ID
+        assert "[summary] Answer 0" in digest.content
+        assert "Score=0" in digest.content
+        summaries = [m for m in messages if m.name == SUMMARY_NAME]
+        assert [m.content.split()[1] for m in summaries] == ["2"]
+        assert messages[-1].content.endswith("**Score**=2")
+        assert sum(m.id == DIGEST_ID for m in messages) == 1
+
+    def test_size_bounded_across_rounds(self):
+        """Test that history size stops growing however many rounds run"""
+
+        def size(messages):
+            return sum(len(m.content) for m in messages)
+
+        ten, fifty = run_rounds(10), run_rounds(50)
+
+        assert len(ten) == len(fifty)
+        assert abs(size(fifty) - size(ten)) < 100
+        assert len(fifty[1].content.split("\n")) == 7
+
+    def test_disabled(self):
+        """Test that keep_recent=0 keeps the full history"""
+        messages = run_rounds(3, keep_recent=0)
+
+        assert len(messages) == 13
+
+    def test_graph_channel_uses_compaction(self):
+        """Test that WebSearchState's messages channel compacts on update"""
+        builder = StateGraph(WebSearchState)
+        builder.add_node("chatter", lambda state: {"messages": review_round(0)})
+        builder.add_edge(START, "chatter")
+        builder.add_edge("chatter", END)
+        graph = builder.compile()
+
+        with (
+            patch("src.config.MESSAGE_KEEP_RECENT", 2),
+            patch("src.config.MESSAGE_DIGEST_LINES", 5),
+        ):
+            result = graph.invoke({"messages": [HumanMessage(content="query")]})
+
+        assert [m.id == DIGEST_ID for m in result["messages"]] == [
+            False,
+            True,
+            False,
+            False,
+        ]
+        assert result["messages"][2].name == SUMMARY_NAME
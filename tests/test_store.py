@@ -0,0 +1,684 @@
+"""
+Tests for the SQLite-backed store
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+import numpy as np
+import pytest
+from unittest.mock import patch
+from langgraph.store.base import PutOp
+from src.store import SqliteStore
+from src.store.ann import IVFIndex
+from src.store.snapshot import (
+    LessonSnapshot,
+    QuantizedMatrix,
+    build_snapshot,
+    quantize,
+)
+from src.tools.consult_note import (
+    LESSON_NAMESPACE,
+    lesson_namespace,
+    recall_notes,
+    save_lesson,
+)
+
+
+@pytest.fixture(autouse=True)
+def hash_embeddings():
+    """Recall consults the shared embedding service: make it the offline one."""
+    with (
+        patch("src.config.EMBEDDING_BACKEND", "hash"),
+        patch("src.config.EMBEDDING_CACHE_PATH", ""),
+        patch("src.embeddings.service._service", None),
+    ):
+        yield
+
+
+def fake_embed(texts):
+    """Bag-of-words hash embedding: texts sharing words get similar vectors."""
+    vectors = []
+    for text in texts:
+        vector = [0.0] * 32
+        for word in text.lower().split():
+            vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % 32] += 1.0
+        vectors.append(vector)
+    return vectors
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SqliteStore(
+        str(tmp_path / "store.db"),
+        index={"dims": 32, "embed": fake_embed, "fields": ["lesson"]},
+    )
+    yield store
+    store.close()
+
+
+class TestSqliteStore:
+    """Test cases for SqliteStore"""
+
+    def test_put_get_delete(self, store):
+        """Test basic put, get and delete"""
+        store.put(("lessons",), "a", {"lesson": "cite sources"})
+
+        item = store.get(("lessons",), "a")
+        assert item.value == {"lesson": "cite sources"}
+        assert item.namespace == ("lessons",)
+
+        store.delete(("lessons",), "a")
+        assert store.get(("lessons",), "a") is None
+
+    def test_claim_is_exclusive_until_lease_runs_out(self, store):
+        """Test that one owner holds a claimed item until its lease expires"""
+        store.put(("jobs",), "j", {"query": "q"}, index=False)
+
+        item = store.claim(("jobs",), "j", "w1", lease_s=60)
+        assert item.value["query"] == "q" and item.value["claimed_by"] == "w1"
+        assert store.claim(("jobs",), "j", "w2", lease_s=60) is None
+        assert store.claim(("jobs",), "j", "w1", lease_s=0) is not None
+
+        time.sleep(0.01)
+        assert store.claim(("jobs",), "j", "w2", lease_s=60).value["claimed_by"] == "w2"
+        assert store.claim(("jobs",), "missing", "w1", lease_s=60) is None
+
+    def test_update_fields_changes_only_named_fields(self, store):
+        """Test that field updates add to counters and keep the rest of the value"""
+        store.put(("lessons",), "a", {"lesson": "cite sources", "helpful": 2})
+
+        updated = store.update_fields(
+            [(("lessons",), "a"), (("lessons",), "missing")],
+            set_fields={"last_recalled": "now", "flags": [True]},
+            add={"helpful": 1, "recall_count": 1},
+        )
+
+        assert updated == 1
+        assert store.get(("lessons",), "a").value == {
+            "lesson": "cite sources",
+            "helpful": 3,
+            "recall_count": 1,
+            "last_recalled": "now",
+            "flags": [True],
+        }
+        assert store.search(("lessons",), query="cite sources")[0].key == "a"
+        with pytest.raises(ValueError):
+            store.update_fields([(("lessons",), "a")], add={"a'b": 1})
+
+    def test_concurrent_counter_updates_all_land(self, store, tmp_path):
+        """Test that increments from several connections to one file aren't lost"""
+        store.put(("lessons",), "a", {"lesson": "cite sources"}, index=False)
+        others = [SqliteStore(str(tmp_path / "store.db")) for _ in range(3)]
+
+        def bump(target):
+            for _ in range(20):
+                target.update_fields([(("lessons",), "a")], add={"helpful": 1})
+
+        threads = [threading.Thread(target=bump, args=(s,)) for s in [store, *others]]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for other in others:
+            other.close()
+
+        assert store.get(("lessons",), "a").value["helpful"] == 80
+
+    def test_update_keeps_created_at(self, store):
+        """Test that overwriting an item keeps its creation time"""
+        store.put(("lessons",), "a", {"lesson": "first"})
+        created = store.get(("lessons",), "a").created_at
+
+        store.put(("lessons",), "a", {"lesson": "second"})
+        item = store.get(("lessons",), "a")
+
+        assert item.value["lesson"] == "second"
+        assert item.created_at == created
+
+    def test_does_not_touch_disk_until_used(self, tmp_path):
+        """Test that constructing the store doesn't create the database file"""
+        path = tmp_path / "nested" / "store.db"
+        store = SqliteStore(str(path))
+        assert not path.exists()
+
+        store.put(("answers",), "k", {"answer": "x"})
+        assert path.exists()
+        store.close()
+
+    def test_wal_mode(self, store):
+        """Test that the database runs in WAL mode"""
+        mode = store.conn.execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode == "wal"
+
+    @pytest.mark.asyncio
+    async def test_semantic_search_ranks_by_similarity(self, store):
+        """Test that search with a query ranks the most similar lesson first"""
+        await store.aput(("lessons",), "1", {"lesson": "compare prices across vendors"})
+        await store.aput(("lessons",), "2", {"lesson": "check the release date"})
+        await store.aput(("lessons",), "3", {"lesson": "cite every source inline"})
+
+        results = await store.asearch(("lessons",), query="cite every source", limit=2)
+
+        assert len(results) == 2
+        assert results[0].key == "3"
+        assert results[0].score >= results[1].score
+
+    @pytest.mark.asyncio
+    async def test_search_filter_and_offset(self, store):
+        """Test that filters and offset apply to ranked results"""
+        for i in range(5):
+            await store.aput(
+                ("lessons",), str(i), {"lesson": f"lesson {i}", "tag": i % 2}
+            )
+
+        results = await store.asearch(
+            ("lessons",), query="lesson", filter={"tag": 0}, limit=10
+        )
+        assert sorted(r.key for r in results) == ["0", "2", "4"]
+
+        paged = await store.asearch(("lessons",), query="lesson", limit=2, offset=1)
+        assert len(paged) == 2
+
+    @pytest.mark.asyncio
+    async def test_search_without_query_lists_newest_first(self, store):
+        """Test that search without a query returns items by recency"""
+        await store.aput(("lessons",), "old", {"lesson": "old"})
+        await store.aput(("lessons",), "new", {"lesson": "new"})
+
+        results = await store.asearch(("lessons",))
+
+        assert [r.key for r in results] == ["new", "old"]
+
+    @pytest.mark.asyncio
+    async def test_unindexed_items_still_returned(self, store):
+        """Test that items stored with index=False still show up after scored ones"""
+        await store.aput(("lessons",), "plain", {"lesson": "no vector"}, index=False)
+        await store.aput(("lessons",), "vec", {"lesson": "has vector"})
+
+        results = await store.asearch(("lessons",), query="vector")
+
+        assert [r.key for r in results] == ["vec", "plain"]
+        assert results[1].score is None
+
+    @pytest.mark.asyncio
+    async def test_embedding_failure_stores_item_unindexed(self, tmp_path):
+        """Test that a failing embedder doesn't lose the write"""
+
+        def broken_embed(texts):
+            raise RuntimeError("embedding service down")
+
+        store = SqliteStore(
+            str(tmp_path / "store.db"), index={"dims": 4, "embed": broken_embed}
+        )
+        await store.aput(("lessons",), "a", {"lesson": "kept"})
+
+        item = await store.aget(("lessons",), "a")
+        assert item.value["lesson"] == "kept"
+        store.close()
+
+    def test_batched_puts_keep_last_write(self, store):
+        """Test that duplicate puts in one batch resolve to the last value"""
+        store.batch(
+            [
+                PutOp(("lessons",), "a", {"lesson": "first"}),
+                PutOp(("lessons",), "a", {"lesson": "second"}),
+            ]
+        )
+
+        assert store.get(("lessons",), "a").value["lesson"] == "second"
+
+    def test_list_namespaces(self, store):
+        """Test namespace listing with prefix and depth"""
+        store.put(("lessons",), "a", {"lesson": "x"})
+        store.put(("lessons", "tenant"), "b", {"lesson": "y"})
+        store.put(("answers",), "c", {"answer": "z"})
+
+        assert store.list_namespaces() == [
+            ("answers",),
+            ("lessons",),
+            ("lessons", "tenant"),
+        ]
+        assert store.list_namespaces(prefix=("lessons",), max_depth=1) == [("lessons",)]
+
+    def test_search_includes_sub_namespaces(self, store):
+        """Test that a namespace prefix matches nested namespaces but not siblings"""
+        store.put(("lessons", "tenant"), "a", {"lesson": "nested"})
+        store.put(("lessons2",), "b", {"lesson": "sibling"})
+
+        results = store.search(("lessons",))
+
+        assert [r.key for r in results] == ["a"]
+
+    def test_persists_across_reopen(self, tmp_path):
+        """Test that lessons survive closing and reopening the store"""
+        path = str(tmp_path / "store.db")
+        index = {"dims": 32, "embed": fake_embed, "fields": ["lesson"]}
+
+        first = SqliteStore(path, index=index)
+        first.put(("lessons",), "a", {"lesson": "verify numbers twice"})
+        first.close()
+
+        second = SqliteStore(path, index=index)
+        results = second.search(("lessons",), query="verify numbers")
+        assert results[0].key == "a"
+        assert results[0].score > 0
+        second.close()
+
+    def test_sees_writes_from_other_connections(self, store):
+        """Test that cached vectors are refreshed after another process writes"""
+        store.put(("lessons",), "a", {"lesson": "alpha beta"})
+        assert len(store.search(("lessons",), query="alpha")) == 1
+
+        other = sqlite3.connect(store.path)
+        other.execute("DELETE FROM items")
+        other.execute("DELETE FROM vectors")
+        other.commit()
+        other.close()
+
+        assert store.search(("lessons",), query="alpha") == []
+
+    @pytest.mark.asyncio
+    async def test_lesson_round_trip(self, store):
+        """Test save_lesson and recall_notes against the SQLite store"""
+        await save_lesson(store, "Always cross-check statistics", "stats query")
+        await save_lesson(store, "Prefer primary sources", "sources query")
+
+        notes = await recall_notes(store, "cross-check statistics", limit=1)
+
+        assert notes == ["Always cross-check statistics"]
+        assert (await store.asearch(LESSON_NAMESPACE, limit=10)) != []
+
+    @pytest.mark.asyncio
+    async def test_tenant_recall_only_loads_own_partition(self, store):
+        """Test that a tenant's recall searches its own index plus the shared tier"""
+        acme = lesson_namespace("acme", "research")
+        globex = lesson_namespace("globex")
+        await save_lesson(store, "Check acme filings", "q", namespace=acme)
+        await save_lesson(store, "Check globex filings", "q", namespace=globex)
+        await save_lesson(store, "Check shared filings", "q")
+        store._indexes.clear()
+
+        notes = await recall_notes(store, "check filings", limit=5, namespace=acme)
+
+        assert sorted(notes) == ["Check acme filings", "Check shared filings"]
+        assert set(store._indexes) == {"tenants.acme.research.lessons", "lessons"}
+
+
+def clustered(count, dims=16, topics=8, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((topics, dims))
+    vectors = centres[rng.integers(0, topics, count)] + 0.1 * rng.standard_normal(
+        (count, dims)
+    )
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+class TestIVFIndex:
+    """Test cases for the IVF approximate nearest-neighbour index"""
+
+    def test_candidates_cover_true_neighbours(self):
+        """Test that probing a few clusters finds the exact nearest neighbours"""
+        matrix = clustered(2000)
+        ann = IVFIndex.train(matrix, nlist=16)
+        ann.build(ann.assign(matrix))
+
+        hits = 0
+        for row in range(0, 2000, 100):
+            exact = set(np.argsort(-(matrix @ matrix[row]))[:5].tolist())
+            hits += len(exact & set(ann.candidates(matrix[row], 4).tolist()))
+
+        assert hits / (20 * 5) >= 0.9
+
+    def test_add_and_round_trip(self):
+        """Test incremental adds and centroid serialisation"""
+        matrix = clustered(500)
+        ann = IVFIndex.train(matrix, nlist=8)
+        ann.build(ann.assign(matrix[:400]))
+
+        label = int(ann.assign(matrix[400])[0])
+        ann.add(400, label)
+        assert 400 in ann.candidates(matrix[400], 1).tolist()
+
+        restored = IVFIndex.from_bytes(ann.to_bytes(), ann.dims, ann.trained_count)
+        assert np.array_equal(restored.centroids, ann.centroids)
+        assert restored.trained_count == 500
+
+
+class TestSqliteStoreANN:
+    """Test cases for ANN search inside SqliteStore"""
+
+    @pytest.fixture
+    def vectors(self):
+        return clustered(300)
+
+    def make_store(self, path, vectors):
+        def embed(texts):
+            # "v12" embeds to vectors[12]; anything else to vectors[0]
+            return [
+                vectors[int(t[1:])].tolist() if t[1:].isdigit() else vectors[0].tolist()
+                for t in texts
+            ]
+
+        return SqliteStore(
+            path,
+            index={"dims": 16, "embed": embed, "fields": ["lesson"]},
+            ann_min_vectors=200,
+            ann_nprobe=4,
+        )
+
+    def fill(self, store, count):
+        store.batch(
+            [PutOp(("lessons",), str(i), {"lesson": f"v{i}"}) for i in range(count)]
+        )
+
+    def test_trains_and_finds_exact_match(self, tmp_path, vectors):
+        """Test that the index is trained past the threshold and still ranks correctly"""
+        store = self.make_store(str(tmp_path / "store.db"), vectors)
+        self.fill(store, 250)
+
+        results = store.search(("lessons",), query="v42", limit=3)
+
+        assert results[0].key == "42"
+        assert store._indexes["lessons"].ann is not None
+        assert store.conn.execute("SELECT COUNT(*) FROM ann_index").fetchone()[0] == 1
+        store.close()
+
+    def test_below_threshold_stays_exact(self, tmp_path, vectors):
+        """Test that small namespaces are not indexed"""
+        store = self.make_store(str(tmp_path / "store.db"), vectors)
+        self.fill(store, 50)
+
+        store.search(("lessons",), query="v1")
+
+        assert store._indexes["lessons"].ann is None
+        store.close()
+
+    def test_incremental_insert_and_delete(self, tmp_path, vectors):
+        """Test that puts after training are assigned a cluster and deletes disappear"""
+        store = self.make_store(str(tmp_path / "store.db"), vectors)
+        self.fill(store, 250)
+        store.search(("lessons",), query="v1")
+
+        store.put(("lessons",), "new", {"lesson": "v260"})
+        list_id = store.conn.execute(
+            "SELECT list_id FROM vectors WHERE key = 'new'"
+        ).fetchone()[0]
+        assert list_id is not None
+        assert store.search(("lessons",), query="v260", limit=1)[0].key == "new"
+
+        store.delete(("lessons",), "42")
+        keys = [r.key for r in store.search(("lessons",), query="v42", limit=5)]
+        assert "42" not in keys
+        store.close()
+
+    def test_index_persists_across_reopen(self, tmp_path, vectors):
+        """Test that reopening reuses the trained centroids instead of retraining"""
+        path = str(tmp_path / "store.db")
+        first = self.make_store(path, vectors)
+        self.fill(first, 250)
+        first.search(("lessons",), query="v1")
+        centroids = first._indexes["lessons"].ann.centroids.copy()
+        first.close()
+
+        second = self.make_store(path, vectors)
+        results = second.search(("lessons",), query="v7", limit=1)
+
+        assert results[0].key == "7"
+        assert np.array_equal(second._indexes["lessons"].ann.centroids, centroids)
+        second.close()
+
+    def test_failed_label_save_rolls_back(self, tmp_path, vectors):
+        """Test that a failed cluster-id write doesn't leave the transaction open"""
+        store = self.make_store(str(tmp_path / "store.db"), vectors)
+        self.fill(store, 250)
+        store.search(("lessons",), query="v1")
+        index = store._indexes["lessons"]
+        before = store.conn.execute("SELECT key, list_id FROM vectors").fetchall()
+
+        with patch.object(
+            SqliteStore, "_bump_versions", side_effect=sqlite3.OperationalError("full")
+        ):
+            with pytest.raises(sqlite3.OperationalError):
+                store._save_labels("lessons", index, [0, 1], [99, 99])
+
+        assert not store.conn.in_transaction
+        assert (
+            store.conn.execute("SELECT key, list_id FROM vectors").fetchall() == before
+        )
+        store.put(("lessons",), "after", {"lesson": "v3"})
+        store.close()
+
+
+class TestSqliteStoreLexical:
+    """Test cases for keyword (FTS5) search inside SqliteStore"""
+
+    def test_ranks_by_keywords_without_embedding(self, tmp_path):
+        """Test that keyword search finds matching lessons and never embeds"""
+        calls = []
+
+        def embed(texts):
+            calls.append(texts)
+            return fake_embed(texts)
+
+        store = SqliteStore(
+            str(tmp_path / "store.db"),
+            index={"dims": 32, "embed": embed, "fields": ["lesson"]},
+        )
+        store.put(("lessons",), "a", {"lesson": "Always cite primary sources"})
+        store.put(("lessons",), "b", {"lesson": "Prefer recent benchmark results"})
+        calls.clear()
+
+        results = store.lexical_search(("lessons",), "which sources to cite?")
+
+        assert [r.key for r in results] == ["a"]
+        assert results[0].score > 0
+        assert not calls
+        store.close()
+
+    def test_index_follows_updates_and_deletes(self, store):
+        """Test that the keyword index is maintained on every write"""
+        store.put(("lessons",), "a", {"lesson": "cite sources"})
+        store.put(("lessons",), "a", {"lesson": "check dates"})
+
+        assert store.lexical_search(("lessons",), "sources") == []
+        assert [r.key for r in store.lexical_search(("lessons",), "dates")] == ["a"]
+
+        # Usage updates without re-indexing keep the item searchable
+        store.put(("lessons",), "a", {"lesson": "check dates", "hits": 1}, index=False)
+        assert [r.key for r in store.lexical_search(("lessons",), "dates")] == ["a"]
+
+        store.delete(("lessons",), "a")
+        assert store.lexical_search(("lessons",), "dates") == []
+
+    def test_namespace_isolation(self, store):
+        """Test that a namespace's search never returns other namespaces' items"""
+        store.put(("lessons",), "shared", {"lesson": "cite sources"})
+        store.put(
+            lesson_namespace("acme", "x"), "own", {"lesson": "cite sources often"}
+        )
+        store.put(lesson_namespace("acme2", "x"), "other", {"lesson": "cite sources"})
+
+        own = store.lexical_search(lesson_namespace("acme", "x"), "sources")
+        shared = store.lexical_search(("lessons",), "sources")
+
+        assert [r.key for r in own] == ["own"]
+        assert [r.key for r in shared] == ["shared"]
+
+    def test_common_terms_skipped_when_rarer_terms_match(self, store, monkeypatch):
+        """Test that very common query terms don't drag in every item"""
+        monkeypatch.setattr("src.store.sqlite_store._COMMON_TERM_DOCS", 2)
+        for i in range(5):
+            store.put(("lessons",), str(i), {"lesson": f"search tip {i}"})
+        store.put(("lessons",), "dates", {"lesson": "search for dates"})
+
+        assert [r.key for r in store.lexical_search(("lessons",), "search dates")] == [
+            "dates"
+        ]
+        # Only common terms: still searched
+        assert len(store.lexical_search(("lessons",), "search", limit=10)) == 6
+
+    def test_backfills_existing_store(self, tmp_path):
+        """Test that a store written before the keyword index existed is indexed on open"""
+        path = str(tmp_path / "store.db")
+        first = SqliteStore(
+            path, index={"dims": 32, "embed": fake_embed, "fields": ["lesson"]}
+        )
+        first.put(("lessons",), "a", {"lesson": "cite sources"})
+        first.conn.execute("DROP TABLE lexical")
+        first.close()
+
+        second = SqliteStore(
+            path, index={"dims": 32, "embed": fake_embed, "fields": ["lesson"]}
+        )
+        assert [r.key for r in second.lexical_search(("lessons",), "sources")] == ["a"]
+        second.close()
+
+
+class TestSnapshot:
+    """Test cases for memory-mapped, quantized store snapshots"""
+
+    @pytest.fixture
+    def vectors(self):
+        # Unclustered, so neighbours aren't near-ties that any rounding reorders
+        vectors = np.random.default_rng(0).standard_normal((600, 32))
+        return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(
+            np.float32
+        )
+
+    def make_store(self, path, vectors, **kwargs):
+        def embed(texts):
+            return [vectors[int(t[1:]) % len(vectors)].tolist() for t in texts]
+
+        return SqliteStore(
+            path, index={"dims": 32, "embed": embed, "fields": ["lesson"]}, **kwargs
+        )
+
+    def fill(self, store, count):
+        store.batch(
+            [PutOp(("lessons",), str(i), {"lesson": f"v{i}"}) for i in range(count)]
+        )
+
+    @pytest.mark.parametrize("dtype", ["int8", "float16"])
+    def test_quantize_round_trip(self, vectors, dtype):
+        """Test that quantized rows stay close to the originals"""
+        data, scales = quantize(vectors, dtype)
+        restored = np.asarray(QuantizedMatrix(data, scales))
+
+        assert restored.dtype == np.float32
+        assert np.abs(restored - vectors).max() < 0.01
+
+    @pytest.mark.parametrize("dtype", ["int8", "float16"])
+    def test_recall_parity_with_full_precision(self, tmp_path, vectors, dtype):
+        """Test that a snapshot-backed store ranks like the full-precision index"""
+        path = str(tmp_path / "store.db")
+        full = self.make_store(path, vectors)
+        self.fill(full, 600)
+        build_snapshot(full, tmp_path / "snapshot", dtype=dtype)
+
+        mapped = self.make_store(
+            path, vectors, snapshot_path=str(tmp_path / "snapshot")
+        )
+        overlap = []
+        for i in range(0, 600, 12):
+            expected = [
+                r.key for r in full.search(("lessons",), query=f"v{i}", limit=10)
+            ]
+            got = [r.key for r in mapped.search(("lessons",), query=f"v{i}", limit=10)]
+            assert got[0] == expected[0] == str(i)
+            overlap.append(len(set(got) & set(expected)) / 10)
+
+        assert isinstance(mapped._indexes["lessons"].matrix, QuantizedMatrix)
+        assert np.mean(overlap) >= 0.95
+        full.close()
+        mapped.close()
+
+    def test_stale_snapshot_falls_back_to_sqlite(self, tmp_path, vectors):
+        """Test that a snapshot is ignored once the namespace has changed"""
+        path = str(tmp_path / "store.db")
+        store = self.make_store(path, vectors)
+        self.fill(store, 50)
+        build_snapshot(store, tmp_path / "snapshot")
+        store.put(("lessons",), "new", {"lesson": "v99"})
+        store.close()
+
+        reopened = self.make_store(
+            path, vectors, snapshot_path=str(tmp_path / "snapshot")
+        )
+        results = reopened.search(("lessons",), query="v99", limit=1)
+
+        assert results[0].key == "new"
+        assert isinstance(reopened._indexes["lessons"].matrix, np.ndarray)
+        reopened.close()
+
+    def test_usage_updates_keep_snapshot_current(self, tmp_path, vectors):
+        """Test that writes which don't touch embeddings keep the snapshot in use"""
+        path = str(tmp_path / "store.db")
+        store = self.make_store(path, vectors)
+        self.fill(store, 50)
+        build_snapshot(store, tmp_path / "snapshot")
+        store.put(("lessons",), "3", {"lesson": "v3", "recall_count": 1}, index=False)
+        store.close()
+
+        reopened = self.make_store(
+            path, vectors, snapshot_path=str(tmp_path / "snapshot")
+        )
+        assert reopened.search(("lessons",), query="v3", limit=1)[0].key == "3"
+        assert isinstance(reopened._indexes["lessons"].matrix, QuantizedMatrix)
+
+        # Writing through a mapped index copies it first
+        reopened.put(("lessons",), "3", {"lesson": "v7"})
+        assert reopened.search(("lessons",), query="v7", limit=2)[0].key in {"3", "7"}
+        assert isinstance(reopened._indexes["lessons"].matrix, np.ndarray)
+        reopened.close()
+
+    def test_rebuilt_in_background_once_behind(self, tmp_path, vectors):
+        """Test that enough lesson writes rebuild an existing snapshot"""
+        snapshot_path = tmp_path / "snapshot"
+        store = self.make_store(
+            str(tmp_path / "store.db"),
+            vectors,
+            snapshot_path=str(snapshot_path),
+            snapshot_rebuild_writes=3,
+        )
+        self.fill(store, 50)
+        build_snapshot(store, snapshot_path, dtype="float16")
+
+        for i in range(2):
+            store.put(("lessons",), f"new{i}", {"lesson": f"v{60 + i}"})
+            store.put(("lessons",), "3", {"lesson": "v3", "uses": i}, index=False)
+        assert store._rebuild is None
+
+        store.put(("lessons",), "new2", {"lesson": "v62"})
+        store._rebuild.join()
+
+        rebuilt = LessonSnapshot.open(snapshot_path)
+        assert rebuilt.versions["lessons"] == store._vector_version("lessons")
+        assert rebuilt.dtype == "float16"
+        assert len(rebuilt.load("lessons").keys) == 53
+        rebuilt.close()
+        store.close()
+
+    def test_snapshot_keeps_ann_clusters(self, tmp_path, vectors):
+        """Test that ANN cluster ids come from the snapshot instead of reassignment"""
+        path = str(tmp_path / "store.db")
+        store = self.make_store(path, vectors, ann_min_vectors=200, ann_nprobe=4)
+        self.fill(store, 600)
+        store.search(("lessons",), query="v1")
+        build_snapshot(store, tmp_path / "snapshot")
+        store.close()
+
+        reopened = self.make_store(
+            path,
+            vectors,
+            ann_min_vectors=200,
+            ann_nprobe=4,
+            snapshot_path=str(tmp_path / "snapshot"),
+        )
+        assert reopened.search(("lessons",), query="v42", limit=1)[0].key == "42"
+        index = reopened._indexes["lessons"]
+        assert index.ann is not None
+        assert isinstance(index.matrix, QuantizedMatrix)
+        reopened.close()
@@ -0,0 +1,193 @@
+"""
+Tests for the search-branch task queue, its workers and search_web on an executor
+"""
+
+import asyncio
+import os
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from src.nodes import search_nodes
+from src.tasks import SqliteTaskQueue, create_executor, task_key
+from src.tasks.worker import LocalWorkers, run_worker
+
+HANDLER = "tests.test_tasks:fake_branch"
+
+
+async def fake_branch(query, degradations):
+    """Branch handler run by the workers; "straggler" hangs on its first attempt."""
+    if query == "broken":
+        raise RuntimeError("scraper crashed")
+    if query == "straggler":
+        marker = Path(os.environ["TASKS_TEST_DIR"]) / "straggler"
+        if not marker.exists():
+            marker.touch()
+            await asyncio.sleep(60)
+    return {
+        "question": query,
+        "results": [
+            {"title": f"{query} result", "url": f"https://example.com/{query}"}
+        ],
+        "worker_pid": os.getpid(),
+        "degradations": degradations,
+    }
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = SqliteTaskQueue(
+        str(tmp_path / "tasks.db"), lease_s=30, timeout_s=10, poll_s=0.02
+    )
+    yield queue
+    queue.close()
+
+
+class TestSqliteTaskQueue:
+    """Test cases for the SQLite task queue"""
+
+    def test_task_key(self):
+        """Test that keys depend on the thread, question and degradations only"""
+        key = task_key("t1", "q", ["basic_search", "skip_relevance"])
+        assert key == task_key("t1", "q", ["skip_relevance", "basic_search"])
+        assert key != task_key("t2", "q", ["basic_search", "skip_relevance"])
+        assert key != task_key("t1", "q", [])
+
+    def test_submit_is_idempotent(self, queue):
+        """Test that a queued or finished key is not queued again"""
+        assert queue.submit("k", {"query": "q"})
+        assert not queue.submit("k", {"query": "q"})
+        assert queue.claim("w1") == ("k", {"query": "q"})
+        assert queue.complete("k", {"results": [1]})
+        assert not queue.submit("k", {"query": "q"})
+        assert queue.get("k")["result"] == {"results": [1]}
+
+    def test_empty_results_are_searched_again(self, queue):
+        """Test that a finished task without results is not reused"""
+        for key, result in (("empty", {"results": []}), ("error", {"error": "down"})):
+            queue.submit(key, {"query": "q"})
+            queue.claim("w1")
+            queue.complete(key, result)
+            assert queue.submit(key, {"query": "q"})
+            assert queue.get(key)["status"] == "pending"
+
+    def test_expired_lease_is_redispatched(self, queue):
+        """Test that a straggler's task goes to another worker and the first result wins"""
+        queue.lease_s = 0.05
+        queue.submit("k", {"query": "q"})
+        assert queue.claim("w1") is not None
+        assert queue.claim("w2") is None
+
+        time.sleep(0.1)
+        assert queue.claim("w2") == ("k", {"query": "q"})
+        assert queue.complete("k", {"by": "w2"})
+        assert not queue.complete("k", {"by": "w1"})
+        task = queue.get("k")
+        assert task["result"] == {"by": "w2"} and task["attempts"] == 2
+
+    def test_failures_retry_then_give_up(self, queue):
+        """Test that failed attempts are retried up to max_attempts, then requeued on submit"""
+        queue.max_attempts = 2
+        queue.submit("k", {"query": "q"})
+        queue.claim("w1")
+        queue.fail("k", "w1", "boom")
+        assert queue.get("k")["status"] == "pending"
+        queue.claim("w1")
+        queue.fail("k", "w1", "boom again")
+        assert queue.get("k")["status"] == "failed"
+        assert queue.claim("w1") is None
+
+        assert queue.submit("k", {"query": "q"})
+        assert queue.get("k")["status"] == "pending"
+
+    def test_stale_worker_cannot_fail_reclaimed_task(self, queue):
+        """Test that a straggler's failure leaves a task another worker reclaimed alone"""
+        queue.lease_s = 0.05
+        queue.submit("k", {"query": "q"})
+        assert queue.claim("w1") is not None
+
+        time.sleep(0.1)
+        assert queue.claim("w2") is not None
+        assert not queue.fail("k", "w1", "too late")
+        task = queue.get("k")
+        assert task["status"] == "running" and task["worker"] == "w2"
+        assert task["error"] is None
+        assert queue.claim("w3") is None
+
+        assert queue.complete("k", {"by": "w2"})
+
+    def test_prune_keeps_unfinished_tasks(self, queue):
+        """Test that prune only deletes finished tasks"""
+        queue.submit("done", {})
+        queue.claim("w1")
+        queue.complete("done", {})
+        queue.submit("pending", {})
+
+        assert queue.prune(0) == 1
+        assert queue.stats() == {"pending": 1}
+
+    @pytest.mark.asyncio
+    async def test_run_times_out_without_workers(self, queue):
+        """Test that a branch nobody works on fails after timeout_s"""
+        queue.timeout_s = 0.1
+        with pytest.raises(TimeoutError):
+            await queue.run("k", {"query": "q"})
+
+    def test_create_executor(self, tmp_path):
+        """Test executor selection by name"""
+        assert create_executor("inline") is None
+        with patch("src.config.SEARCH_TASK_DB", str(tmp_path / "t.db")):
+            assert isinstance(create_executor("sqlite"), SqliteTaskQueue)
+        with pytest.raises(ValueError):
+            create_executor("redis")
+
+
+class TestSearchWorkers:
+    """Test cases for search_web running its branches on workers"""
+
+    @pytest.mark.asyncio
+    async def test_search_web_collects_worker_results(self, queue):
+        """Test that worker results land in search_results and sources"""
+        stop = asyncio.Event()
+        worker = asyncio.create_task(
+            run_worker(queue, concurrency=4, handler_ref=HANDLER, stop=stop)
+        )
+        try:
+            with patch.object(search_nodes, "get_search_executor", return_value=queue):
+                updates = await asyncio.gather(
+                    *(
+                        search_nodes.search_web({"query": query})
+                        for query in ("q1", "q2", "broken")
+                    )
+                )
+        finally:
+            stop.set()
+            await worker
+
+        assert updates[0]["search_results"][0]["question"] == "q1"
+        assert updates[1]["sources"] == [
+            {"title": "q2 result", "url": "https://example.com/q2"}
+        ]
+        assert "scraper crashed" in updates[2]["search_results"][0]["error"]
+        assert updates[2]["sources"] == []
+        assert queue.stats() == {"done": 2, "failed": 1}
+
+    @pytest.mark.asyncio
+    async def test_straggler_redispatched_to_another_process(
+        self, queue, tmp_path, monkeypatch
+    ):
+        """Test that a hung worker's task is finished by another worker process"""
+        monkeypatch.setenv("TASKS_TEST_DIR", str(tmp_path))
+        queue.lease_s = 1.0
+        queue.timeout_s = 60
+        with LocalWorkers(queue, workers=2, concurrency=1, handler_ref=HANDLER):
+            result = await queue.run(
+                task_key("t", "straggler", []),
+                {"query": "straggler", "degradations": []},
+            )
+
+        assert result["question"] == "straggler"
+        assert result["worker_pid"] != os.getpid()
+        assert queue.get(task_key("t", "straggler", []))["attempts"] == 2
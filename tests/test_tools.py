@@ -2,8 +2,61 @@
 Tests for search tools
 """
 
-from unittest.mock import patch
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from langgraph.store.memory import InMemoryStore
 from src.tools.search_tool import search_tavily, _extract_results
+from src.tools.answer_cache import (
+    ANSWER_NAMESPACE,
+    answer_key,
+    answer_namespace,
+    is_reusable_run,
+    lookup_answer,
+    save_answer,
+)
+from datetime import datetime, timedelta, timezone
+import asyncio
+import time
+from langgraph.store.base import SearchItem
+from src.store.lexical import lexical_search
+from src.tools.consult_note import (
+    LESSON_NAMESPACE,
+    LESSON_TEXT_FIELDS,
+    fuse_rankings,
+    get_lesson_namespace,
+    lesson_namespace,
+    rank_lessons,
+    recall_lessons,
+    recall_notes,
+    record_lesson_outcome,
+    save_lesson,
+)
+from src.tools.learning_queue import (
+    LEARNING_QUEUE_NAMESPACE,
+    BatchedLesson,
+    LessonBatch,
+    drain_learning_queue,
+    enqueue_learning,
+    pending_jobs,
+    plan_changed,
+)
+from src.tools.lesson_consolidation import (
+    MergedLessons,
+    consolidate_lessons,
+    evict_lessons,
+    schedule_consolidation,
+)
+
+
+@pytest.fixture(autouse=True)
+def hash_embeddings():
+    """Recall consults the shared embedding service: make it the offline one."""
+    with (
+        patch("src.config.EMBEDDING_BACKEND", "hash"),
+        patch("src.config.EMBEDDING_CACHE_PATH", ""),
+        patch("src.embeddings.service._service", None),
+    ):
+        yield
 
 
 class TestExtractResults:
@@ -144,3 +197,644 @@ class TestSearchTavily:
         assert isinstance(result, list)
         assert len(result) == 1
         assert "Some unexpected string response" in result[0]["content"]
+
+
+class TestAnswerCache:
+    """Test cases for the cached-answer store helpers"""
+
+    def test_answer_key_normalises_query(self):
+        """Test that trivially different phrasings share a key"""
+        assert answer_key("What is AI?") == answer_key("  what is   ai ")
+        assert answer_key("What is AI?") != answer_key("What is ML?")
+
+    @pytest.mark.asyncio
+    async def test_save_and_lookup(self):
+        """Test that saved answers can be looked up again"""
+        store = InMemoryStore()
+
+        assert await lookup_answer(store, "What is AI?") is None
+        assert await save_answer(store, "What is AI?", "AI is ...")
+        assert await lookup_answer(store, "what is ai") == "AI is ..."
+
+    @pytest.mark.asyncio
+    async def test_no_store(self):
+        """Test that missing store is handled gracefully"""
+        assert await lookup_answer(None, "q") is None
+        assert not await save_answer(None, "q", "a")
+
+    @pytest.mark.asyncio
+    @patch("src.config.ANSWER_CACHE_TTL_HOURS", 1.0)
+    async def test_expired_answers_are_dropped(self):
+        """Test that answers older than the TTL miss and are deleted"""
+        store = InMemoryStore()
+        await save_answer(store, "What is AI?", "AI is ...")
+
+        with patch("src.tools.answer_cache.time.time", return_value=time.time() + 7200):
+            assert await lookup_answer(store, "What is AI?") is None
+        assert await store.aget(ANSWER_NAMESPACE, answer_key("What is AI?")) is None
+
+    @pytest.mark.asyncio
+    async def test_fresh_queries_are_not_cached(self):
+        """Test that queries about recent events always go to search"""
+        store = InMemoryStore()
+
+        assert not await save_answer(store, "Latest AI news today", "...")
+        await store.aput(
+            ANSWER_NAMESPACE,
+            answer_key("Latest AI news today"),
+            {"answer": "stale", "cached_at": time.time()},
+        )
+        assert await lookup_answer(store, "Latest AI news today") is None
+
+    @pytest.mark.asyncio
+    async def test_answers_are_scoped_by_tenant(self):
+        """Test that one tenant's answers are not served to another"""
+        store = InMemoryStore()
+        acme = answer_namespace("acme", "web")
+        await save_answer(store, "What is AI?", "Acme's answer", namespace=acme)
+
+        assert acme == ("tenants", "acme", "web", "answers")
+        assert await lookup_answer(store, "What is AI?", namespace=acme)
+        assert await lookup_answer(store, "What is AI?") is None
+        assert (
+            await lookup_answer(
+                store, "What is AI?", namespace=answer_namespace("other")
+            )
+            is None
+        )
+
+    def test_runs_amended_by_feedback_are_not_reusable(self):
+        """Test that an answer to a plan changed by human feedback isn't reused"""
+        plan_a = "1. What is AI?\n2. History of AI"
+        approved = "### Human Feedback:\nlooks good\n\n" + plan_a
+        amended = "### Human Feedback:\nadd pricing\n\n1. What is AI?\n2. AI pricing"
+
+        assert is_reusable_run({})
+        assert is_reusable_run({"plan_a": plan_a, "plan_b": approved})
+        assert not is_reusable_run({"plan_a": plan_a, "plan_b": amended})
+
+
+async def topic_embed(texts):
+    """Lessons about citations share one direction, everything else another."""
+    return [[1.0, 0.0] if "cite" in t.lower() else [0.0, 1.0] for t in texts]
+
+
+class TestLessonConsolidation:
+    """Test cases for background lesson consolidation"""
+
+    async def lessons(self, store):
+        return {
+            item.key: item.value
+            for item in await store.asearch(LESSON_NAMESPACE, limit=100)
+        }
+
+    @pytest.mark.asyncio
+    @patch("src.tools.lesson_consolidation.aembed_texts", side_effect=topic_embed)
+    async def test_merges_near_duplicates(self, mock_embed):
+        """Test that similar lessons collapse into one with a support count"""
+        store = InMemoryStore()
+        await save_lesson(store, "Always cite sources", "query one", lesson_id="a")
+        await save_lesson(store, "Cite every source inline", "query two", lesson_id="b")
+        await save_lesson(store, "Check the publication date", "query three")
+
+        stats = await consolidate_lessons(store, threshold=0.9)
+
+        lessons = await self.lessons(store)
+        assert len(lessons) == 2
+        assert lessons["a"]["support"] == 2
+        assert lessons["a"]["task_queries"] == ["query one", "query two"]
+        assert all(v["consolidated"] for v in lessons.values())
+        assert stats == {"examined": 3, "merged": 1, "canonical": 2}
+
+    @pytest.mark.asyncio
+    @patch("src.tools.lesson_consolidation.aembed_texts", side_effect=topic_embed)
+    async def test_incremental(self, mock_embed):
+        """Test that a second pass only looks at lessons saved since the first"""
+        store = InMemoryStore()
+        await save_lesson(store, "Always cite sources", "q1", lesson_id="a")
+        await consolidate_lessons(store, threshold=0.9)
+
+        assert (await consolidate_lessons(store, threshold=0.9))["examined"] == 0
+
+        await save_lesson(store, "Cite sources for numbers", "q2")
+        stats = await consolidate_lessons(store, threshold=0.9)
+
+        assert stats == {"examined": 1, "merged": 1, "canonical": 0}
+        assert (await self.lessons(store))["a"]["support"] == 2
+
+    @pytest.mark.asyncio
+    @patch("src.tools.lesson_consolidation.aembed_texts", side_effect=topic_embed)
+    async def test_llm_rewrites_clusters_in_one_call(self, mock_embed):
+        """Test that merged clusters are rewritten with a single batched LLM call"""
+        store = InMemoryStore()
+        await save_lesson(store, "Always cite sources", "q1", lesson_id="a")
+        await save_lesson(store, "Cite sources inline", "q2")
+        await save_lesson(store, "Check dates", "q3", lesson_id="c")
+        await save_lesson(store, "Check dates twice", "q4")
+
+        structured = MagicMock()
+        structured.ainvoke = AsyncMock(
+            return_value=MergedLessons(lessons=["Cite sources inline", "Check dates"])
+        )
+        llm = MagicMock()
+        llm.with_structured_output.return_value = structured
+
+        await consolidate_lessons(store, threshold=0.9, llm=llm)
+
+        structured.ainvoke.assert_called_once()
+        lessons = await self.lessons(store)
+        assert lessons["a"]["lesson"] == "Cite sources inline"
+        assert lessons["a"]["support"] == 2
+
+    @pytest.mark.asyncio
+    @patch("src.tools.lesson_consolidation.config")
+    @patch("src.tools.lesson_consolidation.aembed_texts", side_effect=topic_embed)
+    async def test_schedule_runs_in_background(self, mock_embed, mock_config):
+        """Test that scheduling returns immediately and the pass finishes later"""
+        mock_config.LESSON_CONSOLIDATION = True
+        mock_config.LESSON_MERGE_WITH_LLM = False
+        mock_config.LESSON_MERGE_THRESHOLD = 0.9
+        mock_config.LESSON_MAX_COUNT = 0
+        store = InMemoryStore()
+        await save_lesson(store, "Always cite sources", "q1")
+
+        task = schedule_consolidation(store)
+        assert not task.done()
+        await task
+
+        assert all(v["consolidated"] for v in (await self.lessons(store)).values())
+
+        mock_config.LESSON_CONSOLIDATION = False
+        assert schedule_consolidation(store) is None
+
+
+def lesson_item(key, score, age_days=0, **value):
+    updated_at = datetime.now(timezone.utc) - timedelta(days=age_days)
+    return SearchItem(
+        LESSON_NAMESPACE,
+        key,
+        {"lesson": key, **value},
+        updated_at,
+        updated_at,
+        score=score,
+    )
+
+
+class TestLessonRanking:
+    """Test cases for usage-weighted lesson recall and eviction"""
+
+    def test_rank_prefers_useful_recent_lessons(self):
+        """Test that usefulness and recency can outweigh a small similarity gap"""
+        ranked = rank_lessons(
+            [
+                lesson_item("often corrected", 0.82, corrections=6),
+                lesson_item("stale", 0.81, age_days=365),
+                lesson_item("helpful", 0.80, helpful=6),
+            ]
+        )
+
+        assert [item.key for item in ranked] == ["helpful", "often corrected", "stale"]
+
+    def test_similarity_still_dominates(self):
+        """Test that an unrelated lesson is not recalled just for being useful"""
+        ranked = rank_lessons(
+            [lesson_item("unrelated", 0.1, helpful=50), lesson_item("related", 0.9)]
+        )
+
+        assert ranked[0].key == "related"
+
+    @pytest.mark.asyncio
+    async def test_recall_tracks_usage(self):
+        """Test that recalled lessons get their recall count bumped"""
+        store = InMemoryStore()
+        await save_lesson(store, "Always cite sources", "q1", lesson_id="a")
+
+        assert await recall_notes(store, "sources", limit=1) == ["Always cite sources"]
+        await recall_notes(store, "sources", limit=1)
+
+        item = await store.aget(LESSON_NAMESPACE, "a")
+        assert item.value["recall_count"] == 2
+        assert "last_recalled" in item.value
+
+    @pytest.mark.asyncio
+    async def test_record_outcome(self):
+        """Test that plan outcomes are counted per recalled lesson"""
+        store = InMemoryStore()
+        await save_lesson(store, "Always cite sources", "q1", lesson_id="a")
+
+        assert await record_lesson_outcome(store, ["a", "gone"], corrected=False) == 1
+        await record_lesson_outcome(store, ["a"], corrected=True)
+
+        value = (await store.aget(LESSON_NAMESPACE, "a")).value
+        assert (value["helpful"], value["corrections"]) == (1, 1)
+        assert await record_lesson_outcome(None, ["a"], corrected=True) == 0
+
+    @pytest.mark.asyncio
+    async def test_concurrent_usage_updates_keep_every_increment(self, tmp_path):
+        """Test that concurrent recalls and outcomes on SQLite don't lose counts"""
+        from src.store import SqliteStore
+
+        store = SqliteStore(
+            str(tmp_path / "store.db"),
+            index={"dims": 2, "embed": lambda texts: [[1.0, 0.0]] * len(texts)},
+        )
+        await save_lesson(store, "Always cite sources", "q1", lesson_id="a")
+
+        await asyncio.gather(
+            *[record_lesson_outcome(store, ["a"], corrected=False) for _ in range(5)],
+            *[record_lesson_outcome(store, ["a"], corrected=True) for _ in range(3)],
+            *[recall_notes(store, "cite sources", limit=1) for _ in range(4)],
+        )
+
+        value = (await store.aget(LESSON_NAMESPACE, "a")).value
+        assert (value["helpful"], value["corrections"]) == (5, 3)
+        assert value["recall_count"] == 4
+        assert value["lesson"] == "Always cite sources"
+        store.close()
+
+    @pytest.mark.asyncio
+    async def test_evict_unhelpful_lessons(self):
+        """Test that eviction trims the store, dropping corrected lessons first"""
+        store = InMemoryStore()
+        for i in range(10):
+            await save_lesson(store, f"lesson {i}", "q", lesson_id=str(i))
+        await record_lesson_outcome(store, ["0", "1"], corrected=True)
+        await record_lesson_outcome(store, ["5"], corrected=False)
+
+        assert await evict_lessons(store, max_count=20) == 0
+        assert await evict_lessons(store, max_count=0) == 0
+        assert await evict_lessons(store, max_count=9) == 2
+
+        keys = {item.key for item in await store.asearch(LESSON_NAMESPACE, limit=100)}
+        assert len(keys) == 8
+        assert not keys & {"0", "1"}
+
+
+def batch_llm(*results):
+    """Chat model mock whose structured output returns the given results in turn."""
+    structured = MagicMock()
+    structured.ainvoke = AsyncMock(side_effect=list(results))
+    llm = MagicMock()
+    llm.with_structured_output.return_value = structured
+    return llm, structured
+
+
+class TestLearningQueue:
+    """Test cases for the durable learning queue and its worker"""
+
+    @pytest.mark.asyncio
+    @patch("src.tools.learning_queue.schedule_learning")
+    async def test_enqueue_is_durable_and_deduplicated(self, mock_schedule):
+        """Test that jobs land in the store once per plan diff"""
+        store = InMemoryStore()
+
+        assert await enqueue_learning(store, "q", "A", "B", recalled_lesson_keys=["x"])
+        assert await enqueue_learning(store, "q", "A", "B")
+        assert not await enqueue_learning(None, "q", "A", "B")
+        assert not await enqueue_learning(store, "q", "", "B")
+
+        jobs = await pending_jobs(store)
+        assert len(jobs) == 1
+        assert jobs[0].value["recalled_lesson_keys"] == ["x"]
+        assert mock_schedule.call_count == 2
+
+    @pytest.mark.asyncio
+    @patch("src.tools.learning_queue.config")
+    @patch("src.tools.learning_queue.schedule_learning")
+    async def test_drain_batches_jobs(self, mock_schedule, mock_config):
+        """Test that several plan diffs are distilled with one LLM call"""
+        mock_config.LEARNING_BATCH_SIZE = 8
+        store = InMemoryStore()
+        await save_lesson(store, "Always cite sources", "old", lesson_id="a")
+        await enqueue_learning(store, "q1", "A1", "B1", recalled_lesson_keys=["a"])
+        await enqueue_learning(store, "q2", "A2", "B2")
+        await enqueue_learning(store, "q3", "same", "same")
+
+        llm, structured = batch_llm(
+            LessonBatch(
+                lessons=[
+                    BatchedLesson(has_lesson=True, lesson="Search primary sources"),
+                    BatchedLesson(has_lesson=False, lesson=""),
+                ]
+            )
+        )
+        stats = await drain_learning_queue(store, llm=llm)
+
+        structured.ainvoke.assert_called_once()
+        assert stats == {"done": 3, "lessons": 1, "retry": 0}
+        assert await store.asearch(LEARNING_QUEUE_NAMESPACE) == []
+        lessons = await store.asearch(LESSON_NAMESPACE, limit=10)
+        assert {item.value["lesson"] for item in lessons} == {
+            "Always cite sources",
+            "Search primary sources",
+        }
+        assert (await store.aget(LESSON_NAMESPACE, "a")).value["corrections"] == 1
+
+    @pytest.mark.asyncio
+    @patch("src.tools.learning_queue.config")
+    @patch("src.tools.learning_queue.schedule_learning")
+    async def test_failed_jobs_are_retried_then_dropped(
+        self, mock_schedule, mock_config
+    ):
+        """Test that failed jobs stay queued until they run out of attempts"""
+        mock_config.LEARNING_BATCH_SIZE = 8
+        mock_config.LEARNING_MAX_ATTEMPTS = 2
+        store = InMemoryStore()
+        await save_lesson(store, "Always cite sources", "old", lesson_id="a")
+        await enqueue_learning(store, "q1", "A1", "B1", recalled_lesson_keys=["a"])
+
+        llm, structured = batch_llm(RuntimeError("rate limited"), RuntimeError("again"))
+        assert (await drain_learning_queue(store, llm=llm))["retry"] == 1
+
+        (job,) = await pending_jobs(store)
+        assert job.value["attempts"] == 1
+        assert job.value["recalled_lesson_keys"] == []
+
+        assert (await drain_learning_queue(store, llm=llm))["done"] == 1
+        assert await pending_jobs(store) == []
+        # The outcome was recorded once despite the retry
+        assert (await store.aget(LESSON_NAMESPACE, "a")).value["corrections"] == 1
+
+    @pytest.mark.asyncio
+    @patch("src.tools.learning_queue.config")
+    @patch("src.tools.learning_queue.schedule_learning")
+    async def test_jobs_claimed_elsewhere_are_skipped(self, mock_schedule, mock_config):
+        """Test that a job another worker holds is left alone until its claim runs out"""
+        mock_config.LEARNING_BATCH_SIZE = 8
+        mock_config.LEARNING_CLAIM_SECONDS = 60
+        store = InMemoryStore()
+        await enqueue_learning(store, "q1", "A1", "B1")
+        (job,) = await pending_jobs(store)
+        claim = {"claimed_by": "other", "claim_until": time.time() + 60}
+        await store.aput(LEARNING_QUEUE_NAMESPACE, job.key, {**job.value, **claim})
+
+        llm, structured = batch_llm(
+            LessonBatch(lessons=[BatchedLesson(has_lesson=False, lesson="")])
+        )
+        assert (await drain_learning_queue(store, llm=llm))["done"] == 0
+        structured.ainvoke.assert_not_called()
+        assert len(await pending_jobs(store)) == 1
+
+        # The other worker died: its claim runs out and the job is taken over
+        claim["claim_until"] = time.time() - 1
+        await store.aput(LEARNING_QUEUE_NAMESPACE, job.key, {**job.value, **claim})
+        assert (await drain_learning_queue(store, llm=llm))["done"] == 1
+        assert await pending_jobs(store) == []
+
+    @pytest.mark.asyncio
+    @patch("src.tools.learning_queue.config")
+    @patch("src.tools.learning_queue.schedule_learning")
+    async def test_concurrent_drains_process_each_job_once(
+        self, mock_schedule, mock_config, tmp_path
+    ):
+        """Test that two workers draining one SQLite store never share a job"""
+        from src.store import SqliteStore
+
+        mock_config.LEARNING_BATCH_SIZE = 1
+        mock_config.LEARNING_CLAIM_SECONDS = 60
+        store = SqliteStore(str(tmp_path / "store.db"))
+        for i in range(6):
+            await enqueue_learning(store, f"q{i}", f"A{i}", f"B{i}")
+
+        distilled = []
+
+        async def distill(messages):
+            distilled.append(messages[0].content)
+            await asyncio.sleep(0)
+            return LessonBatch(lessons=[BatchedLesson(has_lesson=False, lesson="")])
+
+        llm, structured = batch_llm()
+        structured.ainvoke = AsyncMock(side_effect=distill)
+        first, second = await asyncio.gather(
+            drain_learning_queue(store, llm=llm), drain_learning_queue(store, llm=llm)
+        )
+
+        assert first["done"] + second["done"] == 6
+        assert len(distilled) == 6
+        assert await pending_jobs(store) == []
+        store.close()
+
+    def test_plan_changed_compares_questions(self):
+        """Test that an approval appended to the plan is not a correction"""
+        plan_a = "1. What is X?\n2. Why Y?"
+        approved = f"{plan_a}\n\n### Human Feedback:\nLooks good, go ahead."
+        edited = "### Human Feedback:\ndrop 2\n\n1. What is X?"
+
+        assert not plan_changed(plan_a, approved)
+        assert plan_changed(plan_a, edited)
+
+    @pytest.mark.asyncio
+    @patch("src.tools.learning_queue.config")
+    @patch("src.tools.learning_queue.schedule_learning")
+    async def test_approved_plan_is_not_distilled(self, mock_schedule, mock_config):
+        """Test that an unchanged plan credits recalled lessons without an LLM call"""
+        mock_config.LEARNING_BATCH_SIZE = 8
+        store = InMemoryStore()
+        await save_lesson(store, "Always cite sources", "old", lesson_id="a")
+        plan_a = "1. What is X?"
+        await enqueue_learning(
+            store,
+            "q",
+            plan_a,
+            f"### Human Feedback:\nok\n\n{plan_a}",
+            recalled_lesson_keys=["a"],
+        )
+
+        llm, structured = batch_llm()
+        stats = await drain_learning_queue(store, llm=llm)
+
+        structured.ainvoke.assert_not_called()
+        assert stats["done"] == 1 and stats["lessons"] == 0
+        lesson = (await store.aget(LESSON_NAMESPACE, "a")).value
+        assert lesson["helpful"] == 1 and lesson.get("corrections", 0) == 0
+
+
+class TestTenantNamespaces:
+    """Test cases for per-tenant lesson namespaces"""
+
+    def test_namespace_from_graph_config(self):
+        """Test that tenant and project come from configurable, then defaults"""
+        run_config = {"configurable": {"tenant_id": "acme", "project_id": "web"}}
+
+        assert get_lesson_namespace(run_config) == ("tenants", "acme", "web", "lessons")
+        assert get_lesson_namespace({"configurable": {"tenant_id": "acme"}}) == (
+            "tenants",
+            "acme",
+            "default",
+            "lessons",
+        )
+        assert get_lesson_namespace(None) == LESSON_NAMESPACE
+        with pytest.raises(ValueError):
+            lesson_namespace("acme.com")
+
+    @pytest.mark.asyncio
+    async def test_tenants_do_not_share_lessons(self):
+        """Test that recall sees the tenant's lessons and the shared tier only"""
+        store = InMemoryStore()
+        acme, globex = lesson_namespace("acme"), lesson_namespace("globex")
+        await save_lesson(store, "acme lesson", "q", namespace=acme)
+        await save_lesson(store, "globex lesson", "q", namespace=globex)
+        await save_lesson(store, "shared lesson", "q", lesson_id="shared")
+
+        notes = await recall_notes(store, "lesson", limit=5, namespace=acme)
+        assert sorted(notes) == ["acme lesson", "shared lesson"]
+
+        with patch("src.config.LESSON_SHARED_TIER", False):
+            notes = await recall_notes(store, "lesson", limit=5, namespace=acme)
+        assert notes == ["acme lesson"]
+
+        # Outcomes reach shared lessons recalled by a tenant
+        await record_lesson_outcome(store, ["shared"], corrected=False, namespace=acme)
+        assert (await store.aget(LESSON_NAMESPACE, "shared")).value["helpful"] == 1
+
+    @pytest.mark.asyncio
+    @patch("src.tools.learning_queue.config")
+    @patch("src.tools.learning_queue.schedule_learning")
+    async def test_queued_lessons_land_in_job_namespace(
+        self, mock_schedule, mock_config
+    ):
+        """Test that the worker saves each lesson into its own tenant's namespace"""
+        mock_config.LEARNING_BATCH_SIZE = 8
+        store = InMemoryStore()
+        acme = lesson_namespace("acme")
+        await enqueue_learning(store, "q", "A", "B", namespace=acme)
+        await enqueue_learning(store, "q", "A", "B")
+
+        llm, _ = batch_llm(
+            LessonBatch(
+                lessons=[
+                    BatchedLesson(has_lesson=True, lesson="acme lesson"),
+                    BatchedLesson(has_lesson=True, lesson="shared lesson"),
+                ]
+            )
+        )
+        learned = set()
+        await drain_learning_queue(store, llm=llm, learned=learned)
+
+        assert learned == {acme, LESSON_NAMESPACE}
+        assert [i.value["lesson"] for i in await store.asearch(acme)] == ["acme lesson"]
+
+
+class TestHybridRecall:
+    """Test cases for keyword, vector and fused lesson recall"""
+
+    def test_fuse_rankings(self):
+        """Test that items ranked well by both lists come first"""
+        a, b, c = (lesson_item(key, 0.0) for key in "abc")
+
+        fused = fuse_rankings([[a, b, c], [b, c]], k=60)
+
+        assert [item.key for item in fused] == ["b", "c", "a"]
+        assert fuse_rankings([[a]], k=60)[0].score == pytest.approx(1.0)
+
+    @pytest.mark.asyncio
+    async def test_bm25_fallback_for_plain_stores(self):
+        """Test that stores without a keyword index are scored in Python"""
+        store = InMemoryStore()
+        await save_lesson(store, "Always cite primary sources", "q", lesson_id="a")
+        await save_lesson(store, "Prefer recent benchmarks", "sources", lesson_id="b")
+        await save_lesson(store, "Check publication dates", "q", lesson_id="c")
+
+        results = await lexical_search(
+            store, LESSON_NAMESPACE, "cite sources", fields=LESSON_TEXT_FIELDS
+        )
+
+        assert [item.key for item in results] == ["a", "b"]
+
+    @pytest.mark.asyncio
+    async def test_lexical_mode_never_embeds(self):
+        """Test that lexical mode recalls without touching the vector search"""
+        store = InMemoryStore()
+        await save_lesson(store, "Always cite primary sources", "q", lesson_id="a")
+
+        with (
+            patch("src.tools.consult_note.config.LESSON_RECALL_MODE", "lexical"),
+            patch.object(
+                InMemoryStore,
+                "asearch",
+                autospec=True,
+                side_effect=InMemoryStore.asearch,
+            ) as search,
+        ):
+            notes = await recall_notes(store, "cite sources", limit=1)
+
+        assert notes == ["Always cite primary sources"]
+        # Only the Python BM25 listing, never a query search
+        assert all(call.kwargs.get("query") is None for call in search.call_args_list)
+
+    @pytest.mark.asyncio
+    async def test_hybrid_falls_back_when_embedder_unavailable(self):
+        """Test that hybrid recall skips vector search while embeddings are down"""
+        store = InMemoryStore()
+        await save_lesson(store, "Always cite primary sources", "q", lesson_id="a")
+        service = MagicMock(available=False)
+
+        with (
+            patch("src.tools.consult_note.get_embedding_service", return_value=service),
+            patch.object(
+                InMemoryStore,
+                "asearch",
+                autospec=True,
+                side_effect=InMemoryStore.asearch,
+            ) as search,
+        ):
+            notes = await recall_notes(store, "cite sources", limit=1)
+
+        assert notes == ["Always cite primary sources"]
+        assert all(call.kwargs.get("query") is None for call in search.call_args_list)
+
+    @pytest.mark.asyncio
+    async def test_hybrid_falls_back_on_vector_timeout(self):
+        """Test that a slow vector search is abandoned for keyword matches"""
+        store = InMemoryStore()
+        await save_lesson(store, "Always cite primary sources", "q", lesson_id="a")
+        plain_search = InMemoryStore.asearch
+
+        async def slow_search(self, namespace, *, query=None, **kwargs):
+            if query is not None:
+                await asyncio.sleep(5)
+            return await plain_search(self, namespace, query=query, **kwargs)
+
+        with (
+            patch.object(InMemoryStore, "asearch", slow_search),
+            patch("src.tools.consult_note.config.LESSON_RECALL_MODE", "hybrid"),
+            patch("src.tools.consult_note.config.LESSON_VECTOR_TIMEOUT_MS", 10),
+            patch(
+                "src.tools.consult_note.get_embedding_service",
+                return_value=MagicMock(available=True),
+            ),
+        ):
+            notes = await recall_notes(store, "cite sources", limit=1)
+
+        assert notes == ["Always cite primary sources"]
+
+    @pytest.mark.asyncio
+    async def test_hybrid_fuses_vector_and_keyword_matches(self, tmp_path):
+        """Test that a lesson matching both ways beats one matching only by meaning"""
+        from src.store import SqliteStore
+
+        def embed(texts):
+            # "cite" and "quote" mean the same thing to this embedder
+            return [
+                [1.0, 0.0]
+                if ("cite" in t.lower() or "quote" in t.lower())
+                else [0.0, 1.0]
+                for t in texts
+            ]
+
+        store = SqliteStore(
+            str(tmp_path / "store.db"),
+            index={"dims": 2, "embed": embed, "fields": ["lesson"]},
+        )
+        await save_lesson(store, "Quote the original paper", "q", lesson_id="quote")
+        await save_lesson(store, "Cite primary sources", "q", lesson_id="cite")
+        await save_lesson(store, "Check dates", "q", lesson_id="dates")
+
+        with patch(
+            "src.tools.consult_note.get_embedding_service",
+            return_value=MagicMock(available=True),
+        ):
+            recalled = await recall_lessons(store, "cite sources", limit=2)
+
+        assert [item.key for item in recalled] == ["cite", "quote"]
+        store.close()